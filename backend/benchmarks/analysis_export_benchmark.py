@@ -0,0 +1,154 @@
+"""
+Columnar Analysis Export Benchmark
+
+Appends synthetic completed-analysis records (the build_analysis_record()
+shape, spread over several days) through the columnar exporter, then runs the
+same offline question both ways:
+
+    mean forecaster latency and count per risk level,
+    for runs whose verification confidence was below 0.7
+
+- columnar: pyarrow.dataset scan of the hive-partitioned files, reading only
+  the three columns involved with the filter pushed down
+- baseline: replaying the records as JSON lines (json.loads per record)
+
+Reports export throughput (rows/s), bytes per row on disk, and scan time.
+
+Usage:
+    python benchmarks/analysis_export_benchmark.py --rows 200000 1000000 --format parquet --compression zstd
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.storage.columnar_export import AGENT_PREFIXES, ColumnarAnalysisExporter
+
+try:
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    ds = None
+
+RISK_LEVELS = ["Low", "Moderate", "High", "Critical"]
+CONCERNS = ["hypoglycemia", "hyperglycemia", "rapid_drop", "rapid_rise", "none"]
+EVENTS = ["meal", "exercise", "stress", "illness", "no_recent_significant_event"]
+EXIT_REASONS = ["confidence_threshold_met", "max_iterations", "unreliable_cgm_data"]
+DAY_MS = 86_400_000
+
+
+def synthetic_records(rows: int, days: int, seed: int):
+    """build_analysis_record()-shaped dicts, created evenly over `days` days"""
+    rng = np.random.default_rng(seed)
+    start_ms = int(time.time() * 1000) - days * DAY_MS
+    created = start_ms + np.sort(rng.integers(0, days * DAY_MS, rows))
+    risk = rng.integers(0, len(RISK_LEVELS), rows)
+    confidence = rng.uniform(0.4, 1.0, rows).round(3)
+    glucose = rng.integers(45, 350, rows)
+    latency = rng.gamma(4.0, 400.0, (rows, len(AGENT_PREFIXES))).round(1)
+    tokens = rng.integers(200, 4000, (rows, len(AGENT_PREFIXES)))
+    for i in range(rows):
+        iterations = 1 + int(confidence[i] < 0.8) + int(confidence[i] < 0.6)
+        yield {
+            "analysis_id": i + 1,
+            "session_id": f"session-{i:09d}",
+            "scenario_id": f"scenario_{i % 8}",
+            "created_at_ms": int(created[i]),
+            "risk_forecast": {"short_term_outlook": {"overall_risk_level": RISK_LEVELS[risk[i]],
+                                                     "primary_concern": CONCERNS[i % len(CONCERNS)]}},
+            "verification_output": {"verification_confidence": float(confidence[i])},
+            "verification_confidence": float(confidence[i]),
+            "iteration_count": iterations,
+            "total_duration_ms": float(latency[i].sum()),
+            "timings": {author: float(latency[i, j]) for j, author in enumerate(AGENT_PREFIXES)},
+            "cgm_data": {"glucose_value": int(glucose[i]), "trend_arrow": "Flat", "data_quality_issues": "None"},
+            "cgm_data_quality": {"reliable": True},
+            "context_event_type": EVENTS[i % len(EVENTS)],
+            "confidence_history": [float(confidence[i])] * iterations,
+            "exit_reason": EXIT_REASONS[i % len(EXIT_REASONS)],
+            "tokens": {author: {"input": int(tokens[i, j]), "output": int(tokens[i, j] // 4)}
+                       for j, author in enumerate(AGENT_PREFIXES)},
+        }
+
+
+def scan_columnar(directory: str, file_format: str):
+    dataset = ds.dataset(directory, format="parquet" if file_format == "parquet" else "ipc", partitioning="hive")
+    table = dataset.to_table(columns=["risk_level", "forecaster_latency_ms"],
+                             filter=pc.field("verification_confidence") < 0.7)
+    grouped = table.group_by("risk_level").aggregate([("forecaster_latency_ms", "mean"), ("risk_level", "count")])
+    return {row["risk_level"]: (row["risk_level_count"], row["forecaster_latency_ms_mean"])
+            for row in grouped.to_pylist()}
+
+
+def scan_json(path: str):
+    totals = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["verification_output"]["verification_confidence"] >= 0.7:
+                continue
+            level = record["risk_forecast"]["short_term_outlook"]["overall_risk_level"]
+            count, latency = totals.get(level, (0, 0.0))
+            totals[level] = (count + 1, latency + record["timings"]["GlycemicRiskForecasterAgent"])
+    return {level: (count, latency / count) for level, (count, latency) in totals.items()}
+
+
+def directory_bytes(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--flush-rows", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    if ds is None:
+        print("pyarrow is required for this benchmark (pip install pyarrow)")
+        return 1
+
+    print(f"{'rows':>10} | {'export rows/s':>13} | {'files':>5} | {'B/row':>6} | {'JSON B/row':>10} | "
+          f"{'scan s':>7} | {'JSON replay s':>13} | {'speedup':>7}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as directory:
+            export_dir = os.path.join(directory, "export")
+            json_path = os.path.join(directory, "analyses.jsonl")
+            exporter = ColumnarAnalysisExporter(export_dir, args.format, args.compression, flush_rows=args.flush_rows)
+            export_seconds = 0.0
+            with open(json_path, "w") as f:
+                for record in synthetic_records(rows, args.days, args.seed):
+                    started = time.perf_counter()
+                    exporter.append(record)
+                    export_seconds += time.perf_counter() - started
+                    f.write(json.dumps(record) + "\n")
+            started = time.perf_counter()
+            exporter.flush()
+            export_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            columnar = scan_columnar(export_dir, args.format)
+            scan_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            replayed = scan_json(json_path)
+            replay_seconds = time.perf_counter() - started
+            for level, (count, latency) in replayed.items():
+                assert columnar[level][0] == count and abs(columnar[level][1] - latency) < 1e-6, level
+
+            print(f"{rows:>10,} | {rows / export_seconds:>13,.0f} | {exporter.files_written:>5} | "
+                  f"{directory_bytes(export_dir) / rows:>6.1f} | {os.path.getsize(json_path) / rows:>10.1f} | "
+                  f"{scan_seconds:>7.3f} | {replay_seconds:>13.2f} | {replay_seconds / scan_seconds:>6.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
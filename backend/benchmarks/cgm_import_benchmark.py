@@ -0,0 +1,131 @@
+"""
+CGM Export Import Benchmark
+
+Writes synthetic Dexcom Clarity CSV and Nightscout JSON exports of growing
+length (5-minute EGVs with "Low" readings and non-EGV event rows mixed in),
+then selects the final 3 h window with the streaming importer and reports:
+
+- parse throughput (MB per second, untraced run)
+- peak Python heap (tracemalloc, NumPy buffers included) per file size:
+  flat for the importer, vs reading every row into memory first
+
+Usage:
+    python benchmarks/cgm_import_benchmark.py --years 0.5 1 2 4 --block-mb 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.ingestion.importer import iter_export_chunks, select_window
+
+DEXCOM_HEADER = (
+    "Index,Timestamp (YYYY-MM-DDThh:mm:ss),Event Type,Event Subtype,Patient Info,Device Info,Source Device ID,"
+    "Glucose Value (mg/dL),Insulin Value (u),Carb Value (grams),Duration (hh:mm:ss),"
+    "Glucose Rate of Change (mg/dL/min),Transmitter Time (Long Integer),Transmitter ID"
+)
+START = np.datetime64("2020-01-01T00:00:00")
+
+
+def synthetic_glucose(readings: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(readings) * 5
+    daily = 35 * np.sin(2 * np.pi * minutes / 1440) + 25 * np.sin(2 * np.pi * minutes / 360)
+    return np.clip(140 + daily + rng.normal(0, 6, readings), 39, 401).round().astype(int)
+
+
+def write_dexcom(path: str, readings: int, seed: int):
+    glucose = synthetic_glucose(readings, seed)
+    stamps = (START + np.arange(readings) * np.timedelta64(5, "m")).astype(str)
+    with open(path, "w", newline="") as f:
+        f.write(DEXCOM_HEADER + "\n1,,FirstName,,Sam,,,,,,,,,\n2,,Device,,,G6,,,,,,,,\n")
+        for i in range(readings):
+            value = "Low" if glucose[i] < 40 else "High" if glucose[i] > 400 else glucose[i]
+            f.write(f"{i + 3},{stamps[i]},EGV,,,,Android G6,{value},,,,,{i * 300},8XXXXX\n")
+            if i % 96 == 0:
+                f.write(f"{i + 3},{stamps[i]},Carbs,,,,Android G6,,,45,,,,\n")
+
+
+def write_nightscout(path: str, readings: int, seed: int):
+    glucose = synthetic_glucose(readings, seed)
+    epoch_ms = (START + np.arange(readings) * np.timedelta64(5, "m")).astype("datetime64[ms]").astype(np.int64)
+    with open(path, "w") as f:
+        f.write("[")
+        for i in range(readings - 1, -1, -1):  # Nightscout exports newest first
+            f.write(json.dumps({"_id": f"{i:024x}", "sgv": int(glucose[i]), "date": int(epoch_ms[i]),
+                                "direction": "Flat", "type": "sgv", "device": "xDrip"}))
+            f.write("," if i else "]")
+
+
+def load_everything(path: str):
+    """Baseline: every row into Python lists, then select the tail."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            records = json.load(f)
+        rows = [(r["date"] / 1000, r["sgv"]) for r in records]
+    else:
+        with open(path, newline="") as f:
+            rows = [row for row in csv.reader(f)][1:]
+    return len(rows)
+
+
+def measure(fn, *args):
+    """Result, seconds (untraced run) and peak traced heap (second run)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, nargs="+", default=[0.5, 1, 2, 4])
+    parser.add_argument("--block-mb", type=float, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    block_bytes = int(args.block_mb * 1024 * 1024)
+
+    print(f"{'file':>15} | {'years':>5} | {'MB':>6} | {'readings':>9} | {'import s':>8} | {'MB/s':>5} | "
+          f"{'import peak':>11} | {'load-all peak':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for years in args.years:
+            readings = int(years * 365 * 288)
+            for name, writer in (("dexcom.csv", write_dexcom), ("nightscout.json", write_nightscout)):
+                path = os.path.join(directory, name)
+                writer(path, readings, args.seed)
+                size_mb = os.path.getsize(path) / 1e6
+
+                def streamed():
+                    counted = [0]
+
+                    def chunks():
+                        for timestamps, glucose in iter_export_chunks(path, block_bytes):
+                            counted[0] += timestamps.size
+                            yield timestamps, glucose
+                    _, window = select_window(chunks())
+                    return counted[0], window
+
+                (parsed, window), seconds, peak = measure(streamed)
+                _, _, baseline_peak = measure(load_everything, path)
+                assert parsed == readings and None not in window, (parsed, readings)
+                print(f"{name:>15} | {years:>5g} | {size_mb:>6.1f} | {parsed:>9,} | {seconds:>8.2f} | "
+                      f"{size_mb / seconds:>5.1f} | {peak / 1e6:>8.1f} MB | {baseline_peak / 1e6:>10.1f} MB")
+                os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Cohort Generation Benchmark
+
+Generates the same synthetic cohort with 1, 2, 4 ... --max-workers processes
+and reports throughput, speedup over one worker and whether the output is
+byte-identical (per-patient seeds make it independent of the worker count).
+
+Then consumes the shards the way batch analysis does - memory-mapped, no
+parsing: for every day, the 3 h window ending one hour after each patient's
+key event goes through compute_window_features and forecast_trajectories in
+one vectorized call per shard, and time-below-range is reported per scenario.
+
+Usage:
+    python benchmarks/cohort_generation_benchmark.py --patients 2000 --days 14 --max-workers 8
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.analytics import compute_window_features, forecast_trajectories
+from t1d_swarm.analytics.cohort import SCENARIOS, event_windows, generate_cohort, iter_cohort_shards
+
+
+def digest(directory: str) -> str:
+    h = hashlib.sha256()
+    for shard in iter_cohort_shards(directory):
+        for key in ("glucose", "scenario", "events"):
+            h.update(np.ascontiguousarray(shard[key]).tobytes())
+    return h.hexdigest()[:16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-patients", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{args.patients} patients x {args.days} days, {os.cpu_count()} CPU(s)")
+    print(f"{'workers':>7} | {'seconds':>7} | {'patients/s':>10} | {'speedup':>7} | digest")
+    workers, baseline, reference = 1, None, None
+    with tempfile.TemporaryDirectory() as root:
+        while workers <= args.max_workers:
+            out = os.path.join(root, f"w{workers}")
+            started = time.perf_counter()
+            generate_cohort(out, args.patients, args.days, seed=args.seed, workers=workers,
+                            shard_patients=args.shard_patients)
+            seconds = time.perf_counter() - started
+            baseline = baseline or seconds
+            fingerprint = digest(out)
+            reference = reference or fingerprint
+            print(f"{workers:>7} | {seconds:>7.2f} | {args.patients / seconds:>10,.0f} | {baseline / seconds:>6.2f}x | "
+                  f"{fingerprint}{'' if fingerprint == reference else '  MISMATCH'}")
+            workers *= 2
+
+        below, counts = np.zeros(len(SCENARIOS)), np.zeros(len(SCENARIOS))
+        started = time.perf_counter()
+        windows = 0
+        for shard in iter_cohort_shards(os.path.join(root, "w1")):
+            for day in range(args.days):
+                batch = event_windows(shard["glucose"], shard["events"], day, window_samples=36, lead_samples=12)
+                features = compute_window_features(batch)
+                forecast_trajectories(batch, horizon_hours=1.0)
+                codes = shard["scenario"][np.arange(batch.shape[0]), shard["events"][:, day]]
+                np.add.at(below, codes, np.nan_to_num(features["time_below_range"]))
+                np.add.at(counts, codes, 1)
+                windows += batch.shape[0]
+        seconds = time.perf_counter() - started
+    print(f"batch path: {windows:,} event windows (features + 1 h forecast) in {seconds:.2f} s "
+          f"({windows / seconds:,.0f} windows/s)")
+    for code, name in enumerate(SCENARIOS):
+        print(f"  {name:>27}: {counts[code]:>6.0f} windows, time below range {below[code] / max(1, counts[code]):.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
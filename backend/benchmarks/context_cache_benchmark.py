@@ -0,0 +1,165 @@
+"""
+Context Cache Benchmark
+
+Runs the real RefinementLoopAgent for several sessions against a fake model,
+with the forecaster's and verifier's static instruction prefixes served from
+a ContextCacheManager backed by FakeCacheBackend, and reports per agent:
+
+- prompt tokens per call, and how many of them the provider reads from the
+  cache instead of processing (and billing) at the full input rate
+- cache traffic: creates, refreshes, deletes, prefixes too small to cache
+- parity: for every cached call, the cached prefix plus the rewritten request
+  must carry exactly the text of the original request
+
+A second phase drives the TTL lifecycle on a fake clock (refresh near expiry,
+recreate after expiry, delete on close). Prefixes under --min-tokens are
+served uncached, as the provider would reject them.
+
+Usage:
+    python benchmarks/context_cache_benchmark.py --sessions 20 --min-tokens 1024
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Shared offline fixtures (sets the model env vars before the agents import)
+from forecaster_refinement_tokens_benchmark import (
+    CGM_DATA, CONTEXT_EVENT, count_tokens, forecast, verification, TOKEN_SOURCE,
+)
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig
+from google.adk.events import Event
+from google.adk.models import LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from t1d_swarm.context_cache import ContextCacheManager, FakeCacheBackend
+from t1d_swarm.subagents.refinement_loop_agent.agent import RefinementLoopAgent
+from t1d_swarm.subagents.refinement_loop_agent.subagents.glycemic_risk_forecast_agent import agent as forecaster
+from t1d_swarm.subagents.refinement_loop_agent.subagents.forecast_verifier import agent as verifier
+
+PREFIX_CACHES = {"forecaster": forecaster.prefix_cache, "verifier": verifier.prefix_cache}
+
+
+def request_text(instruction: str, contents) -> str:
+    texts = [instruction or ""] + [p.text for c in contents for p in c.parts or [] if p.text]
+    return "".join("".join(texts).split())  # whitespace-insensitive
+
+
+async def run_sessions(sessions: int, backend: FakeCacheBackend, manager: ContextCacheManager) -> dict:
+    originals = {}
+    calls = defaultdict(list)
+    parity_errors = 0
+
+    for role, prefix_cache in PREFIX_CACHES.items():
+        prefix_cache.manager = manager
+        original_before = type(prefix_cache).before_model
+
+        async def before(callback_context, llm_request, _cache=prefix_cache, _before=original_before):
+            originals[id(llm_request)] = request_text(llm_request.config.system_instruction, llm_request.contents)
+            return await _before(_cache, callback_context, llm_request)
+
+        prefix_cache.before_model = before
+    # LlmAgent holds the bound callbacks it was built with; point them at the wrappers
+    forecaster.GlycemicRiskForecasterAgent.before_model_callback[2] = PREFIX_CACHES["forecaster"].before_model
+    verifier.ForecastVerifierAgent.before_model_callback = PREFIX_CACHES["verifier"].before_model
+
+    async def fake_generate(self, llm_request, stream=False):
+        nonlocal parity_errors
+        config = llm_request.config
+        cached_tokens = 0
+        instruction = str(config.system_instruction or "")
+        if config.cached_content:
+            cached = backend.resolve(config.cached_content)
+            instruction, cached_tokens = cached.system_instruction, cached.token_count
+            if request_text(instruction, llm_request.contents) != originals.get(id(llm_request)):
+                parity_errors += 1
+        role = "verifier" if "critically verifying" in instruction else "forecaster"
+        rounds = sum(1 for c in calls[role] if c["session"] == session_index) + 1
+        prompt_tokens = count_tokens(llm_request) + cached_tokens
+        calls[role].append({"session": session_index, "prompt": prompt_tokens, "cached": cached_tokens})
+        text = forecast(rounds) if role == "forecaster" else verification(rounds, 1500)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens, cached_content_token_count=cached_tokens or None,
+            ),
+        )
+
+    Gemini.generate_content_async = fake_generate
+    service = InMemorySessionService()
+    for session_index in range(sessions):
+        session = await service.create_session(
+            app_name="bench", user_id="u", state={"cgm_data": CGM_DATA, "context_event": CONTEXT_EVENT},
+        )
+        for author, text in (("user", "Run the T1D insight analysis."),
+                             ("SimulatedCGMFeedAgent", str(CGM_DATA)),
+                             ("AmbientContextSimulatorAgent", str(CONTEXT_EVENT))):
+            await service.append_event(session, Event(
+                invocation_id=f"run-{session_index}", author=author,
+                content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)]),
+            ))
+        ctx = InvocationContext(session_service=service, invocation_id=f"run-{session_index}",
+                                agent=RefinementLoopAgent, session=session, run_config=RunConfig())
+        async for event in RefinementLoopAgent.run_async(ctx):
+            if not event.partial:
+                await service.append_event(session, event)
+    return {"calls": calls, "parity_errors": parity_errors}
+
+
+async def ttl_lifecycle(min_tokens: int) -> dict:
+    now = [1_000_000.0]
+    clock = lambda: now[0]
+    backend = FakeCacheBackend(min_tokens=min_tokens, clock=clock)
+    manager = ContextCacheManager(backend, ttl=3600, refresh_margin=300, min_tokens=min_tokens, clock=clock)
+    prefix = "static instruction " * (min_tokens // 2)
+    steps = []
+    for advance, label in ((0, "first use"), (1000, "warm hit"), (2400, "near expiry"), (7200, "after expiry")):
+        now[0] += advance
+        entry = await manager.acquire("gemini-2.0-flash", prefix, label="lifecycle")
+        manager.release(entry)
+        steps.append((label, dict(backend.calls), round(entry.expire_at - now[0])))
+    await manager.close()
+    steps.append(("close", dict(backend.calls), sum(c.expire_at > now[0] for c in backend.caches.values())))
+    return {"steps": steps}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--min-tokens", type=int, default=1024, help="Provider minimum cacheable prefix")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    backend = FakeCacheBackend(min_tokens=args.min_tokens)
+    manager = ContextCacheManager(backend, min_tokens=args.min_tokens)
+    r = asyncio.run(run_sessions(args.sessions, backend, manager))
+
+    print(f"{args.sessions} sessions, tokens: {TOKEN_SOURCE}, min cacheable prefix {args.min_tokens} tokens")
+    print(f"{'agent':>10} | {'calls':>5} | {'prompt/call':>11} | {'cached/call':>11} | {'uncached/call':>13} | cached share")
+    for role, samples in r["calls"].items():
+        prompt = sum(s["prompt"] for s in samples) / len(samples)
+        cached = sum(s["cached"] for s in samples) / len(samples)
+        print(f"{role:>10} | {len(samples):>5} | {prompt:>11.0f} | {cached:>11.0f} | {prompt - cached:>13.0f} | "
+              f"{cached / prompt:.0%}")
+    stats = manager.stats()
+    print(f"backend calls {backend.calls}, too small to cache: {stats['too_small']}, "
+          f"parity errors: {r['parity_errors']}")
+
+    print("TTL lifecycle (fake clock, ttl 3600 s, refresh margin 300 s):")
+    for label, calls, remaining in asyncio.run(ttl_lifecycle(args.min_tokens))["steps"]:
+        detail = f"{remaining} live caches left" if label == "close" else f"ttl left {remaining}s"
+        print(f"  {label:>12}: {calls} {detail}")
+    return 1 if r["parity_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
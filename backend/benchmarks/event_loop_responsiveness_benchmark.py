@@ -0,0 +1,105 @@
+"""
+Event Loop Responsiveness Benchmark
+
+Streams SSE progress heartbeats from a ProgressTracker while several slow
+"scenario generations" run concurrently, and reports the worst heartbeat delay.
+
+The slow call is a blocking sleep standing in for the synchronous google-genai
+request in tools.generate_scenario. It runs either inline on the event loop
+(the old behaviour of the root before_agent_callback) or on the bounded
+blocking pool (execution.run_blocking).
+
+Exits non-zero when the pooled run misses --bound-ms, so it can gate CI.
+
+Usage:
+    python benchmarks/event_loop_responsiveness_benchmark.py --scenarios 8 --scenario-seconds 1.0
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.execution import BlockingExecutor
+from t1d_swarm.progress_system.tracker import ProgressTracker
+
+
+def slow_scenario(seconds: float) -> dict:
+    """Blocking stand-in for a synchronous model call."""
+    time.sleep(seconds)
+    return {"display_name": "Benchmark scenario"}
+
+
+async def measure_heartbeats(tracker: ProgressTracker, session_id: str, duration: float) -> list:
+    """Heartbeat delays (ms) beyond the configured interval while the stream runs."""
+    delays = []
+    stream = tracker.get_events_stream(session_id)
+    deadline = time.perf_counter() + duration
+    last = time.perf_counter()
+    async for message in stream:
+        now = time.perf_counter()
+        if '"heartbeat"' in message:
+            delays.append(max(0.0, (now - last - tracker.heartbeat_interval) * 1000))
+            last = now
+        if now >= deadline:
+            break
+    await stream.aclose()
+    return delays
+
+
+async def run_mode(mode: str, scenarios: int, scenario_seconds: float, interval: float, workers: int) -> dict:
+    tracker = ProgressTracker(heartbeat_interval=interval)
+    executor = BlockingExecutor(max_workers=workers)
+
+    async def scenario_task(index: int):
+        await asyncio.sleep(interval * index / 2)  # staggered arrivals
+        if mode == "inline":
+            slow_scenario(scenario_seconds)
+        else:
+            await executor.run(slow_scenario, scenario_seconds)
+
+    duration = scenario_seconds * max(1, scenarios / workers) + interval * scenarios + 1.0
+    heartbeat = asyncio.create_task(measure_heartbeats(tracker, f"bench-{mode}", duration))
+    await asyncio.gather(*(scenario_task(i) for i in range(scenarios)))
+    delays = await heartbeat
+    stats = executor.stats()
+    executor.shutdown()
+    delays.sort()
+    return {
+        "heartbeats": len(delays),
+        "max_delay_ms": delays[-1] if delays else float("nan"),
+        "p95_delay_ms": delays[int(0.95 * (len(delays) - 1))] if delays else float("nan"),
+        "max_queue_depth": stats["max_queue_depth"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=8)
+    parser.add_argument("--scenario-seconds", type=float, default=1.0)
+    parser.add_argument("--heartbeat-ms", type=float, default=100.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--bound-ms", type=float, default=50.0, help="Max heartbeat delay allowed with the pool")
+    parser.add_argument("--skip-inline", action="store_true", help="Only run the pooled mode")
+    args = parser.parse_args()
+
+    modes = ["pooled"] if args.skip_inline else ["inline", "pooled"]
+    results = {}
+    for mode in modes:
+        results[mode] = asyncio.run(run_mode(mode, args.scenarios, args.scenario_seconds,
+                                             args.heartbeat_ms / 1000, args.workers))
+        r = results[mode]
+        print(f"{mode:>7}: {r['heartbeats']:4d} heartbeats, max delay {r['max_delay_ms']:8.1f} ms, "
+              f"p95 {r['p95_delay_ms']:8.1f} ms, max queue depth {r['max_queue_depth']}")
+
+    if results["pooled"]["max_delay_ms"] > args.bound_ms:
+        print(f"FAIL: pooled heartbeat delay exceeded {args.bound_ms} ms")
+        sys.exit(1)
+    print(f"OK: pooled heartbeat delay within {args.bound_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Execution Profile Envelope Benchmark
+
+Runs the real root_agent (scenario setup, CGM feed, context, refinement loop,
+presenter, result capture) once per built-in scenario and repeat under each
+execution profile (fast / balanced / thorough) against a fake model, and
+publishes each profile's latency and cost envelope:
+
+- end-to-end latency p50 / p95 / max: the latency of every model call that
+  completed (a cancelled speculative duplicate adds none) plus the run's
+  orchestration time (callbacks, parsing, result capture), measured by making
+  the run again with the same draws and no sleeps. The fake sleeps each
+  latency scaled by --time-scale, so speculative attempts finish in order
+- model calls, search-grounded calls (verifier rounds), speculative
+  duplicates included
+- prompt and output tokens (request / response characters / 4)
+- cost per run from --input-price / --output-price per 1M tokens and
+  --search-price per 1000 grounded requests
+
+Each agent's call latency is lognormal around its --latency-ms median. The
+verifier's confidence depends on the scenario and rises each round, so the
+balanced profile's early exits and the thorough profile's full rounds happen
+as in real runs. The model tiers are whatever *_FAST_MODEL configures
+(usually none, so the cascade does not change the numbers here).
+
+--output writes the envelopes (and the assumptions behind them) as JSON.
+Envelopes from real traffic: record runs with RUN_RECORDING_DIR and replay them
+with benchmarks/replay_benchmark.py --latency-scale 1.
+
+Usage:
+    python benchmarks/execution_profile_benchmark.py --repeat 3 --output execution_profiles.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+_scratch = tempfile.mkdtemp(prefix="execution-profile-benchmark-")
+os.environ.update(
+    ANALYSIS_DB_PATH=os.path.join(_scratch, "analyses.db"), ANALYSIS_EXPORT_ENABLED="false", RUN_RECORDING_DIR="",
+)
+
+# Shared offline fixtures (sets the model env vars before the agents import)
+from forecaster_refinement_tokens_benchmark import FEEDBACK_ROUNDS
+
+from google.adk.models import LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from t1d_swarm.agent import root_agent, set_global_scenario
+from t1d_swarm.execution import PROFILES, model_call_hedger
+from t1d_swarm.tools import SCENARIO_DETAILS_DB
+
+AGENTS = ("feed", "context", "forecaster", "verifier", "presenter")
+# System instruction markers -> agent
+MARKERS = (
+    ("simulating Continuous Glucose Monitor", "feed"),
+    ("simulating contextual events", "context"),
+    ("critically verifying", "verifier"),
+    ("friendly and empathetic", "presenter"),
+)
+# Verification confidence of a scenario's first round (each later round adds ROUND_GAIN)
+BASE_CONFIDENCE = {
+    "stable_day": 0.84, "high_carb_hyper": 0.78, "post_exercise_hypo": 0.74, "complex_meal_delayed_spike": 0.7,
+    "edge_case_sensor_failure": 0.55, "edge_case_illness": 0.72, "contradictory_stress_hypo": 0.62,
+    "contradictory_symptoms": 0.58,
+}
+ROUND_GAIN = 0.07
+CONCERNS = {
+    "high_carb_hyper": "hyperglycemia", "complex_meal_delayed_spike": "hyperglycemia",
+    "edge_case_illness": "hyperglycemia", "post_exercise_hypo": "hypoglycemia",
+    "contradictory_stress_hypo": "hypoglycemia", "contradictory_symptoms": "data_discrepancy",
+    "edge_case_sensor_failure": "data_gap",
+}
+
+
+def agent_of(instruction: str) -> str:
+    return next((agent for marker, agent in MARKERS if marker in instruction), "forecaster")
+
+
+def tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def response_text(agent: str, run: dict) -> str:
+    scenario = run["scenario"]
+    if agent == "feed":
+        return json.dumps({"glucose_value": 142, "trend_arrow": "Flat", "unit": "mg/dL", "data_quality_issues": "None",
+                           "timestamp_simulated": "2025-06-01T12:00:00Z"})
+    if agent == "context":
+        return json.dumps({"event_type": "meal", "description_raw": SCENARIO_DETAILS_DB[scenario]["scenario_description"],
+                           "parsed_details": {}, "timestamp_event": "2025-06-01T11:30:00Z"})
+    if agent == "forecaster":
+        round_index = run["rounds"] + 1
+        return json.dumps({
+            "forecast_id": f"{scenario}-{round_index}",
+            "timestamp_forecast_generated": "2025-06-01T12:00:00Z",
+            "short_term_outlook": {
+                "overall_risk_level": "Moderate", "primary_concern": CONCERNS.get(scenario, "no_immediate_concern"),
+                "time_horizon_hours": 2, "confidence_score": 0.8,
+                "narrative_summary": f"Round {round_index}: " + SCENARIO_DETAILS_DB[scenario]["scenario_description"],
+            },
+            "contributing_factors": [{"factor_type": "context", "detail": f"refined in round {round_index}",
+                                      "impact_on_forecast": "moderate"}],
+            "suggested_focus_areas_qualitative": ["Recheck in an hour"],
+            "actionable_micro_insight_candidate": "Check your glucose again in an hour.",
+        })
+    if agent == "verifier":
+        run["rounds"] += 1
+        confidence = min(0.97, BASE_CONFIDENCE[scenario] + ROUND_GAIN * (run["rounds"] - 1) + run["rng"].gauss(0, 0.04))
+        findings = "Search findings: " + "clinical guidance on post-meal and post-exercise glucose. " * 40
+        return findings + "\n```json\n" + json.dumps({
+            "original_forecast_id": f"{scenario}-{run['rounds']}",
+            "verification_confidence": round(confidence, 2),
+            "verification_summary": f"Round {run['rounds']} checked against published guidance.",
+            "feedback_for_forecaster": FEEDBACK_ROUNDS[(run["rounds"] - 1) % len(FEEDBACK_ROUNDS)],
+        }) + "\n```"
+    return "Heads up: keep an eye on your glucose over the next hour. You've got this."
+
+
+def install_fake_model(args, run: dict, time_scale: float):
+    async def fake_generate(self, llm_request, stream=False):
+        instruction = str(llm_request.config.system_instruction or "")
+        agent = agent_of(instruction)
+        prompt = instruction + "".join(
+            part.text or "" for content in llm_request.contents for part in content.parts or []
+        )
+        text = response_text(agent, run)
+        usage = run["usage"]
+        usage["calls"] += 1
+        usage[f"{agent}_calls"] += 1
+        usage["search_calls"] += agent == "verifier"
+        usage["prompt_tokens"] += tokens(prompt)
+        usage["output_tokens"] += tokens(text)
+        latency_ms = args.latency_ms[agent] * math.exp(run["rng"].gauss(0, args.latency_sigma))
+        await asyncio.sleep(latency_ms / 1000 * time_scale)
+        usage["model_ms"] += latency_ms  # not reached when cancelled (losing speculative attempt)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=tokens(prompt), candidates_token_count=tokens(text),
+            ),
+        )
+
+    Gemini.generate_content_async = fake_generate
+
+
+async def run_profile(profile: str, args, time_scale: float) -> list:
+    run = {}
+    install_fake_model(args, run, time_scale)
+    results = []
+    for repeat in range(args.repeat):
+        for scenario in SCENARIO_DETAILS_DB:
+            rng = random.Random(f"{args.seed}-{repeat}-{scenario}")  # same draws in the timed and the bare pass
+            run.update(scenario=scenario, rounds=0, usage=Counter(), rng=rng)
+            set_global_scenario({"scenario_id": scenario, "custom_text": None, "profile": profile})
+            runner = InMemoryRunner(agent=root_agent, app_name="t1d_swarm")
+            session = await runner.session_service.create_session(app_name="t1d_swarm", user_id="bench")
+            started = time.perf_counter()
+            async for _ in runner.run_async(user_id="bench", session_id=session.id, new_message=types.Content(
+                    role="user", parts=[types.Part(text="Run the T1D insight analysis.")])):
+                pass
+            usage = dict(run["usage"])
+            usage["wall_ms"] = (time.perf_counter() - started) * 1000
+            usage["cost_usd"] = (usage.get("prompt_tokens", 0) * args.input_price
+                                 + usage.get("output_tokens", 0) * args.output_price) / 1e6 \
+                + usage.get("search_calls", 0) * args.search_price / 1000
+            results.append(usage)
+    set_global_scenario(None)
+    return results
+
+
+def quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def envelope(results: list) -> dict:
+    def summary(key: str, digits: int = 1) -> dict:
+        values = [r.get(key, 0) for r in results]
+        return {"p50": round(quantile(values, 0.5), digits), "p95": round(quantile(values, 0.95), digits),
+                "max": round(max(values), digits), "mean": round(sum(values) / len(values), digits)}
+
+    return {
+        "runs": len(results),
+        "latency_ms": summary("latency_ms", 0),
+        "orchestration_ms": summary("overhead_ms"),
+        "model_calls": summary("calls"),
+        "calls_by_agent": {agent: round(sum(r.get(f"{agent}_calls", 0) for r in results) / len(results), 2)
+                           for agent in AGENTS},
+        "search_calls": summary("search_calls"),
+        "prompt_tokens": summary("prompt_tokens", 0),
+        "output_tokens": summary("output_tokens", 0),
+        "cost_usd": summary("cost_usd", 5),
+    }
+
+
+def parse_latencies(text: str) -> dict:
+    latencies = {"feed": 1200, "context": 1000, "forecaster": 2500, "verifier": 5000, "presenter": 1200}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        agent, ms = item.split("=")
+        if agent not in latencies:
+            raise argparse.ArgumentTypeError(f"unknown agent '{agent}' (expected one of: {', '.join(latencies)})")
+        latencies[agent] = float(ms)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per built-in scenario and profile")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency-ms", type=parse_latencies, default=parse_latencies(""),
+                        help="Median call latency per agent, e.g. 'forecaster=3000,verifier=7000'")
+    parser.add_argument("--latency-sigma", type=float, default=0.35, help="Lognormal spread of call latency")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="Fraction of the model latency actually slept")
+    parser.add_argument("--input-price", type=float, default=0.10, help="USD per 1M prompt tokens")
+    parser.add_argument("--output-price", type=float, default=0.40, help="USD per 1M output tokens")
+    parser.add_argument("--search-price", type=float, default=35.0, help="USD per 1000 search-grounded requests")
+    parser.add_argument("--output", help="Write the envelopes as JSON to this path")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    # Speculation is per profile; plain p90 hedging would blur the comparison
+    model_call_hedger.enabled = False
+
+    envelopes = {}
+    for profile in args.profiles:
+        timed = asyncio.run(run_profile(profile, args, args.time_scale))
+        overhead = asyncio.run(run_profile(profile, args, 0.0))
+        for result, bare in zip(timed, overhead):
+            result["latency_ms"] = result.get("model_ms", 0.0) + bare["wall_ms"]
+            result["overhead_ms"] = bare["wall_ms"]
+        envelopes[profile] = envelope(timed)
+
+    print(f"{len(SCENARIO_DETAILS_DB)} scenarios x {args.repeat} runs per profile, median call latency "
+          f"{', '.join(f'{agent} {ms:.0f} ms' for agent, ms in args.latency_ms.items())}")
+    print(f"{'profile':>9} | {'p50 ms':>7} | {'p95 ms':>7} | {'max ms':>7} | {'calls p50':>9} | {'calls max':>9} | "
+          f"{'search':>6} | {'prompt tok p95':>14} | {'out tok p95':>11} | {'cost p50 $':>10} | {'cost p95 $':>10}")
+    for profile, e in envelopes.items():
+        print(f"{profile:>9} | {e['latency_ms']['p50']:>7.0f} | {e['latency_ms']['p95']:>7.0f} | "
+              f"{e['latency_ms']['max']:>7.0f} | {e['model_calls']['p50']:>9.0f} | {e['model_calls']['max']:>9.0f} | "
+              f"{e['search_calls']['mean']:>6.1f} | {e['prompt_tokens']['p95']:>14,.0f} | "
+              f"{e['output_tokens']['p95']:>11,.0f} | {e['cost_usd']['p50']:>10.5f} | {e['cost_usd']['p95']:>10.5f}")
+        print(f"{'':>9}   calls per run by agent: {e['calls_by_agent']}, "
+              f"orchestration p50 {e['orchestration_ms']['p50']:.0f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "profiles": envelopes,
+                "definitions": {name: PROFILES[name].to_dict() for name in envelopes},
+                "assumptions": {
+                    "median_latency_ms": args.latency_ms, "latency_sigma": args.latency_sigma,
+                    "usd_per_1m_prompt_tokens": args.input_price, "usd_per_1m_output_tokens": args.output_price,
+                    "usd_per_1k_search_requests": args.search_price, "runs_per_scenario": args.repeat, "seed": args.seed,
+                    "tokens": "characters / 4",
+                },
+            }, f, indent=2)
+        print(f"Envelopes written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Forecaster Refinement Token Benchmark
+
+Runs the real RefinementLoopAgent (forecaster -> verifier -> confidence check,
+up to 3 iterations) against a fake model and measures the forecaster's prompt
+size per iteration in both refinement modes:
+
+- full:  iteration 2+ resend the complete update prompt plus the whole loop
+         history (the previous behaviour)
+- delta: iteration 2+ keep iteration 1's instruction and turn contents and add
+         only the previous forecast and the verifier's feedback
+
+The session is seeded like a real run (user message, CGM feed and ambient
+context agent outputs); the verifier answers with search-style findings plus
+its JSON verdict, with rising confidence and new feedback each round so the
+loop runs all iterations. Tokens are counted with the local Gemini tokenizer
+when sentencepiece is installed, else estimated at 4 characters per token.
+The counts reach the agent as usage metadata, so the forecaster_token_usage
+state written by record_prompt_tokens is what gets reported.
+
+Usage:
+    python benchmarks/forecaster_refinement_tokens_benchmark.py --verifier-chars 3000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Offline run: every model call below is answered by fake_generate
+for _var in ("GLYCEMIC_FORECAST_MODEL", "FORECAST_VERIFIER_MODEL", "SIMULATED_CGM_MODEL",
+             "AMBIENT_CONTEXT_MODEL", "INSIGHT_PRESENTER_MODEL", "GENERATE_SCENARIO_MODEL"):
+    os.environ.setdefault(_var, "gemini-2.0-flash")
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig
+from google.adk.events import Event
+from google.adk.models import LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from t1d_swarm.subagents.refinement_loop_agent.agent import RefinementLoopAgent
+from t1d_swarm.subagents.refinement_loop_agent.subagents.glycemic_risk_forecast_agent import refinement
+
+try:
+    from google.genai.local_tokenizer import LocalTokenizer
+    _tokenizer = LocalTokenizer("gemini-2.0-flash")
+    TOKEN_SOURCE = "local Gemini tokenizer"
+except ImportError:  # optional dependency (sentencepiece)
+    _tokenizer = None
+    TOKEN_SOURCE = "estimate, 4 chars/token"
+
+CGM_DATA = {
+    "current_glucose_mg_dl": 92, "trend_arrow": "SingleDown", "data_quality_issues": [],
+    "readings": [{"minutes_ago": m, "glucose_mg_dl": 160 - (60 - m)} for m in range(60, -1, -5)],
+}
+CONTEXT_EVENT = {
+    "event_type": "exercise", "description_raw": "45 min run finished 20 minutes ago, moderate intensity",
+    "time_since_event_minutes": 20, "user_reported_symptoms": [],
+}
+
+
+# Distinct points each round (repeated feedback would end the loop early)
+FEEDBACK_ROUNDS = [
+    ["Quantify how the falling trend interacts with the recent run.",
+     "Mention insulin on board timing relative to the exercise."],
+    ["Explain why the risk level moved from elevated to high.",
+     "Address delayed overnight hypoglycemia after afternoon activity."],
+    ["Tone down the alarm in the micro insight; the reading is still in range.",
+     "State the time horizon explicitly in the narrative."],
+]
+
+
+def count_tokens(request) -> int:
+    texts = [str(request.config.system_instruction or "")]
+    texts += [part.text for content in request.contents for part in content.parts or [] if part.text]
+    if _tokenizer is not None:
+        return _tokenizer.count_tokens(texts).total_tokens
+    return sum(len(text) for text in texts) // 4
+
+
+def forecast(iteration: int) -> str:
+    return json.dumps({
+        "forecast_id": f"fc-{iteration}",
+        "short_term_outlook": {
+            "overall_risk_level": ["elevated", "high", "high"][iteration - 1],
+            "primary_concern": "hypoglycemia", "time_horizon_hours": 2.0,
+            "narrative_summary": f"Revision {iteration}: glucose is falling steadily after a moderate run; "
+                                 "post-exercise insulin sensitivity may extend the drop over the next hours. " * iteration,
+            "confidence_score": 0.5 + 0.1 * iteration,
+        },
+        "contributing_factors": [
+            {"factor_type": "cgm_trend", "detail": "SingleDown from 160 to 92 mg/dL over the last hour",
+             "impact_on_forecast": "Sustained fall raises near-term hypoglycemia risk"},
+            {"factor_type": "exercise", "detail": f"Moderate 45 min run, finished 20 min ago (round {iteration})",
+             "impact_on_forecast": "Increased insulin sensitivity may prolong the drop"},
+        ],
+        "suggested_focus_areas_qualitative": ["Monitor glucose closely over the next few hours."],
+        "actionable_micro_insight_candidate": "Heads up: your glucose is dropping after your run - keep carbs nearby.",
+    })
+
+
+def verification(iteration: int, findings_chars: int) -> str:
+    findings = (f"Search round {iteration}: sources describe delayed post-exercise hypoglycemia up to 24 h after "
+                "moderate aerobic activity, with the largest effect in the first hours. ")
+    verdict = {
+        "original_forecast_id": f"fc-{iteration}",
+        "verification_confidence": [0.45, 0.55, 0.65][iteration - 1],
+        "verification_summary": f"Round {iteration}: forecast direction is plausible but under-specified.",
+        "feedback_for_forecaster": FEEDBACK_ROUNDS[iteration - 1],
+    }
+    return (findings * (findings_chars // len(findings) + 1))[:findings_chars] + "\n```json\n" + json.dumps(verdict) + "\n```"
+
+
+async def run_loop(mode: str, findings_chars: int) -> list:
+    refinement.REFINEMENT_MODE = mode
+    rounds = {"forecaster": 0, "verifier": 0}
+
+    async def fake_generate(self, llm_request, stream=False):
+        instruction = str(llm_request.config.system_instruction or "")
+        role = "verifier" if "critically verifying" in instruction else "forecaster"
+        rounds[role] += 1
+        text = forecast(rounds[role]) if role == "forecaster" else verification(rounds[role], findings_chars)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=count_tokens(llm_request)),
+        )
+
+    Gemini.generate_content_async = fake_generate
+    service = InMemorySessionService()
+    session = await service.create_session(
+        app_name="bench", user_id="u", state={"cgm_data": CGM_DATA, "context_event": CONTEXT_EVENT},
+    )
+    # What the pipeline puts in the conversation before the loop starts
+    seed = [
+        ("user", "Run the T1D insight analysis."),
+        ("SimulatedCGMFeedAgent", json.dumps(CGM_DATA)),
+        ("AmbientContextSimulatorAgent", json.dumps(CONTEXT_EVENT)),
+    ]
+    for author, text in seed:
+        await service.append_event(session, Event(
+            invocation_id="bench-run", author=author,
+            content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)]),
+        ))
+
+    ctx = InvocationContext(
+        session_service=service, invocation_id="bench-run", agent=RefinementLoopAgent,
+        session=session, run_config=RunConfig(),
+    )
+    async for event in RefinementLoopAgent.run_async(ctx):
+        if not event.partial:
+            await service.append_event(session, event)
+    return session.state.get(refinement.TOKEN_USAGE_KEY) or []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verifier-chars", type=int, default=3000,
+                        help="Length of the verifier's search findings ahead of its JSON verdict")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    usage = {mode: asyncio.run(run_loop(mode, args.verifier_chars))
+             for mode in (refinement.REFINEMENT_MODE_FULL, refinement.REFINEMENT_MODE_DELTA)}
+    full, delta = usage[refinement.REFINEMENT_MODE_FULL], usage[refinement.REFINEMENT_MODE_DELTA]
+    print(f"Forecaster prompt tokens per iteration ({TOKEN_SOURCE}), verifier findings {args.verifier_chars} chars")
+    print(f"{'iteration':>9} | {'full':>7} | {'delta':>7} | saved")
+    for f, d in zip(full, delta):
+        print(f"{f['iteration']:>9} | {f['prompt_tokens']:>7} | {d['prompt_tokens']:>7} | "
+              f"{f['prompt_tokens'] - d['prompt_tokens']:>6} ({1 - d['prompt_tokens'] / f['prompt_tokens']:.0%})")
+    total_full, total_delta = sum(e["prompt_tokens"] for e in full), sum(e["prompt_tokens"] for e in delta)
+    print(f"{'run total':>9} | {total_full:>7} | {total_delta:>7} | "
+          f"{total_full - total_delta:>6} ({1 - total_delta / total_full:.0%})")
+    return 0 if len(full) == len(delta) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Numeric Glucose Forecast Benchmark
+
+Forecasts 0-3 h trajectories for a synthetic population in one vectorized
+call and compares it with forecasting the same users one at a time. Each
+user's day is a baseline plus gamma-shaped meal rises, a post-exercise drop
+and sensor noise (NaN gaps at --gap-rate); the window before "now" is the
+input and the following hours are the truth the forecast is scored against:
+
+- throughput: users per second, batch vs per-user loop (sampled, extrapolated)
+- accuracy: mean absolute error at 30 / 60 / 120 minutes against the last
+  reading carried forward, and how often the truth falls inside the 80% band
+
+Usage:
+    python benchmarks/glucose_forecast_benchmark.py --users 10000 --window-minutes 180
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.analytics.glucose_forecast import (
+    CARB_PEAK_MINUTES, NET_CARB_EFFECT_MG_DL_PER_G, carb_absorbed, exercise_drop, forecast_trajectories,
+)
+
+INTERVAL_MINUTES = 5.0
+
+
+def synthetic_population(users: int, window_minutes: float, horizon_hours: float, gap_rate: float, seed: int):
+    """Windows (with gaps), future truth and the meal / exercise inputs per user."""
+    rng = np.random.default_rng(seed)
+    steps_before = int(window_minutes / INTERVAL_MINUTES)
+    steps_after = int(horizon_hours * 60 / INTERVAL_MINUTES)
+    t = (np.arange(-steps_before + 1, steps_after + 1) * INTERVAL_MINUTES)[np.newaxis, :]
+
+    baseline = rng.normal(130, 25, (users, 1)) + rng.normal(0, 0.15, (users, 1)) * t  # slow drift
+    carbs = np.where(rng.random(users) < 0.5, rng.uniform(20, 90, users), 0.0)
+    carbs_ago = rng.uniform(0, 120, users)
+    # The true absorption peak varies around the model's
+    peak_scale = rng.uniform(0.7, 1.4, (users, 1))
+    meal = NET_CARB_EFFECT_MG_DL_PER_G * carbs[:, np.newaxis] * carb_absorbed(
+        (t + carbs_ago[:, np.newaxis]) / peak_scale
+    )
+    intensity = np.where(rng.random(users) < 0.3, rng.uniform(0.3, 1.0, users), 0.0)
+    exercise_ago = rng.uniform(0, 90, users)
+    exercise = -intensity[:, np.newaxis] * exercise_drop(t + exercise_ago[:, np.newaxis])
+
+    truth = np.clip(baseline + meal + exercise, 40, 400)
+    observed = truth[:, :steps_before] + rng.normal(0, 6, (users, steps_before))
+    observed[rng.random(observed.shape) < gap_rate] = np.nan
+    observed[:, -1] = truth[:, steps_before - 1]  # a current reading for every user
+    inputs = {"carbs_g": carbs, "carbs_minutes_ago": carbs_ago,
+              "exercise_intensity": intensity, "exercise_minutes_ago": exercise_ago}
+    return observed, truth[:, steps_before:], inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--window-minutes", type=float, default=180)
+    parser.add_argument("--horizon-hours", type=float, default=3.0)
+    parser.add_argument("--gap-rate", type=float, default=0.05)
+    parser.add_argument("--loop-sample", type=int, default=500, help="Users timed one at a time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    window, truth, inputs = synthetic_population(
+        args.users, args.window_minutes, args.horizon_hours, args.gap_rate, args.seed
+    )
+
+    started = time.perf_counter()
+    batch = forecast_trajectories(window, INTERVAL_MINUTES, args.horizon_hours, **inputs)
+    batch_seconds = time.perf_counter() - started
+
+    sample = min(args.loop_sample, args.users)
+    started = time.perf_counter()
+    for user in range(sample):
+        forecast_trajectories(window[user], INTERVAL_MINUTES, args.horizon_hours,
+                              **{name: values[user] for name, values in inputs.items()})
+    loop_seconds = (time.perf_counter() - started) / sample * args.users
+
+    print(f"{args.users} users, {args.window_minutes:.0f} min windows ({args.gap_rate:.0%} gaps), "
+          f"{args.horizon_hours:g} h horizon, meal peak {CARB_PEAK_MINUTES:.0f} min (truth 0.7-1.4x)")
+    print(f"  batch call:    {batch_seconds * 1000:8.1f} ms  ({args.users / batch_seconds:,.0f} users/s)")
+    print(f"  per-user loop: {loop_seconds * 1000:8.1f} ms  (extrapolated from {sample} users), "
+          f"{loop_seconds / batch_seconds:.0f}x slower")
+
+    last_value = window[:, -1:]
+    inside = (truth >= batch["low_80"]) & (truth <= batch["high_80"])
+    print(f"{'minutes':>8} | {'kalman MAE':>10} | {'last-value MAE':>14} | in 80% band")
+    for minutes in (30, 60, 120, 180):
+        step = int(minutes / INTERVAL_MINUTES) - 1
+        if step >= truth.shape[1]:
+            break
+        kalman = np.nanmean(np.abs(batch["mean"][:, step] - truth[:, step]))
+        naive = np.nanmean(np.abs(last_value[:, 0] - truth[:, step]))
+        print(f"{minutes:>8} | {kalman:>10.1f} | {naive:>14.1f} | {inside[:, step].mean():.0%}")
+    hypo = ~np.isnan(batch["minutes_to_hypo"])
+    print(f"users with a forecast hypo within the horizon: {hypo.mean():.1%}, "
+          f"median time to hypo {np.nanmedian(batch['minutes_to_hypo']) if hypo.any() else float('nan'):.0f} min")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Hedged Model Calls Benchmark
+
+Sends refinement rounds (forecaster call, then verifier call) through the
+agents' real HedgedLlm models against a fake model with long-tail latency:
+each call takes a lognormal time around --base-ms, and --tail-rate of them
+are slowed down --tail-factor times (a stuck search round, a cold backend).
+
+Runs the same workload with hedging off and on (timeouts apply in both) and
+reports per-call and per-round p50 / p90 / p99 latency, the hedge rate and how
+often the hedge won. Each phase starts with a warm-up so the rolling p90 has
+--min-samples latencies before hedging can fire.
+
+Usage:
+    python benchmarks/hedged_model_calls_benchmark.py --rounds 400 --tail-rate 0.05 --tail-factor 10
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Shared offline fixtures (sets the model env vars before the agents import)
+from forecaster_refinement_tokens_benchmark import forecast, verification
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.genai import types
+
+from t1d_swarm.execution import HedgedCaller
+from t1d_swarm.subagents.refinement_loop_agent.subagents.glycemic_risk_forecast_agent.agent import (
+    GlycemicRiskForecasterAgent,
+)
+from t1d_swarm.subagents.refinement_loop_agent.subagents.forecast_verifier.agent import ForecastVerifierAgent
+
+AGENTS = {"forecaster": GlycemicRiskForecasterAgent, "verifier": ForecastVerifierAgent}
+
+
+def percentiles(samples) -> str:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return f"{pick(0.5):>6.0f} | {pick(0.9):>6.0f} | {pick(0.99):>6.0f}"
+
+
+async def run_phase(hedge: bool, args) -> dict:
+    rng = random.Random(args.seed)
+    hedger = HedgedCaller(enabled=hedge, min_samples=args.min_samples, min_delay=args.base_ms / 1000,
+                          max_hedge_ratio=args.max_hedge_ratio)
+    for agent in AGENTS.values():
+        hedger.register(agent.model.hedger.policies[agent.model.policy_name])
+        agent.model.hedger = hedger
+
+    async def fake_generate(self, llm_request, stream=False):
+        seconds = rng.lognormvariate(0, 0.25) * args.base_ms / 1000
+        if rng.random() < args.tail_rate:
+            seconds *= args.tail_factor
+        await asyncio.sleep(seconds)
+        text = verification(1, 200) if "verifier" in llm_request.config.system_instruction else forecast(1)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+    Gemini.generate_content_async = fake_generate
+
+    async def call(role: str) -> float:
+        agent = AGENTS[role]
+        request = LlmRequest(
+            model=agent.model.model, config=types.GenerateContentConfig(system_instruction=f"{role} instruction"),
+        )
+        started = time.perf_counter()
+        async for _ in agent.model.generate_content_async(request):
+            pass
+        return time.perf_counter() - started
+
+    gate = asyncio.Semaphore(args.concurrency)
+    calls, rounds = [], []
+
+    async def refinement_round(record: bool):
+        async with gate:
+            started = time.perf_counter()
+            timings = [await call("forecaster"), await call("verifier")]
+            if record:
+                calls.extend(timings)
+                rounds.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(refinement_round(False) for _ in range(args.min_samples)))
+    await asyncio.gather(*(refinement_round(True) for _ in range(args.rounds)))
+    return {"calls": calls, "rounds": rounds, "stats": hedger.stats()["policies"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--base-ms", type=float, default=100, help="Median model call latency")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="Share of calls in the slow tail")
+    parser.add_argument("--tail-factor", type=float, default=10, help="Slowdown of a tail call")
+    parser.add_argument("--min-samples", type=int, default=20)
+    parser.add_argument("--max-hedge-ratio", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results = {"no hedging": asyncio.run(run_phase(False, args)), "hedged": asyncio.run(run_phase(True, args))}
+
+    print(f"{args.rounds} rounds x 2 calls, median {args.base_ms:.0f} ms, {args.tail_rate:.0%} of calls "
+          f"{args.tail_factor:.0f}x slower, concurrency {args.concurrency}")
+    print(f"{'mode':>10} | {'':>5} | {'p50 ms':>6} | {'p90 ms':>6} | {'p99 ms':>6} | hedges (won)")
+    for mode, r in results.items():
+        hedged = sum(p["hedged"] for p in r["stats"].values())
+        wins = sum(p["hedge_wins"] for p in r["stats"].values())
+        total = sum(p["calls"] for p in r["stats"].values())
+        print(f"{mode:>10} | {'call':>5} | {percentiles(r['calls'])} | {hedged / total:.1%} ({wins})")
+        print(f"{'':>10} | {'round':>5} | {percentiles(r['rounds'])} |")
+    before, after = (sorted(results[m]["rounds"]) for m in ("no hedging", "hedged"))
+    p99 = lambda s: s[min(len(s) - 1, int(0.99 * len(s)))]
+    print(f"round p99 reduction: {1 - p99(after) / p99(before):.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
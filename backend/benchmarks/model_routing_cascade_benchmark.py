@@ -0,0 +1,153 @@
+"""
+Model Routing Cascade Benchmark
+
+Runs the real RefinementLoopAgent for a set of sessions against a fake model
+with per-tier latency, once with the forecaster on the large model only and
+once through the cheap-first cascade (GLYCEMIC_FORECAST_FAST_MODEL), and
+reports end-to-end loop latency, model calls per tier and the escalation rate.
+
+Each session is easy or hard (--hard-fraction). The verifier's confidence
+depends on which tier wrote the forecast: the fast tier clears the loop's
+threshold on easy sessions only, the large tier on both. A share of the fast
+tier's answers (--invalid-rate) is truncated JSON, which the router's schema
+validator catches and re-sends to the large tier at once.
+
+Usage:
+    python benchmarks/model_routing_cascade_benchmark.py --sessions 30 --fast-ms 40 --large-ms 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FAST_MODEL = "gemini-2.0-flash-lite"
+os.environ.setdefault("GLYCEMIC_FORECAST_FAST_MODEL", FAST_MODEL)
+
+# Shared offline fixtures (sets the model env vars before the agents import)
+from forecaster_refinement_tokens_benchmark import CGM_DATA, CONTEXT_EVENT, FEEDBACK_ROUNDS, forecast
+
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import RunConfig
+from google.adk.events import Event
+from google.adk.models import LlmResponse
+from google.adk.models.google_llm import Gemini
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from t1d_swarm.execution import ModelRouter
+from t1d_swarm.subagents.refinement_loop_agent.agent import RefinementLoopAgent
+from t1d_swarm.subagents.refinement_loop_agent.subagents.glycemic_risk_forecast_agent import agent as forecaster
+
+# Verification confidence by (session difficulty, forecast tier)
+CONFIDENCE = {("easy", "fast"): 0.85, ("hard", "fast"): 0.6, ("easy", "large"): 0.9, ("hard", "large"): 0.85}
+
+
+def verdict(round_index: int, confidence: float) -> str:
+    return "```json\n" + json.dumps({
+        "original_forecast_id": f"fc-{round_index}",
+        "verification_confidence": confidence,
+        "verification_summary": f"Round {round_index}: checked against post-exercise glucose literature.",
+        "feedback_for_forecaster": FEEDBACK_ROUNDS[(round_index - 1) % len(FEEDBACK_ROUNDS)],
+    }) + "\n```"
+
+
+async def run_sessions(sessions, cascade: bool, args) -> dict:
+    policy = forecaster.routing_policy
+    large_model = forecaster.MODEL_NAME
+    policy.tiers = [FAST_MODEL, large_model] if cascade else [large_model]
+    # Fresh counters per phase; the agent's bound callbacks follow the router instance
+    router = forecaster.model_router
+    router.__dict__.update(ModelRouter().__dict__)
+    router.register(policy)
+
+    calls = Counter()
+    current = {}
+
+    async def fake_generate(self, llm_request, stream=False):
+        instruction = str(llm_request.config.system_instruction or "")
+        if "critically verifying" in instruction:
+            await asyncio.sleep(args.verifier_ms / 1000)
+            calls["verifier"] += 1
+            current["round"] += 1
+            text = verdict(current["round"], CONFIDENCE[(current["difficulty"], current["tier"])])
+        else:
+            tier = "fast" if llm_request.model == FAST_MODEL else "large"
+            await asyncio.sleep((args.fast_ms if tier == "fast" else args.large_ms) / 1000)
+            calls[f"forecaster_{tier}"] += 1
+            current["tier"] = tier
+            text = forecast(min(current["round"] + 1, 3))
+            if tier == "fast" and current["rng"].random() < args.invalid_rate:
+                text = text[: len(text) // 2]  # truncated JSON
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+    Gemini.generate_content_async = fake_generate
+    service = InMemorySessionService()
+    latencies = []
+    for index, difficulty in enumerate(sessions):
+        current.update(round=0, tier="large", difficulty=difficulty, rng=random.Random(index))
+        session = await service.create_session(
+            app_name="bench", user_id="u", state={"cgm_data": CGM_DATA, "context_event": CONTEXT_EVENT},
+        )
+        for author, text in (("user", "Run the T1D insight analysis."),
+                             ("SimulatedCGMFeedAgent", json.dumps(CGM_DATA)),
+                             ("AmbientContextSimulatorAgent", json.dumps(CONTEXT_EVENT))):
+            await service.append_event(session, Event(
+                invocation_id=f"run-{index}", author=author,
+                content=types.Content(role="user" if author == "user" else "model", parts=[types.Part(text=text)]),
+            ))
+        ctx = InvocationContext(session_service=service, invocation_id=f"run-{index}",
+                                agent=RefinementLoopAgent, session=session, run_config=RunConfig())
+        started = time.perf_counter()
+        async for event in RefinementLoopAgent.run_async(ctx):
+            if not event.partial:
+                await service.append_event(session, event)
+        latencies.append(time.perf_counter() - started)
+        calls["rounds"] += current["round"]
+    return {"latencies": sorted(latencies), "calls": calls,
+            "stats": router.stats()["agents"][policy.agent_name]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--hard-fraction", type=float, default=0.25, help="Sessions the fast tier cannot satisfy")
+    parser.add_argument("--invalid-rate", type=float, default=0.05, help="Fast-tier answers that break the schema")
+    parser.add_argument("--fast-ms", type=float, default=40)
+    parser.add_argument("--large-ms", type=float, default=200)
+    parser.add_argument("--verifier-ms", type=float, default=60)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(7)
+    sessions = ["hard" if rng.random() < args.hard_fraction else "easy" for _ in range(args.sessions)]
+    results = {"large only": asyncio.run(run_sessions(sessions, False, args)),
+               "cascade": asyncio.run(run_sessions(sessions, True, args))}
+
+    print(f"{args.sessions} sessions ({sessions.count('hard')} hard), forecaster latency fast {args.fast_ms:.0f} ms / "
+          f"large {args.large_ms:.0f} ms, verifier {args.verifier_ms:.0f} ms, fast invalid rate {args.invalid_rate:.0%}")
+    print(f"{'mode':>10} | {'mean ms':>7} | {'p95 ms':>6} | {'rounds':>6} | {'fast calls':>10} | {'large calls':>11} | "
+          f"escalation rate")
+    for mode, r in results.items():
+        samples = r["latencies"]
+        mean = sum(samples) / len(samples) * 1000
+        p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000
+        print(f"{mode:>10} | {mean:>7.0f} | {p95:>6.0f} | {r['calls']['rounds']:>6} | "
+              f"{r['calls']['forecaster_fast']:>10} | {r['calls']['forecaster_large']:>11} | "
+              f"{r['stats']['escalation_rate']:.0%} {r['stats']['escalations']}")
+    baseline, cascade = (sum(results[m]["latencies"]) for m in ("large only", "cascade"))
+    print(f"end-to-end speedup: {baseline / cascade:.2f}x")
+    for model, summary in results["cascade"]["stats"]["by_tier"].items():
+        print(f"  {model}: {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
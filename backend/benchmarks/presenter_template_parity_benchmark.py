@@ -0,0 +1,260 @@
+"""
+Insight Presenter Template Parity Benchmark
+
+Parity set: one representative forecaster output per built-in scenario
+(SCENARIO_DETAILS_DB; a scenario without a case fails the run), plus edge
+cases. For each case it reports:
+
+- the presenter path (template or LLM, with the reason) and whether it is the
+  expected one: contradictory and complex runs must reach the LLM
+- template render time (microseconds, no I/O)
+- the LLM presenter's message for the same forecast and parity of the two
+  messages: same direction (low / high / data / steady wording), text
+  similarity and length ratio
+
+Message parity is only claimed against INSIGHT_PRESENTER_MODEL's own
+output: --llm calls the model, --record also saves its messages to
+fixtures/ (a trace replayed through observability.replaying, keyed on the
+presenter request, so a changed prompt or parity case shows up as a missing
+recording). Offline, the recording is used only if it was recorded from the
+configured model; without one, paths and render times are still checked and
+message parity is reported as not checked.
+
+Exits 1 when a path is unexpected, a templated message points the other way
+from the LLM's or is less similar than --min-similarity, or a case has no
+recording.
+
+Usage:
+    python benchmarks/presenter_template_parity_benchmark.py --record     # needs model credentials
+    python benchmarks/presenter_template_parity_benchmark.py --show       # offline, from the recording
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from google import genai
+
+from t1d_swarm.observability import ReplayMismatch, RunTrace, recording, replaying
+from t1d_swarm.observability.replay import TRACE_SUFFIX, TRACE_VERSION
+from t1d_swarm.subagents.insight_presenter_agent.agent import routing_policy
+from t1d_swarm.subagents.insight_presenter_agent.prompts import INSIGHT_PRESENTER_PROMPT
+from t1d_swarm.subagents.insight_presenter_agent.templates import select_presentation
+from t1d_swarm.subagents.refinement_loop_agent.subagents.loop_exit_agent.logic import (
+    EXIT_UNRELIABLE_DATA, normalize_text, text_similarity,
+)
+from t1d_swarm.tools import SCENARIO_DETAILS_DB
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", f"presenter_parity{TRACE_SUFFIX}")
+
+OK = {"issues": [], "reliable": True, "source": "reported"}
+UNRELIABLE = {"issues": ["erratic_readings", "missing_data"], "reliable": False, "source": "detector"}
+
+
+def case(scenario_id, risk_level, concern, narrative, candidate, focus, confidence=0.86, quality=OK,
+         exit_reason="confidence_threshold_met", expect="template"):
+    return {
+        "scenario_id": scenario_id,
+        "state": {
+            "scenario_id": scenario_id,
+            "cgm_data_quality": quality,
+            "refinement_exit_reason": exit_reason,
+            "risk_forecast": {
+                "forecast_id": f"parity-{scenario_id}",
+                "timestamp_forecast_generated": "2025-06-01T12:00:00Z",
+                "short_term_outlook": {"overall_risk_level": risk_level, "primary_concern": concern,
+                                       "time_horizon_hours": 2, "narrative_summary": narrative,
+                                       "confidence_score": confidence},
+                "contributing_factors": [],
+                "suggested_focus_areas_qualitative": focus,
+                "actionable_micro_insight_candidate": candidate,
+            },
+        },
+        "confidence": confidence,
+        "expect": expect,
+    }
+
+
+PARITY_SET = [
+    case("stable_day", "low", "no_immediate_concern",
+         "Glucose is steady in range after a small balanced snack.",
+         "Your snack is keeping you steady, nice work staying in range.", ["Keep your usual routine"]),
+    case("high_carb_hyper", "high", "hyperglycemia",
+         "Glucose is rising rapidly after a large high-carb lunch and sugary soda.",
+         "Consider a correction dose as per your plan and drink some water.", ["Check glucose in 1 hour"]),
+    case("post_exercise_hypo", "elevated", "hypoglycemia",
+         "Glucose is trending down after a 45-minute run, with a risk of a post-exercise low.",
+         "Have 15 g of fast-acting carbs handy and recheck in 15 minutes.", ["Monitor for low symptoms"]),
+    case("complex_meal_delayed_spike", "moderate", "hyperglycemia",
+         "Glucose is stable now but a delayed rise is expected from the high-fat pizza meal.",
+         "Pizza can raise glucose later, so check again in 2 to 3 hours.", ["Watch for a delayed rise"]),
+    case("edge_case_sensor_failure", "high", "data_gap",
+         "CGM readings are erratic with gaps and do not match how the user feels.",
+         "Do a fingerstick check before making any insulin decisions.", ["Consider replacing the sensor"],
+         confidence=0.55, quality=UNRELIABLE, exit_reason=EXIT_UNRELIABLE_DATA),
+    case("edge_case_illness", "elevated", "hyperglycemia",
+         "Illness is causing insulin resistance and a slow, stubborn rise.",
+         "Follow your sick-day plan, stay hydrated and check ketones if you stay high.", ["Check ketones"]),
+    case("contradictory_stress_hypo", "elevated", "hypoglycemia",
+         "Despite stress, glucose is trending down, contrary to the usual stress response.",
+         "Keep fast-acting carbs nearby during your presentation.", ["Recheck after the presentation"],
+         expect="llm"),
+    case("contradictory_symptoms", "high", "data_discrepancy",
+         "CGM reads 190 mg/dL and stable, but the user reports shaky, sweaty hypo symptoms.",
+         "Your symptoms don't match your CGM, so check with a fingerstick now.", ["Confirm with a BGM"],
+         expect="llm"),
+    # Edge cases beyond the built-in scenarios
+    case("low_confidence_run", "elevated", "hyperglycemia",
+         "Glucose may rise but the evidence is mixed.",
+         "Check again in an hour.", ["Recheck soon"], confidence=0.5, expect="llm"),
+    case("self_contradicting_forecast", "very_high_urgent", "no_immediate_concern",
+         "Everything looks fine.", "No action needed.", [], expect="llm"),
+    case("long_candidate", "low", "no_immediate_concern",
+         "Stable.", " ".join(["Keep doing what you are doing."] * 12), [], expect="llm"),
+]
+
+DIRECTIONS = {
+    "low": re.compile(r"\b(low|hypo\w*|dip|drop\w*|going down|trending (down|lower)|fast-acting carbs)\b"),
+    "high": re.compile(r"\b(high|hyper\w*|ris\w+|spike|climb\w*|trending (up|higher)|correction|ketones)\b"),
+    "data": re.compile(r"\b(sensor|fingerstick|unreliable|gaps?|bgm)\b"),
+}
+
+
+def directions(text: str) -> set:
+    text = text.lower()
+    return {name for name, pattern in DIRECTIONS.items() if pattern.search(text)} or {"steady"}
+
+
+def render_micros(state, confidence, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        select_presentation(state, confidence, routing_policy.escalate_below)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def presenter_request(forecast) -> tuple:
+    """(contents, config) of the LLM presenter call for a forecast; recordings are keyed on them."""
+    prompt = INSIGHT_PRESENTER_PROMPT.replace("{{risk_forecast}}", json.dumps(forecast, indent=2))
+    return ["Present the insight."], {"system_instruction": prompt}
+
+
+async def llm_message(client, model: str, forecast) -> tuple:
+    contents, config = presenter_request(forecast)
+    started = time.perf_counter()
+    response = await client.aio.models.generate_content(model=model, contents=contents, config=config)
+    return (response.text or "").strip(), (time.perf_counter() - started) * 1000
+
+
+def load_recording(path: str) -> tuple:
+    """(trace, None) for messages recorded from the configured presenter model, else (None, why not)."""
+    if not os.path.exists(path):
+        return None, f"no model recording at {os.path.relpath(path)}"
+    trace = RunTrace.read(path)
+    model, configured = trace.header.get("model"), os.getenv("INSIGHT_PRESENTER_MODEL")
+    if trace.header.get("source") != "model" or not model:
+        return None, f"{os.path.relpath(path)} was not recorded from a model"
+    if configured and model != configured:
+        return None, f"{os.path.relpath(path)} was recorded from {model}, not INSIGHT_PRESENTER_MODEL={configured}"
+    return trace, None
+
+
+async def run(args) -> int:
+    missing = sorted(set(SCENARIO_DETAILS_DB) - {c["scenario_id"] for c in PARITY_SET})
+    if missing:
+        print(f"Parity set has no case for built-in scenario(s): {', '.join(missing)}")
+        return 1
+    live = args.llm or args.record
+    cassette, unchecked = contextlib.nullcontext(), None
+    if live:
+        client, model = genai.Client(), os.getenv("INSIGHT_PRESENTER_MODEL")
+        if not model:
+            print("INSIGHT_PRESENTER_MODEL is not set")
+            return 1
+        trace = RunTrace({"type": "header", "version": TRACE_VERSION, "created_at": time.time(),
+                          "source": "model", "model": model})
+        if args.record:
+            cassette = recording(trace)
+    else:
+        trace, unchecked = load_recording(args.fixture)
+        if trace is not None:
+            # Never reaches the network: the replay serves every request
+            client, model = genai.Client(vertexai=False, api_key="replay"), trace.header["model"]
+            cassette = replaying(trace)
+            print(f"LLM messages: {os.path.relpath(args.fixture)} (recorded from {model})")
+        else:
+            print(f"Message parity not checked: {unchecked}; record it with --record")
+
+    failures = 0
+    header = f"{'case':>28} | {'path':>8} | {'reason':>18} | {'expected':>8} | {'render µs':>9}"
+    if live:
+        header += f" | {'LLM ms':>7}"
+    print(header + ("" if unchecked else f" | {'direction':>9} | {'similarity':>10} | {'len ratio':>9}"))
+    with cassette:
+        for item in PARITY_SET:
+            state, confidence = item["state"], item["confidence"]
+            text, reason = select_presentation(state, confidence, routing_policy.escalate_below)
+            path = "template" if text else "llm"
+            expected = path == item["expect"]
+            failures += not expected
+            micros = render_micros(state, confidence, args.repeat)
+            row = f"{item['scenario_id']:>28} | {path:>8} | {reason:>18} | {'ok' if expected else 'WRONG':>8} | {micros:>9.1f}"
+            if unchecked:
+                print(row + (f"\n{'':>28}   template: {text}" if args.show and text else ""))
+                continue
+
+            try:
+                reference, latency = await llm_message(client, model, state["risk_forecast"])
+            except ReplayMismatch:
+                failures += 1
+                print(row + " | NO RECORDING (re-record with --record)")
+                continue
+            if live:
+                row += f" | {latency:>7.0f}"
+            if text:
+                agree = directions(text) == directions(reference)
+                similarity = text_similarity(normalize_text(text), normalize_text(reference))
+                close = similarity >= args.min_similarity
+                failures += (not agree) + (not close)
+                row += (f" | {'same' if agree else 'DIFFERS':>9} | {similarity:>10.2f}{'' if close else ' LOW'} | "
+                        f"{len(text) / max(1, len(reference)):>9.2f}")
+            print(row)
+            if args.show:
+                print(f"{'':>28}   template: {text}")
+                print(f"{'':>28}   llm:      {reference}")
+
+    if args.record:
+        size = trace.write(args.fixture)
+        print(f"Recorded {len(trace.exchanges)} LLM messages to {args.fixture} ({size / 1024:.1f} KB)")
+    templated = sum(1 for item in PARITY_SET if item["expect"] == "template")
+    if unchecked:
+        summary = "all paths as expected" if not failures else f"{failures} path failure(s)"
+        summary += "; message parity NOT checked (no recording from the presenter model)"
+    else:
+        summary = "all paths and messages at parity" if not failures else f"{failures} parity failure(s)"
+    print(f"{templated}/{len(PARITY_SET)} cases skip the presenter model call; {summary}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="Call the LLM presenter instead of the recording "
+                        "(needs model credentials)")
+    parser.add_argument("--record", action="store_true", help="Call the LLM presenter and rewrite the recording")
+    parser.add_argument("--fixture", default=FIXTURE, help="Recorded LLM presenter messages")
+    parser.add_argument("--min-similarity", type=float, default=0.5,
+                        help="Lowest template / LLM text similarity accepted")
+    parser.add_argument("--show", action="store_true", help="Print the messages")
+    parser.add_argument("--repeat", type=int, default=20000, help="Renders timed per case")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Progress Wire Format Comparison
+
+Streams the same RealAgentTracker/agent-callback shaped event sequence through
+ProgressTracker to a JSON subscriber and a compact-v1 subscriber on the same
+session, then reports bytes and SSE frames per session for each, and checks
+that decoding the compact stream reproduces every JSON event (agent, type,
+parent, data, timestamp to the millisecond).
+
+Events are emitted in bursts (an agent's complete + the next agent's start +
+its first progress land within a millisecond, as the ADK callbacks do), with a
+pause between bursts, so batching is exercised the way a real run does.
+
+Usage:
+    python benchmarks/progress_wire_format_benchmark.py --sessions 50 --batch-window-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.progress_system.tracker import ProgressTracker
+from t1d_swarm.progress_system.wire_format import WIRE_FORMAT_COMPACT, WIRE_FORMAT_JSON
+
+ROOT = "T1dInsightOrchestratorAgent"
+AGENTS = ("SimulatedCGMFeedAgent", "AmbientContextSimulatorAgent", "RefinementLoopAgent", "InsightPresenterAgent")
+
+
+def run_bursts(progress_steps: int):
+    """Bursts of events emitted back to back; one list per burst."""
+    total = len(AGENTS) * progress_steps
+    done = 0
+    burst = [{"agent_name": ROOT, "event_type": "agent_start",
+              "data": {"message": "🎯 Starting T1D analysis...", "progress": 0.0}}]
+    for agent in AGENTS:
+        burst.append({"agent_name": agent, "event_type": "agent_start", "parent_agent": ROOT,
+                      "data": {"message": f"Starting {agent}...", "progress": done / total}})
+        for _ in range(progress_steps):
+            done += 1
+            burst.append({"agent_name": agent, "event_type": "agent_progress", "parent_agent": ROOT,
+                          "data": {"message": f"Processing... ({int(done / total * 100)}% overall)",
+                                   "progress": done / total}})
+            yield burst
+            burst = []
+        burst.append({"agent_name": agent, "event_type": "agent_complete", "parent_agent": ROOT,
+                      "data": {"message": f"✅ {agent} complete", "progress": done / total}})
+    burst.append({"agent_name": ROOT, "event_type": "agent_complete",
+                  "data": {"message": "🎉 T1D analysis complete!", "progress": 1.0}})
+    yield burst
+
+
+def decode_compact(frames: list) -> list:
+    """Reference compact-v1 decoder (what a migrated frontend would do)."""
+    agents, types, t0, events = {}, {}, 0, []
+    for frame in frames:
+        if frame.startswith(":"):
+            continue
+        kind, data = frame.split("\n", 1)
+        payload = json.loads(data[len("data: "):])
+        if kind == "event: dict":
+            t0 = payload.get("t0", t0)
+            agents.update({int(k): v for k, v in payload["agents"].items()})
+            types.update({int(k): v for k, v in payload["types"].items()})
+            continue
+        for t_ms, agent_id, type_id, parent_id, event_data in payload:
+            event = {"agent_name": agents[agent_id], "event_type": types[type_id], "t_ms": t0 + t_ms,
+                     "data": event_data}
+            if parent_id >= 0:
+                event["parent_agent"] = agents[parent_id]
+            events.append(event)
+    return events
+
+
+def _epoch_ms(iso: str) -> int:
+    return int(datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+async def collect(stream, frames: list):
+    # One chunk may carry several frames (a dict frame ahead of its batch)
+    async for chunk in stream:
+        frames.extend(frame for frame in chunk.split("\n\n") if frame)
+
+
+async def run(sessions: int, progress_steps: int, burst_gap: float, batch_window: float) -> dict:
+    tracker = ProgressTracker(heartbeat_interval=30.0, batch_window=batch_window)
+    streams = {}
+    for s in range(sessions):
+        session_id = f"wire-{s}"
+        for wire_format in (WIRE_FORMAT_JSON, WIRE_FORMAT_COMPACT):
+            frames = []
+            streams[session_id, wire_format] = (frames, asyncio.create_task(
+                collect(tracker.stream(session_id, wire_format=wire_format), frames)))
+    await asyncio.sleep(0.05)
+
+    async def emitter(session_id: str):
+        for burst in run_bursts(progress_steps):
+            for event in burst:
+                await tracker.emit_event(session_id, dict(event, session_id=session_id))
+            await asyncio.sleep(burst_gap)
+
+    await asyncio.gather(*(emitter(f"wire-{s}") for s in range(sessions)))
+    await asyncio.sleep(0.2)  # let subscribers drain, then end every stream
+    for s in range(sessions):
+        tracker.cleanup_session(f"wire-{s}")
+    await asyncio.gather(*(task for _, task in streams.values()))
+
+    totals = {fmt: {"bytes": 0, "frames": 0} for fmt in (WIRE_FORMAT_JSON, WIRE_FORMAT_COMPACT)}
+    mismatches = 0
+    for s in range(sessions):
+        session_id = f"wire-{s}"
+        json_frames, _ = streams[session_id, WIRE_FORMAT_JSON]
+        compact_frames, _ = streams[session_id, WIRE_FORMAT_COMPACT]
+        for fmt, frames in ((WIRE_FORMAT_JSON, json_frames), (WIRE_FORMAT_COMPACT, compact_frames)):
+            totals[fmt]["bytes"] += sum(len((f + "\n\n").encode()) for f in frames)
+            totals[fmt]["frames"] += len(frames)
+        expected = [json.loads(f[len("data: "):]) for f in json_frames]
+        for event, decoded in zip(expected, decode_compact(compact_frames)):
+            if (event["agent_name"], event["event_type"], event.get("parent_agent"), event["data"]) != (
+                    decoded["agent_name"], decoded["event_type"], decoded.get("parent_agent"), decoded["data"]):
+                mismatches += 1
+            elif event["event_type"] != "connection" and abs(_epoch_ms(event["timestamp"]) - decoded["t_ms"]) > 1:
+                mismatches += 1
+        if len(expected) != len(decode_compact(compact_frames)):
+            mismatches += 1
+    return {"totals": totals, "mismatches": mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--progress-steps", type=int, default=10, help="agent_progress events per agent")
+    parser.add_argument("--burst-gap-ms", type=float, default=20.0, help="Pause between event bursts")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    r = asyncio.run(run(args.sessions, args.progress_steps, args.burst_gap_ms / 1000, args.batch_window_ms / 1000))
+    json_totals, compact_totals = r["totals"][WIRE_FORMAT_JSON], r["totals"][WIRE_FORMAT_COMPACT]
+    print(f"{args.sessions} sessions, {len(AGENTS) * (args.progress_steps + 2) + 2} events each, "
+          f"batch window {args.batch_window_ms} ms ({time.perf_counter() - started:.1f}s)")
+    for name, totals in (("json", json_totals), ("compact", compact_totals)):
+        print(f"{name:>8}: {totals['bytes'] / args.sessions:9.0f} bytes/session, "
+              f"{totals['frames'] / args.sessions:6.1f} frames/session")
+    print(f" savings: {1 - compact_totals['bytes'] / json_totals['bytes']:.1%} bytes, "
+          f"{1 - compact_totals['frames'] / json_totals['frames']:.1%} frames | decode mismatches: {r['mismatches']}")
+    return 1 if r["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Recorded Run Replay Benchmark
+
+Replays recorded root_agent runs (trace files written by the server with
+RUN_RECORDING_DIR set) through the real agent graph with zero network, and
+reports per trace:
+
+- replay wall time (p50 / p95 over --repeat runs): orchestration, loop logic,
+  callbacks and parsing only, or with --latency-scale the recorded model
+  latencies slept back in
+- model calls served, unused recorded calls, events
+- whether every replay reproduced the recorded events (exit code 1 if not),
+  so a set of traces doubles as a deterministic regression test
+
+Replays write their analyses to a temporary result store, not ANALYSIS_DB_PATH.
+
+Usage:
+    RUN_RECORDING_DIR=./run_recordings python main.py        # record some runs
+    python benchmarks/replay_benchmark.py ./run_recordings --repeat 20
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+_scratch = tempfile.mkdtemp(prefix="replay-benchmark-")
+os.environ.update(
+    ANALYSIS_DB_PATH=os.path.join(_scratch, "analyses.db"), ANALYSIS_EXPORT_ENABLED="false", RUN_RECORDING_DIR="",
+)
+
+from t1d_swarm.agent import root_agent
+from t1d_swarm.observability import ReplayMismatch, RunTrace, replay_run
+from t1d_swarm.observability.replay import TRACE_SUFFIX
+
+
+def trace_paths(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, f"*{TRACE_SUFFIX}"))))
+        else:
+            paths.append(target)
+    return paths
+
+
+async def run(args) -> int:
+    paths = trace_paths(args.traces)
+    if not paths:
+        print("No trace files found")
+        return 1
+    failed = 0
+    print(f"{'trace':>40} | {'KB':>6} | {'calls':>5} | {'unused':>6} | {'events':>6} | "
+          f"{'p50 ms':>8} | {'p95 ms':>8} | matches")
+    for path in paths:
+        trace = RunTrace.read(path)
+        durations, problems = [], []
+        report = None
+        for _ in range(args.repeat):
+            try:
+                report = await replay_run(trace, root_agent, strict=not args.lenient, latency_scale=args.latency_scale)
+            except ReplayMismatch as e:
+                problems.append(str(e))
+                break
+            durations.append(report.duration_ms)
+            problems.extend(report.differences)
+        name = os.path.basename(path)[:40]
+        if not durations:
+            print(f"{name:>40} | replay failed: {problems[0]}")
+            failed += 1
+            continue
+        ordered = sorted(durations)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        matches = not problems and report.unmatched_calls == 0
+        failed += not matches
+        print(f"{name:>40} | {os.path.getsize(path) / 1024:>6.1f} | {report.model_calls:>5} | "
+              f"{report.unused_exchanges:>6} | {report.events:>6} | {statistics.median(durations):>8.1f} | "
+              f"{p95:>8.1f} | {'yes' if matches else 'NO'}")
+        for problem in sorted(set(problems))[:args.show]:
+            print(f"    {problem}")
+    print(f"{len(paths) - failed}/{len(paths)} traces replayed deterministically")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traces", nargs="+", help="Trace files or directories of them")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="Fraction of each recorded model latency to sleep (0: full speed)")
+    parser.add_argument("--lenient", action="store_true",
+                        help="Serve unrecorded requests the next unused response instead of failing")
+    parser.add_argument("--show", type=int, default=5, help="Differences printed per trace")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Agent Run Scheduler Queueing Simulation
+
+Poisson arrivals of analysis runs (a fraction of them urgent hypo-risk
+scenarios) against a shared model quota, with and without AgentRunScheduler.
+
+Quota model: each run makes `--calls` sequential model calls; a call started
+while n calls are in flight takes base_latency * max(1, n / quota), i.e. once
+more calls are in flight than the quota serves, everyone slows down together
+(rate limiting / server-side queueing at the model provider).
+
+- immediate: every run starts on arrival (previous behaviour)
+- scheduled: AgentRunScheduler(max_concurrent=quota, max_queue) admits runs
+  (one model call in flight each); the rest wait by priority or are shed (503)
+
+Reports end-to-end latency (arrival to completion) per priority class,
+completed / shed counts at several offered loads. Time is scaled: a 20 s
+pipeline runs in 20 ms.
+
+Usage:
+    python benchmarks/run_scheduler_simulation_benchmark.py --runs 600 --loads 0.7 1.0 1.5
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.execution.scheduler import (
+    PRIORITY_NAMES, ROUTINE, URGENT, AgentRunScheduler, SchedulerOverloaded,
+)
+
+
+class ModelQuota:
+    """Shared model backend: latency stretches once in-flight calls exceed the quota."""
+
+    def __init__(self, quota: int, base_latency: float):
+        self.quota = quota
+        self.base_latency = base_latency
+        self.in_flight = 0
+
+    async def call(self, rng: random.Random):
+        self.in_flight += 1
+        try:
+            stretch = max(1.0, self.in_flight / self.quota)
+            await asyncio.sleep(self.base_latency * stretch * rng.lognormvariate(0, 0.3))
+        finally:
+            self.in_flight -= 1
+
+
+async def simulate(mode: str, load: float, args, seed: int) -> Dict[str, object]:
+    rng = random.Random(seed)
+    quota = ModelQuota(args.quota, args.call_ms / 1000)
+    scheduler = AgentRunScheduler(max_concurrent=args.quota, max_queue=args.max_queue)
+    run_seconds = args.calls * args.call_ms / 1000
+    arrival_rate = load * args.quota / run_seconds  # runs per second at this offered load
+    latencies: Dict[int, List[float]] = {URGENT: [], ROUTINE: []}
+    shed = {URGENT: 0, ROUTINE: 0}
+
+    async def pipeline(priority: int):
+        arrived = time.perf_counter()
+        if mode == "scheduled":
+            try:
+                await scheduler.acquire(None, priority)
+            except SchedulerOverloaded:
+                shed[priority] += 1
+                return
+        try:
+            for _ in range(args.calls):
+                await quota.call(rng)
+        finally:
+            if mode == "scheduled":
+                scheduler.release(time.perf_counter() - arrived)
+        latencies[priority].append(time.perf_counter() - arrived)
+
+    tasks = []
+    for _ in range(args.runs):
+        await asyncio.sleep(rng.expovariate(arrival_rate))
+        priority = URGENT if rng.random() < args.urgent_fraction else ROUTINE
+        tasks.append(asyncio.create_task(pipeline(priority)))
+    await asyncio.gather(*tasks)
+    return {"latencies": latencies, "shed": shed}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return float("nan")
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=600)
+    parser.add_argument("--loads", type=float, nargs="+", default=[0.7, 1.0, 1.5],
+                        help="Offered load as a fraction of quota capacity")
+    parser.add_argument("--quota", type=int, default=4, help="Runs the model quota serves at full speed")
+    parser.add_argument("--calls", type=int, default=5, help="Sequential model calls per run")
+    parser.add_argument("--call-ms", type=float, default=4.0, help="Model call latency within quota (scaled)")
+    parser.add_argument("--max-queue", type=int, default=16)
+    parser.add_argument("--urgent-fraction", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    logging.getLogger("t1d_swarm.execution.scheduler").setLevel(logging.ERROR)  # one warning per shed run
+
+    run_ms = args.calls * args.call_ms
+    print(f"{args.runs} runs per point, quota {args.quota}, unloaded run {run_ms:.0f} ms, "
+          f"{args.urgent_fraction:.0%} urgent, max queue {args.max_queue}")
+    print(f"{'load':>5} {'mode':>10} | {'urgent p50/p95/p99 (x unloaded)':>32} | "
+          f"{'routine p50/p95/p99 (x unloaded)':>33} | shed urgent/routine")
+    for load in args.loads:
+        for mode in ("immediate", "scheduled"):
+            r = asyncio.run(simulate(mode, load, args, args.seed))
+            cells = []
+            for priority in (URGENT, ROUTINE):
+                samples = [s * 1000 / run_ms for s in r["latencies"][priority]]
+                cells.append("/".join(f"{percentile(samples, q):6.1f}" for q in (0.5, 0.95, 0.99)))
+            print(f"{load:5.1f} {mode:>10} | {cells[0]:>32} | {cells[1]:>33} | "
+                  f"{r['shed'][URGENT]}/{r['shed'][ROUTINE]}")
+    print(f"priority classes: {PRIORITY_NAMES}")
+
+
+if __name__ == "__main__":
+    main()
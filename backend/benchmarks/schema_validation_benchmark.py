@@ -0,0 +1,83 @@
+"""
+Schema Validation Microbenchmark
+
+Compares the legacy per-consumer parse path (model_validate_json for the check,
+then json.loads / regex extraction again in every downstream consumer) with the
+parse-once path (precompiled TypeAdapter validate_json, validated dict reused)
+for every structured agent output.
+
+Usage:
+    python benchmarks/schema_validation_benchmark.py --iterations 20000 --consumers 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.schemas import (
+    CGMDataOutput, ContextEventOutput, RiskForecastOutput, ScenarioDict, VerificationOutput, validate_output,
+)
+
+SAMPLES = {
+    "cgm_data": (CGMDataOutput, {
+        "glucose_value": 182, "trend_arrow": "SingleUp", "unit": "mg/dL",
+        "data_quality_issues": None, "timestamp_simulated": "2025-06-20T12:00:00Z",
+    }),
+    "context_event": (ContextEventOutput, {
+        "event_type": "meal", "description_raw": "Large bowl of pasta, garlic bread and a sugary soda.",
+        "parsed_details": {"estimated_carbs_g": 120, "meal_type": "lunch"},
+        "timestamp_event": "2025-06-20T11:45:00Z",
+    }),
+    "risk_forecast": (RiskForecastOutput, {
+        "forecast_id": "3f1c", "timestamp_forecast_generated": "2025-06-20T12:00:01Z",
+        "short_term_outlook": {
+            "overall_risk_level": "elevated", "primary_concern": "hyperglycemia", "time_horizon_hours": 2.0,
+            "narrative_summary": "Glucose is rising after a high-carbohydrate meal.", "confidence_score": 0.75,
+        },
+        "contributing_factors": [
+            {"factor_type": "meal", "detail": "~120 g carbohydrates", "impact_on_forecast": "Sustained rise"},
+            {"factor_type": "cgm_trend", "detail": "SingleUp", "impact_on_forecast": "Rising now"},
+        ],
+        "suggested_focus_areas_qualitative": ["Monitor glucose closely over the next few hours."],
+        "actionable_micro_insight_candidate": "Heads up! Your glucose is climbing after lunch.",
+    }),
+    "verification_output": (VerificationOutput, {
+        "original_forecast_id": "3f1c", "verification_confidence": 0.85,
+        "verification_summary": "Forecast appears consistent with inputs and general knowledge.",
+        "feedback_for_forecaster": ["Consider the delayed effect of fat content."],
+    }),
+    "scenario": (ScenarioDict, {"scenarios": "User's glucose is rising rapidly after a high-carb meal."}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--consumers", type=int, default=3, help="Downstream readers that re-parsed the output")
+    args = parser.parse_args()
+
+    print(f"{'output':<22}{'legacy us':>12}{'parse-once us':>16}{'speedup':>10}")
+    for key, (model, sample) in SAMPLES.items():
+        raw = json.dumps(sample)
+
+        def legacy():
+            model.model_validate_json(raw)
+            for _ in range(args.consumers):
+                json.loads(raw)
+
+        def parse_once():
+            validated = validate_output(key, raw).model_dump(mode="json")
+            for _ in range(args.consumers):
+                validated.get("unused")
+
+        legacy_us = timeit.timeit(legacy, number=args.iterations) / args.iterations * 1e6
+        fast_us = timeit.timeit(parse_once, number=args.iterations) / args.iterations * 1e6
+        print(f"{key:<22}{legacy_us:>12.2f}{fast_us:>16.2f}{legacy_us / fast_us:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Sensor Fault Detection Benchmark
+
+Scores the streaming SensorFaultDetector against a labelled synthetic set:
+clean 3 h CGM windows (smooth drift plus ~3 mg/dL noise) and windows with one
+injected fault each:
+
+- erratic_readings: single-sample spikes of 40-90 mg/dL, or heavy noise
+- compression_low: an overnight drop from >= 110 mg/dL to 45-65 mg/dL that
+  recovers 20-40 minutes later
+- sensor_stuck: the same value repeated for 45-75 minutes
+- missing_data: a run of 2-6 dropped readings
+
+plus physiological negatives that a detector must leave alone:
+
+- fast_drop: a real drop into hypo at 2-3.5 mg/dL/min (e.g. after exercise),
+  treated 15-40 minutes later with a recovery of at most 3 mg/dL/min
+- fast_rise: a post-meal rise of 60-160 mg/dL peaking at 2-4 mg/dL/min
+
+Reports per-label precision / recall / F1 (windows are labelled, so a clean or
+physiological window with any issue is a false positive), the flagged
+negatives by issue, and per-sample update throughput.
+
+Usage:
+    python benchmarks/sensor_fault_detection_benchmark.py --windows 2000 --window-minutes 180
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.analytics.sensor_faults import (
+    COMPRESSION_LOW, ERRATIC_READINGS, ISSUE_ORDER, MISSING_DATA, SENSOR_STUCK, UNRELIABLE_ISSUES,
+    SensorFaultDetector, detect_window_faults,
+)
+
+INTERVAL_MINUTES = 5.0
+CLEAN = "clean"
+FAST_DROP = "fast_drop"
+FAST_RISE = "fast_rise"
+NEGATIVES = (CLEAN, FAST_DROP, FAST_RISE)
+LABELS = NEGATIVES + ISSUE_ORDER
+
+
+def clean_window(rng: random.Random, samples: int) -> list:
+    level = rng.uniform(90, 220)
+    slope = rng.uniform(-0.8, 0.8)  # mg/dL per sample
+    values = []
+    for _ in range(samples):
+        level = min(350.0, max(75.0, level + slope + rng.gauss(0, 1.0)))
+        values.append(round(level + rng.gauss(0, 3.0)))
+    return values
+
+
+def smoothstep(x: float) -> float:
+    x = min(1.0, max(0.0, x))
+    return x * x * (3 - 2 * x)
+
+
+def physiological_window(rng: random.Random, samples: int, label: str) -> list:
+    """A real fast drop into hypo (treated) or a post-meal rise; max slope is 1.5 x amplitude / duration."""
+    at = rng.randrange(samples // 4, samples // 2)
+    if label == FAST_DROP:
+        low = rng.uniform(50, 65)
+        amplitude = rng.uniform(50, 100)
+        duration = 1.5 * amplitude / rng.uniform(2.0, 3.5)
+        treated = at * INTERVAL_MINUTES + duration + rng.uniform(15, 40)
+        recovery = rng.uniform(40, 80)
+        recovery_minutes = 1.5 * recovery / rng.uniform(1.0, 3.0)
+        curve = lambda t: (low + amplitude - amplitude * smoothstep((t - at * INTERVAL_MINUTES) / duration)
+                           + recovery * smoothstep((t - treated) / recovery_minutes))
+    else:
+        start = rng.uniform(90, 160)
+        amplitude = rng.uniform(60, 160)
+        duration = 1.5 * amplitude / rng.uniform(2.0, 4.0)
+        curve = lambda t: start + amplitude * smoothstep((t - at * INTERVAL_MINUTES) / duration)
+    return [round(curve(index * INTERVAL_MINUTES) + rng.gauss(0, 3.0)) for index in range(samples)]
+
+
+def inject(rng: random.Random, values: list, label: str) -> list:
+    values = list(values)
+    n = len(values)
+    at = rng.randrange(n // 3, n - 8)
+    if label == ERRATIC_READINGS:
+        if rng.random() < 0.5:
+            for index in rng.sample(range(at, n), 2):
+                values[index] += rng.choice((-1, 1)) * rng.uniform(40, 90)
+        else:
+            for index in range(at, min(n, at + 8)):
+                values[index] += rng.gauss(0, 25)
+    elif label == COMPRESSION_LOW:
+        low = rng.uniform(45, 65)
+        for index in range(at, min(n, at + rng.randint(4, 8))):
+            values[index] = low + rng.gauss(0, 2)
+    elif label == SENSOR_STUCK:
+        for index in range(at, min(n, at + rng.randint(9, 15))):
+            values[index] = values[at]
+    elif label == MISSING_DATA:
+        for index in range(at, min(n, at + rng.randint(2, 6))):
+            values[index] = None
+    return [None if v is None else max(40, min(400, round(v))) for v in values]
+
+
+def labelled_set(windows: int, samples: int, seed: int):
+    rng = random.Random(seed)
+    dataset = []
+    for index in range(windows):
+        label = LABELS[index % len(LABELS)]
+        if label in (FAST_DROP, FAST_RISE):
+            dataset.append((label, physiological_window(rng, samples, label)))
+            continue
+        values = clean_window(rng, samples)
+        if label == COMPRESSION_LOW:
+            values = [v + max(0, 110 - min(values)) for v in values]  # overnight, in range before the drop
+        dataset.append((label, values if label == CLEAN else inject(rng, values, label)))
+    return dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", type=int, default=2000)
+    parser.add_argument("--window-minutes", type=float, default=180)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    samples = int(args.window_minutes / INTERVAL_MINUTES)
+    dataset = labelled_set(args.windows, samples, args.seed)
+
+    counts = {issue: Counter() for issue in ISSUE_ORDER}
+    flagged = {label: Counter() for label in NEGATIVES}
+    started = time.perf_counter()
+    for label, values in dataset:
+        found = set(detect_window_faults(values, INTERVAL_MINUTES))
+        if label in flagged:
+            flagged[label].update(found)
+            flagged[label]["any"] += bool(found)
+            flagged[label]["unreliable"] += bool(UNRELIABLE_ISSUES & found)
+        for issue in ISSUE_ORDER:
+            truth, predicted = label == issue, issue in found
+            counts[issue]["tp" if truth and predicted else "fn" if truth else "fp" if predicted else "tn"] += 1
+    elapsed = time.perf_counter() - started
+
+    detector = SensorFaultDetector(INTERVAL_MINUTES)
+    stream = [value for _, values in dataset for value in values]
+    started = time.perf_counter()
+    for index, value in enumerate(stream):
+        detector.update(index * INTERVAL_MINUTES * 60, value)
+    stream_seconds = time.perf_counter() - started
+
+    print(f"{len(dataset)} labelled windows x {samples} samples ({args.window_minutes:.0f} min), "
+          f"{len(dataset) // len(LABELS)} per label")
+    print(f"{'issue':>17} | {'precision':>9} | {'recall':>6} | {'F1':>5}")
+    for issue, c in counts.items():
+        precision = c["tp"] / max(1, c["tp"] + c["fp"])
+        recall = c["tp"] / max(1, c["tp"] + c["fn"])
+        f1 = 2 * precision * recall / max(1e-9, precision + recall)
+        print(f"{issue:>17} | {precision:>9.1%} | {recall:>6.1%} | {f1:>5.2f}")
+    for label, c in flagged.items():
+        total = sum(1 for truth, _ in dataset if truth == label)
+        by_issue = ", ".join(f"{issue} {c[issue]}" for issue in ISSUE_ORDER if c[issue]) or "-"
+        print(f"{label} windows flagged: {c['any']}/{total} ({c['unreliable']} unreliable; {by_issue})")
+    print(f"window scoring: {elapsed / len(dataset) * 1e6:.0f} us/window; "
+          f"streaming update: {stream_seconds / len(stream) * 1e6:.2f} us/sample "
+          f"({len(stream) / stream_seconds:,.0f} samples/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
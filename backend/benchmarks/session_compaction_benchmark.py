@@ -0,0 +1,137 @@
+"""
+Session Compaction Benchmark
+
+Builds a synthetic ADK session database (real ADK schema, realistic 3-iteration
+refinement-loop event payloads), then measures DB size and session load time
+before and after a compaction pass.
+
+Usage:
+    python benchmarks/session_compaction_benchmark.py --sessions 100000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from google.adk.events import EventActions
+from google.adk.sessions import DatabaseSessionService
+
+from t1d_swarm.storage import SessionCompactor
+
+APP_NAME = "t1d_swarm"
+
+FORECAST_PAYLOAD = {
+    "forecast_id": "",
+    "timestamp_forecast_generated": "2025-06-20T12:00:00Z",
+    "short_term_outlook": {
+        "overall_risk_level": "elevated",
+        "primary_concern": "hyperglycemia",
+        "time_horizon_hours": 2.0,
+        "narrative_summary": "Glucose is rising after a high-carbohydrate meal and is likely to keep rising. " * 4,
+        "confidence_score": 0.7,
+    },
+    "contributing_factors": [
+        {"factor_type": "meal", "detail": "Large pasta meal with soda " * 3, "impact_on_forecast": "Raises glucose " * 3}
+    ] * 3,
+    "suggested_focus_areas_qualitative": ["Monitor glucose closely over the next few hours."] * 3,
+    "actionable_micro_insight_candidate": "Heads up! Your glucose is climbing after lunch.",
+}
+
+VERIFICATION_PAYLOAD = {
+    "original_forecast_id": "",
+    "verification_confidence": 0.6,
+    "verification_summary": "Forecaster may have underestimated the impact of the meal. " * 4,
+    "feedback_for_forecaster": ["Re-evaluate the hyperglycemia risk given the sugary soda."] * 3,
+}
+
+
+def _event_rows(session_id: str, iterations: int):
+    """Yield (author, content, state_delta) tuples for one synthetic pipeline run."""
+    yield "SimulatedCGMFeedAgent", {"glucose_value": 182, "trend_arrow": "SingleUp"}, {"cgm_data": "..."}
+    yield "AmbientContextAgent", {"event_type": "meal"}, {"context_event": "..."}
+    for _ in range(iterations):
+        forecast = dict(FORECAST_PAYLOAD, forecast_id=str(uuid.uuid4()))
+        yield "GlycemicRiskForecasterAgent", forecast, {"risk_forecast": forecast}
+        yield "ForecastVerifierAgent", VERIFICATION_PAYLOAD, {"verification_output": json.dumps(VERIFICATION_PAYLOAD)}
+        yield "ConfidenceChecker", {"text": "Confidence too low (0.60). Continuing refinement."}, {}
+    yield "InsightPresenterAgent", {"text": "Heads up! Your glucose is climbing after lunch."}, {}
+
+
+def build_database(db_path: str, sessions: int, iterations: int):
+    """Create the ADK schema, then bulk-insert synthetic sessions with raw sqlite for speed."""
+    DatabaseSessionService(f"sqlite:///{db_path}")
+    conn = sqlite3.connect(db_path)
+    old = "2025-01-01 00:00:00"
+    with conn:
+        for i in range(sessions):
+            session_id = f"session-{i}"
+            conn.execute("INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (APP_NAME, "user", session_id, json.dumps({"risk_forecast": FORECAST_PAYLOAD}), old, old))
+            rows = []
+            for n, (author, content, delta) in enumerate(_event_rows(session_id, iterations)):
+                rows.append((str(uuid.uuid4()), APP_NAME, "user", session_id, "inv", author,
+                             f"2025-01-01 00:00:{n:02d}.000000",
+                             json.dumps({"parts": [{"text": json.dumps(content)}], "role": "model"}),
+                             pickle.dumps(EventActions(state_delta=delta))))
+            conn.executemany("INSERT INTO events (id, app_name, user_id, session_id, invocation_id, author, "
+                             "timestamp, content, actions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.close()
+
+
+def measure_load(db_path: str, sessions: int, samples: int) -> float:
+    """Average ADK get_session latency in milliseconds over random sessions."""
+    service = DatabaseSessionService(f"sqlite:///{db_path}")
+    ids = [f"session-{random.randrange(sessions)}" for _ in range(samples)]
+
+    async def _load():
+        start = time.perf_counter()
+        for session_id in ids:
+            await service.get_session(app_name=APP_NAME, user_id="user", session_id=session_id)
+        return (time.perf_counter() - start) / samples * 1000
+
+    return asyncio.run(_load())
+
+
+def file_size_mb(db_path: str) -> float:
+    total = sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+    return total / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--mode", choices=["archive", "drop"], default="archive")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.db")
+        start = time.perf_counter()
+        build_database(db_path, args.sessions, args.iterations)
+        print(f"Built {args.sessions} sessions in {time.perf_counter() - start:.1f}s")
+
+        compactor = SessionCompactor(db_path, ttl_hours=0, idle_minutes=0, mode=args.mode)
+        print(f"Journal mode: {compactor.enable_wal()}")
+        print(f"Before: {file_size_mb(db_path):8.1f} MB, load {measure_load(db_path, args.sessions, args.samples):7.2f} ms/session")
+
+        start = time.perf_counter()
+        stats = compactor.compact_finished_sessions()
+        compactor.vacuum()
+        print(f"Compaction: {stats} in {time.perf_counter() - start:.1f}s")
+        print(f"After:  {file_size_mb(db_path):8.1f} MB, load {measure_load(db_path, args.sessions, args.samples):7.2f} ms/session")
+
+
+if __name__ == "__main__":
+    main()
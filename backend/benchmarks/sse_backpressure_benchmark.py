@@ -0,0 +1,147 @@
+"""
+SSE Backpressure Load Test
+
+Drives ProgressTracker with many concurrent sessions whose SSE subscribers are
+deliberately fast, slow or completely stalled, for each backpressure policy,
+and reports:
+
+- emitter latency (emit_event must never wait on a consumer)
+- dropped / coalesced events and disconnects (ProgressTracker.metrics)
+- whether the slow subscriber still saw every agent_start / agent_complete and
+  the final progress value
+
+A "legacy" row reproduces the previous awaited asyncio.Queue.put with a stalled
+consumer to show the emitter blocking.
+
+Usage:
+    python benchmarks/sse_backpressure_benchmark.py --sessions 200 --buffer 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from t1d_swarm.progress_system.backpressure import POLICIES
+from t1d_swarm.progress_system.tracker import ProgressTracker
+
+AGENTS = ("SimulatedCGMFeedAgent", "AmbientContextSimulatorAgent", "RefinementLoopAgent", "InsightPresenterAgent")
+
+
+def run_events(progress_steps: int):
+    """RealAgentTracker-shaped event sequence: start, N progress, complete per agent."""
+    total = len(AGENTS) * progress_steps
+    done = 0
+    for agent in AGENTS:
+        yield {"agent_name": agent, "event_type": "agent_start", "data": {"progress": done / total}}
+        for _ in range(progress_steps):
+            done += 1
+            yield {"agent_name": agent, "event_type": "agent_progress", "data": {"progress": done / total}}
+        yield {"agent_name": agent, "event_type": "agent_complete", "data": {"progress": done / total}}
+
+
+async def consume(stream, delay: float, received: list, stop: asyncio.Event):
+    """Read SSE frames, sleeping `delay` per frame (None = stall after connecting)."""
+    async for frame in stream:
+        event = json.loads(frame[len("data: "):])
+        if event["event_type"] not in ("connection", "heartbeat"):
+            received.append(event)
+        if delay is None:
+            await stop.wait()
+            break
+        if delay:
+            await asyncio.sleep(delay)
+        if stop.is_set() and event["event_type"] == "agent_complete" and event["agent_name"] == AGENTS[-1]:
+            break
+    await stream.aclose()
+
+
+async def run_policy(policy: str, sessions: int, buffer: int, progress_steps: int,
+                     emit_interval: float, slow_delay: float) -> dict:
+    tracker = ProgressTracker(max_events_per_session=buffer, heartbeat_interval=1.0, default_policy=policy)
+    stop = asyncio.Event()
+    consumers, slow_received, emit_latencies = [], [], []
+
+    for s in range(sessions):
+        session_id = f"load-{s}"
+        for delay in (0.0, slow_delay, None):  # fast, slow, stalled
+            received = []
+            if delay == slow_delay:
+                slow_received.append(received)
+            consumers.append(asyncio.create_task(consume(tracker.get_events_stream(session_id), delay, received, stop)))
+    await asyncio.sleep(0.05)  # let every subscriber connect
+
+    async def emitter(session_id: str):
+        for event in run_events(progress_steps):
+            start = time.perf_counter()
+            await tracker.emit_event(session_id, dict(event, session_id=session_id))
+            emit_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(emit_interval)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(emitter(f"load-{s}") for s in range(sessions)))
+    emit_seconds = time.perf_counter() - started
+    stop.set()
+    await asyncio.sleep(slow_delay * buffer + 0.2)  # let slow readers drain
+    for task in consumers:
+        task.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+    lifecycle = len(AGENTS) * 2
+    complete = sum(
+        1 for events in slow_received
+        if sum(e["event_type"] != "agent_progress" for e in events) == lifecycle
+        and events and events[-1]["data"]["progress"] == 1.0
+    )
+    emit_latencies.sort()
+    return {
+        "emit_seconds": emit_seconds,
+        "emit_p99_us": emit_latencies[int(0.99 * (len(emit_latencies) - 1))] * 1e6,
+        "emit_max_us": emit_latencies[-1] * 1e6,
+        "slow_complete": complete,
+        **tracker.metrics(),
+    }
+
+
+async def run_legacy(buffer: int, events: int) -> str:
+    """Previous behaviour: awaited put on a bounded queue whose consumer stalled."""
+    queue = asyncio.Queue(maxsize=buffer)
+
+    async def emit_all():
+        for i in range(events):
+            await queue.put(i)
+
+    try:
+        await asyncio.wait_for(emit_all(), timeout=1.0)
+        return "emitter never blocked"
+    except asyncio.TimeoutError:
+        return f"emitter blocked after {queue.qsize()} events (stalled client held the agent run)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--buffer", type=int, default=32, help="Per-subscriber buffer (max_events_per_session)")
+    parser.add_argument("--progress-steps", type=int, default=25, help="agent_progress events per agent")
+    parser.add_argument("--emit-interval-ms", type=float, default=1.0)
+    parser.add_argument("--slow-delay-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    events = len(AGENTS) * (args.progress_steps + 2)
+    print(f"{args.sessions} sessions x 3 subscribers (fast / slow / stalled), {events} events per session, "
+          f"buffer {args.buffer}")
+    print(f" legacy: {asyncio.run(run_legacy(args.buffer, events))}")
+    for policy in POLICIES:
+        r = asyncio.run(run_policy(policy, args.sessions, args.buffer, args.progress_steps,
+                                   args.emit_interval_ms / 1000, args.slow_delay_ms / 1000))
+        print(f"{policy:>12}: emit p99 {r['emit_p99_us']:7.1f} us, max {r['emit_max_us']:8.1f} us | "
+              f"dropped {r['dropped']:6d}, coalesced {r['coalesced']:6d}, disconnects {r['disconnects']:4d} | "
+              f"slow clients with full lifecycle + final progress: {r['slow_complete']}/{args.sessions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,10 +23,12 @@ Security Notes:
 
 import os
 import asyncio
+from typing import Optional
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from google.adk.cli.fast_api import get_fast_api_app
 
@@ -36,7 +38,24 @@ load_dotenv()
 # Import the global scenario management functions
 from t1d_swarm.agent import set_global_scenario, get_global_scenario
 from t1d_swarm.tools import *
-from t1d_swarm.progress_system import setup_progress_tracking, progress_tracker, real_agent_tracker
+from t1d_swarm.progress_system import (
+    CONTENT_FORMAT_HEADER, negotiate_wire_format, setup_progress_tracking, progress_tracker, real_agent_tracker,
+)
+from t1d_swarm.storage import (
+    SessionCompactor, analysis_exporter, analysis_result_store, setup_analysis_export_routes, setup_analysis_routes,
+)
+from t1d_swarm.ingestion import cgm_import_registry, cgm_stream_ingestor, setup_ingestion_routes
+from t1d_swarm.observability import (
+    trace_collector, setup_tracing_routes, TRACE_EXPORT_PATH,
+    PROFILING_ENABLED, add_span_processor, agent_attribution, sampling_profiler, loop_lag_monitor,
+    setup_profiling_routes, run_recorder, setup_recording_routes,
+)
+from t1d_swarm.context_cache import context_cache, setup_context_cache_routes
+from t1d_swarm.execution import (
+    blocking_executor, model_call_hedger, model_router, pipeline_registry, resolve_profile, run_blocking,
+    run_scheduler, setup_cancellation_routes, setup_execution_profile_routes, setup_executor_routes,
+    setup_hedging_routes, setup_model_routing_routes, setup_scheduler_routes,
+)
 
 
 # Global session state management
@@ -79,6 +98,38 @@ SESSION_DB_URL = "sqlite:///./sessions.db"
 ALLOWED_ORIGINS = ["http://localhost:4200"]
 # Set web=True if you intend to serve a web interface, False otherwise
 SERVE_WEB_INTERFACE = False
+# Seconds between session compaction / TTL expiry passes
+SESSION_MAINTENANCE_INTERVAL = float(os.getenv("SESSION_MAINTENANCE_INTERVAL_SECONDS", "300"))
+
+# Session DB maintenance (WAL, compaction, TTL expiry, VACUUM) - None for non-SQLite URLs
+session_compactor = SessionCompactor.from_env(SESSION_DB_URL)
+if session_compactor:
+    print(f"🗄️ Session DB journal mode: {session_compactor.enable_wal()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background maintenance tasks for the lifetime of the server"""
+    background_tasks = []
+    if session_compactor:
+        background_tasks.append(asyncio.create_task(session_compactor.run_periodic(SESSION_MAINTENANCE_INTERVAL)))
+    if PROFILING_ENABLED:
+        background_tasks.append(asyncio.create_task(loop_lag_monitor.run()))
+    if analysis_exporter.enabled:
+        background_tasks.append(asyncio.create_task(analysis_exporter.run_periodic()))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await context_cache.close()
+        # Write the rows still buffered so no completed analysis is lost on shutdown
+        try:
+            await run_blocking(analysis_exporter.flush)
+        except Exception as e:
+            print(f"⚠️ Final analysis export flush failed: {e}")
+        blocking_executor.shutdown()
+
 
 # Call the function to get the FastAPI app instance
 # Ensure the agent directory name ('t1d_swarm') matches your agent folder
@@ -87,11 +138,55 @@ app: FastAPI = get_fast_api_app(
     session_service_uri=SESSION_DB_URL,
     allow_origins=ALLOWED_ORIGINS,
     web=SERVE_WEB_INTERFACE,
+    lifespan=lifespan,
 )
 
 # ENABLE PROGRESS TRACKING
 progress_tracker, real_agent_tracker = setup_progress_tracking(app)
 
+# Query API for completed analyses
+setup_analysis_routes(app, analysis_result_store)
+
+# Columnar (Parquet / Arrow) export of completed analyses for offline analytics
+setup_analysis_export_routes(app, analysis_exporter)
+
+# Continuous CGM ingestion with trigger-gated re-forecasting
+setup_ingestion_routes(app, cgm_stream_ingestor)
+
+# Hierarchical trace spans per session (attach to ADK's TracerProvider, installed above)
+trace_collector.install(TRACE_EXPORT_PATH)
+setup_tracing_routes(app, trace_collector)
+
+# Record/replay traces of completed runs (RUN_RECORDING_DIR)
+setup_recording_routes(app, run_recorder)
+
+# Blocking-call pool metrics (queue depth, wait/run times per call)
+setup_executor_routes(app, blocking_executor)
+
+# Provider-side caching of static instruction prefixes (CONTEXT_CACHE_BACKEND=gemini)
+setup_context_cache_routes(app, context_cache)
+
+# Cheap-model-first cascade per agent (*_FAST_MODEL), escalation rate and per-tier latency
+setup_model_routing_routes(app, model_router)
+
+# Per-call timeouts and hedged duplicates for slow model calls (HEDGE_MODEL_CALLS)
+setup_hedging_routes(app, model_call_hedger)
+
+# fast / balanced / thorough pipeline profiles, selected per request (ScenarioRequest.profile)
+setup_execution_profile_routes(app)
+
+# End-to-end cancellation: explicit /analyses/{session_id}/cancel, or when the
+# session's last progress stream disconnects and nobody reconnects in time
+pipeline_registry.add_cleanup_hook(lambda session_id, reason: real_agent_tracker.stop_tracking(session_id))
+pipeline_registry.add_cleanup_hook(progress_tracker.cancel_session)
+progress_tracker.on_session_idle = pipeline_registry.schedule_abandon
+progress_tracker.on_session_resumed = pipeline_registry.resume
+
+# Opt-in sampling profiler + event loop lag monitor (PROFILING_ENABLED=true)
+if PROFILING_ENABLED:
+    add_span_processor(agent_attribution)
+    setup_profiling_routes(app, sampling_profiler, loop_lag_monitor)
+
 # Enhanced middleware for session tracking + auth
 # Simple middleware for session tracking 
 @app.middleware("http")
@@ -114,21 +209,45 @@ async def session_middleware(request, call_next):
     response = await call_next(request)
     return response
 
+# Admission control for agent runs: bounded concurrency, urgent scenarios first,
+# queue positions on the progress stream, 503 once the queue is full
+run_scheduler.on_queue_position = progress_tracker.queue_position
+setup_scheduler_routes(
+    app, run_scheduler, pipeline_registry,
+    scenario_resolver=lambda: (get_global_scenario() or {}).get("scenario_id"),
+)
+
+# Registered after all other middleware so it wraps them (see setup_cancellation_routes)
+setup_cancellation_routes(app, pipeline_registry)
+
 # Add SSE endpoint directly for progress tracking
 @app.get("/progress/{session_id}")
-async def stream_agent_progress(session_id: str):
+async def stream_agent_progress(
+    session_id: str,
+    policy: Optional[str] = Query(None, pattern="^(drop_oldest|coalesce|disconnect)$"),
+    format: Optional[str] = Query(None, pattern="^(json|compact)$"),
+    x_progress_format: Optional[str] = Header(None),
+):
     """
     Server-Sent Events endpoint for real-time agent progress
     Frontend usage: const eventSource = new EventSource('/progress/' + sessionId);
+    Optional `?policy=drop_oldest|coalesce|disconnect` overrides SSE_BACKPRESSURE_POLICY
+    for this client (a slow client never blocks the emitting agents either way).
+    `X-Progress-Format: compact` (or `?format=compact`, since EventSource cannot
+    set headers) opts into the batched compact-v1 wire format; the JSON event
+    format stays the default until the frontend migrates.
     """
+    wire_format = negotiate_wire_format(x_progress_format, format)
     return StreamingResponse(
-        progress_tracker.get_events_stream(session_id),
+        progress_tracker.stream(session_id, policy, wire_format),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control"
+            "Access-Control-Allow-Headers": f"Cache-Control, {CONTENT_FORMAT_HEADER}",
+            "Access-Control-Expose-Headers": CONTENT_FORMAT_HEADER,
+            CONTENT_FORMAT_HEADER: wire_format,
         }
     )
 
@@ -139,24 +258,32 @@ async def get_scenario_from_frontend(scenario_data: ScenarioRequest):
     """
     Receives a scenario and stores it globally.
     If session ID is available, starts progress tracking automatically.
+    An optional `profile` (fast / balanced / thorough) selects the run's execution profile.
     """
+    try:
+        profile = resolve_profile(scenario_data.profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     scenario_dict = {
         "scenario_id": scenario_data.scenario_id,
-        "custom_text": scenario_data.custom_text
+        "custom_text": scenario_data.custom_text,
+        "profile": profile.name,
     }
 
     set_current_session_id(scenario_data.session_id)
+    run_scheduler.note_scenario(scenario_data.session_id, scenario_data.scenario_id)
     
     # Store the scenario globally using the agent's global function
     set_global_scenario(scenario_dict)
     
-    print(f"📋 Scenario stored: {scenario_data.scenario_id}")
+    print(f"📋 Scenario stored: {scenario_data.scenario_id} ({profile.name} profile)")
     
     # If we have a session ID, start progress tracking immediately
     session_id = get_current_session_id()
     if session_id:
         print(f"📡 Starting progress tracking for session {session_id} with scenario {scenario_data.scenario_id}")
-        asyncio.create_task(real_agent_tracker.start_tracking(session_id, scenario_data.scenario_id))
+        pipeline_registry.spawn(session_id, real_agent_tracker.start_tracking(session_id, scenario_data.scenario_id))
     
     return {
         "message": "Scenario stored successfully",
@@ -177,7 +304,7 @@ async def set_session_id(session_id: str):
     if scenario:
         scenario_id = scenario.get("scenario_id")
         print(f"📡 Starting progress tracking for session {session_id} with scenario {scenario_id}")
-        asyncio.create_task(real_agent_tracker.start_tracking(session_id, scenario_id))
+        pipeline_registry.spawn(session_id, real_agent_tracker.start_tracking(session_id, scenario_id))
     
     return {"message": f"Session ID {session_id} stored globally"}
 
@@ -210,11 +337,14 @@ async def get_current_session():
 async def list_available_scenarios():
     """
     Provides a list of available scenarios for the frontend to display.
-    This includes all predefined scenarios plus 'Random' and 'Custom'.
+    This includes all predefined scenarios plus 'Random' and 'Custom', followed by
+    any real CGM exports in CGM_IMPORT_DIR ('import:<file>'; custom_text may give
+    an ISO timestamp to analyse instead of the latest reading).
     """
     options = [{"id": key, "display_name": value["display_name"]} for key, value in SCENARIO_DETAILS_DB.items()]
     options.append({"id": "random", "display_name": "🎲 Random Scenario"})
     options.append({"id": "custom", "display_name": "✍️ Custom Scenario (AI Generated)"})
+    options.extend(await run_blocking(cgm_import_registry.scenario_options))
     return options
 
 
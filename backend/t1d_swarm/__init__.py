@@ -1,3 +1,8 @@
 """ T1D Insight Orchestrator for orchestrating the flow of data and tasks between specialized sub-agents"""
 
+from .execution import setup_queued_logging
+
+# Non-blocking log output for every t1d_swarm.* logger (configured before the agents import)
+setup_queued_logging()
+
 from . import agent
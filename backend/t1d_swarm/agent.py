@@ -1,5 +1,8 @@
 """ T1D Insight Orchestrator Agent"""
 
+import logging
+import time
+
 from google.adk.agents import SequentialAgent
 from google.adk.agents.callback_context import CallbackContext
 
@@ -8,6 +11,16 @@ from .subagents.refinement_loop_agent.agent import RefinementLoopAgent
 from .subagents.simulated_cgm_feed_agent.agent import SimulatedCGMFeedAgent
 from .subagents.insight_presenter_agent.agent import InsightPresenterAgent
 from .tools import generate_scenario, get_scenario_details
+from .schemas import ContextEventOutput
+from .storage import analysis_exporter, analysis_result_store, build_analysis_record
+from .observability import run_recorder, tag_pipeline_span
+from .execution import PROFILE_STATE_KEY, pipeline_registry, resolve_profile, run_blocking
+from .analytics.cohort import SCENARIO_EVENTS, SCENARIOS, scenario_window
+from .ingestion import cgm_import_registry
+from .ingestion.importer import IMPORT_SCENARIO_PREFIX, window_cgm_data
+from .session_context import get_session_id
+
+logger = logging.getLogger(__name__)
 
 # Global variable to store the selected scenario from frontend
 _selected_scenario = None
@@ -22,22 +35,93 @@ def get_global_scenario():
     global _selected_scenario
     return _selected_scenario
 
-def setup_before_agent_call(callback_context: CallbackContext):
-    print("Setting up before agent call")
+def simulated_scenario_inputs(scenario_id: str, description: str) -> dict:
+    """
+    CGM window, reading and context event for a built-in scenario from the
+    deterministic cohort simulator (fast profile), in place of the feed and
+    context LLM calls. Time Complexity: O(SAMPLES_PER_DAY)
+    """
+    window = scenario_window(scenario_id)
+    now = time.time()
+    event_type, details = SCENARIO_EVENTS[scenario_id]
+    return {
+        "cgm_window": window,
+        "cgm_data": window_cgm_data(window, now),
+        "cgm_source": "simulated",
+        "context_event": ContextEventOutput(
+            event_type=event_type, description_raw=description, parsed_details=details,
+        ).model_dump(),
+    }
+
+async def setup_before_agent_call(callback_context: CallbackContext):
+    logger.info("Setting up before agent call")
+
+    # The root callback runs in the ADK request task: register it so the run can be cancelled
+    pipeline_registry.attach(get_session_id(callback_context))
+
+    # Before any state write, so the trace header holds the run's initial state
+    run_recorder.start(callback_context)
+
+    # Execution profile: the request's, else the session's (replays), else EXECUTION_PROFILE
+    selected_scenario = get_global_scenario()
+    profile = resolve_profile((selected_scenario or {}).get("profile") or callback_context.state.get(PROFILE_STATE_KEY))
+    callback_context.state[PROFILE_STATE_KEY] = profile.name
+    logger.info(f"🎚️ Execution profile: {profile.name}")
 
     if "scenario" not in callback_context.state:
-        # Try to get the scenario from global storage
-        selected_scenario = get_global_scenario()
-        
-        if selected_scenario:
-            scenario = get_scenario_details(selected_scenario['scenario_id'], selected_scenario['custom_text'])
-            print(f"Using scenario from frontend: {scenario}")
+        if selected_scenario and selected_scenario['scenario_id'].startswith(IMPORT_SCENARIO_PREFIX):
+            # Real CGM export: streamed off the event loop, the custom text picks the window end
+            imported = await run_blocking(
+                cgm_import_registry.load_scenario, selected_scenario['scenario_id'], selected_scenario['custom_text']
+            )
+            if imported is None:
+                raise ValueError(f"Unknown CGM import: {selected_scenario['scenario_id']}")
+            scenario = imported["scenario"]
+            scenario_id = selected_scenario['scenario_id']
+            callback_context.state["cgm_window"] = imported["cgm_window"]
+            callback_context.state["cgm_data"] = imported["cgm_data"]
+            callback_context.state["cgm_source"] = "import"
+            logger.info(f"Using imported CGM data: {scenario}")
+        elif selected_scenario:
+            # Custom scenarios make a hedged call on the async genai client
+            scenario = await get_scenario_details(selected_scenario['scenario_id'], selected_scenario['custom_text'])
+            scenario_id = selected_scenario['scenario_id']
+            logger.info(f"Using scenario from frontend: {scenario}")
+            if profile.simulate_inputs and scenario_id in SCENARIOS:
+                # Built-in scenario: the simulator stands in for the feed and context agents
+                for key, value in simulated_scenario_inputs(scenario_id, scenario["scenarios"]).items():
+                    callback_context.state[key] = value
+                logger.info(f"Using simulated CGM data and context for {scenario_id}")
         else:
             # Fallback to generating a scenario if none selected from frontend
-            scenario = generate_scenario()
-            print(f"No scenario from frontend, generated: {scenario}")
+            scenario = await generate_scenario()
+            scenario_id = "generated"
+            logger.info(f"No scenario from frontend, generated: {scenario}")
         
         callback_context.state["scenario"] = scenario
+        callback_context.state["scenario_id"] = scenario_id
+
+    callback_context.state["pipeline_started_at"] = time.time()
+    tag_pipeline_span(callback_context)
+
+async def record_analysis_result(callback_context: CallbackContext):
+    """Append the finished run to the analysis result store and columnar export (off the event loop)"""
+    try:
+        record = build_analysis_record(callback_context)
+        analysis_id = await run_blocking(analysis_result_store.append, record)
+        logger.info(f"🗃️ Stored analysis {analysis_id} for session {record['session_id']}")
+        record["analysis_id"] = analysis_id
+        await run_blocking(analysis_exporter.append, record)
+    except Exception as e:
+        # Result capture must never fail the user-facing run
+        logger.warning(f"⚠️ Could not store analysis result: {e}")
+
+async def finish_run_recording(callback_context: CallbackContext):
+    """Write the run's record/replay trace (no-op unless RUN_RECORDING_DIR is set)"""
+    try:
+        await run_recorder.finish(callback_context)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not write run recording: {e}")
 
 t1d_swarm = SequentialAgent(
     name='T1dInsightOrchestratorAgent',
@@ -48,7 +132,8 @@ t1d_swarm = SequentialAgent(
         RefinementLoopAgent,
         InsightPresenterAgent
     ],
-    before_agent_callback=setup_before_agent_call
+    before_agent_callback=setup_before_agent_call,
+    after_agent_callback=[record_analysis_result, finish_run_recording]
 )
 
 root_agent = t1d_swarm
\ No newline at end of file
@@ -0,0 +1,11 @@
+from .cgm_features import compute_window_features, window_features, trend_arrows, rate_of_change
+from .glucose_forecast import context_inputs, forecast_trajectories, glucose_forecast
+from .sensor_faults import SensorFaultDetector, assess_data_quality, detect_window_faults
+from .cohort import event_windows, generate_cohort, iter_cohort_shards, scenario_window
+
+__all__ = [
+    'compute_window_features', 'window_features', 'trend_arrows', 'rate_of_change',
+    'context_inputs', 'forecast_trajectories', 'glucose_forecast',
+    'SensorFaultDetector', 'assess_data_quality', 'detect_window_faults',
+    'event_windows', 'generate_cohort', 'iter_cohort_shards', 'scenario_window',
+]
@@ -0,0 +1,197 @@
+"""
+CGM Window Analytics
+
+Deterministic, NumPy-vectorized features over CGM windows so the trend arrow and
+glycemic statistics come from the data instead of being guessed by the LLM.
+
+All batch functions take a 2-D array `glucose` of shape (n_users, n_samples) in
+mg/dL, oldest sample first, evenly spaced `interval_minutes` apart, with NaN for
+missing readings. Every feature is computed for every user in a single pass of
+array operations - no per-user Python loop.
+
+Features:
+- rate_of_change: least-squares slope (mg/dL/min) over the last `trend_minutes`
+- trend_arrow: CGMDataOutput vocabulary (DoubleUp ... DoubleDown, NOT_COMPUTABLE)
+- time_in_range / time_below_range / time_above_range: fractions of valid samples
+- mean, std, cv (coefficient of variation, %), data_coverage
+- hypo_episodes / hyper_episodes: runs below 70 / above 180 lasting >= 15 minutes
+
+Performance Characteristics:
+- Time Complexity: O(n_users * n_samples), fully vectorized
+- Memory: O(n_users * n_samples) temporaries (a few boolean/float copies of the input)
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# Consensus glycemic thresholds (mg/dL)
+HYPO_THRESHOLD = 70.0
+HYPER_THRESHOLD = 180.0
+MIN_EPISODE_MINUTES = 15.0
+
+# Rate-of-change bands (mg/dL/min) for trend arrows, highest first; below the last is DoubleDown
+TREND_BANDS = (
+    (3.0, "DoubleUp"),
+    (2.0, "SingleUp"),
+    (1.0, "FortyFiveUp"),
+    (-1.0, "Flat"),
+    (-2.0, "FortyFiveDown"),
+    (-3.0, "SingleDown"),
+)
+NOT_COMPUTABLE = "NOT_COMPUTABLE"
+
+_ARROW_LABELS = np.array([arrow for _, arrow in TREND_BANDS] + ["DoubleDown", NOT_COMPUTABLE], dtype=object)
+_BAND_EDGES = np.array([bound for bound, _ in TREND_BANDS])
+
+
+def _as_batch(glucose: Any) -> np.ndarray:
+    """Coerce input to a float (n_users, n_samples) array with NaN for missing values."""
+    batch = np.asarray(glucose, dtype=float)
+    if batch.ndim == 1:
+        batch = batch[np.newaxis, :]
+    if batch.ndim != 2:
+        raise ValueError(f"Expected (n_users, n_samples) glucose array, got shape {batch.shape}")
+    return batch
+
+
+def rate_of_change(glucose: Any, interval_minutes: float = 5.0, trend_minutes: float = 15.0) -> np.ndarray:
+    """
+    Least-squares glucose slope (mg/dL/min) over the trailing trend window.
+
+    NaN when the latest reading is missing or fewer than two readings are valid.
+
+    Time Complexity: O(n_users * k) where k = trend_minutes / interval_minutes + 1
+    """
+    batch = _as_batch(glucose)
+    k = min(batch.shape[1], int(round(trend_minutes / interval_minutes)) + 1)
+    tail = batch[:, -k:]
+    valid = ~np.isnan(tail)
+    count = valid.sum(axis=1)
+
+    t = np.arange(k, dtype=float) * interval_minutes
+    weights = valid.astype(float)
+    safe_count = np.maximum(count, 1)
+    t_mean = (weights * t).sum(axis=1) / safe_count
+    g = np.where(valid, tail, 0.0)
+    g_mean = g.sum(axis=1) / safe_count
+
+    dt = (t[np.newaxis, :] - t_mean[:, np.newaxis]) * weights
+    numerator = (dt * (g - g_mean[:, np.newaxis])).sum(axis=1)
+    denominator = (dt * dt).sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = numerator / denominator
+    computable = (count >= 2) & valid[:, -1] & (denominator > 0)
+    return np.where(computable, slope, np.nan)
+
+
+def trend_arrows(rates: np.ndarray) -> np.ndarray:
+    """
+    Map rates (mg/dL/min) to CGMDataOutput trend arrow strings.
+
+    Time Complexity: O(n) via a single searchsorted over the band edges
+    """
+    rates = np.asarray(rates, dtype=float)
+    # Band edges are descending; searchsorted needs ascending, so search on the negation.
+    # side="left" keeps each edge in the band above it (rate >= bound).
+    index = np.searchsorted(-_BAND_EDGES, -rates, side="left")
+    index = np.where(np.isnan(rates), len(_ARROW_LABELS) - 1, index)
+    return _ARROW_LABELS[index]
+
+
+def count_episodes(mask: np.ndarray, min_samples: int) -> np.ndarray:
+    """
+    Count runs of consecutive True values at least `min_samples` long, per row.
+
+    Run boundaries come from a diff of the zero-padded mask, so all rows are
+    handled in one pass.
+
+    Time Complexity: O(n_users * n_samples)
+    """
+    n_rows = mask.shape[0]
+    padded = np.zeros((n_rows, mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    start_rows, start_cols = np.nonzero(edges == 1)
+    _, end_cols = np.nonzero(edges == -1)
+    # np.nonzero is row-major, so starts and ends pair up row by row
+    long_enough = (end_cols - start_cols) >= min_samples
+    return np.bincount(start_rows[long_enough], minlength=n_rows)
+
+
+def compute_window_features(glucose: Any, interval_minutes: float = 5.0,
+                            trend_minutes: float = 15.0) -> Dict[str, np.ndarray]:
+    """
+    Compute all window features for a batch of users in one vectorized call.
+
+    Args:
+        glucose: (n_users, n_samples) mg/dL values, NaN for gaps (1-D accepted for one user)
+        interval_minutes: Sampling interval between columns
+        trend_minutes: Trailing window used for rate of change / trend arrow
+
+    Returns:
+        Dict[str, np.ndarray]: One array of length n_users per feature
+
+    Time Complexity: O(n_users * n_samples)
+    """
+    batch = _as_batch(glucose)
+    valid = ~np.isnan(batch)
+    count = valid.sum(axis=1)
+    safe_count = np.maximum(count, 1)
+    filled = np.where(valid, batch, 0.0)
+
+    mean = filled.sum(axis=1) / safe_count
+    variance = (np.where(valid, batch - mean[:, np.newaxis], 0.0) ** 2).sum(axis=1) / safe_count
+    std = np.sqrt(variance)
+    has_data = count > 0
+
+    # NaN compares False, so gaps never count toward a range or an episode
+    with np.errstate(invalid="ignore"):
+        below = batch < HYPO_THRESHOLD
+        above = batch > HYPER_THRESHOLD
+    in_range = valid & ~below & ~above
+
+    rates = rate_of_change(batch, interval_minutes, trend_minutes)
+    min_samples = max(1, int(np.ceil(MIN_EPISODE_MINUTES / interval_minutes)))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cv = np.where(has_data & (mean > 0), std / mean * 100.0, np.nan)
+
+    return {
+        "latest_glucose": batch[:, -1],
+        "rate_of_change": rates,
+        "trend_arrow": trend_arrows(rates),
+        "mean": np.where(has_data, mean, np.nan),
+        "std": np.where(has_data, std, np.nan),
+        "cv": cv,
+        "time_in_range": np.where(has_data, in_range.sum(axis=1) / safe_count, np.nan),
+        "time_below_range": np.where(has_data, below.sum(axis=1) / safe_count, np.nan),
+        "time_above_range": np.where(has_data, above.sum(axis=1) / safe_count, np.nan),
+        "data_coverage": count / batch.shape[1],
+        "hypo_episodes": count_episodes(below, min_samples),
+        "hyper_episodes": count_episodes(above, min_samples),
+    }
+
+
+def _scalar(value: Any, digits: int = 2) -> Optional[Any]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def window_features(glucose: Sequence[Optional[float]], interval_minutes: float = 5.0,
+                    trend_minutes: float = 15.0) -> Dict[str, Any]:
+    """
+    Features for a single window as plain JSON-serializable values (None for NaN).
+
+    Suitable for writing into session state (`cgm_features`) or a prompt.
+    """
+    values = [np.nan if g is None else g for g in glucose]
+    if not values:
+        values = [np.nan]
+    features = compute_window_features([values], interval_minutes, trend_minutes)
+    return {name: _scalar(array[0]) for name, array in features.items()}
@@ -0,0 +1,327 @@
+"""
+Synthetic T1D Cohort
+
+Generates weeks of 5-minute CGM data for thousands of virtual patients, every
+day built around one of the SCENARIO_DETAILS_DB categories, and stores it as
+`.npy` shards that batch analytics and benchmarks memory-map without parsing.
+
+Each patient draws a profile (baseline, meal response, dawn rise, sensor
+noise) and each day a scenario; the day's key event is laid on top of three
+ordinary meals, a circadian dawn rise and a slow random drift:
+
+- stable_day: small meals and an afternoon snack
+- high_carb_hyper: a 100-150 g lunch
+- post_exercise_hypo: a drop that starts with a late-afternoon 45-minute run
+- complex_meal_delayed_spike: a high-fat dinner with delayed, prolonged absorption
+- edge_case_sensor_failure: spikes, gaps and a stuck run around midday
+- edge_case_illness: a rise that persists for the rest of the day
+- contradictory_stress_hypo: an afternoon decline
+- contradictory_symptoms: a high, flat plateau in the afternoon
+
+Responses rise from zero slope and stay within physiological rates (at most
+~4 mg/dL/min before noise), so outside edge_case_sensor_failure the sensor
+fault detector only flags the odd window of a noisy sensor (~1%).
+
+Patient i's data depends only on (seed, i), through its own SeedSequence, so a
+cohort is identical whatever the worker count or shard size. scenario_window()
+simulates a single day of one scenario the same way, for pipeline runs that
+take their CGM input from the simulator (the fast execution profile). Workers write
+straight into shared-memory shard buffers (nothing is pickled back), and the
+parent saves each finished shard:
+
+    <out>/manifest.json
+    <out>/glucose-00000.npy   float32 (patients, days * 288), NaN for gaps
+    <out>/scenario-00000.npy  uint8 (patients, days * 288), index into manifest["scenarios"]
+    <out>/events-00000.npy    int32 (patients, days), sample index of each day's key event
+
+Performance Characteristics:
+- Simulation: O(samples) per patient, vectorized over the day
+- Parallelism: patients are independent; throughput scales with workers
+- Memory: one shard of buffers at a time; readers memory-map the shards
+"""
+
+import json
+import logging
+import os
+from multiprocessing import get_context, resource_tracker, shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .glucose_forecast import CGM_RANGE
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_MINUTES = 5.0
+SAMPLES_PER_DAY = int(24 * 60 / INTERVAL_MINUTES)
+MANIFEST_NAME = "manifest.json"
+
+# Scenario ids match SCENARIO_DETAILS_DB; the position is the code stored per sample
+SCENARIOS = (
+    "stable_day", "high_carb_hyper", "post_exercise_hypo", "complex_meal_delayed_spike",
+    "edge_case_sensor_failure", "edge_case_illness", "contradictory_stress_hypo", "contradictory_symptoms",
+)
+# Minute of the day each scenario's key event starts
+EVENT_MINUTES = {
+    "stable_day": 15.5 * 60, "high_carb_hyper": 12.5 * 60, "post_exercise_hypo": 17 * 60,
+    "complex_meal_delayed_spike": 19 * 60, "edge_case_sensor_failure": 10 * 60, "edge_case_illness": 8 * 60,
+    "contradictory_stress_hypo": 14 * 60, "contradictory_symptoms": 15 * 60,
+}
+# Minutes after the key event a scenario_window ends: where the scenario's description places "now"
+# (an hour after the snack, rising just after the meal, at the end of the run, an hour after the pizza, ...)
+WINDOW_LEAD_MINUTES = {
+    "stable_day": 60, "high_carb_hyper": 30, "post_exercise_hypo": 45, "complex_meal_delayed_spike": 60,
+    "edge_case_sensor_failure": 150, "edge_case_illness": 180, "contradictory_stress_hypo": 45,
+    "contradictory_symptoms": 120,
+}
+# Context event behind each scenario's key event (ContextEventOutput event_type and parsed_details)
+SCENARIO_EVENTS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "stable_day": ("meal", {"estimated_carbs_g": 25, "meal_type": "snack", "minutes_ago": 60}),
+    "high_carb_hyper": ("meal", {"estimated_carbs_g": 130, "meal_type": "lunch", "minutes_ago": 30}),
+    "post_exercise_hypo": ("exercise", {"exercise_type": "running", "intensity": "moderate",
+                                        "duration_minutes": 45, "minutes_ago": 0}),
+    "complex_meal_delayed_spike": ("meal", {"estimated_carbs_g": 70, "meal_type": "dinner",
+                                            "fat_content": "high", "minutes_ago": 60}),
+    "edge_case_sensor_failure": ("symptoms_user_reported", {"symptoms": ["cgm readings unreliable"]}),
+    "edge_case_illness": ("illness", {"symptoms": ["fever", "body aches"]}),
+    "contradictory_stress_hypo": ("stress", {"stressor": "presentation"}),
+    "contradictory_symptoms": ("symptoms_user_reported", {"symptoms": ["shaky", "sweaty"]}),
+}
+MEAL_MINUTES = (7.5 * 60, 12.5 * 60, 19 * 60)
+MEAL_PEAK_MINUTES = 55.0
+FAT_DELAY_MINUTES = 45.0
+PLATEAU_RAMP_SAMPLES = 12
+
+
+def _bump(minutes: np.ndarray, peak_minutes: float) -> np.ndarray:
+    """
+    Gamma(3)-shaped response: 0 with zero slope at the event, 1 at
+    `peak_minutes`; its steepest slope is ~1.7 x amplitude / peak_minutes.
+    """
+    t = np.maximum(minutes, 0.0) / peak_minutes
+    return t * t * np.exp(2.0 * (1.0 - t))
+
+
+def _add_event(glucose: np.ndarray, start: int, amplitude: float, peak_minutes: float):
+    """Add a bump starting at sample `start`, over the ~8 peak-lengths it lasts."""
+    end = min(glucose.size, start + int(8 * peak_minutes / INTERVAL_MINUTES))
+    if start < end:
+        glucose[start:end] += amplitude * _bump((np.arange(end - start)) * INTERVAL_MINUTES, peak_minutes)
+
+
+def patient_rng(seed: int, patient: int) -> np.random.Generator:
+    """Patient `patient`'s generator: independent of workers, shards and order."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(patient,)))
+
+
+def simulate_patient(rng: np.random.Generator, days: int, glucose: np.ndarray, scenario: np.ndarray,
+                     events: np.ndarray, codes: Optional[np.ndarray] = None):
+    """
+    Fill one patient's rows in place: glucose (days * SAMPLES_PER_DAY,), the
+    per-sample scenario code and the key event sample of each day (days,).
+    `codes` fixes each day's scenario instead of drawing it.
+
+    Time Complexity: O(days * SAMPLES_PER_DAY)
+    """
+    samples = days * SAMPLES_PER_DAY
+    minutes = np.arange(samples) * INTERVAL_MINUTES
+    baseline = rng.normal(125, 15)
+    meal_gain = rng.uniform(0.6, 1.2)        # mg/dL per gram at the peak, after the bolus
+    dawn = rng.uniform(5, 25)
+    noise = rng.uniform(2, 4.5)
+
+    hour = (minutes % 1440) / 60
+    values = baseline + dawn * np.exp(-((hour - 6.0) / 1.5) ** 2)
+    drift = np.convolve(rng.normal(0, 1, samples), np.ones(24) / np.sqrt(24), mode="same")
+    values += 8.0 * drift
+
+    drawn = rng.integers(0, len(SCENARIOS), days)  # drawn either way, so the rest of the stream is unchanged
+    codes = drawn if codes is None else codes
+    failures = []
+    for day, code in enumerate(codes):
+        name = SCENARIOS[code]
+        first = day * SAMPLES_PER_DAY
+        scenario[first:first + SAMPLES_PER_DAY] = code
+        event = first + int((EVENT_MINUTES[name] + rng.normal(0, 20)) / INTERVAL_MINUTES)
+        events[day] = event
+        for meal_minute in MEAL_MINUTES:
+            start = first + int((meal_minute + rng.normal(0, 30)) / INTERVAL_MINUTES)
+            carbs = rng.uniform(20, 40) if name == "stable_day" else rng.uniform(30, 70)
+            amplitude = meal_gain * carbs * rng.uniform(0.7, 1.3)
+            if meal_minute != EVENT_MINUTES[name]:  # else the key event is this meal
+                _add_event(values, start, amplitude, MEAL_PEAK_MINUTES)
+
+        if name == "stable_day":
+            _add_event(values, event, meal_gain * rng.uniform(15, 30), MEAL_PEAK_MINUTES)
+        elif name == "high_carb_hyper":
+            _add_event(values, event, meal_gain * rng.uniform(100, 150), 75.0)
+        elif name == "post_exercise_hypo":
+            _add_event(values, event, -rng.uniform(60, 100), 75.0)
+        elif name == "complex_meal_delayed_spike":
+            delayed = event + int(FAT_DELAY_MINUTES / INTERVAL_MINUTES)
+            _add_event(values, delayed, meal_gain * rng.uniform(50, 80), 150.0)
+        elif name == "edge_case_illness":
+            rise = rng.uniform(50, 90) * np.minimum(1.0, np.arange(first + SAMPLES_PER_DAY - event) / 48)
+            values[event:first + SAMPLES_PER_DAY] += rise
+        elif name == "contradictory_stress_hypo":
+            _add_event(values, event, -rng.uniform(50, 70), 75.0)
+        elif name == "contradictory_symptoms":
+            plateau = slice(event, min(samples, event + 48))
+            step = np.arange(plateau.stop - plateau.start)
+            ramp = np.clip(np.minimum(step + 1, 48 - step) / PLATEAU_RAMP_SAMPLES, 0.0, 1.0)
+            weight = 0.8 * ramp * ramp * (3 - 2 * ramp)  # eased in and out over an hour
+            values[plateau] = values[plateau] * (1 - weight) + rng.uniform(185, 200) * weight
+        elif name == "edge_case_sensor_failure":
+            failures.append(event)
+
+    values += rng.normal(0, noise, samples)
+    np.clip(values, *CGM_RANGE, out=values)
+    values = np.round(values)
+    values[rng.random(samples) < 0.005] = np.nan  # occasional dropped readings
+    for event in failures:
+        span = slice(event, min(samples, event + 48))
+        spikes = rng.random(span.stop - span.start) < 0.15
+        values[span][spikes] += rng.choice((-1, 1), spikes.sum()) * rng.uniform(40, 90, spikes.sum())
+        gap = event + int(rng.integers(0, 24))
+        values[gap:gap + int(rng.integers(2, 6))] = np.nan
+        stuck = event + 24
+        values[stuck:min(samples, stuck + 10)] = values[stuck - 1]
+    np.clip(values, *CGM_RANGE, out=values)
+    glucose[:] = values
+
+
+def _attach(name: str, shape: Tuple[int, ...], dtype) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    # Attaching re-registers the name with the parent's resource tracker (a set), so the parent's unlink clears it
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _simulate_rows(task: Tuple[Any, ...]) -> int:
+    """Worker: simulate patients [first, first + rows) into a shard's shared buffers at `offset`."""
+    buffers, shard_patients, offset, rows, first, seed, days = task
+    blocks = []
+    try:
+        views = {}
+        for key, (name, dtype, width) in buffers.items():
+            block, views[key] = _attach(name, (shard_patients, width), dtype)
+            blocks.append(block)
+        for row in range(offset, offset + rows):
+            simulate_patient(patient_rng(seed, first + row - offset), days,
+                             views["glucose"][row], views["scenario"][row], views["events"][row])
+        del views
+    finally:
+        for block in blocks:
+            block.close()
+    return rows
+
+
+def generate_cohort(out_dir: str, patients: int, days: int, seed: int = 0, workers: int = 1,
+                    shard_patients: int = 1000, start_method: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Simulate a cohort into `out_dir` (created if needed) and return its manifest.
+
+    Args:
+        out_dir (str): Output directory for shards and manifest.json
+        patients (int): Virtual patients
+        days (int): Days per patient
+        seed (int): Cohort seed; patient i always gets the same data for a seed
+        workers (int): Processes (1 runs in-process)
+        shard_patients (int): Patients per shard file
+        start_method (str): multiprocessing start method (platform default if None)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    samples = days * SAMPLES_PER_DAY
+    layout = {"glucose": (np.float32, samples), "scenario": (np.uint8, samples), "events": (np.int32, days)}
+    resource_tracker.ensure_running()  # before the pool starts, so workers share the parent's tracker
+    pool = get_context(start_method).Pool(workers) if workers > 1 else None
+    shards = []
+    try:
+        for index, first in enumerate(range(0, patients, shard_patients)):
+            count = min(shard_patients, patients - first)
+            blocks = {key: shared_memory.SharedMemory(create=True, size=max(1, count * width * np.dtype(dtype).itemsize))
+                      for key, (dtype, width) in layout.items()}
+            try:
+                buffers = {key: (blocks[key].name, dtype, width) for key, (dtype, width) in layout.items()}
+                step = max(1, -(-count // (workers * 4)))  # a few tasks per worker for balance
+                tasks = [(buffers, count, offset, min(step, count - offset), first + offset, seed, days)
+                         for offset in range(0, count, step)]
+                done = sum(pool.imap_unordered(_simulate_rows, tasks) if pool else map(_simulate_rows, tasks))
+                assert done == count
+                files = {}
+                for key, (dtype, width) in layout.items():
+                    files[key] = f"{key}-{index:05d}.npy"
+                    np.save(os.path.join(out_dir, files[key]),
+                            np.ndarray((count, width), dtype=dtype, buffer=blocks[key].buf))
+                shards.append({"first_patient": first, "patients": count, "files": files})
+            finally:
+                for block in blocks.values():
+                    block.close()
+                    block.unlink()
+            logger.info(f"🧬 Cohort shard {index}: patients {first}-{first + count - 1}")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    manifest = {
+        "patients": patients, "days": days, "seed": seed, "interval_minutes": INTERVAL_MINUTES,
+        "samples_per_patient": samples, "scenarios": list(SCENARIOS), "shards": shards,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(cohort_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(cohort_dir, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def iter_cohort_shards(cohort_dir: str, mmap_mode: Optional[str] = "r") -> Iterator[Dict[str, Any]]:
+    """
+    Shards in patient order as {"first_patient", "glucose", "scenario", "events"},
+    memory-mapped by default (no parsing, pages load on access).
+    """
+    for shard in read_manifest(cohort_dir)["shards"]:
+        arrays = {key: np.load(os.path.join(cohort_dir, name), mmap_mode=mmap_mode)
+                  for key, name in shard["files"].items()}
+        yield {"first_patient": shard["first_patient"], **arrays}
+
+
+def event_windows(glucose: np.ndarray, events: np.ndarray, day: int, window_samples: int = 36,
+                  lead_samples: int = 0) -> np.ndarray:
+    """
+    (patients, window_samples) windows ending `lead_samples` after each
+    patient's key event on `day` - the batch input for cgm_features and
+    glucose_forecast. Windows that would start before sample 0 are NaN-padded.
+
+    Time Complexity: O(patients * window_samples), one fancy-indexing gather
+    """
+    ends = events[:, day].astype(np.int64) + lead_samples
+    index = ends[:, np.newaxis] + np.arange(1 - window_samples, 1)[np.newaxis, :]
+    valid = (index >= 0) & (index < glucose.shape[1])
+    windows = np.asarray(glucose)[np.arange(glucose.shape[0])[:, np.newaxis], np.clip(index, 0, glucose.shape[1] - 1)]
+    return np.where(valid, windows, np.nan)
+
+
+def scenario_window(scenario_id: str, window_samples: int = 36, seed: int = 0) -> List[Optional[float]]:
+    """
+    Deterministic CGM window (5-minute samples, oldest first, None for gaps)
+    for a built-in scenario: one simulated day of it, ending
+    WINDOW_LEAD_MINUTES after its key event. Same (scenario, seed), same window.
+
+    Raises:
+        ValueError: Not one of SCENARIOS
+
+    Time Complexity: O(SAMPLES_PER_DAY)
+    """
+    if scenario_id not in SCENARIOS:
+        raise ValueError(f"No simulator for scenario '{scenario_id}'")
+    code = SCENARIOS.index(scenario_id)
+    lead = int(WINDOW_LEAD_MINUTES[scenario_id] / INTERVAL_MINUTES)
+    glucose = np.empty(SAMPLES_PER_DAY)
+    events = np.empty((1, 1), dtype=np.int32)
+    simulate_patient(patient_rng(seed, code), 1, glucose, np.empty(SAMPLES_PER_DAY, dtype=np.uint8),
+                     events[0], codes=np.array([code]))
+    return [None if np.isnan(value) else float(value)
+            for value in event_windows(glucose[np.newaxis, :], events, 0, window_samples, lead)[0]]
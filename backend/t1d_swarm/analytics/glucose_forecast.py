@@ -0,0 +1,273 @@
+"""
+Numeric Glucose Forecast
+
+A local-linear-trend Kalman filter over the CGM window, projected 0-3 hours
+ahead with meal and exercise inputs, so the forecaster's trajectory and
+time-to-threshold statements start from numbers instead of prose.
+
+State per user is (glucose mg/dL, rate mg/dL/min). The filter runs over the
+window with an undamped trend (gaps skip the update), then the state is
+projected forward with the rate damped toward zero (trends do not persist for
+hours) while the inputs add what is still to come:
+
+- meal: net rise of NET_CARB_EFFECT_MG_DL_PER_G per gram, spread over a
+  gamma(2) absorption curve peaking CARB_PEAK_MINUTES after the meal
+- exercise: a drop of up to EXERCISE_DROP_MG_DL_PER_MIN (scaled by intensity)
+  decaying with EXERCISE_HALF_LIFE_MINUTES after the session
+
+The filter's trend already carries what the inputs have done so far. Bands
+combine the projected state variance with INPUT_UNCERTAINTY of the input
+effect. Batch functions take (n_users, n_samples) arrays like cgm_features and
+loop only over time steps, never over users.
+
+Performance Characteristics:
+- Time Complexity: O(n_users * (n_samples + horizon_steps)), vectorized per step
+- Memory: O(n_users * horizon_steps) for the trajectories and bands
+"""
+
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .cgm_features import HYPER_THRESHOLD, HYPO_THRESHOLD, _as_batch
+
+# Filter tuning (mg/dL, minutes)
+MEASUREMENT_VARIANCE = 36.0          # CGM sensor noise, ~6 mg/dL sd
+RATE_PROCESS_VARIANCE = 0.008        # rate random walk per minute, (mg/dL/min)^2/min
+RATE_HALF_LIFE_MINUTES = 30.0        # damping of the trend in the projection
+UNKNOWN_RATE_VARIANCE = 1.0          # initial rate variance without a prior
+PRIOR_RATE_VARIANCE = 0.25           # initial rate variance with a trend-arrow prior
+
+# Input effects (population defaults; context events carry no insulin data)
+NET_CARB_EFFECT_MG_DL_PER_G = 1.5    # net rise per gram after a typical bolus
+CARB_PEAK_MINUTES = 45.0
+EXERCISE_DROP_MG_DL_PER_MIN = 0.5    # at intensity 1.0, right after the session
+EXERCISE_HALF_LIFE_MINUTES = 60.0
+INPUT_UNCERTAINTY = 0.3              # sd of the input effect, as a fraction of it
+
+CGM_RANGE = (40.0, 400.0)
+MAX_HORIZON_HOURS = 3.0
+BAND_Z = {"80": 1.2816, "95": 1.96}
+
+EXERCISE_INTENSITY = {
+    "light": 0.3, "low": 0.3, "easy": 0.3,
+    "moderate": 0.6, "medium": 0.6,
+    "vigorous": 1.0, "high": 1.0, "hard": 1.0, "intense": 1.0,
+}
+CARB_KEYS = ("estimated_carbs_g", "carbs_g", "carbohydrates_g", "carbs")
+MINUTES_AGO_KEYS = ("minutes_ago", "time_since_event_minutes", "minutes_since_event")
+
+# Rate (mg/dL/min) at the middle of each trend arrow's band, for windows of one reading
+ARROW_RATES = {
+    "DoubleUp": 3.5, "SingleUp": 2.5, "FortyFiveUp": 1.5, "Flat": 0.0,
+    "FortyFiveDown": -1.5, "SingleDown": -2.5, "DoubleDown": -3.5,
+}
+
+
+def _vector(value: Any, n_users: int, default: float) -> np.ndarray:
+    array = np.broadcast_to(np.asarray(default if value is None else value, dtype=float), (n_users,))
+    return np.where(np.isnan(array), default, array)
+
+
+def carb_absorbed(minutes: np.ndarray) -> np.ndarray:
+    """Fraction of a meal absorbed `minutes` after eating (gamma(2) CDF). Time Complexity: O(n)"""
+    t = np.maximum(minutes, 0.0) / CARB_PEAK_MINUTES
+    return 1.0 - (1.0 + t) * np.exp(-t)
+
+
+def exercise_drop(minutes: np.ndarray) -> np.ndarray:
+    """Cumulative drop (mg/dL per unit intensity) `minutes` after a session. Time Complexity: O(n)"""
+    decay = np.log(2.0) / EXERCISE_HALF_LIFE_MINUTES
+    return EXERCISE_DROP_MG_DL_PER_MIN * (1.0 - np.exp(-decay * np.maximum(minutes, 0.0))) / decay
+
+
+def _predict(g, r, p00, p01, p11, dt: float, damped: bool):
+    """One local-linear-trend step of the state and its covariance. Time Complexity: O(n)"""
+    phi = 0.5 ** (dt / RATE_HALF_LIFE_MINUTES) if damped else 1.0
+    q = RATE_PROCESS_VARIANCE
+    return (g + dt * r, phi * r,
+            p00 + 2 * dt * p01 + dt * dt * p11 + q * dt ** 3 / 3,
+            phi * (p01 + dt * p11) + q * dt ** 2 / 2,
+            phi * phi * p11 + q * dt)
+
+
+def filter_window(glucose: np.ndarray, interval_minutes: float, prior_rate: np.ndarray):
+    """
+    Kalman-filter every user's window in one pass over the time steps.
+
+    Returns:
+        (glucose, rate, p00, p01, p11): final state and covariance per user
+
+    Time Complexity: O(n_users * n_samples)
+    """
+    n_users, n_samples = glucose.shape
+    valid = ~np.isnan(glucose)
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), 0)
+    g = glucose[np.arange(n_users), first]
+    has_prior = ~np.isnan(prior_rate)
+    r = np.where(has_prior, prior_rate, 0.0)
+    p00 = np.full(n_users, MEASUREMENT_VARIANCE)
+    p01 = np.zeros(n_users)
+    p11 = np.where(has_prior, PRIOR_RATE_VARIANCE, UNKNOWN_RATE_VARIANCE)
+
+    # Each user's filter starts at its first valid reading
+    for step in range(n_samples):
+        started = step > first
+        if started.any():
+            predicted = _predict(g, r, p00, p01, p11, interval_minutes, damped=False)
+            g, r, p00, p01, p11 = (np.where(started, new, old) for new, old in zip(predicted, (g, r, p00, p01, p11)))
+        observed = valid[:, step] & (step >= first)
+        innovation = np.where(observed, glucose[:, step] - g, 0.0)
+        s = p00 + MEASUREMENT_VARIANCE
+        k0 = np.where(observed, p00 / s, 0.0)
+        k1 = np.where(observed, p01 / s, 0.0)
+        g, r = g + k0 * innovation, r + k1 * innovation
+        p00, p01, p11 = (1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01
+    return g, r, p00, p01, p11
+
+
+def forecast_trajectories(glucose: Any, interval_minutes: float = 5.0, horizon_hours: float = MAX_HORIZON_HOURS,
+                          prior_rate: Any = None, carbs_g: Any = None, carbs_minutes_ago: Any = None,
+                          exercise_intensity: Any = None, exercise_minutes_ago: Any = None) -> Dict[str, np.ndarray]:
+    """
+    Forecast glucose trajectories with confidence bands for a batch of users.
+
+    Args:
+        glucose: (n_users, n_samples) mg/dL, oldest first, NaN for gaps (1-D accepted for one user)
+        interval_minutes: Sampling interval of the window and of the trajectory
+        horizon_hours: Forecast window, capped at MAX_HORIZON_HOURS
+        prior_rate: (n_users,) mg/dL/min from a trend arrow, NaN where unknown
+        carbs_g / carbs_minutes_ago: (n_users,) latest meal, 0 / NaN where none
+        exercise_intensity / exercise_minutes_ago: (n_users,) 0-1 intensity of the latest session
+
+    Returns:
+        Dict[str, np.ndarray]: `minutes` (h,), `mean` / `low_80` / `high_80` /
+        `low_95` / `high_95` (n_users, h), `rate` (n_users,), and per-user
+        `minutes_to_hypo` / `minutes_to_hyper` (mean crossing) plus
+        `earliest_minutes_to_hypo` / `earliest_minutes_to_hyper` (80% band
+        crossing), NaN when no crossing within the horizon
+
+    Time Complexity: O(n_users * (n_samples + h))
+    """
+    batch = _as_batch(glucose)
+    n_users = batch.shape[0]
+    dt = interval_minutes
+    steps = max(1, int(round(min(horizon_hours, MAX_HORIZON_HOURS) * 60 / dt)))
+    minutes = np.arange(1, steps + 1) * dt
+
+    no_data = np.all(np.isnan(batch), axis=1)
+    state = filter_window(batch, dt, _vector(prior_rate, n_users, np.nan))
+    rate = np.where(no_data, np.nan, state[1])
+
+    # Damped-trend projection with the filter's predict step, one column per step
+    mean = np.empty((n_users, steps))
+    variance = np.empty((n_users, steps))
+    for step in range(steps):
+        state = _predict(*state, dt, damped=True)
+        g, p00 = state[0], state[2]
+        mean[:, step] = g
+        variance[:, step] = p00
+
+    # Inputs: only the part of each effect still to come
+    carbs = _vector(carbs_g, n_users, 0.0)
+    carbs_ago = _vector(carbs_minutes_ago, n_users, 0.0)[:, np.newaxis]
+    meal = NET_CARB_EFFECT_MG_DL_PER_G * carbs[:, np.newaxis] * (
+        carb_absorbed(carbs_ago + minutes) - carb_absorbed(carbs_ago)
+    )
+    intensity = np.clip(_vector(exercise_intensity, n_users, 0.0), 0.0, 1.0)
+    exercise_ago = _vector(exercise_minutes_ago, n_users, 0.0)[:, np.newaxis]
+    exercise = -intensity[:, np.newaxis] * (exercise_drop(exercise_ago + minutes) - exercise_drop(exercise_ago))
+    inputs = meal + exercise
+    mean += inputs
+    sd = np.sqrt(variance + (INPUT_UNCERTAINTY * inputs) ** 2)
+
+    low, high = CGM_RANGE
+    result = {"minutes": minutes, "mean": np.clip(mean, low, high), "rate": rate}
+    for level, z in BAND_Z.items():
+        result[f"low_{level}"] = np.clip(mean - z * sd, low, high)
+        result[f"high_{level}"] = np.clip(mean + z * sd, low, high)
+
+    with np.errstate(invalid="ignore"):
+        crossings = {
+            "minutes_to_hypo": mean < HYPO_THRESHOLD,
+            "minutes_to_hyper": mean > HYPER_THRESHOLD,
+            "earliest_minutes_to_hypo": result["low_80"] < HYPO_THRESHOLD,
+            "earliest_minutes_to_hyper": result["high_80"] > HYPER_THRESHOLD,
+        }
+    for name, mask in crossings.items():
+        crossed = mask.any(axis=1) & ~no_data
+        result[name] = np.where(crossed, minutes[mask.argmax(axis=1)], np.nan)
+    for name in ("mean", "low_80", "high_80", "low_95", "high_95"):
+        result[name][no_data] = np.nan
+    return result
+
+
+def context_inputs(context_event: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Meal / exercise inputs from a ContextEventOutput dict (`parsed_details`
+    first, then the top-level fields). Missing values are 0 / NaN.
+    """
+    event = context_event if isinstance(context_event, dict) else {}
+    details = event.get("parsed_details") if isinstance(event.get("parsed_details"), dict) else {}
+
+    def number(*keys: str) -> Optional[float]:
+        for source in (details, event):
+            for key in keys:
+                try:
+                    return float(source[key])
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return None
+
+    minutes_ago = number(*MINUTES_AGO_KEYS) or 0.0
+    carbs = number(*CARB_KEYS) or 0.0
+    intensity = 0.0
+    if event.get("event_type") == "exercise" or "exercise_type" in details:
+        level = str(details.get("intensity") or event.get("intensity") or "moderate").lower()
+        intensity = EXERCISE_INTENSITY.get(level, number("intensity") or 0.6)
+    return {
+        "carbs_g": carbs,
+        "carbs_minutes_ago": minutes_ago if carbs else np.nan,
+        "exercise_intensity": intensity,
+        "exercise_minutes_ago": minutes_ago if intensity else np.nan,
+    }
+
+
+def _rounded(value: Any) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value)
+
+
+def glucose_forecast(glucose: Sequence[Optional[float]], context_event: Optional[Dict[str, Any]] = None,
+                     trend_arrow: Optional[str] = None, interval_minutes: float = 5.0,
+                     horizon_hours: float = MAX_HORIZON_HOURS, report_every_minutes: float = 15.0) -> Dict[str, Any]:
+    """
+    Forecast for a single user as plain JSON-serializable values (None for NaN).
+
+    `glucose` is the CGM window (or just the latest reading); `trend_arrow`
+    seeds the rate when the window is too short to estimate it. The
+    trajectory is reported every `report_every_minutes` to keep prompts short.
+    """
+    values = [np.nan if g is None else g for g in glucose] or [np.nan]
+    inputs = context_inputs(context_event)
+    batch = forecast_trajectories(
+        [values], interval_minutes, horizon_hours,
+        prior_rate=ARROW_RATES.get(trend_arrow, np.nan) if len(values) < 3 else np.nan, **inputs,
+    )
+    every = max(1, int(round(report_every_minutes / interval_minutes)))
+    picks = np.arange(every - 1, len(batch["minutes"]), every)
+    return {
+        "model": "kalman_local_linear_trend",
+        "horizon_hours": float(batch["minutes"][-1] / 60),
+        "rate_mg_dl_per_min": None if np.isnan(batch["rate"][0]) else round(float(batch["rate"][0]), 2),
+        "trajectory": [
+            {"minutes_ahead": int(batch["minutes"][i]), "glucose": _rounded(batch["mean"][0, i]),
+             "low_80": _rounded(batch["low_80"][0, i]), "high_80": _rounded(batch["high_80"][0, i])}
+            for i in picks
+        ],
+        "minutes_to_hypo": _rounded(batch["minutes_to_hypo"][0]),
+        "earliest_minutes_to_hypo": _rounded(batch["earliest_minutes_to_hypo"][0]),
+        "minutes_to_hyper": _rounded(batch["minutes_to_hyper"][0]),
+        "earliest_minutes_to_hyper": _rounded(batch["earliest_minutes_to_hyper"][0]),
+        "inputs": {name: None if np.isnan(value) else value for name, value in inputs.items()},
+    }
@@ -0,0 +1,224 @@
+"""
+CGM Sensor Fault Detection
+
+Flags bad CGM data deterministically, one sample at a time, so agents get a
+`data_quality_issues` value instead of having to notice erratic readings:
+
+- missing_data: a missing reading, or a gap longer than GAP_FACTOR intervals
+- erratic_readings: a jump that departs from the rolling trend faster than
+  JUMP_RATE mg/dL/min (beyond what glucose physiology does), or a rolling
+  sample-to-sample deviation above NOISE_STD mg/dL
+- compression_low: a drop of at least COMPRESSION_DROP_RATE mg/dL/min into the
+  hypo range from a rolling baseline at or above COMPRESSION_BASELINE (pressure
+  on the sensor, typically overnight) that lasts two or more readings. A drop at
+  a physiological rate is only suspected: a real hypo looks the same, so it is
+  labelled once the readings rebound out of the hypo range faster than
+  JUMP_RATE. A drop faster than JUMP_RATE is labelled from the second low
+  reading. A single low reading that bounces straight back counts as erratic
+- sensor_stuck: STUCK_SAMPLES consecutive identical readings
+
+Only stuck and erratic readings make the data unreliable. A compression low
+leaves the readings after the rebound usable, and a suspected one may be a real
+hypo, so it is reported without suppressing the forecast.
+
+An issue stays flagged for `hold_samples` readings after its last occurrence,
+so a window that contains the fault reports it. Rolling statistics are running
+sums over a fixed-size deque.
+
+Performance Characteristics:
+- update(): O(1) time per sample
+- Memory: O(window) per stream
+"""
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from .cgm_features import HYPO_THRESHOLD
+
+MISSING_DATA = "missing_data"
+ERRATIC_READINGS = "erratic_readings"
+COMPRESSION_LOW = "compression_low"
+SENSOR_STUCK = "sensor_stuck"
+
+# Order issues are reported in
+ISSUE_ORDER = (SENSOR_STUCK, COMPRESSION_LOW, ERRATIC_READINGS, MISSING_DATA)
+# Issues that make trend- and forecast-based analysis pointless; never a possible real hypo
+UNRELIABLE_ISSUES = frozenset({SENSOR_STUCK, ERRATIC_READINGS})
+# Session state: {"issues": [...], "reliable": bool, "source": "detector" | "reported"}
+DATA_QUALITY_KEY = "cgm_data_quality"
+
+GAP_FACTOR = 1.5
+JUMP_RATE = 6.0  # mg/dL/min; glucose rarely changes faster than 4-5
+NOISE_STD = 15.0
+COMPRESSION_DROP_RATE = 2.0
+COMPRESSION_BASELINE = 90.0
+COMPRESSION_MAX_MINUTES = 90.0
+STUCK_SAMPLES = 9
+
+
+class SensorFaultDetector:
+    """Streaming fault detector for one CGM stream."""
+
+    def __init__(self, interval_minutes: float = 5.0, window: int = 12, hold_samples: int = 12):
+        """
+        Args:
+            interval_minutes (float): Expected sampling interval
+            window (int): Readings in the rolling baseline / noise statistics
+            hold_samples (int): Readings an issue stays flagged after it was last seen
+        """
+        self.interval_minutes = interval_minutes
+        self.window = window
+        self.hold_samples = hold_samples
+        self.samples = 0
+        self._values: Deque[float] = deque()
+        self._deltas: Deque[float] = deque()
+        self._sum = 0.0
+        self._delta_sum = 0.0
+        self._delta_sq_sum = 0.0
+        self._last_time: Optional[float] = None
+        self._last_value: Optional[float] = None
+        self._last_value_time: Optional[float] = None
+        self._same_count = 0
+        self._compression_since: Optional[float] = None
+        self._compression_lows = 0
+        self._compression_fast = False
+        self._last_seen: Dict[str, int] = {}
+
+    def _push_value(self, value: float):
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+
+    def _push_delta(self, delta: float):
+        self._deltas.append(delta)
+        self._delta_sum += delta
+        self._delta_sq_sum += delta * delta
+        if len(self._deltas) > self.window:
+            old = self._deltas.popleft()
+            self._delta_sum -= old
+            self._delta_sq_sum -= old * old
+
+    @property
+    def baseline(self) -> Optional[float]:
+        """Rolling mean of the last `window` valid readings."""
+        return self._sum / len(self._values) if self._values else None
+
+    @property
+    def noise(self) -> float:
+        """Rolling standard deviation of sample-to-sample changes (mg/dL), once half a window is in."""
+        n = len(self._deltas)
+        if n < max(3, self.window // 2):
+            return 0.0
+        mean = self._delta_sum / n
+        return math.sqrt(max(0.0, self._delta_sq_sum / n - mean * mean))
+
+    def update(self, timestamp: float, glucose: Optional[float]) -> List[str]:
+        """
+        Add one reading (epoch seconds, mg/dL or None) and return the active issues.
+
+        Time Complexity: O(1)
+        """
+        self.samples += 1
+        seen = []
+        interval_seconds = self.interval_minutes * 60
+        if self._last_time is not None and timestamp - self._last_time > GAP_FACTOR * interval_seconds:
+            seen.append(MISSING_DATA)
+
+        if glucose is None:
+            seen.append(MISSING_DATA)
+        else:
+            glucose = float(glucose)
+            if self._last_value is not None:
+                minutes = max((timestamp - self._last_value_time) / 60, self.interval_minutes)
+                delta = glucose - self._last_value
+                rate = delta / minutes
+                baseline = self.baseline
+                if self._compression_since is not None:
+                    if glucose >= HYPO_THRESHOLD or timestamp - self._compression_since > COMPRESSION_MAX_MINUTES * 60:
+                        rebound = glucose >= HYPO_THRESHOLD and rate > JUMP_RATE
+                        if self._compression_lows == 1:  # a single low reading was a spike
+                            if rebound or self._compression_fast:
+                                seen.append(ERRATIC_READINGS)
+                        elif rebound and not self._compression_fast:  # confirmed by the rebound
+                            seen.append(COMPRESSION_LOW)
+                        self._compression_since = None  # the rebound itself is not noise
+                    else:
+                        self._compression_lows += 1
+                        if self._compression_fast:
+                            seen.append(COMPRESSION_LOW)
+                elif (rate <= -COMPRESSION_DROP_RATE and glucose < HYPO_THRESHOLD
+                        and baseline is not None and baseline >= COMPRESSION_BASELINE):
+                    # Suspected until it rebounds, unless the drop is too fast to be glucose
+                    self._compression_since, self._compression_lows = timestamp, 1
+                    self._compression_fast = rate < -JUMP_RATE
+                else:
+                    n = len(self._deltas)
+                    trend = self._delta_sum / n * minutes / self.interval_minutes if n else 0.0
+                    if abs(delta - trend) / minutes > JUMP_RATE:
+                        seen.append(ERRATIC_READINGS)
+                    self._push_delta(delta)
+                    if self.noise > NOISE_STD:
+                        seen.append(ERRATIC_READINGS)
+                self._same_count = self._same_count + 1 if delta == 0 else 0
+            if self._same_count + 1 >= STUCK_SAMPLES:
+                seen.append(SENSOR_STUCK)
+            if self._compression_since is None:  # keep the pre-drop baseline during a compression
+                self._push_value(glucose)
+            self._last_value, self._last_value_time = glucose, timestamp
+        self._last_time = timestamp
+
+        for issue in seen:
+            self._last_seen[issue] = self.samples
+        return self.issues
+
+    @property
+    def issues(self) -> List[str]:
+        """Issues seen within the last `hold_samples` readings, most severe first."""
+        return [issue for issue in ISSUE_ORDER
+                if issue in self._last_seen and self.samples - self._last_seen[issue] < self.hold_samples]
+
+
+def detect_window_faults(glucose: Sequence[Optional[float]], interval_minutes: float = 5.0,
+                         hold_samples: Optional[int] = None) -> List[str]:
+    """
+    Issues in an evenly spaced window (oldest first, None for gaps), by
+    replaying it through a detector; by default anything in the window counts.
+
+    Time Complexity: O(w)
+    """
+    detector = SensorFaultDetector(interval_minutes=interval_minutes,
+                                   hold_samples=hold_samples or max(1, len(glucose)))
+    for index, value in enumerate(glucose):
+        detector.update(index * interval_minutes * 60, value)
+    return detector.issues
+
+
+def merge_issues(issues: Sequence[str], reported: Optional[str] = None) -> Optional[str]:
+    """`data_quality_issues` string: detected issues plus any reported ones not already covered."""
+    merged = list(issues)
+    for item in (reported or "").split(","):
+        item = item.strip()
+        if item and item.lower() not in ("none", "null") and item not in merged:
+            merged.append(item)
+    return ", ".join(merged) or None
+
+
+def assess_data_quality(issues: Optional[Any], source: str) -> Dict[str, Any]:
+    """
+    The DATA_QUALITY_KEY entry for a list of issues or a data_quality_issues
+    string (as an LLM reports it: unreliable labels are matched as substrings).
+    """
+    if isinstance(issues, str):
+        text = issues.lower()
+        found = [issue for issue in ISSUE_ORDER if issue in text]
+        issues = found + ([issues] if not found and text.strip() not in ("", "none", "null") else [])
+    issues = list(issues or [])
+    return {"issues": issues, "reliable": not UNRELIABLE_ISSUES.intersection(issues), "source": source}
+
+
+def cgm_data_reliable(state: Any) -> bool:
+    """False when the run's CGM data was assessed as unreliable; True when unassessed."""
+    quality = state.get(DATA_QUALITY_KEY)
+    return not isinstance(quality, dict) or quality.get("reliable", True)
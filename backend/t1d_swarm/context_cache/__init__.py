@@ -0,0 +1,24 @@
+import os
+
+from .backends import CacheBackendError, GeminiCacheBackend, FakeCacheBackend
+from .manager import CachedPrefix, ContextCacheManager, StaticPrefixCache
+from .endpoints import setup_context_cache_routes
+
+# "gemini" (explicit caching via the Gemini API / Vertex AI), "fake" (in-process) or "off"
+CONTEXT_CACHE_BACKEND = os.getenv("CONTEXT_CACHE_BACKEND", "off").lower()
+
+_backends = {"gemini": GeminiCacheBackend, "fake": FakeCacheBackend}
+
+# Global context cache manager instance (caching disabled when the backend is "off")
+context_cache = ContextCacheManager(
+    backend=_backends[CONTEXT_CACHE_BACKEND]() if CONTEXT_CACHE_BACKEND in _backends else None,
+    ttl=float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600")),
+    refresh_margin=float(os.getenv("CONTEXT_CACHE_REFRESH_MARGIN_SECONDS", "300")),
+    min_tokens=int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024")),
+    max_entries=int(os.getenv("CONTEXT_CACHE_MAX_ENTRIES", "32")),
+)
+
+__all__ = [
+    'CacheBackendError', 'GeminiCacheBackend', 'FakeCacheBackend', 'CachedPrefix', 'ContextCacheManager',
+    'StaticPrefixCache', 'setup_context_cache_routes', 'context_cache', 'CONTEXT_CACHE_BACKEND',
+]
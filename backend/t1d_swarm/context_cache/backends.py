@@ -0,0 +1,149 @@
+"""
+Context Cache Backends
+
+Provider-side storage for cached instruction prefixes. A backend creates a
+cached content holding a system instruction (and the tools bound to it),
+extends its TTL, and deletes it:
+
+- GeminiCacheBackend: Gemini API / Vertex AI explicit context caching
+  (`client.aio.caches`), configured from the usual GOOGLE_* environment
+- FakeCacheBackend: in-process stand-in with the same contract (minimum size,
+  TTL expiry, not-found errors) for tests, benchmarks and offline runs; a
+  fake model resolves `cached_content` names through `resolve()`
+
+Performance Characteristics:
+- Gemini: one API round trip per create / refresh / delete, none per request
+- Fake: O(1) per operation, O(c) memory for c live caches
+"""
+
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackendError(Exception):
+    """A cache could not be created, refreshed or deleted."""
+
+
+class GeminiCacheBackend:
+    """Explicit context caching through the google-genai async client."""
+
+    def __init__(self, client: Optional[Any] = None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:  # created on first use, no network at import
+            from google import genai
+            self._client = genai.Client()
+        return self._client
+
+    @staticmethod
+    def _expires_at(cached: Any, ttl_seconds: float) -> float:
+        expire_time = getattr(cached, "expire_time", None)
+        return expire_time.timestamp() if expire_time is not None else time.time() + ttl_seconds
+
+    async def create(self, model: str, system_instruction: str, tools: Optional[List[types.Tool]],
+                     ttl_seconds: float, display_name: str) -> Tuple[str, float]:
+        """Create a cached content. Returns (name, expiry epoch seconds)."""
+        try:
+            cached = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_instruction,
+                    tools=tools or None,
+                    ttl=f"{int(ttl_seconds)}s",
+                    display_name=display_name,
+                ),
+            )
+        except Exception as e:
+            raise CacheBackendError(str(e)) from e
+        return cached.name, self._expires_at(cached, ttl_seconds)
+
+    async def refresh(self, name: str, ttl_seconds: float) -> float:
+        """Extend a cached content's TTL. Returns the new expiry."""
+        try:
+            cached = await self.client.aio.caches.update(
+                name=name, config=types.UpdateCachedContentConfig(ttl=f"{int(ttl_seconds)}s")
+            )
+        except Exception as e:
+            raise CacheBackendError(str(e)) from e
+        return self._expires_at(cached, ttl_seconds)
+
+    async def delete(self, name: str):
+        try:
+            await self.client.aio.caches.delete(name=name)
+        except Exception as e:
+            raise CacheBackendError(str(e)) from e
+
+
+@dataclass
+class FakeCachedContent:
+    name: str
+    model: str
+    system_instruction: str
+    tools: Optional[List[types.Tool]]
+    expire_at: float
+    token_count: int
+    display_name: str = ""
+
+
+@dataclass
+class FakeCacheBackend:
+    """
+    In-memory backend with the provider's contract.
+
+    Enforces the minimum cacheable size (raising like the API does), expires
+    entries by TTL against `clock`, and counts every call so tests can assert
+    on create / refresh / delete traffic.
+    """
+    min_tokens: int = 1024
+    clock: Callable[[], float] = time.time
+    chars_per_token: int = 4
+    caches: Dict[str, FakeCachedContent] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=lambda: {"create": 0, "refresh": 0, "delete": 0})
+
+    def __post_init__(self):
+        self._ids = itertools.count(1)
+
+    def _live(self, name: str) -> FakeCachedContent:
+        cached = self.caches.get(name)
+        if cached is None or cached.expire_at <= self.clock():
+            self.caches.pop(name, None)
+            raise CacheBackendError(f"404 cached content {name} not found")
+        return cached
+
+    async def create(self, model: str, system_instruction: str, tools: Optional[List[types.Tool]],
+                     ttl_seconds: float, display_name: str) -> Tuple[str, float]:
+        self.calls["create"] += 1
+        token_count = len(system_instruction) // self.chars_per_token
+        if token_count < self.min_tokens:
+            raise CacheBackendError(
+                f"400 cached content is too small: {token_count} tokens, minimum {self.min_tokens}"
+            )
+        name = f"cachedContents/fake-{next(self._ids)}"
+        self.caches[name] = FakeCachedContent(
+            name, model, system_instruction, tools, self.clock() + ttl_seconds, token_count, display_name
+        )
+        return name, self.caches[name].expire_at
+
+    async def refresh(self, name: str, ttl_seconds: float) -> float:
+        self.calls["refresh"] += 1
+        cached = self._live(name)
+        cached.expire_at = self.clock() + ttl_seconds
+        return cached.expire_at
+
+    async def delete(self, name: str):
+        self.calls["delete"] += 1
+        self._live(name)
+        del self.caches[name]
+
+    def resolve(self, name: str) -> FakeCachedContent:
+        """What a model serving `cached_content=name` would see (raises when expired)."""
+        return self._live(name)
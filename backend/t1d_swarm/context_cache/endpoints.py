@@ -0,0 +1,20 @@
+import logging
+from typing import TYPE_CHECKING
+
+from fastapi import FastAPI
+
+if TYPE_CHECKING:
+    from .manager import ContextCacheManager
+
+logger = logging.getLogger(__name__)
+
+
+def setup_context_cache_routes(app: FastAPI, manager: "ContextCacheManager"):
+    """Add the context cache inspection route to the FastAPI app"""
+
+    @app.get("/debug/context-cache")
+    async def get_context_cache_stats():
+        """Cached instruction prefixes (TTL, references, hits) and cache counters"""
+        return manager.stats()
+
+    logger.info("✅ Context cache endpoints registered: /debug/context-cache")
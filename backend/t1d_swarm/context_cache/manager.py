@@ -0,0 +1,303 @@
+"""
+Context Cache Manager
+
+Most of each agent's instruction is a static prefix (role, task, schema,
+guidelines, examples) followed by a small per-session suffix (CGM data,
+context event, forecast). The manager keeps one provider-side cached content
+per (model, static prefix, tools) and rewrites model requests to reference it,
+so the provider stops re-processing the prefix on every call:
+
+    before: system_instruction = static prefix + suffix, tools = [...]
+    after:  cached_content = "cachedContents/..." (prefix + tools),
+            suffix prepended to the first user turn
+
+Lifecycle per cached prefix:
+- created on first use (single-flight: concurrent callers wait for one create)
+- refreshed (TTL extended) when used within `refresh_margin` of expiry
+- reference-counted while requests using it are in flight; only unreferenced
+  entries are evicted (LRU beyond `max_entries`) or deleted on close()
+- prefixes under `min_tokens` (below the provider minimum) and prefixes whose
+  creation failed are served uncached; failures are retried after a backoff
+
+Any cache problem falls back to the unmodified request.
+
+Performance Characteristics:
+- Cache hit: O(p) hashing of the p-char prefix, no provider round trip
+- Create / refresh: one backend call per prefix per TTL window
+- Memory: O(max_entries) entries
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from .backends import CacheBackendError
+
+logger = logging.getLogger(__name__)
+
+# Requests tracked per StaticPrefixCache; older ones are assumed to have errored
+MAX_IN_FLIGHT = 1024
+
+
+@dataclass
+class CachedPrefix:
+    """One provider-side cached instruction prefix."""
+    key: str
+    model: str
+    name: str
+    label: str
+    expire_at: float
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    refs: int = 0
+    hits: int = 0
+    refreshes: int = 0
+    includes_tools: bool = False
+
+
+class ContextCacheManager:
+    """
+    Creates, refreshes and evicts cached contents for static instruction prefixes.
+
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(self, backend=None, ttl: float = 3600.0, refresh_margin: float = 300.0,
+                 min_tokens: int = 1024, max_entries: int = 32, failure_backoff: float = 600.0,
+                 stale_ref_seconds: float = 600.0, chars_per_token: int = 4,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            backend: GeminiCacheBackend / FakeCacheBackend, or None to disable caching
+            ttl (float): Seconds a cached content lives after create / refresh
+            refresh_margin (float): Refresh when used with less than this left
+            min_tokens (int): Smallest prefix worth caching (provider minimum)
+            max_entries (int): Cached prefixes kept before LRU eviction
+            failure_backoff (float): Seconds to serve a prefix uncached after a failure
+            stale_ref_seconds (float): Treat references older than this as leaked
+                (a request that errored never reaches its after_model callback)
+            chars_per_token (int): Token estimate for the min_tokens check
+            clock: Epoch-seconds time source (share it with a FakeCacheBackend in tests)
+        """
+        self.backend = backend
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self.failure_backoff = failure_backoff
+        self.stale_ref_seconds = stale_ref_seconds
+        self.chars_per_token = chars_per_token
+        self.clock = clock
+        self._entries: "OrderedDict[str, CachedPrefix]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._failed_until: Dict[str, float] = {}
+        self._skipped: Dict[str, str] = {}
+        self.counters = {"cached_requests": 0, "creates": 0, "refreshes": 0, "evictions": 0, "failures": 0,
+                         "uncached": 0, "cached_tokens": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def cache_key(model: str, prefix: str, tools: Optional[List[types.Tool]]) -> str:
+        """Stable identity of a cacheable prefix. Time Complexity: O(p)"""
+        digest = hashlib.sha256(model.encode())
+        digest.update(prefix.encode())
+        for tool in tools or []:
+            digest.update(json.dumps(tool.model_dump(mode="json", exclude_none=True), sort_keys=True).encode())
+        return digest.hexdigest()[:32]
+
+    async def acquire(self, model: str, prefix: str, tools: Optional[List[types.Tool]] = None,
+                      label: str = "") -> Optional[CachedPrefix]:
+        """
+        A live cached content for the prefix, referenced until release(), or
+        None when the prefix should be sent uncached.
+
+        Time Complexity: O(p) on a hit; one backend call on create / refresh
+        """
+        if self.backend is None:
+            return None
+        key = self.cache_key(model, prefix, tools)
+        if len(prefix) // self.chars_per_token < self.min_tokens:
+            if key not in self._skipped:
+                self._skipped[key] = label
+                logger.info(f"🧊 Not caching {label or key}: ~{len(prefix) // self.chars_per_token} tokens "
+                            f"< minimum {self.min_tokens}")
+            self.counters["uncached"] += 1
+            return None
+        if self._failed_until.get(key, 0.0) > self.clock():
+            self.counters["uncached"] += 1
+            return None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:  # single-flight create / refresh per prefix
+            entry = await self._ensure_live(key, model, prefix, tools, label)
+        if entry is None:
+            self.counters["uncached"] += 1
+            return None
+        entry.refs += 1
+        entry.hits += 1
+        entry.last_used = self.clock()
+        self.counters["cached_requests"] += 1
+        self._entries.move_to_end(key)
+        self._evict()
+        return entry
+
+    async def _ensure_live(self, key: str, model: str, prefix: str, tools: Optional[List[types.Tool]],
+                           label: str) -> Optional[CachedPrefix]:
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expire_at - now > self.refresh_margin:
+            return entry
+        try:
+            if entry is not None and entry.expire_at > now:
+                try:
+                    entry.expire_at = await self.backend.refresh(entry.name, self.ttl)
+                    entry.refreshes += 1
+                    self.counters["refreshes"] += 1
+                    return entry
+                except CacheBackendError as e:
+                    logger.info(f"🧊 Refresh of {entry.name} failed ({e}), recreating")
+            name, expire_at = await self.backend.create(model, prefix, tools, self.ttl, label or key)
+        except CacheBackendError as e:
+            self.counters["failures"] += 1
+            self._failed_until[key] = now + self.failure_backoff
+            self._entries.pop(key, None)
+            logger.warning(f"⚠️ Context cache for {label or key} unavailable, sending uncached "
+                           f"for {self.failure_backoff:.0f}s: {e}")
+            return None
+        self.counters["creates"] += 1
+        self._failed_until.pop(key, None)
+        entry = self._entries[key] = CachedPrefix(
+            key, model, name, label, expire_at, created_at=now, last_used=now, includes_tools=bool(tools)
+        )
+        logger.info(f"🧊 Cached instruction prefix {label or key} as {name}")
+        return entry
+
+    def release(self, entry: CachedPrefix, response: Optional[LlmResponse] = None):
+        """Drop a request's reference; records the cached tokens it reported. Time Complexity: O(1)"""
+        entry.refs = max(0, entry.refs - 1)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.cached_content_token_count:
+            self.counters["cached_tokens"] += usage.cached_content_token_count
+
+    def _evictable(self, entry: CachedPrefix) -> bool:
+        return entry.refs == 0 or self.clock() - entry.last_used > self.stale_ref_seconds
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            victim = next((e for e in self._entries.values() if self._evictable(e)), None)
+            if victim is None:
+                return  # everything in use; over budget until references drop
+            del self._entries[victim.key]
+            self.counters["evictions"] += 1
+            asyncio.create_task(self._delete(victim))
+
+    async def _delete(self, entry: CachedPrefix):
+        try:
+            await self.backend.delete(entry.name)
+        except CacheBackendError as e:
+            logger.info(f"🧊 Delete of {entry.name} failed ({e}); it expires by TTL")
+
+    async def close(self):
+        """Delete every unreferenced cached content (server shutdown)."""
+        for entry in [e for e in self._entries.values() if self._evictable(e)]:
+            del self._entries[entry.key]
+            await self._delete(entry)
+
+    @staticmethod
+    def apply(llm_request: LlmRequest, entry: CachedPrefix, suffix: str):
+        """
+        Point a request at a cached prefix: the provider rejects a system
+        instruction or tools next to cached content, so the per-session
+        suffix moves into the first user turn and tools live in the cache.
+        """
+        config = llm_request.config
+        config.cached_content = entry.name
+        config.system_instruction = None
+        if entry.includes_tools:
+            config.tools = None
+            config.tool_config = None
+        if not suffix:
+            return
+        contents = list(llm_request.contents)
+        if contents and contents[0].role == "user":
+            contents[0] = types.Content(role="user", parts=[types.Part(text=suffix)] + list(contents[0].parts or []))
+        else:
+            contents.insert(0, types.Content(role="user", parts=[types.Part(text=suffix)]))
+        llm_request.contents = contents
+
+    def stats(self) -> Dict[str, Any]:
+        """Live cached prefixes with TTL and references, plus hit / create / failure counters."""
+        now = self.clock()
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "ttl_seconds": self.ttl,
+            "min_tokens": self.min_tokens,
+            "entries": [
+                {"label": e.label, "name": e.name, "model": e.model, "refs": e.refs, "hits": e.hits,
+                 "refreshes": e.refreshes, "ttl_remaining_seconds": round(e.expire_at - now, 1),
+                 "age_seconds": round(now - e.created_at, 1)}
+                for e in self._entries.values()
+            ],
+            "too_small": sorted(label or key for key, label in self._skipped.items()),
+            "backing_off": sum(1 for until in self._failed_until.values() if until > now),
+            **self.counters,
+        }
+
+
+class StaticPrefixCache:
+    """
+    before/after model callbacks serving one agent's static instruction prefix
+    from the manager's cache.
+
+    The prefix must be the exact start of the agent's instruction as ADK sends
+    it (format the static prompt the same way the agent does); requests that do
+    not start with it are sent unchanged.
+    """
+
+    def __init__(self, manager: ContextCacheManager, static_prefix: str, label: str):
+        self.manager = manager
+        self.static_prefix = static_prefix
+        self.label = label
+        self._in_flight: "OrderedDict[str, CachedPrefix]" = OrderedDict()
+
+    async def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        if not self.manager.enabled or llm_request.config is None or llm_request.config.cached_content:
+            return None
+        instruction = llm_request.config.system_instruction
+        if not isinstance(instruction, str) or not instruction.startswith(self.static_prefix):
+            return None
+        entry = await self.manager.acquire(
+            llm_request.model, self.static_prefix, llm_request.config.tools, label=self.label
+        )
+        if entry is None:
+            return None
+        self.manager.apply(llm_request, entry, instruction[len(self.static_prefix):].strip())
+        # A previous call of this invocation that errored never reached after_model
+        leaked = self._in_flight.pop(callback_context.invocation_id, None)
+        if leaked is not None:
+            self.manager.release(leaked)
+        self._in_flight[callback_context.invocation_id] = entry
+        while len(self._in_flight) > MAX_IN_FLIGHT:
+            self.manager.release(self._in_flight.popitem(last=False)[1])
+        return None
+
+    def after_model(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        entry = self._in_flight.pop(callback_context.invocation_id, None)
+        if entry is not None:
+            self.manager.release(entry, llm_response)
+        return None
@@ -0,0 +1,57 @@
+import os
+
+from .cancellation import PipelineCancellationMiddleware, PipelineRegistry
+from .executor import BlockingExecutor, CallStats
+from .hedging import HedgedCaller, HedgedLlm, HedgePolicy, ModelCallTimeout, speculative_policy
+from .log import setup_queued_logging
+from .model_router import ModelRouter, RoutingPolicy, tiers_from_env
+from .profiles import DEFAULT_PROFILE, PROFILE_STATE_KEY, PROFILES, ExecutionProfile, resolve_profile, run_profile
+from .scheduler import (
+    DEFAULT_URGENT_SCENARIOS, AdmissionControlMiddleware, AgentRunScheduler, SchedulerOverloaded,
+)
+from .endpoints import (
+    setup_cancellation_routes, setup_execution_profile_routes, setup_executor_routes, setup_hedging_routes,
+    setup_model_routing_routes, setup_scheduler_routes,
+)
+
+# Global pool for known-blocking calls (sync genai requests, SQLite writes)
+blocking_executor = BlockingExecutor(max_workers=int(os.getenv("BLOCKING_POOL_SIZE", "8")))
+run_blocking = blocking_executor.run
+
+# Running pipeline / tracker tasks per session, cancelled on request or when abandoned
+pipeline_registry = PipelineRegistry(
+    abandon_grace=float(os.getenv("PIPELINE_ABANDON_GRACE_SECONDS", "15")),
+    abandon_on_disconnect=os.getenv("CANCEL_ON_DISCONNECT", "true").lower() == "true",
+)
+
+# Admission control for agent pipeline runs (bounded concurrency, priority queue, 503 shedding)
+run_scheduler = AgentRunScheduler(
+    max_concurrent=int(os.getenv("MAX_CONCURRENT_RUNS", "4")),
+    max_queue=int(os.getenv("MAX_QUEUED_RUNS", "32")),
+    urgent_scenarios=[
+        scenario.strip() for scenario in os.getenv("URGENT_SCENARIOS", ",".join(DEFAULT_URGENT_SCENARIOS)).split(",")
+        if scenario.strip()
+    ],
+)
+
+# Cheap-model-first cascade; agents register their RoutingPolicy (tiers from *_FAST_MODEL env vars)
+model_router = ModelRouter()
+
+# Per-agent timeouts, and a duplicate request once a call runs past its rolling p90 latency
+model_call_hedger = HedgedCaller(
+    enabled=os.getenv("HEDGE_MODEL_CALLS", "true").lower() == "true",
+    quantile=float(os.getenv("HEDGE_QUANTILE", "0.9")),
+    min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+    max_hedge_ratio=float(os.getenv("HEDGE_MAX_RATIO", "0.1")),
+)
+
+__all__ = [
+    'BlockingExecutor', 'CallStats', 'PipelineRegistry', 'PipelineCancellationMiddleware',
+    'AgentRunScheduler', 'AdmissionControlMiddleware', 'SchedulerOverloaded',
+    'setup_queued_logging', 'setup_executor_routes', 'setup_cancellation_routes', 'setup_scheduler_routes',
+    'ModelRouter', 'RoutingPolicy', 'tiers_from_env', 'setup_model_routing_routes',
+    'HedgedCaller', 'HedgedLlm', 'HedgePolicy', 'ModelCallTimeout', 'speculative_policy', 'setup_hedging_routes',
+    'ExecutionProfile', 'PROFILES', 'PROFILE_STATE_KEY', 'DEFAULT_PROFILE', 'resolve_profile', 'run_profile',
+    'setup_execution_profile_routes',
+    'blocking_executor', 'run_blocking', 'pipeline_registry', 'run_scheduler', 'model_router', 'model_call_hedger',
+]
@@ -0,0 +1,262 @@
+"""
+Pipeline Cancellation
+
+Tracks the asyncio tasks doing work for each session (the ADK /run or /run_sse
+request task that executes the agent pipeline, the RealAgentTracker progress
+coroutine) so a session can be aborted end to end:
+
+- explicitly, via POST /analyses/{session_id}/cancel
+- on abandonment, when the session's last progress stream disconnects and no
+  client reconnects within a grace period (tab closed, not just a reload)
+
+Cancelling a task raises CancelledError at its current await point, which
+aborts in-flight async model calls and stops the pipeline before the next
+agent. Calls already running on the blocking pool finish in their worker thread
+(threads cannot be interrupted) but their results are discarded, and queued
+calls are dropped (see BlockingExecutor.run). Cleanup hooks then release
+per-session state held by other subsystems (progress backlog, tracker sessions).
+
+Performance Characteristics:
+- attach / cancel: O(1) per task, O(h) hooks per cancel
+- Abandon detection: one loop timer per idle session, no polling
+- Memory: O(s) for s sessions with running work, O(MAX_CANCELLED_HISTORY) records
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MAX_CANCELLED_HISTORY = 1000
+
+REASON_CLIENT_REQUEST = "client_request"
+REASON_CLIENT_DISCONNECTED = "client_disconnected"
+
+
+@dataclass
+class RequestScope:
+    """Per-request holder: the request task, and the session attach() bound it to."""
+    task: Optional[asyncio.Task] = None
+    session_id: Optional[str] = None
+
+
+_request_scope: contextvars.ContextVar[Optional[RequestScope]] = contextvars.ContextVar(
+    "t1d_pipeline_request_scope", default=None
+)
+
+
+class PipelineRegistry:
+    """
+    Session -> running tasks map with explicit and abandonment cancellation.
+
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(self, abandon_grace: float = 15.0, abandon_on_disconnect: bool = True):
+        """
+        Args:
+            abandon_grace (float): Seconds a session may have no progress stream
+                before its work is cancelled (covers page reloads / reconnects)
+            abandon_on_disconnect (bool): Cancel abandoned sessions at all
+        """
+        self.abandon_grace = abandon_grace
+        self.abandon_on_disconnect = abandon_on_disconnect
+        self.tasks: Dict[str, Set[asyncio.Task]] = {}
+        self.cancelled: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._abandon_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._cleanup_hooks: List[Callable[[str, str], Any]] = []
+        self.cancelled_total = 0
+        self.abandoned_total = 0
+
+    def add_cleanup_hook(self, hook: Callable[[str, str], Any]):
+        """Register `hook(session_id, reason)`, run after a session's tasks are cancelled."""
+        self._cleanup_hooks.append(hook)
+
+    def _forget(self, session_id: str, task: asyncio.Task):
+        tasks = self.tasks.get(session_id)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            del self.tasks[session_id]
+            self.resume(session_id)
+
+    def attach(self, session_id: str, task: Optional[asyncio.Task] = None) -> Optional[asyncio.Task]:
+        """
+        Register a task as doing work for a session.
+
+        Called from the root agent's before_agent_callback, which runs inside
+        the ADK /run or /run_sse request. Without an explicit task this binds
+        the request task owned by PipelineCancellationMiddleware (so the
+        cancellation is caught where the response can still be finished), or
+        the current task outside a request. The task is forgotten when it ends.
+
+        Time Complexity: O(1)
+        """
+        scope = _request_scope.get()
+        if task is None:
+            task = scope.task if scope is not None else asyncio.current_task()
+        if task is None or not session_id:
+            return None
+        tasks = self.tasks.setdefault(session_id, set())
+        if task not in tasks:
+            tasks.add(task)
+            task.add_done_callback(lambda t, sid=session_id: self._forget(sid, t))
+        self.cancelled.pop(session_id, None)  # a new run supersedes an earlier cancel
+        if scope is not None and scope.task is task:
+            scope.session_id = session_id
+        return task
+
+    def spawn(self, session_id: str, coro: Coroutine) -> asyncio.Task:
+        """Start a background coroutine owned by a session. Time Complexity: O(1)"""
+        task = asyncio.create_task(coro)
+        self.attach(session_id, task)
+        return task
+
+    def running(self, session_id: str) -> bool:
+        return bool(self.tasks.get(session_id))
+
+    def cancel(self, session_id: str, reason: str = REASON_CLIENT_REQUEST) -> Dict[str, Any]:
+        """
+        Cancel every task of a session and run the cleanup hooks.
+
+        Returns:
+            Dict with the number of tasks cancelled and the reason
+
+        Time Complexity: O(t + h) for t tasks and h hooks
+        """
+        self.resume(session_id)
+        tasks = self.tasks.pop(session_id, set())
+        cancelled = 0
+        for task in tasks:
+            if not task.done():
+                task.cancel(f"session {session_id} cancelled: {reason}")
+                cancelled += 1
+        for hook in self._cleanup_hooks:
+            try:
+                hook(session_id, reason)
+            except Exception as e:
+                logger.warning(f"⚠️ Cleanup hook failed for session {session_id}: {e}")
+
+        record = {"session_id": session_id, "reason": reason, "cancelled_tasks": cancelled, "at": time.time()}
+        if cancelled:
+            self.cancelled_total += 1
+            self.cancelled[session_id] = record
+            while len(self.cancelled) > MAX_CANCELLED_HISTORY:
+                self.cancelled.popitem(last=False)
+            logger.info(f"🛑 Cancelled {cancelled} task(s) for session {session_id} ({reason})")
+        return record
+
+    def was_cancelled(self, session_id: Optional[str]) -> bool:
+        return session_id is not None and session_id in self.cancelled
+
+    def schedule_abandon(self, session_id: str):
+        """
+        The session's last progress stream went away: cancel its work unless a
+        client reconnects within abandon_grace seconds.
+
+        Time Complexity: O(1)
+        """
+        if not self.abandon_on_disconnect or not self.running(session_id) or session_id in self._abandon_timers:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._abandon_timers[session_id] = loop.call_later(self.abandon_grace, self._abandon, session_id)
+
+    def resume(self, session_id: str):
+        """A client is watching the session again: keep its work running. Time Complexity: O(1)"""
+        timer = self._abandon_timers.pop(session_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _abandon(self, session_id: str):
+        self._abandon_timers.pop(session_id, None)
+        if self.running(session_id):
+            self.abandoned_total += 1
+            self.cancel(session_id, REASON_CLIENT_DISCONNECTED)
+
+    @contextlib.contextmanager
+    def request_scope(self):
+        """
+        Context for one pipeline request owned by the current task; attach()
+        (called deeper in the request, in this or an inheriting task) binds it
+        to the session.
+        """
+        scope = RequestScope(task=asyncio.current_task())
+        token = _request_scope.set(scope)
+        try:
+            yield scope
+        finally:
+            _request_scope.reset(token)
+
+    def stats(self) -> Dict[str, Any]:
+        """Sessions with running work, pending abandonments and cancellation totals."""
+        return {
+            "running": {session_id: len(tasks) for session_id, tasks in self.tasks.items()},
+            "pending_abandon": sorted(self._abandon_timers),
+            "abandon_grace_seconds": self.abandon_grace,
+            "abandon_on_disconnect": self.abandon_on_disconnect,
+            "cancelled_total": self.cancelled_total,
+            "abandoned_total": self.abandoned_total,
+            "recent_cancellations": list(self.cancelled.values())[-20:],
+        }
+
+
+class PipelineCancellationMiddleware:
+    """
+    Pure ASGI middleware owning the task of each /run and /run_sse request.
+
+    Must be the outermost middleware: Starlette's BaseHTTPMiddleware runs the
+    inner app in a task group, and cancelling a task inside one cancels its
+    host too, leaving nothing to answer the client. Cancelling this task
+    instead unwinds the whole request and lets the middleware finish the
+    response: 409 for /run, a final `data: {"error": ...}` frame (ADK's own SSE
+    error shape) for a /run_sse stream that already started.
+    """
+
+    def __init__(self, app, registry: PipelineRegistry, paths=("/run", "/run_sse")):
+        self.app = app
+        self.registry = registry
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        response_started = False
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with self.registry.request_scope() as request_scope:
+            try:
+                await self.app(scope, receive, tracking_send)
+            except asyncio.CancelledError:
+                if not self.registry.was_cancelled(request_scope.session_id):
+                    raise  # server shutdown or client disconnect, not ours
+                asyncio.current_task().uncancel()
+                record = self.registry.cancelled[request_scope.session_id]
+                if response_started:
+                    frame = f"data: {json.dumps({'error': 'Analysis cancelled.', **record})}\n\n"
+                    await send({"type": "http.response.body", "body": frame.encode(), "more_body": False})
+                else:
+                    body = json.dumps({"detail": "Analysis cancelled.", **record}).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 409,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode())],
+                    })
+                    await send({"type": "http.response.body", "body": body})
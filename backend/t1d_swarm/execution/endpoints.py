@@ -0,0 +1,108 @@
+import logging
+from typing import TYPE_CHECKING, Callable, Optional
+
+from fastapi import FastAPI, HTTPException
+
+from .cancellation import PipelineCancellationMiddleware
+from .scheduler import AdmissionControlMiddleware
+
+if TYPE_CHECKING:
+    from .cancellation import PipelineRegistry
+    from .executor import BlockingExecutor
+    from .hedging import HedgedCaller
+    from .model_router import ModelRouter
+    from .scheduler import AgentRunScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def setup_executor_routes(app: FastAPI, executor: "BlockingExecutor"):
+    """Add the blocking-pool metrics route to the FastAPI app"""
+
+    @app.get("/debug/executor")
+    async def get_executor_stats():
+        """Queue depth, utilisation and per-call wait/run times of the blocking pool"""
+        return executor.stats()
+
+    logger.info("✅ Executor endpoints registered: /debug/executor")
+
+
+def setup_cancellation_routes(app: FastAPI, registry: "PipelineRegistry"):
+    """
+    Add pipeline cancellation routes and middleware to the FastAPI app.
+
+    Call after every other middleware is registered: the cancellation
+    middleware has to be the outermost one (see PipelineCancellationMiddleware).
+    """
+    app.add_middleware(PipelineCancellationMiddleware, registry=registry)
+
+    @app.post("/analyses/{session_id}/cancel")
+    async def cancel_analysis(session_id: str):
+        """
+        Abort a running analysis: cancels the agent pipeline (including in-flight
+        model calls) and the progress tracker, and releases per-session state.
+        """
+        if not registry.running(session_id):
+            raise HTTPException(status_code=404, detail="No running analysis for this session.")
+        return {"status": "cancelled", **registry.cancel(session_id)}
+
+    @app.get("/debug/pipelines")
+    async def get_pipeline_stats():
+        """Sessions with running work, pending abandonments and cancellation counts"""
+        return registry.stats()
+
+    logger.info("✅ Cancellation endpoints registered: /analyses/{session_id}/cancel, /debug/pipelines")
+
+
+def setup_scheduler_routes(app: FastAPI, scheduler: "AgentRunScheduler", registry: Optional["PipelineRegistry"] = None,
+                           scenario_resolver: Optional[Callable[[], Optional[str]]] = None):
+    """
+    Put /run and /run_sse behind the admission scheduler and add its metrics route.
+
+    Call before setup_cancellation_routes so queued runs sit inside the
+    cancellation middleware and can be cancelled while they wait.
+    """
+    app.add_middleware(
+        AdmissionControlMiddleware, scheduler=scheduler, registry=registry, scenario_resolver=scenario_resolver
+    )
+
+    @app.get("/debug/scheduler")
+    async def get_scheduler_stats():
+        """Run slots in use, queue depth per priority class, shed counts and queue wait times"""
+        return scheduler.stats()
+
+    logger.info("✅ Scheduler endpoints registered: /debug/scheduler (admission control on /run, /run_sse)")
+
+
+def setup_model_routing_routes(app: FastAPI, router: "ModelRouter"):
+    """Add the model cascade metrics route to the FastAPI app"""
+
+    @app.get("/debug/model-routing")
+    async def get_model_routing_stats():
+        """Per agent: model tiers, escalation rate and reasons, per-tier call latency"""
+        return router.stats()
+
+    logger.info("✅ Model routing endpoints registered: /debug/model-routing")
+
+
+def setup_hedging_routes(app: FastAPI, hedger: "HedgedCaller"):
+    """Add the hedged model call metrics route to the FastAPI app"""
+
+    @app.get("/debug/hedging")
+    async def get_hedging_stats():
+        """Per agent / call site: hedge rate, hedge wins, timeouts, hedge delay and end-to-end latency"""
+        return hedger.stats()
+
+    logger.info("✅ Hedging endpoints registered: /debug/hedging")
+
+
+def setup_execution_profile_routes(app: FastAPI):
+    """Add the execution profile listing route to the FastAPI app"""
+    from .profiles import DEFAULT_PROFILE, PROFILES
+
+    @app.get("/execution-profiles")
+    async def get_execution_profiles():
+        """Profiles selectable via ScenarioRequest.profile, and the default"""
+        return {"default": DEFAULT_PROFILE, "profiles": [profile.to_dict() for profile in PROFILES.values()]}
+
+    logger.info("✅ Execution profile endpoints registered: /execution-profiles")
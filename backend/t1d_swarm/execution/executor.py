@@ -0,0 +1,157 @@
+"""
+Blocking Call Executor
+
+One sized ThreadPoolExecutor for every known-blocking call made from async code
+(synchronous google-genai requests in tools.py, SQLite writes in the result
+store and session maintenance), so the event loop keeps serving SSE
+heartbeats and other sessions while they run.
+
+Why a dedicated pool instead of asyncio.to_thread:
+- The default executor is shared with everything else in the process, is sized
+  implicitly (min(32, cpu + 4) workers) and exposes no metrics
+- A named, sized pool makes saturation observable: queue depth, wait time and
+  run time per call site are exported via /debug/executor
+
+Performance Characteristics:
+- run(): O(1) submission; the loop is never blocked by the wrapped call
+- Metrics: O(1) per call, O(c) memory for c distinct call names
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class CallStats:
+    """Aggregated timings for one call name."""
+    calls: int = 0
+    failures: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    total_run_ms: float = 0.0
+    max_run_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "mean_wait_ms": round(self.total_wait_ms / self.calls, 2) if self.calls else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+            "mean_run_ms": round(self.total_run_ms / self.calls, 2) if self.calls else 0.0,
+            "max_run_ms": round(self.max_run_ms, 2),
+        }
+
+
+class BlockingExecutor:
+    """
+    Sized thread pool for blocking calls with queue-depth metrics.
+
+    Queue depth is the number of submitted calls not yet picked up by a worker;
+    a persistently non-zero depth means the pool is undersized for the load.
+
+    Thread Safety: Metrics updated under an internal lock from worker threads
+    """
+
+    def __init__(self, max_workers: int = 8, name: str = "t1d-blocking"):
+        """
+        Args:
+            max_workers (int): Worker threads (bounds concurrent blocking calls)
+            name (str): Thread name prefix, visible in /debug/profile stacks
+        """
+        self.max_workers = max_workers
+        self.name = name
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.calls: Dict[str, CallStats] = {}
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # Created lazily so importing the module never starts threads
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._pool
+
+    def _invoke(self, call_name: str, submitted_at: float, ticket: list, fn: Callable[[], T]) -> Optional[T]:
+        started_at = time.perf_counter()
+        with self._lock:
+            if ticket[0] == "abandoned":
+                return None  # awaiting coroutine was cancelled while queued
+            ticket[0] = "started"
+            self.queued -= 1
+            self.running += 1
+        failed = False
+        try:
+            return fn()
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            finished_at = time.perf_counter()
+            wait_ms = (started_at - submitted_at) * 1000
+            run_ms = (finished_at - started_at) * 1000
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                stats = self.calls.setdefault(call_name, CallStats())
+                stats.calls += 1
+                stats.failures += failed
+                stats.total_wait_ms += wait_ms
+                stats.max_wait_ms = max(stats.max_wait_ms, wait_ms)
+                stats.total_run_ms += run_ms
+                stats.max_run_ms = max(stats.max_run_ms, run_ms)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Await `fn(*args, **kwargs)` on the pool without blocking the event loop.
+
+        Context variables (current span, session context) are copied to the
+        worker like asyncio.to_thread does.
+
+        Time Complexity: O(1) on the event loop
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, fn, *args, **kwargs)
+        call_name = getattr(fn, "__qualname__", None) or getattr(fn, "__name__", None) or repr(fn)
+        ticket = ["queued"]
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            return await loop.run_in_executor(
+                self._executor(), self._invoke, call_name, time.perf_counter(), ticket, call
+            )
+        except asyncio.CancelledError:
+            with self._lock:
+                if ticket[0] == "queued":
+                    ticket[0] = "abandoned"
+                    self.queued -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilisation, queue depth and per-call timings."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "running": self.running,
+                "completed": self.completed,
+                "calls": {name: stats.as_dict() for name, stats in self.calls.items()},
+            }
+
+    def shutdown(self, wait: bool = False):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
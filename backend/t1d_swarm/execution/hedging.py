@@ -0,0 +1,316 @@
+"""
+Hedged Model Calls
+
+Model latency has a long tail: one slow call (usually the verifier's search
+round) dominates a session's end-to-end time. HedgedCaller bounds it with:
+
+- hedging: when a call is still running after its rolling p90 latency (per
+  policy and model), a duplicate is sent, optionally to an alternate model;
+  the first valid result wins and the other attempt is cancelled
+- timeouts: a per-policy deadline for the whole call, hedge included, after
+  which every attempt is cancelled and ModelCallTimeout raised
+- speculation: a call made while `speculative_policy` names its policy (set
+  by an agent callback, e.g. for thorough execution profile runs) sends the
+  duplicate at once, outside the hedge cap
+
+Hedges are capped at `max_hedge_ratio` of calls so a slow provider is not hit
+with twice the traffic, and only start once a policy has `min_samples`
+latencies. Cancelled attempts are recorded at their elapsed time (a lower
+bound) so the quantile does not drift down as the slow calls are cut off.
+
+Two entry points share the engine:
+- HedgedLlm: an ADK model (LlmAgent(model=HedgedLlm(...))) wrapping the
+  registry model named by `llm_request.model`, so routing callbacks still pick
+  the tier; responses are buffered per attempt and the winner's replayed
+- HedgedCaller.call: any coroutine factory (the google-genai client in tools)
+
+Performance Characteristics:
+- Hedge delay: O(w log w) over the w-sample latency window, per call
+- Memory: O(w) latencies per policy and model
+- Cost: at most max_hedge_ratio extra calls
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from pydantic import PrivateAttr
+
+from .model_router import response_text
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Policy whose next HedgedLlm call in this task sends its duplicate at once (set in a before_model_callback)
+speculative_policy: ContextVar[Optional[str]] = ContextVar("speculative_policy", default=None)
+
+
+class ModelCallTimeout(TimeoutError):
+    """A model call (hedge included) ran past its policy's timeout."""
+
+
+@dataclass
+class HedgePolicy:
+    """
+    Timeout and hedging for one agent or client call site.
+
+    Args:
+        name: Agent / call site the policy applies to
+        timeout: Seconds for the whole call, hedge included (None: no deadline)
+        alternate_model: Model for the hedge (None: same model as the first attempt)
+        validator: `fn(response_text) -> bool`; invalid results never win while another attempt runs
+    """
+    name: str
+    timeout: Optional[float] = None
+    alternate_model: Optional[str] = None
+    validator: Optional[Callable[[str], bool]] = None
+
+
+@dataclass
+class LatencyWindow:
+    samples: Deque[float]
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    speculative: int = 0
+    timeouts: int = 0
+    invalid: int = 0
+    errors: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+
+class HedgedCaller:
+    """
+    Runs model calls under their policy's timeout, hedging the slow ones.
+
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(self, enabled: bool = True, quantile: float = 0.9, min_samples: int = 20,
+                 min_delay: float = 0.25, max_hedge_ratio: float = 0.1, window: int = 200):
+        """
+        Args:
+            enabled (bool): Hedge at all (timeouts apply either way)
+            quantile (float): Latency quantile after which a duplicate is sent
+            min_samples (int): Latencies needed before a policy hedges
+            min_delay (float): Floor for the hedge delay in seconds
+            max_hedge_ratio (float): Most hedges per call, over the policy's lifetime
+            window (int): Latencies kept per policy and model
+        """
+        self.enabled = enabled
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.window = window
+        self.policies: Dict[str, HedgePolicy] = {}
+        self._latency: Dict[Tuple[str, str], LatencyWindow] = {}
+        self._stats: Dict[str, HedgeStats] = {}
+
+    def register(self, policy: HedgePolicy) -> HedgePolicy:
+        self.policies[policy.name] = policy
+        self._stats.setdefault(policy.name, HedgeStats())
+        return policy
+
+    def _window(self, name: str, model: str) -> LatencyWindow:
+        key = (name, model)
+        if key not in self._latency:
+            self._latency[key] = LatencyWindow(deque(maxlen=self.window))
+        return self._latency[key]
+
+    def hedge_delay(self, policy: HedgePolicy, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None (too few samples, disabled). Time Complexity: O(w log w)"""
+        if not self.enabled:
+            return None
+        window = self._window(policy.name, model)
+        if len(window.samples) < self.min_samples:
+            return None
+        return max(self.min_delay, window.quantile(self.quantile))
+
+    def _may_hedge(self, stats: HedgeStats) -> bool:
+        return stats.hedged < self.max_hedge_ratio * stats.calls
+
+    async def _timed(self, name: str, model: str, attempt: Callable[[str], Awaitable[T]]) -> T:
+        started = time.perf_counter()
+        try:
+            return await attempt(model)
+        finally:
+            # Completed or cancelled (then a lower bound); either way the latency the call had
+            self._window(name, model).add(time.perf_counter() - started)
+
+    async def call(self, policy: HedgePolicy, model: str, attempt: Callable[[str], Awaitable[T]],
+                   valid: Callable[[T], bool] = lambda result: True, speculate: bool = False) -> T:
+        """
+        First valid result of `attempt(model)` and, if it runs past the hedge
+        delay, `attempt(alternate)`; falls back to an invalid result when no
+        attempt produced a valid one. `speculate` starts both attempts at once.
+
+        Raises:
+            ModelCallTimeout: No attempt finished within the policy's timeout
+            Exception: The last attempt's error when every attempt failed
+        """
+        stats = self._stats.setdefault(policy.name, HedgeStats())
+        stats.calls += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + policy.timeout if policy.timeout else None
+        delay = 0.0 if speculate else self.hedge_delay(policy, model)
+        hedge_at = started + delay if delay is not None and (speculate or self._may_hedge(stats)) else None
+
+        # Results are taken in completion order, so a hedge that finishes in the same wake
+        # as the first attempt never beats it arbitrarily (recorded runs replay the same winner)
+        finished: List[asyncio.Task] = []
+        tasks: Dict[asyncio.Task, bool] = {}
+
+        def start(attempt_model: str, is_hedge: bool):
+            task = asyncio.create_task(self._timed(policy.name, attempt_model, attempt))
+            task.add_done_callback(finished.append)
+            tasks[task] = is_hedge
+
+        start(model, False)
+        fallback: Optional[T] = None
+        error: Optional[BaseException] = None
+        try:
+            while tasks:
+                wake = min((t for t in (hedge_at, deadline) if t is not None), default=None)
+                done, _ = await asyncio.wait(
+                    tasks, timeout=None if wake is None else max(0.0, wake - loop.time()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if hedge_at is not None and (deadline is None or hedge_at < deadline):
+                        alternate = policy.alternate_model or model
+                        start(alternate, True)
+                        hedge_at = None
+                        if speculate:
+                            stats.speculative += 1
+                            logger.info(f"🪃 Speculative {policy.name} candidate ({alternate})")
+                        else:
+                            stats.hedged += 1
+                            logger.info(f"🪃 Hedging {policy.name} after {delay * 1000:.0f} ms ({alternate})")
+                        continue
+                    stats.timeouts += 1
+                    raise ModelCallTimeout(f"{policy.name} model call exceeded {policy.timeout:.0f}s")
+                for task in [task for task in finished if task in done]:
+                    is_hedge = tasks.pop(task)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result = task.result()
+                    if valid(result):
+                        stats.hedge_wins += is_hedge
+                        stats.latencies.append(loop.time() - started)
+                        return result
+                    stats.invalid += 1
+                    fallback = result if fallback is None else fallback
+            if fallback is not None:
+                stats.latencies.append(loop.time() - started)
+                return fallback
+            stats.errors += 1
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per policy: calls, hedges, hedge wins, timeouts, hedge delay and end-to-end percentiles."""
+        policies = {}
+        for name, policy in self.policies.items():
+            stats = self._stats[name]
+            e2e = LatencyWindow(stats.latencies)
+            policies[name] = {
+                "timeout_seconds": policy.timeout,
+                "alternate_model": policy.alternate_model,
+                "calls": stats.calls,
+                "hedged": stats.hedged,
+                "hedge_rate": round(stats.hedged / stats.calls, 3) if stats.calls else 0.0,
+                "hedge_wins": stats.hedge_wins,
+                "speculative_calls": stats.speculative,
+                "timeouts": stats.timeouts,
+                "invalid_results": stats.invalid,
+                "errors": stats.errors,
+                "hedge_delay_ms": {
+                    model: round(delay * 1000, 1)
+                    for (policy_name, model) in self._latency if policy_name == name
+                    for delay in [self.hedge_delay(policy, model)] if delay is not None
+                },
+                **{f"latency_{label}_ms": round((e2e.quantile(q) or 0.0) * 1000, 1)
+                   for label, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))},
+            }
+        return {"enabled": self.enabled, "quantile": self.quantile, "max_hedge_ratio": self.max_hedge_ratio,
+                "policies": policies}
+
+
+class HedgedLlm(BaseLlm):
+    """
+    ADK model that sends each request through a HedgedCaller policy.
+
+    `model` is the agent's configured model; the request's own model (set by
+    ADK, possibly rewritten by a routing callback) is what gets called. A
+    request that references a provider cached content is hedged on the same
+    model, as the cache belongs to it.
+    """
+    hedger: HedgedCaller
+    policy_name: str
+    _llms: Dict[str, BaseLlm] = PrivateAttr(default_factory=dict)
+
+    def _llm(self, model: str) -> BaseLlm:
+        if model not in self._llms:  # one client per model, not per call
+            self._llms[model] = LLMRegistry.new_llm(model)
+        return self._llms[model]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        model = llm_request.model or self.model
+        policy = self.hedger.policies.get(self.policy_name)
+        if policy is None:
+            async for response in self._llm(model).generate_content_async(llm_request, stream=stream):
+                yield response
+            return
+        if llm_request.config is not None and llm_request.config.cached_content and policy.alternate_model:
+            policy = HedgePolicy(policy.name, policy.timeout, None, policy.validator)
+
+        sent: List[str] = []
+
+        async def attempt(attempt_model: str) -> List[LlmResponse]:
+            request = llm_request
+            if sent:  # the hedge gets its own copy; attempts must not share a mutable request
+                request = llm_request.model_copy(deep=True)
+                request.model = attempt_model
+            sent.append(attempt_model)
+            return [response async for response in self._llm(attempt_model).generate_content_async(request, stream=stream)]
+
+        responses = await self.hedger.call(
+            policy, model, attempt, lambda responses: self._valid(policy, responses),
+            speculate=speculative_policy.get() == self.policy_name,
+        )
+        for response in responses:
+            yield response
+
+    @staticmethod
+    def _valid(policy: HedgePolicy, responses: List[LlmResponse]) -> bool:
+        final = next((r for r in reversed(responses) if not r.partial), None)
+        if final is None or final.error_code:
+            return False
+        return policy.validator is None or policy.validator(response_text(final))
@@ -0,0 +1,279 @@
+"""
+Model Routing Cascade
+
+Runs an agent on a fast, cheap model tier first and escalates to the larger
+model only when the cheap answer is not good enough:
+
+- low_confidence: the loop's ConfidenceCheckAgent reported a verification
+  confidence below the policy's `escalate_below` for this run (the next
+  forecaster iteration and the presenter then use the larger tier)
+- schema_invalid: the response failed the policy's validator; the same
+  request is re-sent to the next tier at once (through the agent's own model,
+  so a HedgedLlm's timeout applies, bounded by `retry_timeout`) and a valid
+  answer replaces the invalid one in place, so after_model callbacks that run
+  later account for the kept answer. A failed or invalid retry keeps the
+  original response.
+
+Escalations are sticky for the rest of the run and recorded in session state
+(`model_routing`), so every later call of that agent in the run stays on the
+larger tier. The tier is applied by setting `llm_request.model` in a
+before_model callback; the agent's configured model stays the top tier.
+Runs whose execution profile turns the cascade off (thorough) go straight to
+the top tier.
+
+Per agent the router keeps runs, escalations by reason and the escalation
+rate; per tier, calls and latency percentiles (GET /debug/model-routing).
+
+Performance Characteristics:
+- Routing decision: O(h) over the run's confidence history, per model call
+- Schema-invalid escalation: one extra model call on the next tier, at most retry_timeout
+- Memory: O(MAX_LATENCY_SAMPLES) per tier, O(MAX_TRACKED_CALLS) calls in flight
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+
+from .profiles import run_profile
+from ..session_context import get_invocation_context
+
+logger = logging.getLogger(__name__)
+
+ROUTING_STATE_KEY = "model_routing"
+
+ESCALATE_LOW_CONFIDENCE = "low_confidence"
+ESCALATE_SCHEMA_INVALID = "schema_invalid"
+
+MAX_LATENCY_SAMPLES = 1000
+MAX_TRACKED_CALLS = 1024
+MAX_TRACKED_RUNS = 10000
+
+
+@dataclass
+class RoutingPolicy:
+    """
+    Tier cascade for one agent.
+
+    Args:
+        agent_name: LlmAgent the policy applies to
+        tiers: Model names, cheapest first; the last is the agent's own model
+        escalate_below: Escalate once the run's latest verification confidence is below this
+        confidence_source: `fn(context) -> Optional[float]`, the run's latest confidence
+        validator: `fn(response_text) -> bool`; False escalates the call immediately
+        retry_timeout: Seconds the schema-invalid retry may take before the original is kept
+    """
+    agent_name: str
+    tiers: List[str]
+    escalate_below: Optional[float] = None
+    confidence_source: Optional[Callable[[ReadonlyContext], Optional[float]]] = None
+    validator: Optional[Callable[[str], bool]] = None
+    retry_timeout: float = 60.0
+
+    @property
+    def cascading(self) -> bool:
+        return len(self.tiers) > 1
+
+
+@dataclass
+class TierStats:
+    calls: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=MAX_LATENCY_SAMPLES))
+
+    def summary(self) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+
+        def percentile(q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1) if samples else 0.0
+
+        return {
+            "calls": self.calls,
+            "latency_mean_ms": round(sum(samples) / len(samples) * 1000, 1) if samples else 0.0,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+        }
+
+
+def tiers_from_env(model: Optional[str], fast_model: Optional[str]) -> List[str]:
+    """[fast, model] when a distinct fast model is configured, else [model]."""
+    return [fast_model, model] if fast_model and fast_model != model else [model]
+
+
+def response_text(llm_response: LlmResponse) -> str:
+    """The response's answer text (thought parts excluded)."""
+    parts = llm_response.content.parts if llm_response.content else None
+    return "".join(part.text or "" for part in parts or [] if not part.thought)
+
+
+class ModelRouter:
+    """
+    Per-agent tier cascade applied through before/after model callbacks.
+
+    Register a policy per agent, then pass `before_model` ahead of model
+    callbacks that depend on the final model (the context cache keys on it),
+    and `after_model` ahead of those that account for the kept response
+    (token counts).
+    """
+
+    def __init__(self):
+        self.policies: Dict[str, RoutingPolicy] = {}
+        self._tier_stats: Dict[Tuple[str, str], TierStats] = {}
+        self._in_flight: "OrderedDict[Tuple[str, str], Tuple[int, float, LlmRequest]]" = OrderedDict()
+        self._runs: Dict[str, "OrderedDict[str, Optional[str]]"] = {}
+        self.escalations: Dict[str, Dict[str, int]] = {}
+        self._llms: Dict[str, BaseLlm] = {}
+
+    def register(self, policy: RoutingPolicy) -> RoutingPolicy:
+        self.policies[policy.agent_name] = policy
+        self._runs.setdefault(policy.agent_name, OrderedDict())
+        self.escalations.setdefault(policy.agent_name, {ESCALATE_LOW_CONFIDENCE: 0, ESCALATE_SCHEMA_INVALID: 0})
+        if policy.cascading:
+            logger.info(f"🪜 Model cascade for {policy.agent_name}: {' -> '.join(policy.tiers)}")
+        return policy
+
+    @staticmethod
+    def _routing_state(context: ReadonlyContext) -> Dict[str, Any]:
+        state = context.state.get(ROUTING_STATE_KEY) or {}
+        if state.get("invocation_id") != context.invocation_id:
+            return {"invocation_id": context.invocation_id, "agents": {}}
+        return state
+
+    def _note_run(self, agent_name: str, invocation_id: str):
+        runs = self._runs[agent_name]
+        if invocation_id not in runs:
+            runs[invocation_id] = None
+            while len(runs) > MAX_TRACKED_RUNS:
+                runs.popitem(last=False)
+
+    def _escalate(self, context: CallbackContext, policy: RoutingPolicy, tier: int, reason: str) -> int:
+        """Move the agent to `tier` for the rest of the run. Time Complexity: O(1)"""
+        routing = self._routing_state(context)
+        routing["agents"][policy.agent_name] = {"tier": tier, "model": policy.tiers[tier], "reason": reason}
+        context.state[ROUTING_STATE_KEY] = routing
+        self.escalations[policy.agent_name][reason] += 1
+        if self._runs[policy.agent_name].get(context.invocation_id) is None:
+            self._runs[policy.agent_name][context.invocation_id] = reason
+        logger.info(f"🪜 {policy.agent_name} escalated to {policy.tiers[tier]} ({reason})")
+        return tier
+
+    def current_tier(self, context: CallbackContext, policy: RoutingPolicy) -> int:
+        """
+        Tier for the agent's next call in this run: the sticky escalation, or
+        an escalation now if the run's confidence is low.
+
+        Time Complexity: O(h) for the confidence source
+        """
+        tier = self._routing_state(context)["agents"].get(policy.agent_name, {}).get("tier", 0)
+        if tier == 0 and policy.escalate_below is not None and policy.confidence_source is not None:
+            confidence = policy.confidence_source(context)
+            if confidence is not None and confidence < policy.escalate_below:
+                tier = self._escalate(context, policy, 1, ESCALATE_LOW_CONFIDENCE)
+        return min(tier, len(policy.tiers) - 1)
+
+    def _record(self, agent_name: str, model: str, seconds: float):
+        stats = self._tier_stats.setdefault((agent_name, model), TierStats())
+        stats.calls += 1
+        stats.latencies.append(seconds)
+
+    def before_model(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        policy = self.policies.get(callback_context.agent_name)
+        if policy is None:
+            return None
+        self._note_run(policy.agent_name, callback_context.invocation_id)
+        cascading = policy.cascading and run_profile(callback_context.state).model_cascade
+        tier = self.current_tier(callback_context, policy) if cascading else len(policy.tiers) - 1
+        llm_request.model = policy.tiers[tier]
+        # Uncached copy for a schema-invalid retry (later callbacks may rewrite the request per model)
+        retry_request = (
+            llm_request.model_copy(deep=True)
+            if policy.validator is not None and tier < len(policy.tiers) - 1 else None
+        )
+        self._in_flight[(callback_context.invocation_id, policy.agent_name)] = (tier, time.perf_counter(), retry_request)
+        while len(self._in_flight) > MAX_TRACKED_CALLS:
+            self._in_flight.popitem(last=False)  # calls that errored before after_model
+        return None
+
+    async def after_model(self, callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        policy = self.policies.get(callback_context.agent_name)
+        if policy is None or llm_response.partial:
+            return None
+        call = self._in_flight.pop((callback_context.invocation_id, policy.agent_name), None)
+        if call is None:
+            return None
+        tier, started, retry_request = call
+        self._record(policy.agent_name, policy.tiers[tier], time.perf_counter() - started)
+
+        if retry_request is None or self._valid(policy, llm_response):
+            return None
+        next_tier = self._escalate(callback_context, policy, tier + 1, ESCALATE_SCHEMA_INVALID)
+        retry_request.model = policy.tiers[next_tier]
+        started = time.perf_counter()
+        try:
+            replacement = await asyncio.wait_for(
+                self._final_response(self._retry_llm(callback_context, retry_request.model), retry_request),
+                timeout=policy.retry_timeout,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ {policy.agent_name} retry on {retry_request.model} failed, keeping the original: {e!r}")
+            return None
+        finally:
+            self._record(policy.agent_name, retry_request.model, time.perf_counter() - started)
+        if replacement is None or replacement.error_code or not self._valid(policy, replacement):
+            logger.warning(f"⚠️ {policy.agent_name} retry on {retry_request.model} was invalid, keeping the original")
+            return None
+        # In place rather than returned: returning would skip the agent's later after_model callbacks
+        for name in LlmResponse.model_fields:
+            setattr(llm_response, name, getattr(replacement, name))
+        return None
+
+    def _retry_llm(self, context: CallbackContext, model: str) -> BaseLlm:
+        """The agent's own model object (a HedgedLlm calls `llm_request.model`), else one client per model."""
+        agent = getattr(get_invocation_context(context), "agent", None)
+        if isinstance(getattr(agent, "model", None), BaseLlm):
+            return agent.model
+        if model not in self._llms:
+            self._llms[model] = LLMRegistry.new_llm(model)
+        return self._llms[model]
+
+    @staticmethod
+    async def _final_response(llm: BaseLlm, llm_request: LlmRequest) -> Optional[LlmResponse]:
+        final = None
+        async for response in llm.generate_content_async(llm_request):
+            if not response.partial:
+                final = response
+        return final
+
+    @staticmethod
+    def _valid(policy: RoutingPolicy, llm_response: LlmResponse) -> bool:
+        if llm_response.error_code:
+            return True  # provider errors are not routing decisions
+        return policy.validator(response_text(llm_response))
+
+    def stats(self) -> Dict[str, Any]:
+        """Per agent: tiers, runs, escalations by reason, escalation rate and per-tier latency."""
+        agents = {}
+        for name, policy in self.policies.items():
+            runs = self._runs[name]
+            escalated = sum(1 for reason in runs.values() if reason is not None)
+            agents[name] = {
+                "tiers": policy.tiers,
+                "escalate_below": policy.escalate_below,
+                "runs": len(runs),
+                "escalated_runs": escalated,
+                "escalation_rate": round(escalated / len(runs), 3) if runs else 0.0,
+                "escalations": dict(self.escalations[name]),
+                "by_tier": {
+                    model: self._tier_stats[(name, model)].summary()
+                    for model in policy.tiers if (name, model) in self._tier_stats
+                },
+            }
+        return {"agents": agents}
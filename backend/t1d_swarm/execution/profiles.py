@@ -0,0 +1,107 @@
+"""
+Pipeline Execution Profiles
+
+The agent tree is built once, but how much of it a run uses is chosen per
+request (`ScenarioRequest.profile`, else EXECUTION_PROFILE). The profile name
+is stored in session state and the agents' callbacks read it:
+
+- fast: CGM window and context event from the deterministic cohort simulator
+  (built-in scenarios), a single forecast with no verifier round, and the
+  template presenter unless the run is contradictory
+- balanced: the standard pipeline - verify loop with early exits, cheap-model
+  cascade, delta refinement requests, templates for routine insights, and the
+  provider context cache when CONTEXT_CACHE_BACKEND is set
+- thorough: speculative forecast candidates (a duplicate forecaster request
+  sent at once, first schema-valid answer wins), the configured models only,
+  full refinement requests carrying the verifier's grounding, no trajectory
+  early exits, and the LLM presenter
+
+Latency and cost envelopes per profile are measured by
+benchmarks/execution_profile_benchmark.py.
+
+Performance Characteristics:
+- resolve_profile / run_profile: O(1) dictionary lookups, no I/O
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+PROFILE_STATE_KEY = "execution_profile"
+
+PRESENTER_TEMPLATE = "template"  # templates whenever one fits, confidence aside
+PRESENTER_AUTO = "auto"          # templates for routine, confident runs
+PRESENTER_LLM = "llm"            # always the LLM presenter
+
+
+@dataclass(frozen=True)
+class ExecutionProfile:
+    """
+    Which parts of the pipeline a run uses.
+
+    Args:
+        name: Profile name, as sent in ScenarioRequest.profile
+        description: One line for the API listing
+        simulate_inputs: CGM window and context event from the cohort simulator
+            for built-in scenarios instead of the feed and context LLM calls
+        verify: Run the verifier (with search) after each forecast
+        early_exit: Stop the refinement loop on a flat confidence trajectory
+        model_cascade: Cheap model first where an agent has a *_FAST_MODEL tier
+        speculative_forecasts: Send a second forecaster request at once
+        refinement_mode: 'delta' or 'full' refinement requests (refinement.py)
+        presenter: PRESENTER_TEMPLATE, PRESENTER_AUTO or PRESENTER_LLM
+    """
+    name: str
+    description: str
+    simulate_inputs: bool = False
+    verify: bool = True
+    early_exit: bool = True
+    model_cascade: bool = True
+    speculative_forecasts: bool = False
+    refinement_mode: Optional[str] = None  # None: FORECASTER_REFINEMENT_MODE
+    presenter: str = PRESENTER_AUTO
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+PROFILES: Dict[str, ExecutionProfile] = {
+    profile.name: profile for profile in (
+        ExecutionProfile(
+            name="fast",
+            description="Simulated inputs, a single unverified forecast, template presenter",
+            simulate_inputs=True, verify=False, presenter=PRESENTER_TEMPLATE,
+        ),
+        ExecutionProfile(
+            name="balanced",
+            description="Verify loop with early exits, model cascade, caching and routine templates",
+        ),
+        ExecutionProfile(
+            name="thorough",
+            description="Speculative forecasts, full grounding every round, no early exits, LLM presenter",
+            early_exit=False, model_cascade=False, speculative_forecasts=True, refinement_mode="full",
+            presenter=PRESENTER_LLM,
+        ),
+    )
+}
+
+DEFAULT_PROFILE = os.getenv("EXECUTION_PROFILE", "balanced").lower()
+
+
+def resolve_profile(name: Optional[str] = None) -> ExecutionProfile:
+    """
+    The named profile, or the default (EXECUTION_PROFILE) for None.
+
+    Raises:
+        ValueError: Unknown profile name
+    """
+    key = (name or DEFAULT_PROFILE).strip().lower()
+    if key not in PROFILES:
+        raise ValueError(f"Unknown execution profile '{name}' (expected one of: {', '.join(PROFILES)})")
+    return PROFILES[key]
+
+
+def run_profile(state: Any) -> ExecutionProfile:
+    """The profile of the run owning `state` (session or callback state); the default if unset or unknown."""
+    profile = PROFILES.get(str(state.get(PROFILE_STATE_KEY) or "").lower())
+    return profile or PROFILES.get(DEFAULT_PROFILE, PROFILES["balanced"])
@@ -0,0 +1,331 @@
+"""
+Agent Run Scheduler
+
+Admission control in front of root_agent runs (/run, /run_sse). At most
+`max_concurrent` pipelines execute at once; further runs wait in a priority
+queue (urgent hypoglycemia-risk scenarios ahead of routine ones, FIFO within a
+class) and are told their queue position through the progress stream. Once
+`max_queue` runs are waiting, new routine runs are shed with 503 + Retry-After;
+an urgent run instead displaces the newest queued routine run, so urgent
+analyses are only shed when the queue is entirely urgent.
+
+Performance Characteristics:
+- Admission / release: O(log q) heap operations for q queued runs
+- Position updates: O(q log q) per queue change (q <= max_queue)
+- Memory: O(q) queued runs, O(MAX_WAIT_SAMPLES) wait-time samples per class
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+URGENT = 0
+ROUTINE = 1
+PRIORITY_NAMES = {URGENT: "urgent", ROUTINE: "routine"}
+
+# Scenarios whose analysis guards against imminent hypoglycemia
+DEFAULT_URGENT_SCENARIOS = ("post_exercise_hypo", "contradictory_stress_hypo", "contradictory_symptoms")
+
+MAX_WAIT_SAMPLES = 1000
+MAX_SCENARIO_HINTS = 10000
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when a run is shed (queue full, or displaced by an urgent run)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass(order=True)
+class QueuedRun:
+    """A run waiting for a slot; ordered by (priority, arrival)."""
+    priority: int
+    seq: int
+    session_id: Optional[str] = field(compare=False)
+    future: asyncio.Future = field(compare=False, repr=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class AgentRunScheduler:
+    """
+    Bounded-concurrency priority scheduler for agent pipeline runs.
+
+    All methods must be called from the event loop thread.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_queue: int = 32,
+                 urgent_scenarios: Iterable[str] = DEFAULT_URGENT_SCENARIOS,
+                 on_queue_position: Optional[Callable[[str, int, str], Any]] = None):
+        """
+        Args:
+            max_concurrent (int): Pipelines allowed to run at once (model quota bound)
+            max_queue (int): Runs allowed to wait before new ones are shed
+            urgent_scenarios (Iterable[str]): Scenario ids scheduled as urgent
+            on_queue_position: `callback(session_id, position, priority_name)`;
+                position 0 means the run was admitted
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.urgent_scenarios = frozenset(urgent_scenarios)
+        self.on_queue_position = on_queue_position
+        self.running = 0
+        self._queue: List[QueuedRun] = []
+        self._seq = itertools.count()
+        self._scenario_hints: "OrderedDict[str, str]" = OrderedDict()
+        self._run_seconds: Deque[float] = deque(maxlen=MAX_WAIT_SAMPLES)
+        self._waits: Dict[int, Deque[float]] = {p: deque(maxlen=MAX_WAIT_SAMPLES) for p in PRIORITY_NAMES}
+        self.admitted = {p: 0 for p in PRIORITY_NAMES}
+        self.shed = {p: 0 for p in PRIORITY_NAMES}
+        self.displaced = 0
+
+    def note_scenario(self, session_id: str, scenario_id: Optional[str]):
+        """Remember which scenario a session will run (from /get-scenario). Time Complexity: O(1)"""
+        if not session_id or not scenario_id:
+            return
+        self._scenario_hints[session_id] = scenario_id
+        self._scenario_hints.move_to_end(session_id)
+        while len(self._scenario_hints) > MAX_SCENARIO_HINTS:
+            self._scenario_hints.popitem(last=False)
+
+    def scenario_for(self, session_id: Optional[str]) -> Optional[str]:
+        return self._scenario_hints.get(session_id) if session_id else None
+
+    def priority_for(self, scenario_id: Optional[str]) -> int:
+        return URGENT if scenario_id in self.urgent_scenarios else ROUTINE
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued runs x mean run time / slots."""
+        mean_run = sum(self._run_seconds) / len(self._run_seconds) if self._run_seconds else 30.0
+        return max(1, math.ceil((len(self._queue) + 1) * mean_run / self.max_concurrent))
+
+    def _notify_positions(self):
+        if self.on_queue_position is None:
+            return
+        for position, run in enumerate(sorted(self._queue), start=1):
+            if run.session_id:
+                self.on_queue_position(run.session_id, position, PRIORITY_NAMES[run.priority])
+
+    def _notify(self, session_id: Optional[str], position: int, priority: int):
+        if self.on_queue_position is not None and session_id:
+            self.on_queue_position(session_id, position, PRIORITY_NAMES[priority])
+
+    def _shed(self, priority: int, reason: str):
+        self.shed[priority] += 1
+        retry_after = self.retry_after()
+        logger.warning(f"🚦 Shedding {PRIORITY_NAMES[priority]} run ({reason}), retry after {retry_after}s")
+        raise SchedulerOverloaded(reason, retry_after)
+
+    def _admit(self, priority: int, waited: float):
+        self.running += 1
+        self.admitted[priority] += 1
+        self._waits[priority].append(waited)
+
+    def try_acquire(self, priority: int = ROUTINE) -> bool:
+        """Take a free slot without queueing. Time Complexity: O(1)"""
+        if self.running < self.max_concurrent and not self._queue:
+            self._admit(priority, 0.0)
+            return True
+        return False
+
+    async def acquire(self, session_id: Optional[str], priority: int = ROUTINE):
+        """
+        Wait for a run slot.
+
+        Raises:
+            SchedulerOverloaded: Queue full (or displaced by an urgent run)
+
+        Time Complexity: O(log q)
+        """
+        if self.try_acquire(priority):
+            return
+
+        if len(self._queue) >= self.max_queue:
+            victim = max(self._queue) if priority == URGENT and self._queue else None
+            if victim is None or victim.priority == URGENT:
+                self._shed(priority, "queue full")
+            # Make room by displacing the newest routine run
+            self._queue.remove(victim)
+            heapq.heapify(self._queue)
+            self.shed[victim.priority] += 1
+            self.displaced += 1
+            if not victim.future.done():
+                victim.future.set_exception(
+                    SchedulerOverloaded("displaced by an urgent run", self.retry_after())
+                )
+
+        run = QueuedRun(priority, next(self._seq), session_id, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._queue, run)
+        self._notify_positions()
+        try:
+            await run.future
+        except asyncio.CancelledError:
+            if run.future.done() and not run.future.cancelled() and run.future.exception() is None:
+                self.release()  # slot was granted just as the waiter was cancelled
+            elif run in self._queue:
+                self._queue.remove(run)
+                heapq.heapify(self._queue)
+                self._notify_positions()
+            raise
+        self._notify(session_id, 0, priority)
+
+    def release(self, run_seconds: Optional[float] = None):
+        """
+        Free a slot and hand it to the highest-priority queued run.
+
+        Time Complexity: O(log q) plus position updates
+        """
+        self.running -= 1
+        if run_seconds is not None:
+            self._run_seconds.append(run_seconds)
+        popped = False
+        while self._queue and self.running < self.max_concurrent:
+            run = heapq.heappop(self._queue)
+            popped = True
+            if run.future.done():  # cancelled (or displaced) before its waiter left the queue
+                continue
+            self._admit(run.priority, time.monotonic() - run.enqueued_at)
+            run.future.set_result(None)
+            break
+        if popped:
+            self._notify_positions()
+
+    def stats(self) -> Dict[str, Any]:
+        """Slots in use, queue depth by class, admitted / shed counts and wait times."""
+        def percentile(samples: List[float], q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1) if samples else 0.0
+
+        by_priority = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            by_priority[name] = {
+                "queued": sum(run.priority == priority for run in self._queue),
+                "admitted": self.admitted[priority],
+                "shed": self.shed[priority],
+                "wait_p50_ms": percentile(waits, 0.5),
+                "wait_p95_ms": percentile(waits, 0.95),
+                "wait_max_ms": percentile(waits, 1.0),
+            }
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queue_depth": len(self._queue),
+            "displaced": self.displaced,
+            "retry_after_seconds": self.retry_after(),
+            "by_priority": by_priority,
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware running /run and /run_sse requests through the scheduler.
+
+    Reads the request body to find the session, resolves its scenario (hint from
+    /get-scenario, else `scenario_resolver()`), and holds a slot for the whole
+    request, including the /run_sse stream. A client that disconnects while
+    queued gives its place up immediately.
+    """
+
+    def __init__(self, app, scheduler: AgentRunScheduler, registry=None,
+                 scenario_resolver: Optional[Callable[[], Optional[str]]] = None,
+                 paths=("/run", "/run_sse")):
+        self.app = app
+        self.scheduler = scheduler
+        self.registry = registry
+        self.scenario_resolver = scenario_resolver
+        self.paths = frozenset(paths)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                raise ConnectionResetError("client disconnected before sending the body")
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                return b"".join(chunks)
+
+    async def _send_overloaded(self, send, error: SchedulerOverloaded):
+        body = json.dumps({"detail": f"Server busy: {error}. Retry later.",
+                           "retry_after_seconds": error.retry_after}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", str(error.retry_after).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        try:
+            body = await self._read_body(receive)
+        except ConnectionResetError:
+            return
+        try:
+            session_id = json.loads(body).get("session_id")
+        except (ValueError, AttributeError):
+            session_id = None  # let ADK produce its validation error
+        scenario_id = self.scheduler.scenario_for(session_id)
+        if scenario_id is None and self.scenario_resolver is not None:
+            scenario_id = self.scenario_resolver()
+        priority = self.scheduler.priority_for(scenario_id)
+
+        if session_id and self.registry is not None:
+            self.registry.attach(session_id)  # queued runs are cancellable too
+
+        if not self.scheduler.try_acquire(priority):
+            # Queue for a slot, giving it up if the client disconnects meanwhile
+            acquire = asyncio.ensure_future(self.scheduler.acquire(session_id, priority))
+            disconnect = asyncio.ensure_future(receive())
+            try:
+                await asyncio.wait({acquire, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                # Pipeline cancelled while queued: leave the queue, let the cancellation unwind
+                disconnect.cancel()
+                acquire.cancel()
+                await asyncio.gather(acquire, return_exceptions=True)
+                raise
+            disconnect.cancel()
+            if not acquire.done():
+                acquire.cancel()
+                await asyncio.gather(acquire, return_exceptions=True)
+                return
+            try:
+                acquire.result()
+            except SchedulerOverloaded as e:
+                return await self._send_overloaded(send, e)
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, replay_receive, send)
+        finally:
+            self.scheduler.release(time.monotonic() - started)
@@ -0,0 +1,19 @@
+import os
+
+from .stream import CGMReading, CGMStreamIngestor
+from .endpoints import setup_ingestion_routes
+from .importer import CGMImportRegistry, iter_export_chunks, select_window
+
+# Global streaming ingestor instance
+cgm_stream_ingestor = CGMStreamIngestor()
+
+# Real CGM exports (CSV / JSON) offered as /scenarios sources
+cgm_import_registry = CGMImportRegistry(
+    os.getenv("CGM_IMPORT_DIR", "./cgm_imports"),
+    window_size=int(os.getenv("CGM_IMPORT_WINDOW_SAMPLES", "36")),
+)
+
+__all__ = [
+    'CGMReading', 'CGMStreamIngestor', 'setup_ingestion_routes', 'cgm_stream_ingestor',
+    'CGMImportRegistry', 'iter_export_chunks', 'select_window', 'cgm_import_registry',
+]
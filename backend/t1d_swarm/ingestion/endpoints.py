@@ -0,0 +1,65 @@
+import logging
+from typing import TYPE_CHECKING, List
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from .stream import CGMReading
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from .stream import CGMStreamIngestor
+
+
+def setup_ingestion_routes(app: FastAPI, ingestor: "CGMStreamIngestor"):
+    """Add continuous CGM ingestion routes to the FastAPI app"""
+
+    @app.websocket("/ingest/{user_id}/ws")
+    async def ingest_websocket(websocket: WebSocket, user_id: str):
+        """
+        Streaming ingestion: send one CGMReading JSON per message, receive the
+        current forecast (reused or freshly computed) after each reading.
+        Bad messages and failed forecasts get an error frame; the stream stays open.
+        """
+        await websocket.accept()
+        try:
+            while True:
+                try:
+                    reading = CGMReading.model_validate(await websocket.receive_json())
+                except ValidationError as e:
+                    await websocket.send_json({"error": e.errors(include_url=False, include_context=False)})
+                    continue
+                except ValueError as e:  # not JSON
+                    await websocket.send_json({"error": f"Invalid JSON message: {e}"})
+                    continue
+                try:
+                    result = await ingestor.ingest(user_id, reading)
+                except Exception as e:
+                    logger.warning(f"⚠️ Streaming forecast failed for user {user_id}: {e}")
+                    await websocket.send_json({"error": f"Forecast failed: {e}"})
+                    continue
+                await websocket.send_json(result)
+        except WebSocketDisconnect:
+            logger.info(f"🔌 CGM stream closed for user {user_id}")
+
+    @app.post("/ingest/{user_id}/readings")
+    async def ingest_readings(user_id: str, readings: List[CGMReading]):
+        """
+        Batch ingestion for clients without websockets (or backfilling history).
+        The whole batch is appended in timestamp order, then the triggers are
+        evaluated once on the final window: at most one forecast per request.
+        """
+        if not readings:
+            raise HTTPException(status_code=400, detail="At least one reading is required.")
+        return await ingestor.ingest_batch(user_id, readings)
+
+    @app.get("/ingest/{user_id}/stats")
+    async def ingest_stats(user_id: str):
+        """Readings received vs forecasts run for a user"""
+        stats = ingestor.stats(user_id)
+        if stats is None:
+            raise HTTPException(status_code=404, detail="No readings for this user.")
+        return stats
+
+    logger.info("✅ CGM ingestion endpoints registered: /ingest/{user_id}/ws, /ingest/{user_id}/readings")
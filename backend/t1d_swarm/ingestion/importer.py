@@ -0,0 +1,432 @@
+"""
+CGM Export Importer
+
+Streams real device exports into the same shape the pipeline gets from the
+simulated feed, so historical data can be analysed as a scenario:
+
+- CSV: Dexcom Clarity (EGV rows), LibreView (historic / scan glucose) and
+  generic `timestamp,glucose` files; mmol/L columns are converted to mg/dL
+- JSON: Nightscout entry exports (an array of `sgv` records) or NDJSON
+
+Files are memory-mapped and read in fixed-size blocks cut at line (CSV) or
+record (JSON) boundaries; each block becomes one NumPy chunk of epoch seconds
+and mg/dL (NaN for unreadable values), and pages already parsed are dropped
+from the mapping. Only the chunk being parsed and the selected window are
+held in memory, whatever the size of the export.
+
+Exports in CGM_IMPORT_DIR are listed by /scenarios as `import:<file name>`.
+Selecting one analyses the last `window_size` 5-minute samples up to the
+latest reading, or up to the ISO timestamp given as the scenario's custom text.
+Timestamps without a UTC offset are taken as UTC.
+
+Performance Characteristics:
+- Parsing: O(n) time, O(block) memory; ISO timestamps parse vectorized
+- Listing sources: O(files), sniffing only the first block of each file
+- Window selection: one streaming pass, O(window) memory
+"""
+
+import codecs
+import csv
+import json
+import logging
+import mmap
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..analytics import window_features
+from ..analytics.sensor_faults import detect_window_faults, merge_issues
+from ..schemas import CGMDataOutput
+
+logger = logging.getLogger(__name__)
+
+IMPORT_SCENARIO_PREFIX = "import:"
+EXPORT_SUFFIXES = (".csv", ".json", ".ndjson", ".jsonl")
+
+MMOL_TO_MG_DL = 18.0182
+# Dexcom reports out-of-range readings as text
+TEXT_READINGS = {"low": 40.0, "high": 400.0}
+
+DEFAULT_BLOCK_BYTES = 4 * 1024 * 1024
+SNIFF_BYTES = 64 * 1024
+
+TIMESTAMP_COLUMNS = (
+    "timestamp (yyyy-mm-ddthh:mm:ss)", "device timestamp", "timestamp", "datetime", "date_time",
+    "datestring", "time", "date",
+)
+GLUCOSE_COLUMNS = (
+    "glucose value (mg/dl)", "glucose value (mmol/l)", "historic glucose mg/dl", "historic glucose mmol/l",
+    "glucose", "glucose_value", "sgv", "bg", "value",
+)
+# LibreView: manual scans fill gaps in the 15-minute historic series
+SCAN_GLUCOSE_COLUMNS = ("scan glucose mg/dl", "scan glucose mmol/l")
+# Rows kept per format: Dexcom mixes calibrations, alerts and events into the export
+ROW_FILTERS = {"event type": ("egv",), "record type": ("0", "1")}
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%m-%d-%Y %I:%M %p", "%m-%d-%Y %H:%M", "%d-%m-%Y %H:%M",
+    "%m/%d/%Y %H:%M", "%d/%m/%Y %H:%M", "%Y/%m/%d %H:%M",
+)
+# Naive ISO 8601 timestamps numpy can parse in bulk
+NAIVE_ISO_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?$")
+JSON_TIMESTAMP_KEYS = ("date", "timestamp", "dateString", "time")
+JSON_GLUCOSE_KEYS = ("sgv", "glucose", "glucose_value", "value", "mbg")
+
+Chunk = Tuple[np.ndarray, np.ndarray]  # (epoch seconds float64, mg/dL float64 with NaN)
+
+
+@dataclass(frozen=True)
+class CSVLayout:
+    """Column positions found in an export's header row."""
+    header_line: int
+    timestamp: int
+    glucose: int
+    scan_glucose: Optional[int]
+    scale: float
+    filter_column: Optional[int]
+    filter_values: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    """One export file offered as a scenario."""
+    source_id: str
+    path: str
+    file_format: str
+    size_bytes: int
+
+    @property
+    def display_name(self) -> str:
+        return f"📂 Imported CGM Data: {os.path.basename(self.path)} ({self.size_bytes / 1e6:.1f} MB)"
+
+
+def _iter_blocks(path: str, block_bytes: int = DEFAULT_BLOCK_BYTES, cut: bytes = b"\n") -> Iterator[bytes]:
+    """
+    Memory-mapped read in blocks of about `block_bytes`, each ending after a
+    `cut` byte (or at EOF); pages already yielded are released from the mapping.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            start = 0
+            while start < size:
+                end = min(size, start + block_bytes)
+                if end < size:
+                    boundary = mapped.rfind(cut, start, end)
+                    if boundary == -1:
+                        boundary = mapped.find(cut, end)
+                    end = size if boundary == -1 else boundary + 1
+                yield mapped[start:end]
+                released = start - start % mmap.PAGESIZE
+                if hasattr(mmap, "MADV_DONTNEED") and end - released >= mmap.PAGESIZE:
+                    mapped.madvise(mmap.MADV_DONTNEED, released, (end - released) // mmap.PAGESIZE * mmap.PAGESIZE)
+                start = end
+
+
+def sniff_format(path: str) -> Optional[str]:
+    """'csv', 'json' or None (unsupported), from the first non-blank bytes."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES).decode("utf-8-sig", errors="replace").lstrip()
+    if head.startswith(("[", "{")):
+        return "json"
+    return "csv" if _csv_layout(head.splitlines()) is not None else None
+
+
+def _csv_layout(lines: Sequence[str]) -> Optional[CSVLayout]:
+    """Locate the header row (exports put metadata rows above it) and its columns."""
+    for number, row in enumerate(csv.reader(lines)):
+        names = [name.strip().lower() for name in row]
+        timestamp = next((names.index(c) for c in TIMESTAMP_COLUMNS if c in names), None)
+        glucose = next((names.index(c) for c in GLUCOSE_COLUMNS if c in names), None)
+        if timestamp is None or glucose is None:
+            continue
+        scan = next((names.index(c) for c in SCAN_GLUCOSE_COLUMNS if c in names), None)
+        filter_column = next((c for c in ROW_FILTERS if c in names), None)
+        return CSVLayout(
+            header_line=number, timestamp=timestamp, glucose=glucose, scan_glucose=scan,
+            scale=MMOL_TO_MG_DL if "mmol" in names[glucose] else 1.0,
+            filter_column=names.index(filter_column) if filter_column else None,
+            filter_values=ROW_FILTERS.get(filter_column, ()),
+        )
+    return None
+
+
+def _parse_glucose(values: Sequence[Any], scale: float = 1.0) -> np.ndarray:
+    """mg/dL array; blanks and unreadable values become NaN."""
+    try:
+        return np.asarray(values, dtype=np.float64) * scale
+    except (TypeError, ValueError):
+        pass
+    parsed = np.empty(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        text = str(value).strip().lower() if value is not None else ""
+        if text in TEXT_READINGS:
+            parsed[i] = TEXT_READINGS[text]
+            continue
+        try:
+            parsed[i] = float(text.replace(",", ".")) * scale
+        except ValueError:
+            parsed[i] = np.nan
+    return parsed
+
+
+def _parse_timestamp(text: str, formats: List[str]) -> float:
+    """Epoch seconds; remembers the format that worked (moved to the front of `formats`)."""
+    try:
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        for fmt in formats:
+            try:
+                parsed = datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            if formats[0] != fmt:
+                formats.remove(fmt)
+                formats.insert(0, fmt)
+            break
+        else:
+            return np.nan
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _parse_timestamps(values: Sequence[str], formats: List[str]) -> np.ndarray:
+    """Epoch seconds array: vectorized for naive ISO timestamps, per value otherwise."""
+    if values and NAIVE_ISO_TIMESTAMP.match(values[0].strip()):
+        try:
+            iso = np.char.replace(np.asarray(values, dtype=str), " ", "T")
+            return iso.astype("datetime64[s]").astype(np.float64)
+        except ValueError:
+            pass
+    return np.fromiter((_parse_timestamp(value.strip(), formats) for value in values),
+                       dtype=np.float64, count=len(values))
+
+
+def _csv_chunks(path: str, block_bytes: int) -> Iterator[Chunk]:
+    layout = None
+    formats = list(TIMESTAMP_FORMATS)
+    for index, block in enumerate(_iter_blocks(path, block_bytes)):
+        lines = block.decode("utf-8-sig" if index == 0 else "utf-8", errors="replace").splitlines()
+        if layout is None:
+            layout = _csv_layout(lines)
+            if layout is None:
+                raise ValueError(f"No timestamp / glucose header found in {path}")
+            lines = lines[layout.header_line + 1:]
+        timestamps, glucose, scan = [], [], []
+        width = max(layout.timestamp, layout.glucose, layout.scan_glucose or 0, layout.filter_column or 0) + 1
+        for row in csv.reader(lines):
+            if len(row) < width or not row[layout.timestamp]:
+                continue
+            if layout.filter_column is not None \
+                    and row[layout.filter_column].strip().lower() not in layout.filter_values:
+                continue
+            timestamps.append(row[layout.timestamp])
+            glucose.append(row[layout.glucose])
+            if layout.scan_glucose is not None:
+                scan.append(row[layout.scan_glucose])
+        if not timestamps:
+            continue
+        values = _parse_glucose(glucose, layout.scale)
+        if scan:
+            values = np.where(np.isnan(values), _parse_glucose(scan, layout.scale), values)
+        yield _parse_timestamps(timestamps, formats), values
+
+
+def _json_record(record: Dict[str, Any], formats: List[str]) -> Tuple[float, Any]:
+    if record.get("type") not in (None, "sgv"):
+        return np.nan, None
+    timestamp = next((record[key] for key in JSON_TIMESTAMP_KEYS if record.get(key) is not None), None)
+    glucose = next((record[key] for key in JSON_GLUCOSE_KEYS if record.get(key) is not None), None)
+    if isinstance(timestamp, (int, float)):
+        timestamp = timestamp / 1000 if timestamp > 1e11 else float(timestamp)  # Nightscout: epoch ms
+    elif isinstance(timestamp, str):
+        timestamp = _parse_timestamp(timestamp, formats)
+    else:
+        timestamp = np.nan
+    return timestamp, glucose
+
+
+def _json_chunks(path: str, block_bytes: int) -> Iterator[Chunk]:
+    """Flat records from a JSON array or NDJSON, decoded incrementally across blocks."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    formats = list(TIMESTAMP_FORMATS)
+    buffer = ""
+    for block in _iter_blocks(path, block_bytes, cut=b"}"):
+        buffer += utf8.decode(block)
+        timestamps, glucose, position = [], [], 0
+        while True:
+            start = buffer.find("{", position)
+            if start == -1:
+                position = len(buffer)
+                break
+            try:
+                record, position = decoder.raw_decode(buffer, start)
+            except json.JSONDecodeError:
+                position = start  # incomplete record: wait for the next block
+                break
+            if isinstance(record, dict):
+                timestamp, value = _json_record(record, formats)
+                timestamps.append(timestamp)
+                glucose.append(value)
+        buffer = buffer[position:]
+        if len(buffer) > 4 * block_bytes:
+            raise ValueError(f"{path} is not an array of flat CGM records")
+        if timestamps:
+            yield np.asarray(timestamps, dtype=np.float64), _parse_glucose(glucose)
+
+
+def iter_export_chunks(path: str, block_bytes: int = DEFAULT_BLOCK_BYTES) -> Iterator[Chunk]:
+    """
+    Stream an export as (epoch seconds, mg/dL) NumPy chunks in file order.
+    Rows without a parseable timestamp are dropped; unreadable glucose is NaN.
+
+    Raises:
+        ValueError: If the file is not a supported CGM export
+    """
+    file_format = sniff_format(path)
+    if file_format is None:
+        raise ValueError(f"Unsupported CGM export: {path}")
+    chunks = _csv_chunks(path, block_bytes) if file_format == "csv" else _json_chunks(path, block_bytes)
+    for timestamps, glucose in chunks:
+        valid = ~np.isnan(timestamps)
+        if valid.any():
+            yield timestamps[valid], glucose[valid]
+
+
+def select_window(chunks: Iterator[Chunk], window_size: int = 36, interval_minutes: float = 5.0,
+                  end: Optional[float] = None) -> Tuple[Optional[float], List[Optional[float]]]:
+    """
+    The `window_size` samples up to `end` (default: the latest reading) on an
+    even grid, oldest first with None for gaps, and the end timestamp. Exports
+    need not be sorted; only readings inside the running window are kept.
+
+    Time Complexity: O(n) over the chunks, O(window) memory
+    """
+    interval = interval_minutes * 60
+    span = window_size * interval
+    kept_t, kept_g = np.empty(0), np.empty(0)
+    latest = -np.inf
+    for timestamps, glucose in chunks:
+        if end is not None:
+            inside = timestamps <= end
+            timestamps, glucose = timestamps[inside], glucose[inside]
+        if timestamps.size == 0:
+            continue
+        latest = max(latest, float(timestamps.max()))
+        recent = timestamps > latest - span
+        kept_t = np.concatenate([kept_t, timestamps[recent]])
+        kept_g = np.concatenate([kept_g, glucose[recent]])
+        recent = kept_t > latest - span
+        kept_t, kept_g = kept_t[recent], kept_g[recent]
+    if kept_t.size == 0:
+        return None, []
+
+    slots = np.full(window_size, np.nan)
+    offsets = np.rint((latest - kept_t) / interval).astype(int)
+    on_grid = (offsets >= 0) & (offsets < window_size) & ~np.isnan(kept_g)
+    order = np.argsort(kept_t[on_grid], kind="stable")  # later readings win a slot
+    slots[window_size - 1 - offsets[on_grid][order]] = kept_g[on_grid][order]
+    return latest, [None if np.isnan(value) else round(float(value), 1) for value in slots]
+
+
+def window_cgm_data(window: Sequence[Optional[float]], timestamp: float) -> Dict[str, Any]:
+    """CGMDataOutput-compatible dict for the last sample of an imported window."""
+    features = window_features(window)
+    latest = window[-1] if window else None
+    return CGMDataOutput(
+        glucose_value=int(round(latest)) if latest is not None else None,
+        trend_arrow=features["trend_arrow"] if latest is not None else "NOT_COMPUTABLE",
+        data_quality_issues=merge_issues(detect_window_faults(window), None if latest is not None else "missing_data"),
+        timestamp_simulated=datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(),
+    ).model_dump()
+
+
+class CGMImportRegistry:
+    """
+    Export files in one directory, offered as `import:<file name>` scenarios.
+
+    Thread Safety: Stateless apart from the directory listing; safe to call
+    from the blocking executor.
+    """
+
+    def __init__(self, directory: str, window_size: int = 36, block_bytes: int = DEFAULT_BLOCK_BYTES):
+        """
+        Args:
+            directory (str): Folder holding the exports (need not exist)
+            window_size (int): 5-minute samples handed to the pipeline
+            block_bytes (int): Bytes parsed per chunk (bounds memory)
+        """
+        self.directory = directory
+        self.window_size = window_size
+        self.block_bytes = block_bytes
+        self._formats: Dict[Tuple[str, float], Optional[str]] = {}
+
+    def sources(self) -> List[ExportSource]:
+        """Supported exports in the directory, by file name. Time Complexity: O(files)"""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if not entry.is_file() or not entry.name.lower().endswith(EXPORT_SUFFIXES):
+                continue
+            stat = entry.stat()
+            key = (entry.path, stat.st_mtime)
+            if key not in self._formats:
+                try:
+                    self._formats[key] = sniff_format(entry.path)
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not read CGM export {entry.name}: {e}")
+                    self._formats[key] = None
+            if self._formats[key]:
+                found.append(ExportSource(f"{IMPORT_SCENARIO_PREFIX}{entry.name}", entry.path,
+                                          self._formats[key], stat.st_size))
+        return found
+
+    def scenario_options(self) -> List[Dict[str, str]]:
+        """/scenarios entries for the imported exports"""
+        return [{"id": source.source_id, "display_name": source.display_name} for source in self.sources()]
+
+    def source(self, source_id: str) -> Optional[ExportSource]:
+        return next((source for source in self.sources() if source.source_id == source_id), None)
+
+    def load_scenario(self, source_id: str, end_text: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Session state for an imported scenario: `scenario`, `cgm_window` and
+        `cgm_data` at `end_text` (ISO timestamp) or the latest reading.
+        None when the source does not exist.
+
+        Raises:
+            ValueError: If the export cannot be parsed, has no readings before
+                `end_text`, or `end_text` is not a timestamp
+        """
+        source = self.source(source_id)
+        if source is None:
+            return None
+        end = None
+        if end_text and end_text.strip():
+            end = _parse_timestamp(end_text.strip(), list(TIMESTAMP_FORMATS))
+            if np.isnan(end):
+                raise ValueError(f"Not a timestamp: {end_text!r}")
+        timestamp, window = select_window(iter_export_chunks(source.path, self.block_bytes), self.window_size,
+                                          end=end)
+        if timestamp is None:
+            raise ValueError(f"No readings in {os.path.basename(source.path)} up to the requested time")
+        cgm_data = window_cgm_data(window, timestamp)
+        readings = sum(value is not None for value in window)
+        description = (
+            f"Historical CGM data imported from {os.path.basename(source.path)}: the {self.window_size * 5} "
+            f"minutes up to {cgm_data['timestamp_simulated']} ({readings} of {self.window_size} readings). "
+            f"The latest reading is {cgm_data['glucose_value']} mg/dL, trend {cgm_data['trend_arrow']}"
+            + (f", data quality issues: {cgm_data['data_quality_issues']}." if cgm_data["data_quality_issues"] else ".")
+        )
+        logger.info(f"📂 Loaded {source_id}: {readings} readings up to {cgm_data['timestamp_simulated']}")
+        return {"scenario": {"scenarios": description}, "cgm_window": window, "cgm_data": cgm_data}
@@ -0,0 +1,334 @@
+"""
+Continuous CGM Ingestion
+
+Accepts a stream of CGM readings per user (one every ~5 minutes), keeps a rolling
+window per user, and re-runs only the forecasting stage when something meaningful
+changed. Between triggers the previous `risk_forecast` is reused, so per-user LLM
+spend is proportional to glycemic events rather than to the sampling rate.
+
+Re-forecast triggers:
+- trend_change: trend arrow differs from the one the last forecast was based on
+- threshold_crossing: glucose moved into a different glycemic zone (<54, <70, 70-180, >180, >250)
+- context_event: a new context event (meal, exercise, ...) arrived with the reading
+- data_quality: readings became non-computable (gap / sensor error) or recovered;
+  data_quality_issues comes from the streaming sensor fault detector (O(1) per reading)
+- stale_forecast: the last forecast is older than max_forecast_age_minutes
+
+Readings must arrive in time order per user: one not newer than the latest in
+the window is counted and dropped (the resampler and the fault detector both
+treat the last reading as the newest). A batch is sorted first, appended as a
+whole, and evaluated once on the final window.
+
+Performance Characteristics:
+- ingest without trigger: O(w) where w is the (small, bounded) window size, no model call
+- ingest with trigger: one forecaster LLM call, serialized per user
+- ingest_batch: O(b log b + w) for b readings, at most one forecaster call
+- Memory: O(u * w) for u tracked users, bounded by max_users (LRU eviction)
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from pydantic import BaseModel, field_validator
+
+from ..analytics import window_features
+from ..analytics.sensor_faults import DATA_QUALITY_KEY, SensorFaultDetector, assess_data_quality, merge_issues
+from ..subagents.refinement_loop_agent.subagents.glycemic_risk_forecast_agent.agent import (
+    MODEL_NAME,
+    apply_numeric_forecast,
+)
+from ..subagents.refinement_loop_agent.subagents.glycemic_risk_forecast_agent.prompts import (
+    RiskForecastOutput,
+    risk_forecaster_prompts,
+)
+
+logger = logging.getLogger(__name__)
+
+# Glycemic zones (mg/dL) - crossing any boundary triggers a re-forecast
+ZONE_BOUNDARIES: Tuple[int, ...] = (54, 70, 180, 250)
+
+# CGM sampling interval the rolling window is resampled onto
+SAMPLE_INTERVAL_MINUTES = 5.0
+
+STREAM_APP_NAME = "t1d_swarm_stream"
+
+
+def _parse_timestamp(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:  # naive device clocks are UTC, as in importer / wire_format
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class CGMReading(BaseModel):
+    """One reading pushed by a device / client."""
+    glucose_value: Optional[int] = None
+    timestamp: Optional[str] = None  # ISO 8601 (naive = UTC); server time when omitted
+    data_quality_issues: Optional[str] = None
+    context_event: Optional[Dict[str, Any]] = None  # ContextEventOutput-shaped dict
+
+    @field_validator("timestamp")
+    @classmethod
+    def _check_timestamp(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            _parse_timestamp(value)  # raises ValueError -> validation error
+        return value
+
+
+@dataclass
+class UserStream:
+    """Rolling window and forecast cache for one user."""
+    window: Deque[Tuple[float, Optional[int]]]
+    last_forecast: Optional[Dict[str, Any]] = None
+    forecast_basis: Dict[str, Any] = field(default_factory=dict)
+    last_forecast_at: float = 0.0
+    context_event: Optional[Dict[str, Any]] = None
+    features: Dict[str, Any] = field(default_factory=dict)
+    forecasts_run: int = 0
+    readings_seen: int = 0
+    late_readings: int = 0
+    fault_detector: SensorFaultDetector = field(default_factory=SensorFaultDetector)
+    sensor_issues: List[str] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def glucose_zone(glucose_value: Optional[int]) -> Optional[int]:
+    """Index of the glycemic zone a reading falls in, None when there is no reading."""
+    if glucose_value is None:
+        return None
+    return sum(1 for boundary in ZONE_BOUNDARIES if glucose_value >= boundary)
+
+
+def resample_window(window: Deque[Tuple[float, Optional[int]]],
+                    interval_minutes: float = SAMPLE_INTERVAL_MINUTES) -> List[Optional[float]]:
+    """
+    Place window readings on an even grid ending at the latest reading.
+
+    Late/missing samples become None (gaps), so the analytics module sees the
+    same shape it gets for batched windows.
+
+    Time Complexity: O(w)
+    """
+    if not window:
+        return []
+    latest = window[-1][0]
+    slots: List[Optional[float]] = [None] * window.maxlen if window.maxlen else [None] * len(window)
+    for timestamp, glucose_value in window:
+        offset = int(round((latest - timestamp) / (interval_minutes * 60)))
+        if 0 <= offset < len(slots) and glucose_value is not None:
+            slots[len(slots) - 1 - offset] = glucose_value
+    return slots
+
+
+class CGMStreamIngestor:
+    """
+    Per-user rolling windows with trigger-gated re-forecasting.
+
+    Forecasts run the same instruction/schema as GlycemicRiskForecasterAgent on a
+    dedicated agent instance (an ADK agent can only have one parent) through an
+    in-memory runner, so they never touch the persisted pipeline sessions.
+
+    Thread Safety: One asyncio.Lock per user serializes forecasts; concurrent
+    triggers for the same user coalesce into the next forecast.
+    """
+
+    def __init__(self, window_size: int = 36, max_users: int = 10000, max_forecast_age_minutes: float = 60.0):
+        """
+        Args:
+            window_size (int): Readings kept per user (36 = 3h at 5-minute sampling)
+            max_users (int): Tracked users before least-recently-seen eviction
+            max_forecast_age_minutes (float): Forecast TTL before a forced refresh
+        """
+        self.window_size = window_size
+        self.max_users = max_users
+        self.max_forecast_age_minutes = max_forecast_age_minutes
+        self.users: "OrderedDict[str, UserStream]" = OrderedDict()
+        self._session_service = InMemorySessionService()
+        self._forecaster = LlmAgent(
+            model=MODEL_NAME,
+            name="StreamingRiskForecasterAgent",
+            description="Re-forecasts glycemic risk for streamed CGM windows.",
+            instruction=risk_forecaster_prompts,
+            output_schema=RiskForecastOutput,
+            output_key="risk_forecast",
+            before_agent_callback=apply_numeric_forecast,
+            disallow_transfer_to_parent=True,
+            disallow_transfer_to_peers=True,
+        )
+        self._runner = Runner(app_name=STREAM_APP_NAME, agent=self._forecaster,
+                              session_service=self._session_service)
+
+    def _user_stream(self, user_id: str) -> UserStream:
+        stream = self.users.get(user_id)
+        if stream is None:
+            stream = UserStream(window=deque(maxlen=self.window_size))
+            self.users[user_id] = stream
+            while len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(user_id)
+        return stream
+
+    def build_cgm_data(self, stream: UserStream, data_quality_issues: Optional[str] = None) -> Dict[str, Any]:
+        """
+        CGMDataOutput-compatible dict for the latest reading, trend computed from
+        the window and data_quality_issues from the sensor fault detector (plus
+        any issue the device reported).
+        """
+        timestamp, glucose_value = stream.window[-1]
+        stream.features = window_features(resample_window(stream.window), SAMPLE_INTERVAL_MINUTES)
+        trend_arrow = stream.features["trend_arrow"] if glucose_value is not None else "NOT_COMPUTABLE"
+        data_quality_issues = merge_issues(stream.sensor_issues, data_quality_issues)
+        if glucose_value is None and not data_quality_issues:
+            data_quality_issues = "missing_data"
+        return {
+            "glucose_value": glucose_value,
+            "trend_arrow": trend_arrow,
+            "unit": "mg/dL",
+            "data_quality_issues": data_quality_issues,
+            "timestamp_simulated": datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z"),
+        }
+
+    def detect_triggers(self, stream: UserStream, cgm_data: Dict[str, Any]) -> List[str]:
+        """
+        Reasons the cached forecast is no longer valid for this window.
+
+        Time Complexity: O(1)
+        """
+        if stream.last_forecast is None:
+            return ["initial"]
+        basis = stream.forecast_basis
+        triggers = []
+        if cgm_data["trend_arrow"] != basis.get("trend_arrow"):
+            triggers.append("trend_change")
+        if glucose_zone(cgm_data["glucose_value"]) != basis.get("zone"):
+            triggers.append("threshold_crossing")
+        # Identity check: a forecast that already consumed this context event covers it
+        if stream.context_event is not basis.get("context_event"):
+            triggers.append("context_event")
+        if bool(cgm_data["data_quality_issues"]) != basis.get("data_quality_issues", False):
+            triggers.append("data_quality")
+        if time.time() - stream.last_forecast_at > self.max_forecast_age_minutes * 60:
+            triggers.append("stale_forecast")
+        return triggers
+
+    async def _run_forecaster(self, user_id: str, cgm_data: Dict[str, Any], context_event: Optional[Dict[str, Any]],
+                              cgm_features: Optional[Dict[str, Any]] = None,
+                              cgm_window: Optional[List[Optional[float]]] = None) -> Optional[Dict[str, Any]]:
+        """Run only the forecasting stage in a throwaway in-memory session."""
+        session = await self._session_service.create_session(
+            app_name=STREAM_APP_NAME, user_id=user_id,
+            state={
+                "cgm_data": cgm_data,
+                "context_event": context_event or {"event_type": "no_recent_significant_event",
+                                                   "description_raw": "No context reported."},
+                "cgm_features": cgm_features or {},
+                "cgm_window": cgm_window or [],
+                DATA_QUALITY_KEY: assess_data_quality(cgm_data.get("data_quality_issues"), "detector"),
+            },
+        )
+        try:
+            message = types.Content(role="user", parts=[types.Part(text="Forecast glycemic risk for the latest CGM window.")])
+            async for _ in self._runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                pass
+            finished = await self._session_service.get_session(
+                app_name=STREAM_APP_NAME, user_id=user_id, session_id=session.id
+            )
+            return finished.state.get("risk_forecast") if finished else None
+        finally:
+            await self._session_service.delete_session(
+                app_name=STREAM_APP_NAME, user_id=user_id, session_id=session.id
+            )
+
+    def _append(self, stream: UserStream, timestamp: float, reading: CGMReading) -> bool:
+        """Add one reading to the window and the fault detector; False (dropped) when it is late."""
+        stream.readings_seen += 1
+        if stream.window and timestamp <= stream.window[-1][0]:
+            stream.late_readings += 1
+            return False
+        stream.window.append((timestamp, reading.glucose_value))
+        stream.sensor_issues = stream.fault_detector.update(timestamp, reading.glucose_value)
+        if reading.context_event is not None:
+            stream.context_event = reading.context_event
+        return True
+
+    async def ingest(self, user_id: str, reading: CGMReading) -> Dict[str, Any]:
+        """
+        Append one reading and return the current forecast, re-running the
+        forecaster only if a trigger fired.
+
+        Returns:
+            Dict with cgm_data, risk_forecast, reused (bool), triggers and
+            late_readings (readings dropped as out of order)
+
+        Time Complexity: O(w) without trigger; one LLM call with trigger
+        """
+        return await self.ingest_batch(user_id, [reading])
+
+    async def ingest_batch(self, user_id: str, readings: List[CGMReading]) -> Dict[str, Any]:
+        """
+        Append readings (sorted by timestamp) and evaluate the triggers once on
+        the final window, so backfilled history costs at most one forecast.
+
+        Returns:
+            Same shape as ingest()
+
+        Time Complexity: O(b log b + w); at most one LLM call
+        """
+        stream = self._user_stream(user_id)
+        timed = sorted(((_parse_timestamp(reading.timestamp), reading) for reading in readings), key=lambda item: item[0])
+        accepted = [reading for timestamp, reading in timed if self._append(stream, timestamp, reading)]
+        late_readings = len(timed) - len(accepted)
+        if not accepted:
+            return {"cgm_data": self.build_cgm_data(stream), "risk_forecast": stream.last_forecast, "reused": True,
+                    "triggers": [], "late_readings": late_readings}
+
+        async with stream.lock:
+            # Re-evaluated under the lock: a forecast that finished while we waited
+            # may already cover this window, which coalesces bursts of triggers
+            cgm_data = self.build_cgm_data(stream, accepted[-1].data_quality_issues)
+            triggers = self.detect_triggers(stream, cgm_data)
+            if not triggers:
+                return {"cgm_data": cgm_data, "risk_forecast": stream.last_forecast, "reused": True, "triggers": [],
+                        "late_readings": late_readings}
+
+            logger.info(f"📈 Re-forecasting for user {user_id}: {', '.join(triggers)}")
+            forecast = await self._run_forecaster(
+                user_id, cgm_data, stream.context_event, stream.features, resample_window(stream.window)
+            )
+            if forecast is not None:
+                stream.last_forecast = forecast
+                stream.last_forecast_at = time.time()
+                stream.forecasts_run += 1
+                stream.forecast_basis = {
+                    "trend_arrow": cgm_data["trend_arrow"],
+                    "zone": glucose_zone(cgm_data["glucose_value"]),
+                    "data_quality_issues": bool(cgm_data["data_quality_issues"]),
+                    "context_event": stream.context_event,
+                }
+            return {"cgm_data": cgm_data, "risk_forecast": stream.last_forecast, "reused": forecast is None,
+                    "triggers": triggers, "late_readings": late_readings}
+
+    def stats(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Readings vs forecasts for one user (the LLM-call savings ratio)."""
+        stream = self.users.get(user_id)
+        if stream is None:
+            return None
+        return {
+            "readings_seen": stream.readings_seen,
+            "forecasts_run": stream.forecasts_run,
+            "late_readings": stream.late_readings,
+            "window_size": len(stream.window),
+            "last_forecast_at": stream.last_forecast_at or None,
+        }
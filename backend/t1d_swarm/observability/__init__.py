@@ -0,0 +1,47 @@
+import os
+
+from .tracing import (
+    SessionTraceCollector,
+    TracedLoopAgent,
+    JsonlSpanExporter,
+    add_span_processor,
+    annotate_current_span,
+    tag_pipeline_span,
+    CONFIDENCE_ATTRIBUTE,
+    EXIT_REASON_ATTRIBUTE,
+)
+from .profiler import AgentAttribution, SamplingProfiler, EventLoopLagMonitor
+from .replay import ReplayMismatch, ReplayReport, RunRecorder, RunTrace, recording, replay_run, replaying
+from .endpoints import setup_recording_routes, setup_tracing_routes, setup_profiling_routes
+
+# Local OTLP/JSON-lines span export target; opt-in, the file grows without bound ("" disables file export)
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+
+# Opt-in profiling surface (/debug/profile, /debug/loop-lag and the lag monitor)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Global per-session trace collector instance
+trace_collector = SessionTraceCollector()
+
+# Global profiling instances (idle until /debug/profile is called or the monitor is started)
+agent_attribution = AgentAttribution()
+sampling_profiler = SamplingProfiler(agent_attribution, interval=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000)
+loop_lag_monitor = EventLoopLagMonitor(
+    agent_attribution,
+    interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000,
+    stall_threshold=float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100")) / 1000,
+)
+
+# Record every completed root_agent run for deterministic replay ("" disables recording)
+run_recorder = RunRecorder(os.getenv("RUN_RECORDING_DIR", ""))
+
+__all__ = [
+    'SessionTraceCollector', 'TracedLoopAgent', 'JsonlSpanExporter', 'add_span_processor',
+    'annotate_current_span', 'tag_pipeline_span', 'CONFIDENCE_ATTRIBUTE', 'EXIT_REASON_ATTRIBUTE',
+    'setup_tracing_routes', 'trace_collector', 'TRACE_EXPORT_PATH',
+    'AgentAttribution', 'SamplingProfiler', 'EventLoopLagMonitor', 'setup_profiling_routes',
+    'agent_attribution', 'sampling_profiler', 'loop_lag_monitor', 'PROFILING_ENABLED',
+    'RunRecorder', 'RunTrace', 'ReplayMismatch', 'ReplayReport', 'replay_run', 'recording', 'replaying',
+    'setup_recording_routes',
+    'run_recorder',
+]
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from .profiler import MAX_PROFILE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from .profiler import EventLoopLagMonitor, SamplingProfiler
+    from .replay import RunRecorder
+    from .tracing import SessionTraceCollector
+
+
+def setup_tracing_routes(app: FastAPI, collector: "SessionTraceCollector"):
+    """Add the trace waterfall route to the FastAPI app"""
+
+    # ADK already owns /debug/trace/{event_id} and /debug/trace/session/{session_id}
+    # (flat span lists for its web UI), so the waterfall lives one segment deeper
+    @app.get("/debug/trace/{session_id}/waterfall")
+    async def get_trace_waterfall(session_id: str):
+        """
+        Span waterfall for a session: root run, sub-agents, loop iterations,
+        model calls and tool calls with offsets, durations, tokens and confidence.
+        """
+        waterfall = collector.waterfall(session_id)
+        if waterfall is None:
+            raise HTTPException(status_code=404, detail="No trace recorded for this session.")
+        return waterfall
+
+    logger.info("✅ Tracing endpoints registered: /debug/trace/{session_id}/waterfall")
+
+
+def setup_profiling_routes(app: FastAPI, profiler: "SamplingProfiler", lag_monitor: "EventLoopLagMonitor"):
+    """Add the sampling profiler and event loop lag routes to the FastAPI app"""
+
+    @app.get("/debug/profile")
+    async def run_profile(
+        seconds: float = Query(5.0, gt=0, le=MAX_PROFILE_SECONDS),
+        format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+        tasks: bool = Query(True, description="Also sample suspended asyncio task stacks"),
+    ):
+        """
+        Sample all threads (and suspended agent tasks) for N seconds.
+
+        `format=collapsed` returns flamegraph.pl / speedscope input; `format=json`
+        adds per-agent and per-session sample counts.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            # The sampler sleeps between samples on a worker thread, never on the loop; it uses
+            # the default executor so a long profile never holds a blocking-pool slot
+            result = await asyncio.to_thread(profiler.profile, seconds, loop, threading.get_ident(), tasks)
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        if format == "collapsed":
+            return PlainTextResponse(profiler.collapsed(result["stacks"]))
+        result["stacks"] = dict(result["stacks"].most_common())
+        return result
+
+    @app.get("/debug/loop-lag")
+    async def get_loop_lag():
+        """Event loop lag summary and recent stalls with the stack that blocked the loop"""
+        return lag_monitor.stats()
+
+    logger.info("✅ Profiling endpoints registered: /debug/profile, /debug/loop-lag")
+
+
+def setup_recording_routes(app: FastAPI, recorder: "RunRecorder"):
+    """Add the run recording status route to the FastAPI app"""
+
+    @app.get("/debug/run-recordings")
+    async def run_recording_stats():
+        """Whether runs are recorded for replay, where, and how many so far"""
+        return recorder.stats()
+
+    logger.info("✅ Run recording endpoints registered: /debug/run-recordings")
@@ -0,0 +1,339 @@
+"""
+Hot-Path Profiling
+
+Opt-in, always-available profiling for the running server (no restart, no
+external profiler attached):
+
+- SamplingProfiler: on-demand wall-clock sampler over every thread's stack
+  (sys._current_frames) plus the suspended asyncio task stacks, returning
+  collapsed stacks ("frame;frame;frame count") for flamegraph tools
+- AgentAttribution: span processor that tracks which agent (and session) each
+  asyncio task is currently running, so samples are prefixed with the agent
+- EventLoopLagMonitor: heartbeat coroutine plus watchdog thread; when the loop
+  stalls past a threshold the watchdog captures the blocking stack (e.g. a
+  callback doing file or network I/O inline instead of through
+  execution.run_blocking)
+
+Overhead:
+- Idle: one loop wake-up and one watchdog wake-up per lag interval, O(1) dict
+  updates per agent span - cheap enough to leave enabled in production
+- While profiling: one sampler thread, O(threads * depth + tasks * depth) per
+  sample at the configured rate (default 100 Hz); only one profile at a time
+
+Performance Characteristics:
+- Sample: O(t * d) for t threads/tasks of stack depth d (capped at MAX_STACK_DEPTH)
+- Collapsed output: O(u) for u unique stacks
+- Memory: O(u) while profiling, O(max_stalls) for the lag monitor
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+
+from .tracing import SESSION_ATTRIBUTE
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+MAX_PROFILE_SECONDS = 120.0
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse_frames(frame, limit: int = MAX_STACK_DEPTH) -> List[str]:
+    """Root-first frame labels for a thread's current frame. Time Complexity: O(d)"""
+    labels = []
+    while frame is not None and len(labels) < limit:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _agent_name(span_name: str) -> str:
+    # ADK names agent spans "agent_run [AgentName]"
+    return span_name[len("agent_run ["):-1]
+
+
+class AgentAttribution(SpanProcessor):
+    """
+    Tracks the innermost running agent per asyncio task from ADK agent_run spans.
+
+    The sampler thread cannot read the event loop's context variables, so this
+    keeps a plain task -> span stack map it can look up under the GIL. A task's
+    entry is dropped when the task finishes, so runs cancelled before their
+    spans end are not kept alive.
+
+    Time Complexity: O(1) per span start/end (O(depth) for a span ended out of order)
+    """
+
+    def __init__(self):
+        self._stacks: Dict[Any, List[Any]] = {}   # task -> its open agent spans, innermost last
+        self._span_tasks: Dict[int, Any] = {}     # span id -> task, so on_end finds the stack directly
+
+    def on_start(self, span, parent_context=None):
+        if not span.name.startswith("agent_run ["):
+            return
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            return
+        if task is None:
+            return
+        stack = self._stacks.get(task)
+        if stack is None:
+            stack = self._stacks[task] = []
+            task.add_done_callback(self._forget)
+        stack.append(span)
+        self._span_tasks[span.context.span_id] = task
+
+    def on_end(self, span: ReadableSpan):
+        if not span.name.startswith("agent_run ["):
+            return
+        span_id = span.context.span_id
+        stack = self._stacks.get(self._span_tasks.pop(span_id, None))
+        if not stack:
+            return
+        if stack[-1].context.span_id == span_id:
+            stack.pop()
+        else:
+            stack[:] = [open_span for open_span in stack if open_span.context.span_id != span_id]
+
+    def _forget(self, task: Any):
+        for span in self._stacks.pop(task, ()):
+            self._span_tasks.pop(span.context.span_id, None)
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def current(self, task: Any) -> Tuple[Optional[str], Optional[str]]:
+        """(agent name, session id) for a task, (None, None) when it runs no agent."""
+        try:
+            span = self._stacks[task][-1]
+        except (KeyError, IndexError):  # no agent, or its span ended while the sampler thread looked
+            return None, None
+        return _agent_name(span.name), (span.attributes or {}).get(SESSION_ATTRIBUTE)
+
+
+class SamplingProfiler:
+    """
+    On-demand wall-clock sampler over all threads and asyncio tasks.
+
+    Stack prefixes:
+    - "thread:<name>" for every thread; the event loop thread is additionally
+      prefixed with "agent:<name>" of the task running at sample time
+    - "task-wait;agent:<name>" for suspended tasks (await points such as model
+      calls), so off-CPU time shows up in the same flamegraph
+
+    Thread Safety: One profile at a time (non-blocking lock)
+    """
+
+    def __init__(self, attribution: AgentAttribution, interval: float = 0.01):
+        self.attribution = attribution
+        self.interval = interval
+        self._busy = threading.Lock()
+
+    def _loop_prefix(self, loop: asyncio.AbstractEventLoop) -> Tuple[List[str], Optional[str], Optional[str]]:
+        task = asyncio.tasks._current_tasks.get(loop)
+        agent, session_id = self.attribution.current(task)
+        return ([f"agent:{agent}"] if agent else []), agent, session_id
+
+    def _sample(self, loop: Optional[asyncio.AbstractEventLoop], loop_thread_id: Optional[int],
+                include_tasks: bool, stacks: Counter, agents: Counter, sessions: Counter):
+        sampler_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler_id:
+                continue
+            prefix = [f"thread:{names.get(thread_id, thread_id)}"]
+            if loop is not None and thread_id == loop_thread_id:
+                agent_prefix, agent, session_id = self._loop_prefix(loop)
+                prefix += agent_prefix
+                # Per-agent totals count event loop time only (where agents execute)
+                agents[agent or "(idle/other)"] += 1
+                if session_id:
+                    sessions[session_id] += 1
+            stacks[";".join(prefix + collapse_frames(frame))] += 1
+
+        if include_tasks and loop is not None:
+            running = asyncio.tasks._current_tasks.get(loop)
+            try:
+                tasks = asyncio.all_tasks(loop)
+            except RuntimeError:
+                return
+            for task in tasks:
+                if task is running or task.done():
+                    continue
+                agent, _ = self.attribution.current(task)
+                if agent is None:
+                    continue  # idle server tasks (heartbeats, servers) would dominate the graph
+                try:
+                    frames = task.get_stack(limit=MAX_STACK_DEPTH)
+                except Exception:
+                    continue
+                labels = [_frame_label(f) for f in frames]
+                stacks[";".join(["task-wait", f"agent:{agent}"] + labels)] += 1
+
+    def profile(self, seconds: float, loop: Optional[asyncio.AbstractEventLoop] = None,
+                loop_thread_id: Optional[int] = None, include_tasks: bool = True) -> Dict[str, Any]:
+        """
+        Sample for `seconds` on the calling thread (run it via asyncio.to_thread).
+
+        Returns:
+            Dict with collapsed stack counts, per-agent / per-session sample
+            counts and the achieved sample count
+
+        Raises:
+            RuntimeError: When another profile is already running
+        """
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            seconds = max(0.1, min(seconds, MAX_PROFILE_SECONDS))
+            stacks: Counter = Counter()
+            agents: Counter = Counter()
+            sessions: Counter = Counter()
+            samples = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            next_sample = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_sample:
+                    time.sleep(next_sample - now)
+                self._sample(loop, loop_thread_id, include_tasks, stacks, agents, sessions)
+                samples += 1
+                next_sample += self.interval
+            return {
+                "seconds": round(time.perf_counter() - started, 3),
+                "interval_ms": self.interval * 1000,
+                "samples": samples,
+                "by_agent": dict(agents.most_common()),
+                "by_session": dict(sessions.most_common()),
+                "stacks": stacks,
+            }
+        finally:
+            self._busy.release()
+
+    @staticmethod
+    def collapsed(stacks: Counter) -> str:
+        """Brendan Gregg collapsed-stack text (flamegraph.pl / speedscope input)."""
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class EventLoopLagMonitor:
+    """
+    Measures event loop scheduling lag and captures the stack of stalls.
+
+    A heartbeat coroutine sleeps `interval` seconds and records how late it woke
+    up. A daemon watchdog thread notices a missing heartbeat while the stall is
+    still in progress and snapshots the loop thread's stack, which is then
+    attached to the stall record when the loop recovers.
+    """
+
+    def __init__(self, attribution: Optional[AgentAttribution] = None, interval: float = 0.1,
+                 stall_threshold: float = 0.1, max_stalls: int = 200):
+        """
+        Args:
+            interval (float): Heartbeat period in seconds
+            stall_threshold (float): Lag in seconds that counts as a stall
+            max_stalls (int): Recent stalls kept in memory
+        """
+        self.attribution = attribution
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self.beats = 0
+        self.stall_total = 0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self._last_beat = time.monotonic()
+        self._pending_stack: Optional[Dict[str, Any]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stopped = threading.Event()
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def _watchdog(self):
+        while not self._stopped.wait(self.interval):
+            last_beat = self._last_beat
+            overdue = time.monotonic() - last_beat - self.interval
+            if overdue < self.stall_threshold or self._pending_stack is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            task = asyncio.tasks._current_tasks.get(self._loop)
+            agent, session_id = self.attribution.current(task) if self.attribution else (None, None)
+            self._pending_stack = {
+                "beat": last_beat,
+                "stack": ";".join(collapse_frames(frame)),
+                "agent": agent,
+                "session_id": session_id,
+            }
+
+    async def run(self):
+        """Heartbeat loop; run as a background task for the server lifetime."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True).start()
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lag = max(0.0, now - self._last_beat - self.interval)
+                pending, self._pending_stack = self._pending_stack, None
+                beat, self._last_beat = self._last_beat, now
+                self.beats += 1
+                self.total_lag_ms += lag * 1000
+                self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+                if lag >= self.stall_threshold:
+                    self.stall_total += 1
+                    captured = pending if pending and pending["beat"] == beat else {}
+                    self.stalls.append({
+                        "at": time.time(),
+                        "lag_ms": round(lag * 1000, 1),
+                        "stack": captured.get("stack"),
+                        "agent": captured.get("agent"),
+                        "session_id": captured.get("session_id"),
+                    })
+                    logger.info(f"🐢 Event loop stalled {lag * 1000:.0f}ms"
+                          + (f" in {captured['agent']}" if captured.get("agent") else ""))
+        finally:
+            self._stopped.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Lag summary plus the most recent stalls (newest last)."""
+        return {
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+            "beats": self.beats,
+            "mean_lag_ms": round(self.total_lag_ms / self.beats, 2) if self.beats else 0.0,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "stall_count": self.stall_total,
+            "stalls": list(self.stalls),
+        }
@@ -0,0 +1,522 @@
+"""
+Run Record / Replay
+
+Model nondeterminism makes two runs of the swarm incomparable, so changes to
+the orchestration (loop logic, callbacks, parsing, state handling) are
+measured against recorded runs instead:
+
+- RunRecorder captures one root_agent run into a compact trace file (gzip
+  JSON lines): every google-genai model request and response (the ADK agents,
+  with google_search grounding results, and the scenario client in tools),
+  then every event's author, state delta, escalation, function calls /
+  responses and search queries:
+
+      {"type": "header", "version": 1, "session_id": ..., "initial_state": {...}, "user_content": {...}}
+      {"type": "model", "key": <request hash>, "model": ..., "request": {...}, "responses": [...], "latency_ms": ...}
+      {"type": "event", "author": ..., "state_delta": {...}, "escalate": false, "function_calls": [...], ...}
+
+- replay_run feeds the recorded responses back through the real agent graph
+  (an InMemoryRunner over the given agent) with zero network and diffs the
+  replayed events against the recorded ones.
+- recording / replaying do the same for model calls made outside an agent
+  run (e.g. a benchmark's reference calls): a trace with exchanges only.
+
+Both work by wrapping google-genai's AsyncModels.generate_content /
+generate_content_stream (install(), once per process), the one place every
+model call of the pipeline goes through. The active recording or replay is
+looked up in a context variable, so other runs in the process pass straight
+through.
+
+Replayed requests are matched on a hash of their contents and system
+instruction, not on order: a hedged duplicate, or a repeat of a request whose
+recorded responses are used up, gets the last response for that request.
+Scenario resolution is seeded from the recorded setup state (a "random"
+scenario is not re-drawn). Record and replay with the same
+CONTEXT_CACHE_BACKEND, as cached prefixes are not part of the request
+contents. The genai client is still constructed, so GOOGLE_API_KEY must be
+set (to anything).
+
+Performance Characteristics:
+- Recording: O(request + response) serialization per model call, file write off the event loop
+- Replay: O(request) hash and O(1) lookup per model call, no network
+- Event diff: O(e * d) for e events with d-sized state deltas
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from itertools import zip_longest
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Set, Union
+
+from google.adk.runners import InMemoryRunner
+from google.genai import models as genai_models
+from google.genai import types
+from pydantic import BaseModel
+
+from ..execution import run_blocking
+from ..session_context import get_invocation_context, get_session_id
+
+logger = logging.getLogger(__name__)
+
+TRACE_VERSION = 1
+TRACE_SUFFIX = ".trace.jsonl.gz"
+
+# Differ between two runs on the same inputs; dropped before events are compared
+VOLATILE_KEYS = frozenset({"pipeline_started_at", "invocation_id"})
+
+_active: contextvars.ContextVar[Optional[Union["_Recording", "_Replay"]]] = contextvars.ContextVar(
+    "run_cassette", default=None
+)
+_installed = False
+
+
+class ReplayMismatch(LookupError):
+    """A replayed run sent a model request that was never recorded (strict replay)."""
+
+
+def _dump(value: Any) -> Any:
+    """JSON-ready form of genai request / response values and session state."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _dump(item) for key, item in value.items()}
+    return value
+
+
+def _json_ready(value: Any) -> Any:
+    """Round trip through JSON so recorded and replayed values compare alike (tuples, numpy scalars)."""
+    return json.loads(json.dumps(_dump(value), default=str))
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if key not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def _config_value(config: Any, name: str) -> Any:
+    if isinstance(config, dict):
+        return config.get(name)
+    return getattr(config, name, None)
+
+
+def request_key(contents: Any, config: Any) -> str:
+    """Stable hash of what the model is asked: its contents and system instruction. Time Complexity: O(request)"""
+    payload = json.dumps(
+        {"contents": _dump(contents), "system": _dump(_config_value(config, "system_instruction"))},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def summarize_event(event: Any) -> Dict[str, Any]:
+    """The replay-comparable part of an ADK event."""
+    parts = event.content.parts if event.content and event.content.parts else []
+    grounding = getattr(event, "grounding_metadata", None)
+    actions = event.actions
+    return _json_ready({
+        "type": "event",
+        "author": event.author,
+        "state_delta": dict(actions.state_delta) if actions and actions.state_delta else {},
+        "escalate": bool(actions and actions.escalate),
+        "function_calls": [
+            {"name": part.function_call.name, "args": part.function_call.args}
+            for part in parts if part.function_call
+        ],
+        "function_responses": [
+            {"name": part.function_response.name, "response": part.function_response.response}
+            for part in parts if part.function_response
+        ],
+        "search_queries": list(grounding.web_search_queries or []) if grounding else [],
+    })
+
+
+@dataclass
+class RunTrace:
+    """One recorded run: header, model exchanges and events, each in order."""
+    header: Dict[str, Any]
+    exchanges: List[Dict[str, Any]] = field(default_factory=list)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+    def setup_state(self, root_name: str) -> Dict[str, Any]:
+        """State the root agent's setup callback resolved (scenario, imported CGM window)."""
+        for event in self.events:
+            if event["author"] == root_name:
+                return {key: value for key, value in event["state_delta"].items() if key not in VOLATILE_KEYS}
+        return {}
+
+    def write(self, path: str) -> int:
+        """Write the gzip JSON-lines trace (temporary name, then rename). Returns the file size."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            for record in [self.header, *self.exchanges, *self.events]:
+                f.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        os.replace(temporary, path)
+        return os.path.getsize(path)
+
+    @classmethod
+    def read(cls, path: str) -> "RunTrace":
+        """
+        Raises:
+            ValueError: Not a trace file, or an unsupported trace version
+        """
+        trace: Optional[RunTrace] = None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("type") == "header":
+                    if record.get("version") != TRACE_VERSION:
+                        raise ValueError(f"Unsupported trace version {record.get('version')} in {path}")
+                    trace = cls(record)
+                elif trace is None:
+                    raise ValueError(f"{path} does not start with a trace header")
+                elif record.get("type") == "model":
+                    trace.exchanges.append(record)
+                elif record.get("type") == "event":
+                    trace.events.append(record)
+        if trace is None:
+            raise ValueError(f"{path} is empty")
+        return trace
+
+
+class _Recording:
+    """Passes calls through to the API and appends each exchange to the trace."""
+
+    def __init__(self, trace: RunTrace):
+        self.trace = trace
+
+    def _add(self, model: str, contents: Any, config: Any, responses: List[Any], started: float):
+        self.trace.exchanges.append({
+            "type": "model",
+            "key": request_key(contents, config),
+            "model": model,
+            "request": _json_ready({
+                "contents": contents,
+                "system_instruction": _config_value(config, "system_instruction"),
+                "tools": _config_value(config, "tools"),
+            }),
+            "responses": _json_ready(responses),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    async def generate(self, original, model: str, contents: Any, config: Any):
+        started = time.perf_counter()
+        response = await original(model=model, contents=contents, config=config)
+        self._add(model, contents, config, [response], started)
+        return response
+
+    async def stream(self, original, model: str, contents: Any, config: Any) -> AsyncIterator[Any]:
+        started = time.perf_counter()
+        chunks = await original(model=model, contents=contents, config=config)
+
+        async def tee():
+            collected = []
+            async for chunk in chunks:
+                collected.append(chunk)
+                yield chunk
+            self._add(model, contents, config, collected, started)
+        return tee()
+
+
+class _Replay:
+    """Serves recorded responses by request hash; never calls the API."""
+
+    def __init__(self, trace: RunTrace, strict: bool, latency_scale: float):
+        self.trace = trace
+        self.strict = strict
+        self.latency_scale = latency_scale
+        self._by_key: Dict[str, Deque[int]] = {}
+        for index, exchange in enumerate(trace.exchanges):
+            self._by_key.setdefault(exchange["key"], deque()).append(index)
+        self._last: Dict[str, int] = {}
+        self._used: Set[int] = set()
+        self.calls = 0
+        self.unmatched = 0
+
+    def _take(self, contents: Any, config: Any) -> Dict[str, Any]:
+        key = request_key(contents, config)
+        queue = self._by_key.get(key)
+        if queue:
+            index = self._last[key] = queue.popleft()
+        elif key in self._last:
+            index = self._last[key]  # hedged duplicate or repeat of an exhausted request
+        elif self.strict:
+            raise ReplayMismatch(f"No recorded response for model request {key}")
+        else:
+            # Changed prompt: serve the next unused response in recorded order
+            index = next((i for i in range(len(self.trace.exchanges)) if i not in self._used), None)
+            if index is None:
+                raise ReplayMismatch(f"No recorded response left for model request {key}")
+            self.unmatched += 1
+        self._used.add(index)
+        self.calls += 1
+        return self.trace.exchanges[index]
+
+    @property
+    def unused(self) -> int:
+        return len(self.trace.exchanges) - len(self._used)
+
+    async def _responses(self, contents: Any, config: Any) -> List[types.GenerateContentResponse]:
+        exchange = self._take(contents, config)
+        if self.latency_scale:
+            await asyncio.sleep(exchange["latency_ms"] / 1000 * self.latency_scale)
+        return [types.GenerateContentResponse.model_validate(response) for response in exchange["responses"]]
+
+    async def generate(self, original, model: str, contents: Any, config: Any):
+        return (await self._responses(contents, config))[-1]
+
+    async def stream(self, original, model: str, contents: Any, config: Any) -> AsyncIterator[Any]:
+        responses = await self._responses(contents, config)
+
+        async def chunks():
+            for response in responses:
+                yield response
+        return chunks()
+
+
+def install():
+    """Wrap the google-genai async model calls (idempotent); calls outside a recording or replay are untouched."""
+    global _installed
+    if _installed:
+        return
+    original_generate = genai_models.AsyncModels.generate_content
+    original_stream = genai_models.AsyncModels.generate_content_stream
+
+    @functools.wraps(original_generate)
+    async def generate_content(self, *, model, contents, config=None):
+        cassette = _active.get()
+        if cassette is None:
+            return await original_generate(self, model=model, contents=contents, config=config)
+        return await cassette.generate(functools.partial(original_generate, self), model, contents, config)
+
+    @functools.wraps(original_stream)
+    async def generate_content_stream(self, *, model, contents, config=None):
+        cassette = _active.get()
+        if cassette is None:
+            return await original_stream(self, model=model, contents=contents, config=config)
+        return await cassette.stream(functools.partial(original_stream, self), model, contents, config)
+
+    genai_models.AsyncModels.generate_content = generate_content
+    genai_models.AsyncModels.generate_content_stream = generate_content_stream
+    _installed = True
+
+
+@contextlib.contextmanager
+def recording(trace: RunTrace) -> Iterator[RunTrace]:
+    """Append the model calls made inside the block (this task and tasks it starts) to `trace`."""
+    install()
+    token = _active.set(_Recording(trace))
+    try:
+        yield trace
+    finally:
+        _active.reset(token)
+
+
+@contextlib.contextmanager
+def replaying(trace: RunTrace, strict: bool = True, latency_scale: float = 0.0) -> Iterator["_Replay"]:
+    """
+    Serve the model calls made inside the block from `trace` (no network).
+
+    Raises:
+        ReplayMismatch: Strict replay sent a request that was never recorded
+    """
+    install()
+    replay = _Replay(trace, strict, latency_scale)
+    token = _active.set(replay)
+    try:
+        yield replay
+    finally:
+        _active.reset(token)
+
+
+class RunRecorder:
+    """
+    Records root_agent runs, one trace file per completed run, when enabled.
+
+    start / finish are called from the root agent's before / after callbacks;
+    the recording follows the run's task through the context variable, so
+    concurrent sessions are recorded separately.
+    """
+
+    def __init__(self, directory: str, enabled: bool = True):
+        """
+        Args:
+            directory (str): Where trace files are written ("" disables recording)
+            enabled (bool): False turns start / finish into no-ops
+        """
+        self.directory = directory
+        self.enabled = enabled and bool(directory)
+        self.recorded = 0
+        self.bytes_written = 0
+        self.last_path: Optional[str] = None
+
+    def start(self, callback_context: Any) -> bool:
+        """Begin recording this run (not while replaying or already recording). Call before any state write."""
+        if not self.enabled or _active.get() is not None:
+            return False
+        install()
+        invocation_context = get_invocation_context(callback_context)
+        session = invocation_context.session
+        _active.set(_Recording(RunTrace({
+            "type": "header",
+            "version": TRACE_VERSION,
+            "created_at": time.time(),
+            "app_name": session.app_name,
+            "root_agent": invocation_context.agent.name,
+            "session_id": session.id,
+            "invocation_id": invocation_context.invocation_id,
+            "initial_state": _json_ready(dict(session.state)),
+            "user_content": _json_ready(invocation_context.user_content),
+        })))
+        return True
+
+    async def finish(self, callback_context: Any) -> Optional[str]:
+        """Attach this run's events and write its trace off the event loop. Returns the trace path."""
+        recording = _active.get()
+        if not isinstance(recording, _Recording):
+            return None
+        _active.set(None)
+        invocation_context = get_invocation_context(callback_context)
+        trace = recording.trace
+        trace.events = [
+            summarize_event(event) for event in invocation_context.session.events
+            # The runner appends the user message itself; replay only yields agent events
+            if event.invocation_id == invocation_context.invocation_id and not event.partial and event.author != "user"
+        ]
+        path = os.path.join(
+            self.directory, f"{get_session_id(callback_context)}-{invocation_context.invocation_id}{TRACE_SUFFIX}"
+        )
+        size = await run_blocking(trace.write, path)
+        self.recorded += 1
+        self.bytes_written += size
+        self.last_path = path
+        logger.info(f"📼 Recorded run to {path} ({len(trace.exchanges)} model calls, "
+                    f"{len(trace.events)} events, {size / 1024:.1f} KB)")
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "runs_recorded": self.recorded,
+            "bytes_written": self.bytes_written,
+            "last_trace": self.last_path,
+        }
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of one replay: timing, model calls served and event differences."""
+    session_id: str
+    duration_ms: float
+    model_calls: int
+    unmatched_calls: int
+    unused_exchanges: int
+    events: int
+    differences: List[str]
+
+    @property
+    def matches(self) -> bool:
+        """Replayed events equal the recorded ones and every request was recorded."""
+        return not self.differences and not self.unmatched_calls
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "matches": self.matches}
+
+
+def diff_events(recorded: List[Dict[str, Any]], replayed: List[Dict[str, Any]], root_name: str,
+                seeded: Set[str], limit: int = 20) -> List[str]:
+    """
+    Differences between recorded and replayed event summaries, in order.
+    State keys seeded into the replay session are ignored on the root agent's events.
+    """
+    differences = []
+    for index, (expected, actual) in enumerate(zip_longest(recorded, replayed)):
+        if len(differences) >= limit:
+            differences.append("...")
+            break
+        if actual is None:
+            differences.append(f"event {index}: missing {expected['author']} event")
+            continue
+        if expected is None:
+            differences.append(f"event {index}: extra {actual['author']} event")
+            continue
+        if expected["author"] != actual["author"]:
+            differences.append(f"event {index}: author {expected['author']} != {actual['author']}")
+            continue
+        for name in ("state_delta", "escalate", "function_calls", "function_responses", "search_queries"):
+            want, got = _normalize(expected.get(name)), _normalize(actual.get(name))
+            if name == "state_delta" and expected["author"] == root_name:
+                want = {key: value for key, value in want.items() if key not in seeded}
+                got = {key: value for key, value in got.items() if key not in seeded}
+            if want != got:
+                if isinstance(want, dict) and isinstance(got, dict):
+                    keys = sorted(key for key in set(want) | set(got) if want.get(key) != got.get(key))
+                    differences.append(f"event {index} ({actual['author']}): {name} differs on {keys}")
+                else:
+                    differences.append(f"event {index} ({actual['author']}): {name} {want!r} != {got!r}")
+    return differences
+
+
+async def replay_run(trace: Union[RunTrace, str], agent: Any, strict: bool = True,
+                     latency_scale: float = 0.0) -> ReplayReport:
+    """
+    Run `agent` (the recorded root agent) on a fresh in-memory session, serving
+    every model call from `trace`.
+
+    Args:
+        trace: RunTrace or trace file path
+        agent: Root agent to drive (normally t1d_swarm.agent.root_agent)
+        strict: Raise ReplayMismatch on an unrecorded request, instead of serving the next unused response
+        latency_scale: Sleep this fraction of each recorded model latency (0: full speed)
+
+    Raises:
+        ReplayMismatch: Strict replay sent a request that was never recorded
+    """
+    if isinstance(trace, str):
+        trace = await run_blocking(RunTrace.read, trace)
+    install()
+    header = trace.header
+    app_name = header.get("app_name") or agent.name
+    runner = InMemoryRunner(agent=agent, app_name=app_name)
+    seeded_state = trace.setup_state(agent.name)
+    session = await runner.session_service.create_session(
+        app_name=app_name, user_id="replay", state={**(header.get("initial_state") or {}), **seeded_state},
+    )
+    user_content = (
+        types.Content.model_validate(header["user_content"]) if header.get("user_content")
+        else types.Content(role="user", parts=[types.Part(text="Replay")])
+    )
+
+    started = time.perf_counter()
+    with replaying(trace, strict, latency_scale) as replay:
+        events = [
+            summarize_event(event)
+            async for event in runner.run_async(user_id="replay", session_id=session.id, new_message=user_content)
+            if not event.partial
+        ]
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    return ReplayReport(
+        session_id=header.get("session_id"),
+        duration_ms=round(duration_ms, 2),
+        model_calls=replay.calls,
+        unmatched_calls=replay.unmatched,
+        unused_exchanges=replay.unused,
+        events=len(events),
+        differences=diff_events(trace.events, events, agent.name, set(seeded_state)),
+    )
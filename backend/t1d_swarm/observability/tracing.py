@@ -0,0 +1,356 @@
+"""
+Pipeline Tracing
+
+Hierarchical OpenTelemetry spans for every analysis run, so a slow analysis can
+be broken down into the stage, loop iteration, model call or tool call that
+actually spent the time.
+
+Span tree for one run (ADK emits the agent/model/tool spans, this module adds
+the loop iterations and the T1D attributes):
+
+    invocation
+    └── agent_run [T1dInsightOrchestratorAgent]      t1d.session_id, t1d.scenario_id
+        ├── agent_run [SimulatedCGMFeedAgent]
+        │   └── call_llm                             gen_ai.usage.* tokens
+        ├── agent_run [RefinementLoopAgent]
+        │   ├── loop_iteration [1]                   t1d.verification_confidence
+        │   │   ├── agent_run [GlycemicRiskForecasterAgent]
+        │   │   ├── agent_run [ForecastVerifierAgent]
+        │   │   │   └── execute_tool ...
+        │   │   └── agent_run [ConfidenceChecker]
+        │   └── loop_iteration [2] ...
+        └── agent_run [InsightPresenterAgent]
+
+Session and scenario ids are set once on the root span and copied onto every
+descendant when it starts, so each exported span can be filtered on its own.
+
+Export:
+- JSON lines (OTLP/JSON-shaped span records) to TRACE_EXPORT_PATH when it is
+  set, via a BatchSpanProcessor - the local stand-in for a collector (the file
+  is appended to and never rotated, so it is meant for development)
+- OTLP/HTTP when OTEL_EXPORTER_OTLP_ENDPOINT is set and the exporter is installed
+- In-memory per-session store behind GET /debug/trace/{session_id}/waterfall
+
+Performance Characteristics:
+- on_start / on_end: O(a) for a span attributes, no I/O on the event loop
+- File export: batched on the processor's worker thread
+- Waterfall: O(s log s) for s spans of the session
+- Memory: bounded by max_traces * max_spans_per_trace
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence, Set
+
+from google.adk.agents import LoopAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+from ..session_context import get_session_id
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+except ImportError:  # optional dependency
+    OTLPSpanExporter = None
+
+SESSION_ATTRIBUTE = "t1d.session_id"
+SCENARIO_ATTRIBUTE = "t1d.scenario_id"
+CONFIDENCE_ATTRIBUTE = "t1d.verification_confidence"
+ITERATION_ATTRIBUTE = "t1d.loop.iteration"
+EXIT_REASON_ATTRIBUTE = "t1d.loop.exit_reason"
+
+# Copied from parent to child span at start
+INHERITED_ATTRIBUTES = (SESSION_ATTRIBUTE, SCENARIO_ATTRIBUTE)
+
+# ADK's own session attribute (set on call_llm spans)
+ADK_SESSION_ATTRIBUTE = "gcp.vertex.agent.session_id"
+
+# Full request/response payloads ADK attaches for its web UI - too large to keep per span
+BULKY_ATTRIBUTES = frozenset({
+    "gcp.vertex.agent.llm_request",
+    "gcp.vertex.agent.llm_response",
+    "gcp.vertex.agent.tool_call_args",
+    "gcp.vertex.agent.tool_response",
+})
+
+tracer = trace.get_tracer("t1d_swarm")
+
+
+def span_kind(name: str) -> str:
+    """Classify a span by the naming ADK (and TracedLoopAgent) use."""
+    if name.startswith("agent_run"):
+        return "agent"
+    if name == "call_llm":
+        return "model_call"
+    if name.startswith("execute_tool"):
+        return "tool_call"
+    if name.startswith("loop_iteration"):
+        return "loop_iteration"
+    return name
+
+
+def span_to_dict(span: ReadableSpan) -> Dict[str, Any]:
+    """OTLP/JSON-shaped record for a finished span, without bulky payload attributes."""
+    parent = span.parent
+    return {
+        "traceId": format(span.context.trace_id, "032x"),
+        "spanId": format(span.context.span_id, "016x"),
+        "parentSpanId": format(parent.span_id, "016x") if parent else None,
+        "name": span.name,
+        "startTimeUnixNano": span.start_time,
+        "endTimeUnixNano": span.end_time,
+        "status": span.status.status_code.name,
+        "attributes": {k: v for k, v in (span.attributes or {}).items() if k not in BULKY_ATTRIBUTES},
+    }
+
+
+def annotate_current_span(**attributes: Any):
+    """Set attributes on the active span; None values are skipped. Time Complexity: O(a)"""
+    span = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            span.set_attribute(key, value)
+
+
+def tag_pipeline_span(callback_context: Any):
+    """Stamp session/scenario ids on the current (root agent) span from a callback context."""
+    annotate_current_span(**{
+        SESSION_ATTRIBUTE: get_session_id(callback_context),
+        SCENARIO_ATTRIBUTE: callback_context.state.get("scenario_id"),
+    })
+
+
+def add_span_processor(processor: SpanProcessor) -> bool:
+    """Attach a processor to the global SDK TracerProvider; False if there is none."""
+    provider = trace.get_tracer_provider()
+    if not hasattr(provider, "add_span_processor"):
+        return False
+    provider.add_span_processor(processor)
+    return True
+
+
+class TracedLoopAgent(LoopAgent):
+    """
+    LoopAgent that wraps each iteration in a `loop_iteration [n]` span.
+
+    Iteration semantics are identical to LoopAgent (stop on escalate or
+    max_iterations); the span also records the verification confidence the
+    iteration ended with.
+    """
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        times_looped = 0
+        while not self.max_iterations or times_looped < self.max_iterations:
+            with tracer.start_as_current_span(f"loop_iteration [{times_looped + 1}]") as span:
+                span.set_attribute(ITERATION_ATTRIBUTE, times_looped + 1)
+                escalated = False
+                for sub_agent in self.sub_agents:
+                    events = sub_agent.run_async(ctx)
+                    try:
+                        async for event in events:
+                            yield event
+                            if event.actions.escalate:
+                                escalated = True
+                                break
+                    finally:
+                        # Close here rather than at garbage collection so the
+                        # sub-agent's span is ended in the context that opened it
+                        await events.aclose()
+                    if escalated:
+                        break
+                verification = ctx.session.state.get("verification_output")
+                if isinstance(verification, dict) and verification.get("verification_confidence") is not None:
+                    span.set_attribute(CONFIDENCE_ATTRIBUTE, float(verification["verification_confidence"]))
+            if escalated:
+                return
+            times_looped += 1
+
+
+class JsonlSpanExporter(SpanExporter):
+    """
+    Appends finished spans as JSON lines - a local, OTLP/JSON-compatible stand-in
+    for a trace collector. Runs on the BatchSpanProcessor worker thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(json.dumps(span_to_dict(span), default=str) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"⚠️ Trace export failed: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+class SessionTraceCollector(SpanProcessor):
+    """
+    Span processor that propagates T1D attributes down the span tree and keeps
+    recent traces in memory, indexed by session, for the waterfall endpoint.
+
+    Thread Safety: Internal lock around the trace/session indexes
+    """
+
+    def __init__(self, max_traces: int = 500, max_spans_per_trace: int = 2000):
+        """
+        Args:
+            max_traces (int): Traces kept in memory (least recently finished evicted first)
+            max_spans_per_trace (int): Cap per trace; further spans are counted but dropped
+        """
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+        self._trace_sessions: Dict[int, str] = {}
+        self._session_traces: Dict[str, Set[int]] = {}
+        self.dropped_spans = 0
+        self._lock = threading.Lock()
+        self._installed = False
+
+    def on_start(self, span, parent_context=None):
+        parent = trace.get_current_span(parent_context)
+        parent_attributes = getattr(parent, "attributes", None)
+        if not parent_attributes:
+            return
+        for key in INHERITED_ATTRIBUTES:
+            value = parent_attributes.get(key)
+            if value is not None:
+                span.set_attribute(key, value)
+
+    def on_end(self, span: ReadableSpan):
+        record = span_to_dict(span)
+        attributes = record["attributes"]
+        session_id = attributes.get(SESSION_ATTRIBUTE) or attributes.get(ADK_SESSION_ATTRIBUTE)
+        trace_id = span.context.trace_id
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                spans = self._traces[trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._evict(next(iter(self._traces)))
+            else:
+                self._traces.move_to_end(trace_id)
+            if len(spans) < self.max_spans_per_trace:
+                spans.append(record)
+            else:
+                self.dropped_spans += 1
+            if session_id and trace_id not in self._trace_sessions:
+                self._trace_sessions[trace_id] = session_id
+                self._session_traces.setdefault(session_id, set()).add(trace_id)
+
+    def _evict(self, trace_id: int):
+        self._traces.pop(trace_id, None)
+        session_id = self._trace_sessions.pop(trace_id, None)
+        if session_id:
+            traces = self._session_traces.get(session_id)
+            if traces is not None:
+                traces.discard(trace_id)
+                if not traces:
+                    del self._session_traces[session_id]
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+    def install(self, export_path: Optional[str] = None) -> bool:
+        """
+        Attach this collector (and the file / OTLP exporters) to the global
+        TracerProvider. Call after get_fast_api_app, which installs ADK's provider.
+
+        Returns:
+            bool: False when the global provider is not an SDK provider
+        """
+        if self._installed:
+            return True
+        if not add_span_processor(self):
+            logger.warning("⚠️ Tracing disabled: no SDK TracerProvider installed")
+            return False
+        provider = trace.get_tracer_provider()
+        if export_path:
+            provider.add_span_processor(BatchSpanProcessor(JsonlSpanExporter(export_path)))
+            logger.info(f"🧭 Exporting trace spans to {export_path}")
+        if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") and OTLPSpanExporter is not None:
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            logger.info(f"🧭 Exporting trace spans to {os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT')}")
+        self._installed = True
+        return True
+
+    def waterfall(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Waterfall view of every recorded trace for a session.
+
+        Spans are ordered by start time with their depth in the tree and offsets
+        relative to the earliest span, so a client can draw bars directly.
+
+        Returns:
+            Dict with spans and totals, or None when the session has no traces
+
+        Time Complexity: O(s log s) for s spans
+        """
+        with self._lock:
+            trace_ids = self._session_traces.get(session_id)
+            if not trace_ids:
+                return None
+            spans = [dict(s) for trace_id in trace_ids for s in self._traces.get(trace_id, [])]
+        if not spans:
+            return None
+
+        spans.sort(key=lambda s: (s["startTimeUnixNano"] or 0, -(s["endTimeUnixNano"] or 0)))
+        by_id = {s["spanId"]: s for s in spans}
+        origin = spans[0]["startTimeUnixNano"] or 0
+        end = max(s["endTimeUnixNano"] or origin for s in spans)
+
+        depths: Dict[str, int] = {}
+
+        def depth(span: Dict[str, Any]) -> int:
+            # Parents start before children, so they are already resolved in sorted order
+            parent = by_id.get(span["parentSpanId"])
+            return depths.get(parent["spanId"], 0) + 1 if parent else 0
+
+        rows = []
+        input_tokens = total_tokens = 0
+        for span in spans:
+            depths[span["spanId"]] = depth(span)
+            attributes = span["attributes"]
+            # ADK records total_token_count under gen_ai.usage.output_tokens
+            input_tokens += attributes.get("gen_ai.usage.input_tokens") or 0
+            total_tokens += attributes.get("gen_ai.usage.output_tokens") or 0
+            start = span["startTimeUnixNano"] or origin
+            rows.append({
+                "span_id": span["spanId"],
+                "parent_span_id": span["parentSpanId"],
+                "trace_id": span["traceId"],
+                "name": span["name"],
+                "kind": span_kind(span["name"]),
+                "depth": depths[span["spanId"]],
+                "start_offset_ms": round((start - origin) / 1e6, 2),
+                "duration_ms": round(((span["endTimeUnixNano"] or start) - start) / 1e6, 2),
+                "status": span["status"],
+                "attributes": attributes,
+            })
+
+        return {
+            "session_id": session_id,
+            "trace_count": len(trace_ids),
+            "span_count": len(rows),
+            "total_duration_ms": round((end - origin) / 1e6, 2),
+            "input_tokens": input_tokens,
+            "total_tokens": total_tokens,
+            "spans": rows,
+        }
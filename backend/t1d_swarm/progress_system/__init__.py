@@ -1,9 +1,19 @@
+import logging
+import os
+
+from .backpressure import POLICIES
 from .tracker import ProgressTracker
+from .wire_format import CONTENT_FORMAT_HEADER, negotiate_wire_format
 from .agent_wrapper import setup_agent_monitoring
 from .real_agent_tracker import RealAgentTracker
 
+logger = logging.getLogger(__name__)
+
 # Global progress tracker instance
-progress_tracker = ProgressTracker()
+progress_tracker = ProgressTracker(
+    default_policy=os.getenv("SSE_BACKPRESSURE_POLICY", "coalesce"),
+    batch_window=float(os.getenv("PROGRESS_BATCH_WINDOW_MS", "5")) / 1000,
+)
 real_agent_tracker = RealAgentTracker(progress_tracker)
 
 def setup_progress_tracking(app):
@@ -12,12 +22,20 @@ def setup_progress_tracking(app):
     # Try to setup agent monitoring with the actual Google ADK callback system
     try:
         setup_agent_monitoring(progress_tracker)
-        print("✅ Progress tracking integrated with agent callback system")
+        logger.info("✅ Progress tracking integrated with agent callback system")
     except Exception as e:
-        print(f"⚠️  Could not setup agent monitoring: {e}")
+        logger.warning(f"⚠️  Could not setup agent monitoring: {e}")
+    
+    @app.get("/debug/progress")
+    async def get_progress_metrics():
+        """SSE backpressure metrics: dropped / coalesced events, disconnects, buffer depth"""
+        return progress_tracker.metrics()
         
-    print("✅ Progress tracking system initialized")
+    logger.info("✅ Progress tracking system initialized")
     
     return progress_tracker, real_agent_tracker
 
-__all__ = ['setup_progress_tracking', 'progress_tracker', 'real_agent_tracker'] 
\ No newline at end of file
+__all__ = [
+    'setup_progress_tracking', 'progress_tracker', 'real_agent_tracker', 'POLICIES',
+    'CONTENT_FORMAT_HEADER', 'negotiate_wire_format',
+] 
\ No newline at end of file
@@ -1,7 +1,10 @@
 import asyncio
+import logging
 from typing import TYPE_CHECKING
 from .tracker import AGENT_CONFIG, EventType
 
+logger = logging.getLogger(__name__)
+
 if TYPE_CHECKING:
     from .tracker import ProgressTracker
 
@@ -11,19 +14,19 @@ def setup_agent_monitoring(progress_tracker: "ProgressTracker"):
     This integrates with the actual agent execution flow
     """
     
-    print("🔗 Setting up agent monitoring...")
+    logger.info("🔗 Setting up agent monitoring...")
     
     # Import the agent system
     try:
         from t1d_swarm.agent import setup_before_agent_call, t1d_swarm
-        print(f"✅ Found T1D agent system: {t1d_swarm.name}")
+        logger.info(f"✅ Found T1D agent system: {t1d_swarm.name}")
         
         # Store original callback
         original_callback = setup_before_agent_call
         
         def enhanced_callback(callback_context):
             """Enhanced callback that adds progress tracking"""
-            print(f"🎯 Agent callback triggered for context: {type(callback_context)}")
+            logger.info(f"🎯 Agent callback triggered for context: {type(callback_context)}")
             
             # Extract session ID from multiple possible sources
             session_id = None
@@ -61,7 +64,7 @@ def setup_agent_monitoring(progress_tracker: "ProgressTracker"):
             if not session_id:
                 session_id = 'default_session'
             
-            print(f"📡 Tracking progress for session: {session_id}")
+            logger.info(f"📡 Tracking progress for session: {session_id}")
             
             # Start tracking in background (don't block agent execution)
             asyncio.create_task(_track_real_agent_execution(session_id, progress_tracker, callback_context))
@@ -76,24 +79,24 @@ def setup_agent_monitoring(progress_tracker: "ProgressTracker"):
         # Also try to enhance the sub-agents
         _enhance_sub_agents(t1d_swarm, progress_tracker)
         
-        print("✅ Agent monitoring successfully integrated")
+        logger.info("✅ Agent monitoring successfully integrated")
         
     except ImportError as e:
-        print(f"❌ Failed to import T1D agent system: {e}")
+        logger.error(f"❌ Failed to import T1D agent system: {e}")
         raise
     except Exception as e:
-        print(f"❌ Error setting up agent monitoring: {e}")
+        logger.error(f"❌ Error setting up agent monitoring: {e}")
         raise
 
 def _enhance_sub_agents(main_agent, progress_tracker):
     """Enhance sub-agents with progress tracking"""
     
     if hasattr(main_agent, 'sub_agents'):
-        print(f"🔍 Found {len(main_agent.sub_agents)} sub-agents to enhance")
+        logger.info(f"🔍 Found {len(main_agent.sub_agents)} sub-agents to enhance")
         
         for sub_agent in main_agent.sub_agents:
             agent_name = sub_agent.name if hasattr(sub_agent, 'name') else str(sub_agent)
-            print(f"  📌 Enhancing sub-agent: {agent_name}")
+            logger.info(f"  📌 Enhancing sub-agent: {agent_name}")
             
             # Store original methods if they exist
             if hasattr(sub_agent, 'before_agent_callback'):
@@ -125,7 +128,7 @@ def _enhance_sub_agents(main_agent, progress_tracker):
 async def _track_real_agent_execution(session_id: str, progress_tracker: "ProgressTracker", callback_context):
     """Track the real agent execution flow"""
     
-    print(f"🚀 Starting real-time progress tracking for session: {session_id}")
+    logger.info(f"🚀 Starting real-time progress tracking for session: {session_id}")
     
     # Start main orchestrator
     await _emit_agent_start(session_id, "T1dInsightOrchestratorAgent", progress_tracker)
@@ -164,14 +167,14 @@ async def _track_real_agent_execution(session_id: str, progress_tracker: "Progre
     # Complete main orchestrator
     await _emit_agent_complete(session_id, "T1dInsightOrchestratorAgent", progress_tracker)
     
-    print(f"✅ Progress tracking complete for session: {session_id}")
+    logger.info(f"✅ Progress tracking complete for session: {session_id}")
 
 async def _track_refinement_loop(session_id: str, progress_tracker: "ProgressTracker"):
     """Track the refinement loop sub-agents"""
     
     # Simulate typical refinement loop iterations (1-3 iterations)
     for iteration in range(1, 3):
-        print(f"🔄 Tracking refinement loop iteration {iteration}")
+        logger.info(f"🔄 Tracking refinement loop iteration {iteration}")
         
         # Glycemic Risk Forecast Agent
         await asyncio.sleep(1)
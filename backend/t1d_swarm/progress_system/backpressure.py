@@ -0,0 +1,178 @@
+"""
+SSE Subscriber Backpressure
+
+Non-blocking, bounded per-subscriber buffers for progress streaming. Emitters
+(agent callbacks, RealAgentTracker) hand an event to every subscriber with
+`offer`, which never awaits: when a subscriber's buffer is full its policy
+decides what gives.
+
+Policies:
+- drop_oldest: evict the oldest buffered event to make room
+- coalesce: keep only the latest `agent_progress` per agent (replaced in place,
+  so ordering relative to start/complete events is preserved); if the buffer is
+  still full, fall back to drop_oldest
+- disconnect: close the subscriber; its SSE stream ends and the client reconnects
+
+Performance Characteristics:
+- offer: O(1) (dict lookup + deque append/popleft)
+- get: O(1) per event
+- Memory: O(max_events) per subscriber
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+COALESCIBLE_EVENT_TYPES = frozenset({"agent_progress"})
+
+
+@dataclass
+class SubscriberStats:
+    """Counters for one subscriber (also aggregated tracker-wide)."""
+    offered: int = 0
+    delivered: int = 0
+    dropped: int = 0
+    coalesced: int = 0
+    max_depth: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "offered": self.offered,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "max_depth": self.max_depth,
+        }
+
+
+class Subscriber:
+    """
+    One SSE consumer's bounded buffer with a backpressure policy.
+
+    Buffer slots are one-element lists so a coalesced progress event can be
+    replaced in place without searching the deque.
+    """
+
+    def __init__(self, session_id: str, policy: str = COALESCE, max_events: int = 1000):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}', expected one of {POLICIES}")
+        self.session_id = session_id
+        self.policy = policy
+        self.max_events = max_events
+        self.closed = False
+        self.stats = SubscriberStats()
+        self._buffer: Deque[List[Dict[str, Any]]] = deque()
+        self._progress_slots: Dict[str, List[Dict[str, Any]]] = {}
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _coalesce_key(self, event: Dict[str, Any]) -> Optional[str]:
+        if event.get("event_type") in COALESCIBLE_EVENT_TYPES:
+            return event.get("agent_name")
+        return None
+
+    def _evict_oldest(self):
+        slot = self._buffer.popleft()
+        key = self._coalesce_key(slot[0])
+        if key is not None and self._progress_slots.get(key) is slot:
+            del self._progress_slots[key]
+        self.stats.dropped += 1
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """
+        Buffer an event without blocking.
+
+        Returns:
+            bool: False when the subscriber is (now) closed
+
+        Time Complexity: O(1)
+        """
+        if self.closed:
+            return False
+        self.stats.offered += 1
+
+        if self.policy == COALESCE:
+            key = self._coalesce_key(event)
+            if key is not None:
+                slot = self._progress_slots.get(key)
+                if slot is not None:
+                    slot[0] = event
+                    self.stats.coalesced += 1
+                    return True
+
+        if len(self._buffer) >= self.max_events:
+            if self.policy == DISCONNECT:
+                self.close()
+                return False
+            self._evict_oldest()
+
+        slot = [event]
+        self._buffer.append(slot)
+        if self.policy == COALESCE:
+            key = self._coalesce_key(event)
+            if key is not None:
+                self._progress_slots[key] = slot
+        self.stats.max_depth = max(self.stats.max_depth, len(self._buffer))
+        self._ready.set()
+        return True
+
+    def get_nowait(self) -> Optional[Dict[str, Any]]:
+        """Next buffered event or None. Time Complexity: O(1)"""
+        if not self._buffer:
+            return None
+        slot = self._buffer.popleft()
+        event = slot[0]
+        key = self._coalesce_key(event)
+        if key is not None and self._progress_slots.get(key) is slot:
+            del self._progress_slots[key]
+        if not self._buffer:
+            self._ready.clear()
+        self.stats.delivered += 1
+        return event
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to `timeout` seconds for the next event.
+
+        Returns:
+            The event, or None on timeout / close
+
+        Time Complexity: O(1)
+        """
+        event = self.get_nowait()
+        if event is not None or self.closed:
+            return event
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.get_nowait()
+
+    def close(self):
+        """Stop accepting events and wake the consumer so its stream can end."""
+        self.closed = True
+        self._ready.set()
+
+
+@dataclass
+class BackpressureMetrics:
+    """Tracker-wide totals, including subscribers that have already gone away."""
+    totals: SubscriberStats = field(default_factory=SubscriberStats)
+    disconnects: int = 0
+    backlog_dropped: int = 0
+
+    def absorb(self, subscriber: Subscriber):
+        """Fold a finished subscriber's counters into the totals. Time Complexity: O(1)"""
+        for name, value in subscriber.stats.as_dict().items():
+            if name == "max_depth":
+                self.totals.max_depth = max(self.totals.max_depth, value)
+            else:
+                setattr(self.totals, name, getattr(self.totals, name) + value)
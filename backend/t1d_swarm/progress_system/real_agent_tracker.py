@@ -11,9 +11,12 @@ Performance Characteristics:
 """
 
 import asyncio
+import logging
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Tuple
 
+logger = logging.getLogger(__name__)
+
 if TYPE_CHECKING:
     from .tracker import ProgressTracker
 
@@ -47,15 +50,15 @@ class RealAgentTracker:
         Memory Impact: O(k) events bounded by ProgressTracker queue limits
         """
         if session_id in self.active_sessions:
-            print(f"⚠️ Progress tracking already active for session: {session_id}")
+            logger.warning(f"⚠️ Progress tracking already active for session: {session_id}")
             return
         
         self.active_sessions.add(session_id)
         
         try:
-            print(f"📡 Starting progress tracking for REAL session: {session_id}")
+            logger.info(f"📡 Starting progress tracking for REAL session: {session_id}")
             if scenario_id:
-                print(f"📋 Using scenario: {scenario_id}")
+                logger.info(f"📋 Using scenario: {scenario_id}")
             
             # Initialize orchestrator with immediate feedback
             await self.progress_tracker.emit_event(session_id, {
@@ -85,7 +88,7 @@ class RealAgentTracker:
             for i, (agent_name, icon, message, duration) in enumerate(agents_flow):
                 # Early termination check for session cleanup
                 if session_id not in self.active_sessions:
-                    print(f"🛑 Progress tracking stopped for session: {session_id}")
+                    logger.info(f"🛑 Progress tracking stopped for session: {session_id}")
                     return
                 
                 # Small delay for natural pacing
@@ -156,10 +159,10 @@ class RealAgentTracker:
                 }
             })
             
-            print(f"✅ Progress tracking completed for session: {session_id}")
+            logger.info(f"✅ Progress tracking completed for session: {session_id}")
             
         except Exception as e:
-            print(f"❌ Error in real progress tracking: {e}")
+            logger.error(f"❌ Error in real progress tracking: {e}")
             await self.progress_tracker.emit_event(session_id, {
                 "session_id": session_id,
                 "agent_name": "ProgressTracker",
@@ -240,4 +243,4 @@ class RealAgentTracker:
         Time Complexity: O(1) - Simple set operation
         """
         self.active_sessions.discard(session_id)
-        print(f"🛑 Progress tracking stopped for session: {session_id}") 
\ No newline at end of file
+        logger.info(f"🛑 Progress tracking stopped for session: {session_id}") 
\ No newline at end of file
@@ -1,6 +1,11 @@
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Header, Query
 from fastapi.responses import StreamingResponse
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
+
+logger = logging.getLogger(__name__)
+
+from .wire_format import CONTENT_FORMAT_HEADER, negotiate_wire_format
 
 if TYPE_CHECKING:
     from .tracker import ProgressTracker
@@ -9,21 +14,32 @@ def setup_sse_routes(app: FastAPI, progress_tracker: "ProgressTracker"):
     """Add SSE routes to the FastAPI app"""
     
     @app.get("/stream-progress/{session_id}")
-    async def stream_agent_progress(session_id: str):
+    async def stream_agent_progress(
+        session_id: str,
+        policy: Optional[str] = Query(None, pattern="^(drop_oldest|coalesce|disconnect)$"),
+        format: Optional[str] = Query(None, pattern="^(json|compact)$"),
+        x_progress_format: Optional[str] = Header(None),
+    ):
         """
         Server-Sent Events endpoint for real-time agent progress
         
         Usage from frontend:
         const eventSource = new EventSource('/stream-progress/' + sessionId);
+        Optional `?policy=` selects this client's backpressure policy.
+        `X-Progress-Format: compact` (or `?format=compact`) selects the compact-v1
+        wire format; JSON events remain the default.
         """
+        wire_format = negotiate_wire_format(x_progress_format, format)
         return StreamingResponse(
-            progress_tracker.get_events_stream(session_id),
+            progress_tracker.stream(session_id, policy, wire_format),
             media_type="text/event-stream",
             headers={
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
                 "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Cache-Control"
+                "Access-Control-Allow-Headers": f"Cache-Control, {CONTENT_FORMAT_HEADER}",
+                "Access-Control-Expose-Headers": CONTENT_FORMAT_HEADER,
+                CONTENT_FORMAT_HEADER: wire_format,
             }
         )
     
@@ -33,4 +49,4 @@ def setup_sse_routes(app: FastAPI, progress_tracker: "ProgressTracker"):
         progress_tracker.cleanup_session(session_id)
         return {"message": f"Session {session_id} cleaned up"}
     
-    print("✅ SSE progress endpoints registered: /stream-progress/{session_id}") 
\ No newline at end of file
+    logger.info("✅ SSE progress endpoints registered: /stream-progress/{session_id}") 
\ No newline at end of file
@@ -1,9 +1,18 @@
 import asyncio
 import json
+import logging
+import time
 from datetime import datetime
-from typing import Dict, Optional, Any, Union
+from typing import Callable, Dict, Optional, Any, Set, Union
 from dataclasses import dataclass
 
+from .backpressure import (
+    COALESCE, DROP_OLDEST, POLICIES, BackpressureMetrics, Subscriber, SubscriberStats,
+)
+from .wire_format import COMPACT_HEARTBEAT, WIRE_FORMAT_COMPACT, WIRE_FORMAT_JSON, CompactEncoder
+
+logger = logging.getLogger(__name__)
+
 @dataclass
 class ProgressEvent:
     event_type: str
@@ -19,30 +28,75 @@ class ProgressTracker:
     """
     Manages real-time progress tracking for agent execution sessions.
     
-    Uses asyncio queues for thread-safe event distribution to connected clients.
-    Implements memory-conscious session management to prevent unbounded growth.
+    Each SSE connection is a Subscriber with its own bounded buffer and
+    backpressure policy (drop_oldest, coalesce, disconnect), so a slow or
+    stalled client can never block the agent run that emits into it.
+    Events emitted before any client connects are held in a bounded
+    per-session backlog and handed to the first subscriber.
     
     Time Complexity Analysis:
-    - emit_event: O(1) - Queue put operation
+    - emit_event: O(s) for s subscribers of the session, never awaits
     - get_events_stream: O(1) per event yielded
+    - get_compact_events_stream: O(n) per batch of n events (one frame per batch window)
     - Session management: O(1) for add/remove operations
     """
     
-    def __init__(self, max_events_per_session: int = 1000):
-        # Using bounded queues to prevent memory leaks
-        # Time Complexity: O(1) for queue operations
-        self.session_queues: Dict[str, asyncio.Queue] = {}
+    def __init__(self, max_events_per_session: int = 1000, heartbeat_interval: float = 30.0,
+                 default_policy: str = COALESCE, batch_window: float = 0.005, max_batch_size: int = 256):
+        # Bounded per-subscriber buffers prevent memory leaks
+        # Time Complexity: O(1) for buffer operations
+        if default_policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{default_policy}', expected one of {POLICIES}")
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+        self.backlogs: Dict[str, Subscriber] = {}
         self.active_sessions: set = set()
         self.max_events_per_session = max_events_per_session
+        self.heartbeat_interval = heartbeat_interval
+        self.default_policy = default_policy
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.backpressure = BackpressureMetrics()
+        # Abandonment hooks: the last stream of a session left / a stream (re)connected
+        self.on_session_idle: Optional[Callable[[str], Any]] = None
+        self.on_session_resumed: Optional[Callable[[str], Any]] = None
+        
+    def publish(self, session_id: str, event: Dict[str, Any]):
+        """
+        Hand an event to every subscriber of the session without blocking.
+        
+        Subscribers closed by the disconnect policy are detached here; their
+        streams end on the next read.
+        
+        Time Complexity: O(s) for s subscribers, O(1) each
+        """
+        subscribers = self.subscribers.get(session_id)
+        if not subscribers:
+            backlog = self.backlogs.get(session_id)
+            if backlog is None:
+                backlog = self.backlogs[session_id] = Subscriber(
+                    session_id, DROP_OLDEST, self.max_events_per_session
+                )
+            dropped = backlog.stats.dropped
+            backlog.offer(event)
+            if backlog.stats.dropped > dropped:
+                self.backpressure.backlog_dropped += 1
+            return
+        
+        for subscriber in list(subscribers):
+            if not subscriber.offer(event) and subscriber.closed:
+                subscribers.discard(subscriber)
+                self.backpressure.disconnects += 1
+                logger.warning(f"⚠️ Session {session_id} slow SSE subscriber disconnected (buffer full)")
         
     async def emit_event(self, session_id: str, event_data: Union[Dict[str, Any], str], agent_name: str = None, 
                         message: str = None, data: Optional[Dict[str, Any]] = None, 
                         level: int = 0, icon: str = "🔄", parent_agent: str = None):
         """
-        Emit a progress event to the session queue.
+        Emit a progress event to the session's subscribers.
         
         Supports both new frontend format (dict) and legacy format (individual params).
-        Automatically manages queue size to prevent memory exhaustion.
+        Never waits on a consumer: full subscriber buffers are handled by their
+        backpressure policy (see backpressure.py).
         
         Args:
             session_id: Unique identifier for the session
@@ -54,8 +108,8 @@ class ProgressTracker:
             icon: Display icon for the event
             parent_agent: Name of parent agent (for nested execution)
             
-        Time Complexity: O(1) - Queue operations are constant time
-        Space Complexity: O(1) per event, bounded by max_events_per_session
+        Time Complexity: O(s) for s subscribers - no awaits on consumers
+        Space Complexity: O(1) per event, bounded by max_events_per_session per subscriber
         """
         
         # Handle new frontend format (dict input)
@@ -93,31 +147,48 @@ class ProgressTracker:
             if level is not None:
                 final_event["data"]["level"] = level
         
-        # Ensure session queue exists with bounded size
-        if session_id not in self.session_queues:
-            # Using maxsize to prevent unbounded memory growth
-            self.session_queues[session_id] = asyncio.Queue(maxsize=self.max_events_per_session)
-            
-        # Handle queue overflow gracefully
-        try:
-            await self.session_queues[session_id].put(final_event)
-        except asyncio.QueueFull:
-            # Remove oldest event and add new one (FIFO behavior)
-            try:
-                self.session_queues[session_id].get_nowait()
-                await self.session_queues[session_id].put(final_event)
-                print(f"⚠️ Session {session_id} queue overflow - removed oldest event")
-            except asyncio.QueueEmpty:
-                pass  # Queue somehow became empty, just continue
+        self.publish(session_id, final_event)
         
         # Log event for debugging
         agent_name_display = final_event.get("agent_name", "Unknown")
         event_type = final_event.get("event_type", "unknown")
         message_display = final_event.get("data", {}).get("message", "")
         icon_display = final_event.get("data", {}).get("icon", "📡")
-        print(f"📡 [{session_id}] {icon_display} {agent_name_display}: {event_type} - {message_display}")
+        logger.info(f"📡 [{session_id}] {icon_display} {agent_name_display}: {event_type} - {message_display}")
         
-    async def get_events_stream(self, session_id: str):
+    def subscribe(self, session_id: str, policy: Optional[str] = None) -> Subscriber:
+        """
+        Register a new subscriber, handing it any backlog emitted before it connected.
+        
+        Raises:
+            ValueError: For an unknown policy
+            
+        Time Complexity: O(k) where k is the backlog size (bounded)
+        """
+        subscriber = Subscriber(session_id, policy or self.default_policy, self.max_events_per_session)
+        backlog = self.backlogs.pop(session_id, None)
+        if backlog is not None:
+            while (event := backlog.get_nowait()) is not None:
+                subscriber.offer(event)
+        self.subscribers.setdefault(session_id, set()).add(subscriber)
+        self.active_sessions.add(session_id)
+        if self.on_session_resumed is not None:
+            self.on_session_resumed(session_id)
+        return subscriber
+        
+    def unsubscribe(self, subscriber: Subscriber):
+        """Detach a subscriber and fold its counters into the tracker totals. Time Complexity: O(1)"""
+        subscriber.close()
+        self.backpressure.absorb(subscriber)
+        subscribers = self.subscribers.get(subscriber.session_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._cleanup_session_resources(subscriber.session_id)
+                if self.on_session_idle is not None:
+                    self.on_session_idle(subscriber.session_id)
+        
+    async def get_events_stream(self, session_id: str, policy: Optional[str] = None):
         """
         Generator for SSE events for a specific session - Frontend format.
         
@@ -126,6 +197,7 @@ class ProgressTracker:
         
         Args:
             session_id: Unique session identifier
+            policy: Backpressure policy for this subscriber (default_policy if None)
             
         Yields:
             str: SSE-formatted event data
@@ -133,11 +205,7 @@ class ProgressTracker:
         Time Complexity: O(1) per event - constant time event processing
         Memory Complexity: O(k) where k is bounded by max_events_per_session
         """
-        self.active_sessions.add(session_id)
-        
-        # Create bounded queue if it doesn't exist
-        if session_id not in self.session_queues:
-            self.session_queues[session_id] = asyncio.Queue(maxsize=self.max_events_per_session)
+        subscriber = self.subscribe(session_id, policy)
             
         try:
             # Send initial connection event
@@ -146,37 +214,19 @@ class ProgressTracker:
                 "agent_name": "ProgressTracker",
                 "event_type": "connection",
                 "timestamp": datetime.utcnow().isoformat(),
-                "data": {"message": "Progress tracking connected"}
+                "data": {"message": "Progress tracking connected", "backpressure_policy": subscriber.policy}
             }
             yield f"data: {json.dumps(connection_event)}\n\n"
             
-            # Send any pending events that accumulated before SSE connection
-            # O(k) where k is the number of pending events (bounded)
-            pending_events = []
-            while not self.session_queues[session_id].empty():
-                try:
-                    pending_event = self.session_queues[session_id].get_nowait()
-                    pending_events.append(pending_event)
-                except asyncio.QueueEmpty:
-                    break
-            
-            # Send all pending events
-            for event in pending_events:
-                yield f"data: {json.dumps(event)}\n\n"
-            
-            # Stream events from the queue with heartbeat mechanism
-            while session_id in self.active_sessions:
-                try:
-                    # Wait for event with timeout to enable heartbeat
-                    event = await asyncio.wait_for(
-                        self.session_queues[session_id].get(), 
-                        timeout=30.0
-                    )
-                    
+            # Stream events (backlog first) with heartbeat mechanism
+            while session_id in self.active_sessions and not subscriber.closed:
+                # Wait for event with timeout to enable heartbeat
+                event = await subscriber.get(timeout=self.heartbeat_interval)
+                
+                if event is not None:
                     # Send event in frontend-expected format
                     yield f"data: {json.dumps(event)}\n\n"
-                    
-                except asyncio.TimeoutError:
+                elif not subscriber.closed:
                     # Send heartbeat to keep connection alive
                     heartbeat_event = {
                         "session_id": session_id,
@@ -186,35 +236,115 @@ class ProgressTracker:
                         "data": {}
                     }
                     yield f"data: {json.dumps(heartbeat_event)}\n\n"
+            
+            if subscriber.closed and session_id in self.active_sessions:
+                # Disconnect policy tripped: tell the client to reconnect
+                closed_event = {
+                    "session_id": session_id,
+                    "agent_name": "ProgressTracker",
+                    "event_type": "disconnect",
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "data": {"message": "Subscriber too slow - reconnect to resume", "reason": "slow_consumer"}
+                }
+                yield f"data: {json.dumps(closed_event)}\n\n"
                     
         except asyncio.CancelledError:
             pass
         finally:
             # Cleanup when client disconnects - O(1) operations
-            self._cleanup_session_resources(session_id)
+            self.unsubscribe(subscriber)
+
+    async def _next_batch(self, subscriber: Subscriber, first: Dict[str, Any]):
+        """
+        Collect events arriving within batch_window of `first` into one batch.
+        
+        Time Complexity: O(n) for n events, bounded by max_batch_size
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            event = subscriber.get_nowait()
+            if event is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or subscriber.closed:
+                    break
+                event = await subscriber.get(timeout=remaining)
+                if event is None:
+                    break
+            batch.append(event)
+        return batch
+        
+    async def get_compact_events_stream(self, session_id: str, policy: Optional[str] = None):
+        """
+        Generator for SSE events in the compact-v1 wire format (see wire_format.py).
+        
+        Same subscription, backpressure and lifecycle as get_events_stream, but
+        agent names / event types are sent once as dict frames and events
+        emitted within batch_window of each other share one batch frame.
+        
+        Args:
+            session_id: Unique session identifier
+            policy: Backpressure policy for this subscriber (default_policy if None)
+            
+        Yields:
+            str: SSE-formatted dict / batch frames and comment heartbeats
+            
+        Time Complexity: O(n) per batch of n events
+        Memory Complexity: O(k) where k is bounded by max_events_per_session
+        """
+        subscriber = self.subscribe(session_id, policy)
+        encoder = CompactEncoder(int(time.time() * 1000))
+        
+        try:
+            yield encoder.hello()
+            yield encoder.encode([{
+                "agent_name": "ProgressTracker",
+                "event_type": "connection",
+                "data": {"message": "Progress tracking connected", "backpressure_policy": subscriber.policy},
+            }])
+            
+            while session_id in self.active_sessions and not subscriber.closed:
+                event = await subscriber.get(timeout=self.heartbeat_interval)
+                
+                if event is not None:
+                    yield encoder.encode(await self._next_batch(subscriber, event))
+                elif not subscriber.closed:
+                    yield COMPACT_HEARTBEAT
+            
+            if subscriber.closed and session_id in self.active_sessions:
+                yield encoder.encode([{
+                    "agent_name": "ProgressTracker",
+                    "event_type": "disconnect",
+                    "data": {"message": "Subscriber too slow - reconnect to resume", "reason": "slow_consumer"},
+                }])
+                    
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.unsubscribe(subscriber)
+                        
+    def stream(self, session_id: str, policy: Optional[str] = None, wire_format: str = WIRE_FORMAT_JSON):
+        """SSE generator for the negotiated wire format (json unless compact was requested)."""
+        if wire_format == WIRE_FORMAT_COMPACT:
+            return self.get_compact_events_stream(session_id, policy)
+        return self.get_events_stream(session_id, policy)
                         
     def _cleanup_session_resources(self, session_id: str):
         """
         Clean up resources for a session to prevent memory leaks.
         
-        Removes session from active tracking and clears associated queue.
-        Called automatically when SSE connection closes.
+        Closes any remaining subscribers and drops the pre-connection backlog.
+        Called automatically when the last SSE connection closes.
         
         Args:
             session_id: Session to clean up
             
-        Time Complexity: O(k) where k is remaining events in queue
+        Time Complexity: O(s) where s is remaining subscribers
         """
         self.active_sessions.discard(session_id)
-        if session_id in self.session_queues:
-            # Clear any remaining events to free memory
-            while not self.session_queues[session_id].empty():
-                try:
-                    self.session_queues[session_id].get_nowait()
-                except asyncio.QueueEmpty:
-                    break
-            # Remove the queue reference
-            del self.session_queues[session_id]
+        for subscriber in self.subscribers.pop(session_id, set()):
+            subscriber.close()
+        self.backlogs.pop(session_id, None)
                         
     def cleanup_session(self, session_id: str):
         """
@@ -223,12 +353,70 @@ class ProgressTracker:
         Args:
             session_id: Session identifier to clean up
             
-        Time Complexity: O(k) where k is remaining events in queue
+        Time Complexity: O(s) where s is remaining subscribers
         """
         self._cleanup_session_resources(session_id)
+        
+    def queue_position(self, session_id: str, position: int, priority: str):
+        """
+        Publish a run's place in the admission queue (0 = admitted, starting now).
+        
+        Time Complexity: O(s) for s subscribers
+        """
+        message = "▶️ Starting analysis" if position == 0 else f"⏳ Queued - position {position}"
+        self.publish(session_id, {
+            "session_id": session_id,
+            "agent_name": "T1dInsightOrchestratorAgent",
+            "event_type": EventType.QUEUED,
+            "timestamp": datetime.utcnow().isoformat(),
+            "data": {"message": message, "position": position, "priority": priority},
+        })
+        
+    def cancel_session(self, session_id: str, reason: str):
+        """
+        Tell connected clients the analysis was cancelled; drop the backlog if
+        nobody is connected. Open streams end when their clients disconnect.
+        
+        Time Complexity: O(s) for s subscribers
+        """
+        self.publish(session_id, {
+            "session_id": session_id,
+            "agent_name": "T1dInsightOrchestratorAgent",
+            "event_type": EventType.AGENT_ERROR,
+            "timestamp": datetime.utcnow().isoformat(),
+            "data": {"message": "🛑 Analysis cancelled", "reason": reason, "cancelled": True},
+        })
+        if not self.subscribers.get(session_id):
+            self._cleanup_session_resources(session_id)
+        
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Backpressure counters: totals over finished and live subscribers plus
+        disconnects and backlog drops.
+        
+        Time Complexity: O(s) over live subscribers
+        """
+        totals = BackpressureMetrics(
+            totals=SubscriberStats(**self.backpressure.totals.as_dict()),
+            disconnects=self.backpressure.disconnects,
+            backlog_dropped=self.backpressure.backlog_dropped,
+        )
+        live = [subscriber for subscribers in self.subscribers.values() for subscriber in subscribers]
+        for subscriber in live:
+            totals.absorb(subscriber)
+        return {
+            **totals.totals.as_dict(),
+            "disconnects": totals.disconnects,
+            "backlog_dropped": totals.backlog_dropped,
+            "active_subscribers": len(live),
+            "buffered_events": sum(len(subscriber) for subscriber in live),
+            "backlog_sessions": len(self.backlogs),
+            "default_policy": self.default_policy,
+        }
 
 # Agent event types
 class EventType:
+    QUEUED = "queued"
     AGENT_START = "agent_start"
     AGENT_PROGRESS = "agent_progress"
     AGENT_COMPLETE = "agent_complete"
@@ -0,0 +1,127 @@
+"""
+Compact Progress Wire Format (compact-v1)
+
+The JSON format repeats session_id, agent_name, parent_agent and an ISO
+timestamp in every event. compact-v1 sends names once per stream and batches
+events emitted close together:
+
+    event: dict
+    data: {"v": 1, "t0": 1718000000000, "agents": {"0": "T1dInsightOrchestratorAgent"}, "types": {"0": "agent_start"}}
+
+    event: batch
+    data: [[12, 0, 0, -1, {"message": "...", "progress": 0.0}], [15, 1, 0, 0, {...}]]
+
+- dict frames carry only entries the client has not seen yet (t0/v on the first)
+- each batch row is [ms since t0, agent id, event type id, parent agent id or -1, data]
+- session_id is implied by the stream URL
+- non-ASCII (emoji in messages) is sent as UTF-8, which SSE mandates, not \\u escapes
+- keep-alive is an SSE comment (": hb"), invisible to EventSource handlers
+
+Negotiated per request with `X-Progress-Format: compact` (or `?format=compact`
+for EventSource clients, which cannot set headers); the default stays the JSON
+format the Angular frontend consumes today.
+
+Performance Characteristics:
+- encode: O(1) per event plus O(n) for a batch of n events
+- Memory: O(a + t) per stream for a agent names and t event types
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+WIRE_FORMAT_JSON = "json"
+WIRE_FORMAT_COMPACT = "compact"
+COMPACT_VERSION = 1
+CONTENT_FORMAT_HEADER = "X-Progress-Format"
+
+COMPACT_HEARTBEAT = ": hb\n\n"
+
+
+def negotiate_wire_format(header_value: Optional[str], query_value: Optional[str] = None) -> str:
+    """Pick the stream format from the request header / query parameter. Time Complexity: O(1)"""
+    requested = (query_value or header_value or "").strip().lower()
+    return WIRE_FORMAT_COMPACT if requested.startswith(WIRE_FORMAT_COMPACT) else WIRE_FORMAT_JSON
+
+
+def _epoch_ms(timestamp: Optional[str], default_ms: int) -> int:
+    # Emitters use naive datetime.utcnow().isoformat(); treat naive values as UTC
+    if not timestamp:
+        return default_ms
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return default_ms
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+class CompactEncoder:
+    """
+    Per-stream compact-v1 encoder holding the agent and event-type dictionaries.
+
+    Not shared between streams: ids are only meaningful to the client that
+    received the matching dict frames.
+    """
+
+    def __init__(self, t0_ms: int):
+        self.t0_ms = t0_ms
+        self.agents: Dict[str, int] = {}
+        self.types: Dict[str, int] = {}
+        self._new_agents: Dict[str, str] = {}
+        self._new_types: Dict[str, str] = {}
+        self._sent_header = False
+
+    def _agent_id(self, name: Optional[str]) -> int:
+        if not name:
+            return -1
+        agent_id = self.agents.get(name)
+        if agent_id is None:
+            agent_id = self.agents[name] = len(self.agents)
+            self._new_agents[str(agent_id)] = name
+        return agent_id
+
+    def _type_id(self, event_type: str) -> int:
+        type_id = self.types.get(event_type)
+        if type_id is None:
+            type_id = self.types[event_type] = len(self.types)
+            self._new_types[str(type_id)] = event_type
+        return type_id
+
+    def row(self, event: Dict[str, Any]) -> List[Any]:
+        """One batch row for an event in the JSON progress format. Time Complexity: O(1)"""
+        return [
+            _epoch_ms(event.get("timestamp"), self.t0_ms) - self.t0_ms,
+            self._agent_id(event.get("agent_name")),
+            self._type_id(event.get("event_type", "agent_progress")),
+            self._agent_id(event.get("parent_agent")),
+            event.get("data") or {},
+        ]
+
+    def _dict_frame(self) -> Optional[str]:
+        if not (self._new_agents or self._new_types or not self._sent_header):
+            return None
+        payload: Dict[str, Any] = {}
+        if not self._sent_header:
+            payload.update(v=COMPACT_VERSION, t0=self.t0_ms)
+            self._sent_header = True
+        payload.update(agents=self._new_agents, types=self._new_types)
+        self._new_agents, self._new_types = {}, {}
+        return f"event: dict\ndata: {json.dumps(payload, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+    def encode(self, events: Iterable[Dict[str, Any]]) -> str:
+        """
+        SSE text for a batch: a dict frame for any new names, then one batch frame.
+
+        Time Complexity: O(n) for n events
+        """
+        rows = [self.row(event) for event in events]
+        frames = self._dict_frame() or ""
+        if rows:
+            frames += f"event: batch\ndata: {json.dumps(rows, separators=(',', ':'), ensure_ascii=False)}\n\n"
+        return frames
+
+    def hello(self) -> str:
+        """Opening frame: version, t0 and the (initially empty) dictionaries."""
+        return self._dict_frame() or ""
@@ -0,0 +1,244 @@
+"""
+Shared output schemas and fast validation path
+
+Single home for every structured agent output (`CGMDataOutput`,
+`ContextEventOutput`, `RiskForecastOutput`, `VerificationOutput`, `ScenarioDict`)
+plus TypeAdapters built once at import time.
+
+Parse-once semantics: agent output is validated a single time, straight from the
+raw JSON text (pydantic-core parses and validates in one pass), and the validated
+JSON-mode dict is what gets stored in session state. Downstream consumers read
+that dict instead of re-running json.loads + model validation.
+
+Performance Characteristics:
+- Validators are compiled once per process, not per call
+- validate_output on clean JSON: single Rust-side parse+validate, no intermediate dict
+- Fenced / chatty LLM text falls back to extract_json_from_llm_output, then validate_python
+"""
+
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+
+
+def utc_timestamp() -> str:
+    """ISO 8601 UTC timestamp with 'Z' suffix, used as a schema default."""
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+
+def new_forecast_id() -> str:
+    """Unique forecast identifier, used as a schema default."""
+    return str(uuid.uuid4())
+
+
+# --- Pydantic Schema for CGMDataOutput ---
+# This is what the Simulated_CGM_Feed_Agent will output.
+
+class CGMDataOutput(BaseModel):
+    """
+    Pydantic schema for the structured output of the Simulated_CGM_Feed_Agent.
+    """
+    glucose_value: Optional[int] = Field(
+        default=None,
+        description="The blood glucose reading in mg/dL. Can be null if there's a sensor error or missing data."
+    )
+    trend_arrow: str = Field(
+        description="An arrow showing how quickly the patients glucose is rising,"
+                    "return 'DoubleUp' to indicate patients glucose is rising rapidly,"
+                    "return 'SingleUp' to indicate patients glucose is rising,"
+                    "return 'FortyFiveUp' to indicate patients glucose is rising slowly,"
+                    "return 'Flat' to indicate patients glucose is constant,"
+                    "return 'FortyFiveDown' to indicate patients glucose is falling slowly,"
+                    "return 'SingleDown' to indicate patients glucose is falling,"
+                    "return 'DoubleDown' to indicate patients glucose is falling rapidly,"
+                    "return 'NOT_COMPUTABLE' to indicate the CGM has no reading of patients glucose,"
+                    "return 'Error' to indicate issues with CGM reading",)
+    unit: str = Field(
+        default="mg/dL",
+        description="Unit for the glucose value, typically 'mg/dL'."
+    )
+    data_quality_issues: Optional[str] = Field(
+        default=None,
+        description="Describes any sensor data quality issues (e.g., 'missing_data', 'erratic_readings', 'sensor_error_X01'). Omit or null if no issues."
+    )
+    timestamp_simulated: str = Field(
+        default_factory=utc_timestamp,
+        description="ISO 8601 timestamp for when this CGM reading was simulated (UTC)."
+    )
+
+
+# --- Pydantic Schema for ContextEventOutput ---
+
+class ContextEventOutput(BaseModel):
+    """
+    Pydantic schema for the structured output of the Ambient_Context_Simulator_Agent.
+    """
+    event_type: str = Field(
+        description="The primary type of contextual event (e.g., 'meal', 'exercise', 'stress', 'illness', 'symptoms_user_reported', 'no_recent_significant_event', 'cgm_alert_review', 'other_notes')."
+    )
+    description_raw: str = Field(
+        description="A natural language description of the event, often derived directly from the input scenario."
+    )
+    parsed_details: Optional[Dict[str, Union[str, int, float, List[str]]]] = Field(
+        default_factory=dict, # Ensure it's an empty dict if no details, not None
+        description="Optional structured details extracted or inferred from the event description (e.g., {'estimated_carbs_g': 60, 'meal_type': 'lunch'}, {'exercise_type': 'running', 'intensity': 'moderate'}, {'symptoms': ['nausea', 'headache']})."
+    )
+    timestamp_event: str = Field(
+        default_factory=utc_timestamp,
+        description="ISO 8601 timestamp for when the event occurred or was logged (UTC)."
+    )
+
+
+# --- Pydantic Schemas for RiskForecastOutput ---
+
+class ShortTermOutlookSchema(BaseModel):
+    """
+    Describes the short-term glycemic outlook.
+    """
+    overall_risk_level: str = Field(
+        description="Overall assessed risk level for the short term.",
+    )
+    primary_concern: str = Field(
+        description="The main glycemic concern identified.",
+    )
+    time_horizon_hours: float = Field(
+        description="Estimated time window for this forecast in hours.",
+    )
+    narrative_summary: str = Field(
+        description="A concise, human-readable summary of the immediate risk or outlook."
+    )
+    confidence_score: float = Field(
+        description="The LLM's confidence in this short-term outlook (0.0 to 1.0).",
+        ge=0.0, le=1.0
+    )
+
+class ContributingFactorSchema(BaseModel):
+    """
+    Describes a single factor contributing to the glycemic forecast.
+    """
+    factor_type: str = Field(
+        description="The type of factor considered.",
+    )
+    detail: str = Field(
+        description="Specific details about the factor."
+    )
+    impact_on_forecast: str = Field(
+        description="How this factor influences the forecast.",
+    )
+
+class RiskForecastOutput(BaseModel):
+    """
+    Pydantic schema for the structured output of the Glycemic_Risk_Forecaster_Agent.
+    This defines the expected JSON object containing the glycemic risk forecast.
+    """
+    forecast_id: str = Field(
+        default_factory=new_forecast_id,
+        description="A unique identifier for this specific forecast instance."
+    )
+    timestamp_forecast_generated: str = Field(
+        default_factory=utc_timestamp,
+        description="ISO 8601 timestamp indicating when this forecast was generated (UTC)."
+    )
+    short_term_outlook: ShortTermOutlookSchema = Field(
+        description="Detailed assessment of the short-term glycemic outlook."
+    )
+    contributing_factors: List[ContributingFactorSchema] = Field(
+        default_factory=list,
+        description="A list of factors that the LLM considered significant in making this forecast."
+    )
+    suggested_focus_areas_qualitative: List[str] = Field(
+        default_factory=list,
+        description="Non-prescriptive, general areas for user attention or awareness.",
+    )
+    actionable_micro_insight_candidate: str = Field(
+        description="A single, very concise 'heads-up' message candidate, ready for the Presenter Agent to refine or use directly."
+    )
+
+
+# --- Pydantic Schema for VerificationOutput ---
+
+class VerificationOutput(BaseModel):
+    original_forecast_id: str
+    verification_confidence: float
+    verification_summary: str
+    feedback_for_forecaster: Optional[List[str]] = None
+
+
+# --- Pydantic Schema for generated / rephrased scenarios ---
+
+class ScenarioDict(BaseModel):
+    scenarios: str
+
+
+# --- Precompiled validators ---
+# Keyed by the session state key each agent writes to.
+
+SCHEMA_ADAPTERS: Dict[str, TypeAdapter] = {
+    "cgm_data": TypeAdapter(CGMDataOutput),
+    "context_event": TypeAdapter(ContextEventOutput),
+    "risk_forecast": TypeAdapter(RiskForecastOutput),
+    "verification_output": TypeAdapter(VerificationOutput),
+    "scenario": TypeAdapter(ScenarioDict),
+}
+
+
+def coerce_json(value: Any) -> Optional[Dict[str, Any]]:
+    """
+    Lenient extraction: dicts pass through, LLM text is searched for a JSON object.
+
+    Returns None when nothing JSON-like can be recovered.
+    """
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        # Imported lazily: the loop_exit_agent package imports the agent tree
+        from .subagents.refinement_loop_agent.subagents.loop_exit_agent.tools import extract_json_from_llm_output
+        return extract_json_from_llm_output(value)
+    return None
+
+
+def validate_output(key: str, value: Union[str, bytes, Dict[str, Any]]) -> BaseModel:
+    """
+    Validate one agent output against its schema, parsing raw JSON at most once.
+
+    Args:
+        key: State key of the output (see SCHEMA_ADAPTERS)
+        value: Raw JSON text, LLM text containing JSON, or an already-decoded dict
+
+    Returns:
+        BaseModel: Validated model instance
+
+    Raises:
+        ValueError: Unknown key, or no schema-conforming JSON in the value
+
+    Time Complexity: O(len(value))
+    """
+    adapter = SCHEMA_ADAPTERS.get(key)
+    if adapter is None:
+        raise ValueError(f"No schema registered for '{key}'")
+    if isinstance(value, dict):
+        return adapter.validate_python(value)
+    try:
+        # Fast path: the whole value is the JSON document
+        return adapter.validate_json(value)
+    except ValidationError:
+        extracted = coerce_json(value.decode("utf-8") if isinstance(value, bytes) else value)
+        if extracted is None:
+            raise ValueError(f"No JSON object found for '{key}'")
+        return adapter.validate_python(extracted)
+
+
+def parse_state_output(key: str, value: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validated JSON-mode dict for storing in session state, or None if invalid.
+
+    Store the result back under `key` so downstream agents never re-parse it.
+    """
+    if value is None:
+        return None
+    try:
+        return validate_output(key, value).model_dump(mode="json")
+    except (ValueError, ValidationError):
+        return None
@@ -0,0 +1,35 @@
+"""
+Session context helpers
+
+Small accessors for the ADK invocation context behind a CallbackContext /
+ReadonlyContext, so cross-cutting subsystems (result store, tracing, progress)
+agree on how a session id is resolved.
+"""
+
+from typing import Any, Optional
+
+
+def get_invocation_context(callback_context: Any) -> Optional[Any]:
+    """Return the ADK InvocationContext wrapped by a callback/readonly context, if any."""
+    if hasattr(callback_context, "session") and hasattr(callback_context, "invocation_id"):
+        # Already an InvocationContext (e.g. BaseAgent._run_async_impl ctx)
+        return callback_context
+    return getattr(callback_context, "_invocation_context", None)
+
+
+def get_session_id(callback_context: Any, default: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve the ADK session id for a callback or invocation context.
+
+    Args:
+        callback_context: CallbackContext, ReadonlyContext or InvocationContext
+        default: Value returned when no session is attached
+
+    Returns:
+        Optional[str]: Session identifier
+
+    Time Complexity: O(1)
+    """
+    invocation_context = get_invocation_context(callback_context)
+    session = getattr(invocation_context, "session", None)
+    return getattr(session, "id", None) or default
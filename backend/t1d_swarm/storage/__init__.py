@@ -0,0 +1,25 @@
+import os
+
+from .session_compaction import SessionCompactor, sqlite_path_from_url
+from .result_store import AnalysisResultStore, build_analysis_record
+from .columnar_export import ColumnarAnalysisExporter, flatten_analysis
+from .analysis_endpoints import setup_analysis_export_routes, setup_analysis_routes
+
+# Global analysis result store instance
+analysis_result_store = AnalysisResultStore(os.getenv("ANALYSIS_DB_PATH", "./analyses.db"))
+
+# Global columnar export of completed analyses (day-partitioned Parquet / Arrow IPC)
+analysis_exporter = ColumnarAnalysisExporter(
+    os.getenv("ANALYSIS_EXPORT_DIR", "./analysis_exports"),
+    file_format=os.getenv("ANALYSIS_EXPORT_FORMAT", "parquet"),
+    compression=os.getenv("ANALYSIS_EXPORT_COMPRESSION", "zstd"),
+    flush_rows=int(os.getenv("ANALYSIS_EXPORT_FLUSH_ROWS", "500")),
+    flush_seconds=float(os.getenv("ANALYSIS_EXPORT_FLUSH_SECONDS", "60")),
+    enabled=os.getenv("ANALYSIS_EXPORT_ENABLED", "true").lower() in ("1", "true", "yes"),
+)
+
+__all__ = [
+    'SessionCompactor', 'sqlite_path_from_url',
+    'AnalysisResultStore', 'build_analysis_record', 'setup_analysis_routes', 'analysis_result_store',
+    'ColumnarAnalysisExporter', 'flatten_analysis', 'setup_analysis_export_routes', 'analysis_exporter',
+]
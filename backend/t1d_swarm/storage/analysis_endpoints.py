@@ -0,0 +1,66 @@
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+
+from ..execution import run_blocking
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from .columnar_export import ColumnarAnalysisExporter
+    from .result_store import AnalysisResultStore
+
+
+def setup_analysis_routes(app: FastAPI, result_store: "AnalysisResultStore"):
+    """Add the /analyses query routes to the FastAPI app"""
+
+    @app.get("/analyses")
+    async def list_analyses(
+        scenario_id: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        primary_concern: Optional[str] = None,
+        since_ms: Optional[int] = Query(None, description="Inclusive lower bound, epoch milliseconds"),
+        until_ms: Optional[int] = Query(None, description="Inclusive upper bound, epoch milliseconds"),
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+    ):
+        """
+        List completed analyses newest-first with cursor pagination.
+
+        Pass the returned `next_cursor` as `cursor` to fetch the next page.
+        """
+        filters = {"scenario_id": scenario_id, "risk_level": risk_level, "primary_concern": primary_concern}
+        try:
+            return await run_blocking(
+                result_store.query, filters, since_ms, until_ms, cursor, limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/analyses/{analysis_id}")
+    async def get_analysis(analysis_id: int):
+        """Full analysis record including forecast, verification and presenter text"""
+        record = await run_blocking(result_store.get, analysis_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Analysis not found.")
+        return record
+
+    logger.info("✅ Analysis result endpoints registered: /analyses")
+
+
+def setup_analysis_export_routes(app: FastAPI, exporter: "ColumnarAnalysisExporter"):
+    """Add the columnar export status / flush routes to the FastAPI app"""
+
+    @app.get("/debug/analysis-export")
+    async def analysis_export_stats():
+        """Export directory, format and rows pending / written"""
+        return exporter.stats()
+
+    @app.post("/debug/analysis-export/flush")
+    async def flush_analysis_export():
+        """Write all pending rows now (e.g. before an offline scan)"""
+        rows = await run_blocking(exporter.flush)
+        return {"rows_written": rows, **exporter.stats()}
+
+    logger.info("✅ Analysis export endpoints registered: /debug/analysis-export")
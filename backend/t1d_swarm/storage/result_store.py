@@ -0,0 +1,288 @@
+"""
+Analysis Result Store
+
+Append-only store for completed T1D analyses. The final `risk_forecast`,
+`verification_output`, presenter text, iteration count and per-agent timings are
+captured once per pipeline run (root agent `after_agent_callback`) so clinicians
+can query results without replaying ADK session events.
+
+Query design:
+- Rows are append-only, so the integer primary key is monotonic in time
+- Every filter column has a composite (column, id) index, so a filtered page is a
+  single index range scan regardless of table size
+- Time ranges are resolved to id bounds with two index probes on created_at_ms
+- Pagination is keyset-based (cursor = last id seen), never OFFSET
+
+Performance Characteristics:
+- append: O(log n) index maintenance
+- query: O(log n + page_size) for any combination of one equality filter and a time range
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..analytics.sensor_faults import DATA_QUALITY_KEY
+from ..schemas import coerce_json
+from ..session_context import get_invocation_context, get_session_id
+
+# Filters exposed by the /analyses API mapped to their indexed columns
+FILTER_COLUMNS: Dict[str, str] = {
+    "scenario_id": "scenario_id",
+    "risk_level": "overall_risk_level",
+    "primary_concern": "primary_concern",
+}
+
+SUMMARY_COLUMNS = (
+    "id", "session_id", "scenario_id", "overall_risk_level", "primary_concern",
+    "verification_confidence", "iteration_count", "total_duration_ms", "created_at_ms",
+)
+
+PAYLOAD_COLUMNS = ("risk_forecast", "verification_output", "presenter_text", "timings")
+
+MAX_PAGE_SIZE = 200
+EMPTY_RANGE_ID = 2 ** 63 - 1
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor for keyset pagination."""
+    return base64.urlsafe_b64encode(str(last_id).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii"))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+class AnalysisResultStore:
+    """
+    SQLite-backed append-only store of completed analyses.
+
+    A single connection is shared behind a lock; callers on the event loop should
+    go through execution.run_blocking (see analysis_endpoints).
+
+    Thread Safety: All statements serialized by an internal lock
+    """
+
+    def __init__(self, db_path: str = "./analyses.db"):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connect lazily so importing the module never touches the filesystem
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    scenario_id TEXT,
+                    overall_risk_level TEXT,
+                    primary_concern TEXT,
+                    verification_confidence REAL,
+                    iteration_count INTEGER,
+                    total_duration_ms REAL,
+                    created_at_ms INTEGER NOT NULL,
+                    risk_forecast TEXT,
+                    verification_output TEXT,
+                    presenter_text TEXT,
+                    timings TEXT
+                );
+                CREATE INDEX IF NOT EXISTS ix_analysis_scenario ON analysis_results (scenario_id, id);
+                CREATE INDEX IF NOT EXISTS ix_analysis_risk ON analysis_results (overall_risk_level, id);
+                CREATE INDEX IF NOT EXISTS ix_analysis_concern ON analysis_results (primary_concern, id);
+                CREATE INDEX IF NOT EXISTS ix_analysis_created ON analysis_results (created_at_ms, id);
+                CREATE INDEX IF NOT EXISTS ix_analysis_session ON analysis_results (session_id, id);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """
+        Insert one completed analysis. Returns its id.
+
+        Time Complexity: O(log n)
+        """
+        outlook = (record.get("risk_forecast") or {}).get("short_term_outlook") or {}
+        verification = record.get("verification_output") or {}
+        row = (
+            record.get("session_id"),
+            record.get("scenario_id"),
+            outlook.get("overall_risk_level"),
+            outlook.get("primary_concern"),
+            record.get("verification_confidence"),
+            record.get("iteration_count", 0),
+            record.get("total_duration_ms"),
+            record.get("created_at_ms") or int(time.time() * 1000),
+            json.dumps(record.get("risk_forecast")),
+            json.dumps(verification),
+            record.get("presenter_text"),
+            json.dumps(record.get("timings") or {}),
+        )
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                cursor = conn.execute("""
+                    INSERT INTO analysis_results (
+                        session_id, scenario_id, overall_risk_level, primary_concern,
+                        verification_confidence, iteration_count, total_duration_ms, created_at_ms,
+                        risk_forecast, verification_output, presenter_text, timings
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, row)
+            return cursor.lastrowid
+
+    def _id_bounds(self, conn: sqlite3.Connection, since_ms: Optional[int],
+                   until_ms: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Translate a time range into an id range (ids are monotonic in created_at_ms).
+
+        Each bound is a single ORDER BY ... LIMIT 1 probe on ix_analysis_created,
+        so it stays O(log n) however many rows fall inside the range.
+        """
+        low = high = None
+        if since_ms is not None:
+            row = conn.execute("SELECT id FROM analysis_results WHERE created_at_ms >= ? "
+                               "ORDER BY created_at_ms, id LIMIT 1", (since_ms,)).fetchone()
+            # Nothing at or after since_ms: use a bound no row can satisfy
+            low = row[0] if row else EMPTY_RANGE_ID
+        if until_ms is not None:
+            row = conn.execute("SELECT id FROM analysis_results WHERE created_at_ms <= ? "
+                               "ORDER BY created_at_ms DESC, id DESC LIMIT 1", (until_ms,)).fetchone()
+            high = row[0] if row else -1
+        return low, high
+
+    def query(self, filters: Optional[Dict[str, str]] = None, since_ms: Optional[int] = None,
+              until_ms: Optional[int] = None, cursor: Optional[str] = None,
+              limit: int = 50) -> Dict[str, Any]:
+        """
+        Page through analyses newest-first.
+
+        Args:
+            filters: Equality filters keyed by FILTER_COLUMNS names
+            since_ms / until_ms: Inclusive creation-time bounds (epoch milliseconds)
+            cursor: Cursor from a previous page's `next_cursor`
+            limit: Page size (capped at MAX_PAGE_SIZE)
+
+        Returns:
+            Dict with `items` (summary rows) and `next_cursor` (None on the last page)
+
+        Time Complexity: O(log n + limit)
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses: List[str] = []
+        params: List[Any] = []
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            if name not in FILTER_COLUMNS:
+                raise ValueError(f"Unknown filter '{name}'")
+            clauses.append(f"{FILTER_COLUMNS[name]} = ?")
+            params.append(value)
+
+        with self._lock:
+            conn = self._connection()
+            low, high = self._id_bounds(conn, since_ms, until_ms)
+            if low is not None:
+                clauses.append("id >= ?")
+                params.append(low)
+            if high is not None:
+                clauses.append("id <= ?")
+                params.append(high)
+            if cursor:
+                clauses.append("id < ?")
+                params.append(decode_cursor(cursor))
+
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM analysis_results {where} ORDER BY id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]["id"]) if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, analysis_id: int) -> Optional[Dict[str, Any]]:
+        """Full record including payloads. Time Complexity: O(log n)"""
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS + PAYLOAD_COLUMNS)} FROM analysis_results WHERE id = ?",
+                (analysis_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        for column in ("risk_forecast", "verification_output", "timings"):
+            record[column] = json.loads(record[column]) if record[column] else None
+        return record
+
+
+def build_analysis_record(callback_context: Any) -> Dict[str, Any]:
+    """
+    Assemble a result record from the finished pipeline's session state and events.
+
+    Per-agent timings are the gaps between consecutive events of this invocation,
+    attributed to the event's author; per-agent tokens sum the events' usage metadata.
+
+    Time Complexity: O(e) where e is the number of session events
+    """
+    state = callback_context.state
+    invocation_context = get_invocation_context(callback_context)
+    invocation_id = getattr(invocation_context, "invocation_id", None)
+    session = getattr(invocation_context, "session", None)
+    events = [e for e in getattr(session, "events", []) if e.invocation_id == invocation_id]
+
+    started_at = state.get("pipeline_started_at") or (events[0].timestamp if events else time.time())
+    timings: Dict[str, float] = {}
+    tokens: Dict[str, Dict[str, int]] = {}
+    previous = started_at
+    for event in sorted(events, key=lambda e: e.timestamp):
+        timings[event.author] = timings.get(event.author, 0.0) + max(0.0, event.timestamp - previous) * 1000
+        previous = event.timestamp
+        usage = getattr(event, "usage_metadata", None)
+        if usage is not None:
+            totals = tokens.setdefault(event.author, {"input": 0, "output": 0})
+            totals["input"] += usage.prompt_token_count or 0
+            totals["output"] += usage.candidates_token_count or 0
+
+    # Loop-exit agent state (refinement_loop_agent/.../loop_exit_agent/logic.py)
+    confidence_history = [
+        entry.get("confidence") for entry in state.get("confidence_history") or []
+        if isinstance(entry, dict) and entry.get("invocation_id") == invocation_id
+    ]
+    context_event = coerce_json(state.get("context_event"))
+    # Unscoped in state: without a round of this run (fast profile) it is an earlier run's verification
+    verified = bool(confidence_history)
+
+    return {
+        "session_id": get_session_id(callback_context),
+        "scenario_id": state.get("scenario_id"),
+        # Already validated dicts (parse-once); coerce_json only covers legacy text state
+        "risk_forecast": coerce_json(state.get("risk_forecast")),
+        "verification_output": coerce_json(state.get("verification_output")) if verified else None,
+        "verification_confidence": confidence_history[-1] if verified else None,
+        "presenter_text": state.get("presented_insight"),
+        "iteration_count": sum(1 for e in events if e.author == "GlycemicRiskForecasterAgent"),
+        "total_duration_ms": (time.time() - started_at) * 1000,
+        "created_at_ms": int(time.time() * 1000),
+        "timings": {author: round(ms, 1) for author, ms in timings.items()},
+        # Not stored in SQLite; flattened by the columnar export
+        "cgm_data": coerce_json(state.get("cgm_data")),
+        "cgm_data_quality": state.get(DATA_QUALITY_KEY),
+        "context_event_type": context_event.get("event_type") if isinstance(context_event, dict) else None,
+        "confidence_history": confidence_history,
+        "exit_reason": state.get("refinement_exit_reason"),
+        "presenter_source": (state.get("presenter_source") or {}).get("source"),
+        "execution_profile": state.get("execution_profile"),
+        "tokens": tokens,
+    }
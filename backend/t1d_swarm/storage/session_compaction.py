@@ -0,0 +1,359 @@
+"""
+Session State Compaction
+
+Keeps the ADK SQLite session store (`sessions.db`) bounded. Every refinement
+loop iteration appends full `risk_forecast` / `verification_output` events, so
+finished sessions carry payloads that are never read again.
+
+Maintenance pass:
+- Enables WAL journaling so SSE/debug readers don't block session writes
+- For finished sessions, keeps only the final event of each refinement-loop agent
+  per run (invocation) and moves older iteration events into a compressed archive
+  table (or drops them); a session is compacted again once it has been updated
+  past the point it was last compacted up to
+- Expires sessions (and their events/archives) past a TTL
+- Periodically checkpoints the WAL and VACUUMs the file to return freed pages
+
+Performance Characteristics:
+- Compaction: O(e) per finished session where e is its iteration event count, redone
+  only after new events (earlier runs are already down to their final events)
+- TTL expiry: O(s + e) for expired sessions/events, index-assisted on update_time
+- Session load after compaction: O(f) where f is the (now constant) number of final events
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from ..execution import run_blocking
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+
+# Agents whose events repeat once per refinement-loop iteration.
+# Only the last event of each per run is needed once the loop has finished.
+ITERATION_AUTHORS: Tuple[str, ...] = (
+    "GlycemicRiskForecasterAgent",
+    "ForecastVerifierAgent",
+    "ConfidenceChecker",
+)
+
+# One-byte codec prefix stored in front of every archived payload
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+
+
+def sqlite_path_from_url(db_url: str) -> Optional[str]:
+    """
+    Resolve the filesystem path from a SQLAlchemy SQLite URL.
+
+    Args:
+        db_url (str): URL such as "sqlite:///./sessions.db"
+
+    Returns:
+        Optional[str]: File path, or None for non-SQLite / in-memory URLs
+    """
+    prefix = "sqlite:///"
+    if not db_url.startswith(prefix):
+        return None
+    path = db_url[len(prefix):]
+    if not path or path == ":memory:":
+        return None
+    return path
+
+
+def compress_payload(raw: bytes, codec: str = "zstd") -> bytes:
+    """Compress an archived payload, falling back to zlib when zstd is unavailable."""
+    if codec == "zstd" and zstandard is not None:
+        return CODEC_ZSTD + zstandard.ZstdCompressor(level=6).compress(raw)
+    return CODEC_ZLIB + zlib.compress(raw, 6)
+
+
+def decompress_payload(blob: bytes) -> bytes:
+    """Inverse of compress_payload, dispatching on the codec prefix."""
+    codec, body = blob[:1], blob[1:]
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Archived payload is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    return zlib.decompress(body)
+
+
+class SessionCompactor:
+    """
+    Runs compaction, TTL expiry and VACUUM against the ADK session database.
+
+    Works directly on the SQLite file with the standard library driver so it can
+    run in a worker thread without touching ADK's SQLAlchemy engine.
+
+    Design Pattern: Background maintenance job (idempotent, resumable)
+    Thread Safety: Each pass opens its own connection; WAL lets readers proceed
+    """
+
+    def __init__(self, db_path: str, ttl_hours: float = 72.0, idle_minutes: float = 15.0,
+                 mode: str = "archive", codec: str = "zstd", vacuum_every: int = 12):
+        """
+        Args:
+            db_path (str): Path to the SQLite session database
+            ttl_hours (float): Sessions not updated for this long are deleted (0 disables)
+            idle_minutes (float): Sessions idle this long are considered finished
+            mode (str): "archive" keeps compressed iteration payloads, "drop" deletes them
+            codec (str): "zstd" or "zlib" for archived payloads
+            vacuum_every (int): Run VACUUM every N maintenance passes (0 disables)
+        """
+        if mode not in ("archive", "drop"):
+            raise ValueError(f"Unknown compaction mode '{mode}'")
+        self.db_path = db_path
+        self.ttl_hours = ttl_hours
+        self.idle_minutes = idle_minutes
+        self.mode = mode
+        self.codec = codec
+        self.vacuum_every = vacuum_every
+        self._passes = 0
+
+    @classmethod
+    def from_env(cls, db_url: str) -> Optional["SessionCompactor"]:
+        """Build a compactor from SESSION_* environment variables, or None for non-SQLite URLs."""
+        db_path = sqlite_path_from_url(db_url)
+        if db_path is None:
+            return None
+        return cls(
+            db_path,
+            ttl_hours=float(os.getenv("SESSION_TTL_HOURS", "72")),
+            idle_minutes=float(os.getenv("SESSION_IDLE_MINUTES", "15")),
+            mode=os.getenv("SESSION_COMPACTION_MODE", "archive"),
+            codec=os.getenv("SESSION_COMPACTION_CODEC", "zstd"),
+            vacuum_every=int(os.getenv("SESSION_VACUUM_EVERY", "12")),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    def enable_wal(self) -> str:
+        """
+        Switch the database to WAL journaling.
+
+        WAL is persistent in the database file, so this only needs to run once,
+        but it is cheap and idempotent. Returns the resulting journal mode.
+        """
+        conn = self._connect()
+        try:
+            mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            conn.execute("PRAGMA synchronous = NORMAL")
+            return mode
+        finally:
+            conn.close()
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> bool:
+        """Create compaction tables; returns False if ADK hasn't created its tables yet."""
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "sessions" not in tables or "events" not in tables:
+            return False
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS archived_events (
+                app_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                event_id TEXT NOT NULL,
+                author TEXT,
+                timestamp TEXT,
+                payload BLOB NOT NULL,
+                PRIMARY KEY (app_name, user_id, session_id, event_id)
+            );
+            CREATE TABLE IF NOT EXISTS compacted_sessions (
+                app_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                compacted_at TEXT NOT NULL,
+                compacted_until TEXT,
+                PRIMARY KEY (app_name, user_id, session_id)
+            );
+            CREATE INDEX IF NOT EXISTS ix_sessions_update_time ON sessions (update_time);
+            -- ADK loads a session's events by session_id alone, which the events PK can't serve
+            CREATE INDEX IF NOT EXISTS ix_events_session_timestamp ON events (session_id, timestamp);
+            CREATE INDEX IF NOT EXISTS ix_events_session_author
+                ON events (app_name, user_id, session_id, author, timestamp);
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(compacted_sessions)")}
+        if "compacted_until" not in columns:  # older databases: their sessions are compacted once more
+            conn.execute("ALTER TABLE compacted_sessions ADD COLUMN compacted_until TEXT")
+        return True
+
+    def _finished_sessions(self, conn: sqlite3.Connection, limit: int) -> List[Tuple[str, str, str, str]]:
+        """Idle sessions updated since they were last compacted up to, with their update_time."""
+        cutoff = (datetime.utcnow() - timedelta(minutes=self.idle_minutes)).strftime("%Y-%m-%d %H:%M:%S")
+        return conn.execute("""
+            SELECT s.app_name, s.user_id, s.id, s.update_time FROM sessions s
+            LEFT JOIN compacted_sessions c
+              ON c.app_name = s.app_name AND c.user_id = s.user_id AND c.session_id = s.id
+            WHERE (c.compacted_until IS NULL OR s.update_time > c.compacted_until) AND s.update_time < ?
+            LIMIT ?
+        """, (cutoff, limit)).fetchall()
+
+    def compact_session(self, conn: sqlite3.Connection, app_name: str, user_id: str, session_id: str) -> int:
+        """
+        Archive (or drop) all but the final event of each refinement-loop agent in
+        each run, so every run keeps its final forecast and verification.
+
+        Returns:
+            int: Number of events removed from the live `events` table
+
+        Time Complexity: O(e) where e is the session's iteration event count
+        """
+        placeholders = ",".join("?" for _ in ITERATION_AUTHORS)
+        rows = conn.execute(f"""
+            SELECT id, invocation_id, author, timestamp, content, actions FROM events
+            WHERE app_name = ? AND user_id = ? AND session_id = ? AND author IN ({placeholders})
+            ORDER BY invocation_id, author, timestamp DESC
+        """, (app_name, user_id, session_id, *ITERATION_AUTHORS)).fetchall()
+
+        # Rows are newest-first per (run, author), so every row after the first of each is stale
+        seen = set()
+        stale = []
+        for event_id, invocation_id, author, timestamp, content, actions in rows:
+            if (invocation_id, author) not in seen:
+                seen.add((invocation_id, author))
+                continue
+            stale.append((event_id, author, timestamp, content, actions))
+
+        if not stale:
+            return 0
+
+        if self.mode == "archive":
+            archived = []
+            for event_id, author, timestamp, content, actions in stale:
+                raw = json.dumps({
+                    "content": content,
+                    "actions": base64.b64encode(actions).decode("ascii") if actions else None,
+                }).encode("utf-8")
+                archived.append((app_name, user_id, session_id, event_id, author, str(timestamp),
+                                 compress_payload(raw, self.codec)))
+            conn.executemany("INSERT OR REPLACE INTO archived_events VALUES (?, ?, ?, ?, ?, ?, ?)", archived)
+
+        conn.executemany(
+            "DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? AND id = ?",
+            [(app_name, user_id, session_id, row[0]) for row in stale],
+        )
+        return len(stale)
+
+    def compact_finished_sessions(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Compact every finished session updated since it was last compacted, in batches.
+
+        Each batch is its own transaction so concurrent session writers are
+        only blocked briefly.
+        """
+        stats = {"sessions_compacted": 0, "events_removed": 0}
+        conn = self._connect()
+        try:
+            if not self._ensure_schema(conn):
+                return stats
+            while True:
+                batch = self._finished_sessions(conn, batch_size)
+                if not batch:
+                    break
+                now = datetime.utcnow().isoformat()
+                with conn:
+                    for app_name, user_id, session_id, update_time in batch:
+                        stats["events_removed"] += self.compact_session(conn, app_name, user_id, session_id)
+                        conn.execute("INSERT OR REPLACE INTO compacted_sessions "
+                                     "(app_name, user_id, session_id, compacted_at, compacted_until) "
+                                     "VALUES (?, ?, ?, ?, ?)", (app_name, user_id, session_id, now, update_time))
+                stats["sessions_compacted"] += len(batch)
+        finally:
+            conn.close()
+        return stats
+
+    def expire_sessions(self) -> int:
+        """
+        Delete sessions (with their events and archives) older than the TTL.
+
+        SQLite doesn't enforce ADK's ON DELETE CASCADE unless foreign keys are
+        enabled per connection, so child rows are deleted explicitly.
+
+        Returns:
+            int: Number of sessions deleted
+        """
+        if self.ttl_hours <= 0:
+            return 0
+        cutoff = (datetime.utcnow() - timedelta(hours=self.ttl_hours)).strftime("%Y-%m-%d %H:%M:%S")
+        conn = self._connect()
+        try:
+            if not self._ensure_schema(conn):
+                return 0
+            with conn:
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS expired (app_name TEXT, user_id TEXT, id TEXT)")
+                conn.execute("DELETE FROM expired")
+                conn.execute("INSERT INTO expired SELECT app_name, user_id, id FROM sessions WHERE update_time < ?",
+                             (cutoff,))
+                for table, key in (("events", "session_id"), ("archived_events", "session_id"),
+                                   ("compacted_sessions", "session_id"), ("sessions", "id")):
+                    conn.execute(f"""
+                        DELETE FROM {table} WHERE EXISTS (
+                            SELECT 1 FROM expired x
+                            WHERE x.app_name = {table}.app_name AND x.user_id = {table}.user_id
+                              AND x.id = {table}.{key}
+                        )
+                    """)
+                expired = conn.execute("SELECT COUNT(*) FROM expired").fetchone()[0]
+            return expired
+        finally:
+            conn.close()
+
+    def vacuum(self):
+        """Rebuild the file to release freed pages to the OS, then truncate the WAL."""
+        conn = self._connect()
+        try:
+            conn.execute("VACUUM")
+            # In WAL mode VACUUM writes through the log, so checkpoint afterwards
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+
+    def run_maintenance(self) -> Dict[str, int]:
+        """
+        One full maintenance pass: compact, expire, and periodically VACUUM.
+
+        Blocking - call via execution.run_blocking from async code.
+        """
+        if not os.path.exists(self.db_path):
+            return {}
+        self._passes += 1
+        stats = self.compact_finished_sessions()
+        stats["sessions_expired"] = self.expire_sessions()
+        stats["vacuumed"] = 0
+        if self.vacuum_every and self._passes % self.vacuum_every == 0:
+            self.vacuum()
+            stats["vacuumed"] = 1
+        return stats
+
+    async def run_periodic(self, interval_seconds: float = 300.0):
+        """
+        Background loop running maintenance off the event loop until cancelled.
+
+        Args:
+            interval_seconds (float): Delay between maintenance passes
+        """
+        while True:
+            try:
+                stats = await run_blocking(self.run_maintenance)
+                if stats.get("sessions_compacted") or stats.get("sessions_expired"):
+                    logger.info(f"🗜️ Session maintenance: {stats}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Session maintenance failed: {e}")
+            await asyncio.sleep(interval_seconds)
@@ -2,9 +2,12 @@ import json
 import os
 
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
 from dotenv import load_dotenv
 
 from .prompts import AMBIENT_CONTEXT_PROMPT, ContextEventOutput
+from ...execution import run_profile
 
 load_dotenv()
 
@@ -19,6 +22,18 @@ instruction_for_agent = AMBIENT_CONTEXT_PROMPT.format(
 model_output=SCHEMA_JSON_STRING
 )
 
+def use_simulated_context(callback_context: CallbackContext):
+    """
+    Fast profile runs of built-in scenarios get their context event from the
+    simulator with the CGM data (`state['cgm_source'] == 'simulated'`): skip
+    the model call and keep it.
+    """
+    context_event = callback_context.state.get("context_event")
+    if (callback_context.state.get("cgm_source") != "simulated" or not isinstance(context_event, dict)
+            or not run_profile(callback_context.state).simulate_inputs):
+        return None
+    return types.Content(role="model", parts=[types.Part(text=json.dumps(context_event))])
+
 AmbientContextSimulatorAgent = LlmAgent(
     model=MODEL_NAME,
     name="AmbientContextAgent",
@@ -27,5 +42,6 @@ AmbientContextSimulatorAgent = LlmAgent(
     output_schema=ContextEventOutput,
     output_key="context_event",
     disallow_transfer_to_parent=True,
-    disallow_transfer_to_peers=True
+    disallow_transfer_to_peers=True,
+    before_agent_callback=use_simulated_context
 )
\ No newline at end of file
@@ -1,26 +1,4 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Union, List
-from datetime import datetime
-
-
-class ContextEventOutput(BaseModel):
-    """
-    Pydantic schema for the structured output of the Ambient_Context_Simulator_Agent.
-    """
-    event_type: str = Field(
-        description="The primary type of contextual event (e.g., 'meal', 'exercise', 'stress', 'illness', 'symptoms_user_reported', 'no_recent_significant_event', 'cgm_alert_review', 'other_notes')."
-    )
-    description_raw: str = Field(
-        description="A natural language description of the event, often derived directly from the input scenario."
-    )
-    parsed_details: Optional[Dict[str, Union[str, int, float, List[str]]]] = Field(
-        default_factory=dict, # Ensure it's an empty dict if no details, not None
-        description="Optional structured details extracted or inferred from the event description (e.g., {'estimated_carbs_g': 60, 'meal_type': 'lunch'}, {'exercise_type': 'running', 'intensity': 'moderate'}, {'symptoms': ['nausea', 'headache']})."
-    )
-    timestamp_event: str = Field(
-        default_factory=lambda: datetime.utcnow().isoformat() + "Z",
-        description="ISO 8601 timestamp for when the event occurred or was logged (UTC)."
-    )
+from ...schemas import ContextEventOutput
 
 
 AMBIENT_CONTEXT_PROMPT = """
@@ -1,15 +1,62 @@
+import logging
 import os
 
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
 from dotenv import load_dotenv
 
 from .prompts import INSIGHT_PRESENTER_PROMPT
+from .templates import PRESENTER_SOURCE_KEY, TEMPLATES_ENABLED, select_presentation
+from ...execution import model_router, run_profile, RoutingPolicy, tiers_from_env
+from ...execution.profiles import PRESENTER_LLM, PRESENTER_TEMPLATE
+from ..refinement_loop_agent.subagents.loop_exit_agent.agent import LoopExitAgent
+from ..refinement_loop_agent.subagents.loop_exit_agent.logic import latest_confidence
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 
 MODEL_NAME = os.getenv("INSIGHT_PRESENTER_MODEL")
 
+# Cheap model first (INSIGHT_PRESENTER_FAST_MODEL); the configured model when the
+# run ended below the confidence threshold or the fast model returned nothing
+routing_policy = model_router.register(RoutingPolicy(
+    agent_name="InsightPresenterAgent",
+    tiers=tiers_from_env(MODEL_NAME, os.getenv("INSIGHT_PRESENTER_FAST_MODEL")),
+    escalate_below=float(os.getenv("INSIGHT_PRESENTER_ESCALATE_BELOW", str(LoopExitAgent.threshold))),
+    confidence_source=latest_confidence,
+    validator=lambda text: bool(text.strip()),
+))
+
+def present_from_template(callback_context: CallbackContext):
+    """
+    Render the message locally when the forecast fits a template (see
+    templates.py) and skip the model call; complex or contradictory runs fall
+    through to the LLM. `state['presenter_source']` records which path ran.
+
+    The execution profile can override this: fast runs use a template whatever
+    the confidence, thorough runs always use the LLM.
+    """
+    if not TEMPLATES_ENABLED:
+        return None
+    presenter = run_profile(callback_context.state).presenter
+    if presenter == PRESENTER_LLM:
+        callback_context.state[PRESENTER_SOURCE_KEY] = {"source": "llm", "reason": "profile"}
+        logger.info("📝 Presenter using LLM (profile)")
+        return None
+    confidence = None if presenter == PRESENTER_TEMPLATE else latest_confidence(callback_context)
+    text, reason = select_presentation(callback_context.state, confidence, routing_policy.escalate_below)
+    callback_context.state[PRESENTER_SOURCE_KEY] = {"source": "template" if text else "llm", "reason": reason}
+    if text is None:
+        logger.info(f"📝 Presenter using LLM ({reason})")
+        return None
+    # A callback's content bypasses output_key, so store the message like the LLM path would
+    callback_context.state["presented_insight"] = text
+    logger.info("📝 Presenter rendered from template")
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
 # --- Configure Llm Agent --- 
 
 
@@ -17,5 +64,9 @@ InsightPresenterAgent = LlmAgent(
     model=MODEL_NAME,
     name="InsightPresenterAgent",
     description="Take the processed insight from our 'Brain' and present it in a user-friendly way",
-    instruction=INSIGHT_PRESENTER_PROMPT
+    instruction=INSIGHT_PRESENTER_PROMPT,
+    output_key="presented_insight",
+    before_agent_callback=present_from_template,
+    before_model_callback=model_router.before_model,
+    after_model_callback=model_router.after_model,
 )
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Template Insight Presentation
+
+The presenter's LLM call mostly restyles the forecaster's
+`actionable_micro_insight_candidate` with a friendly opening and closing. For
+those runs the message is rendered locally from templates keyed on
+(overall_risk_level, primary_concern, data quality):
+
+    <opening for risk band + concern> <candidate insight> [<data quality note>] <closing for risk band>
+
+Risk levels map onto four bands (calm / watch / act / urgent) and concerns
+onto the forecaster prompt's vocabulary. The LLM presenter is kept for the
+runs a template would get wrong:
+
+- no parsable forecast, or a risk level / concern outside the tables
+- contradictory runs: `contradictory_*` scenarios, data_discrepancy /
+  sensor_suspect concerns, or a high risk band with no concern
+- forecasts that ended below the confidence threshold (except when the loop
+  stopped on unreliable CGM data, which the data quality note covers)
+- a candidate too long or complex to present verbatim
+
+INSIGHT_PRESENTER_TEMPLATES=false sends every run to the LLM
+(benchmarks/presenter_template_parity_benchmark.py compares the two).
+
+Performance Characteristics:
+- select_presentation: O(c) in the candidate length, microseconds, no I/O
+"""
+
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from ...analytics.sensor_faults import DATA_QUALITY_KEY
+from ...schemas import coerce_json
+from ..refinement_loop_agent.subagents.loop_exit_agent.logic import EXIT_REASON_KEY, EXIT_UNRELIABLE_DATA
+
+TEMPLATES_ENABLED = os.getenv("INSIGHT_PRESENTER_TEMPLATES", "true").lower() in ("1", "true", "yes")
+
+PRESENTER_SOURCE_KEY = "presenter_source"
+
+# Longest candidate presented verbatim; longer ones are condensed by the LLM
+MAX_CANDIDATE_CHARS = 240
+MAX_CANDIDATE_SENTENCES = 2
+
+RISK_BANDS: Dict[str, str] = {
+    "very_low": "calm", "low": "calm", "stable": "calm", "normal": "calm",
+    "moderate": "watch", "elevated": "watch", "medium": "watch",
+    "high": "act", "very_high": "urgent", "very_high_urgent": "urgent", "urgent": "urgent", "critical": "urgent",
+}
+
+CONCERN_ALIASES: Dict[str, str] = {
+    "none": "no_immediate_concern", "no_concern": "no_immediate_concern", "stable": "no_immediate_concern",
+    "hyper": "hyperglycemia", "high_glucose": "hyperglycemia",
+    "hypo": "hypoglycemia", "low_glucose": "hypoglycemia",
+    "rapid_rise": "rapid_change", "rapid_drop": "rapid_change", "rapid_fall": "rapid_change",
+    "missing_data": "data_gap", "sensor_failure": "data_gap", "erratic_readings": "data_gap",
+}
+
+# Concerns the forecaster uses for conflicting evidence; always worded by the LLM
+CONTRADICTORY_CONCERNS = frozenset({"data_discrepancy", "sensor_suspect", "conflicting_symptoms"})
+
+OPENINGS: Dict[Tuple[str, str], str] = {
+    ("calm", "no_immediate_concern"): "Good news: things look steady right now.",
+    ("calm", "hyperglycemia"): "You're in a good place, though your glucose may drift a little higher.",
+    ("calm", "hypoglycemia"): "You're in a good place, though keep an eye out for a dip.",
+    ("calm", "rapid_change"): "Things look okay, but your glucose is on the move.",
+    ("calm", "data_gap"): "Things look okay, but your sensor data is patchy.",
+    ("watch", "no_immediate_concern"): "Nothing urgent, but it's worth a closer look.",
+    ("watch", "hyperglycemia"): "Heads up: your glucose is trending higher.",
+    ("watch", "hypoglycemia"): "Heads up: your glucose is trending lower.",
+    ("watch", "rapid_change"): "Heads up: your glucose is changing quickly.",
+    ("watch", "data_gap"): "Heads up: your sensor data needs a closer look.",
+    ("act", "hyperglycemia"): "Your glucose is running high.",
+    ("act", "hypoglycemia"): "Your glucose is heading low.",
+    ("act", "rapid_change"): "Your glucose is changing fast.",
+    ("act", "data_gap"): "Your sensor data can't be trusted right now.",
+    ("urgent", "hyperglycemia"): "Important: your glucose is very high.",
+    ("urgent", "hypoglycemia"): "Important: you may be going low soon.",
+    ("urgent", "rapid_change"): "Important: your glucose is changing very quickly.",
+    ("urgent", "data_gap"): "Important: your sensor data can't be trusted right now.",
+}
+
+CLOSINGS: Dict[str, str] = {
+    "calm": "Keep it up!",
+    "watch": "You've got this.",
+    "act": "Check back in a little while.",
+    "urgent": "Please act on this right away.",
+}
+
+DATA_QUALITY_NOTES: Dict[str, str] = {
+    "ok": "",
+    "gaps": "Your CGM data has a few gaps, so treat this as a rough guide.",
+    "unreliable": "Your CGM readings look unreliable, so please confirm with a fingerstick before acting.",
+}
+
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+_KEY = re.compile(r"[\s\-]+")
+
+
+def _key(value: Any) -> str:
+    return _KEY.sub("_", str(value or "").strip().lower())
+
+
+def data_quality_level(state: Any) -> str:
+    """'ok', 'gaps' (issues that do not make the data unreliable) or 'unreliable'."""
+    quality = state.get(DATA_QUALITY_KEY)
+    if isinstance(quality, dict):
+        if not quality.get("reliable", True):
+            return "unreliable"
+        return "gaps" if quality.get("issues") else "ok"
+    cgm_data = coerce_json(state.get("cgm_data"))
+    issues = _key(cgm_data.get("data_quality_issues")) if isinstance(cgm_data, dict) else ""
+    return "gaps" if issues not in ("", "none", "null") else "ok"
+
+
+def select_presentation(state: Any, confidence: Optional[float] = None,
+                        threshold: Optional[float] = None) -> Tuple[Optional[str], str]:
+    """
+    Template-rendered message for the run, or None when the LLM presenter
+    should write it, with the reason ('template' when rendered).
+
+    Args:
+        state: Session state (risk_forecast, cgm data quality, scenario, exit reason)
+        confidence: The run's latest verification confidence (None: not checked)
+        threshold: Confidence below which the LLM presenter is used
+
+    Time Complexity: O(c) for a candidate of length c
+    """
+    forecast = coerce_json(state.get("risk_forecast"))
+    if not isinstance(forecast, dict) or not isinstance(forecast.get("short_term_outlook"), dict):
+        return None, "no_forecast"
+    outlook = forecast["short_term_outlook"]
+    band = RISK_BANDS.get(_key(outlook.get("overall_risk_level")))
+    concern = _key(outlook.get("primary_concern"))
+    concern = CONCERN_ALIASES.get(concern, concern)
+
+    if str(state.get("scenario_id") or "").startswith("contradictory_") or concern in CONTRADICTORY_CONCERNS:
+        return None, "contradictory"
+    if band is None:
+        return None, "unknown_risk_level"
+    opening = OPENINGS.get((band, concern))
+    if opening is None:
+        # e.g. a high risk band with no concern: the forecast disagrees with itself
+        return None, "contradictory" if concern == "no_immediate_concern" else "unknown_concern"
+
+    quality = data_quality_level(state)
+    stopped_on_data = state.get(EXIT_REASON_KEY) == EXIT_UNRELIABLE_DATA
+    if confidence is not None and threshold is not None and confidence < threshold and not stopped_on_data:
+        return None, "low_confidence"
+
+    candidate = " ".join(str(forecast.get("actionable_micro_insight_candidate") or "").split())
+    if (not candidate or len(candidate) > MAX_CANDIDATE_CHARS
+            or len(_SENTENCE_END.findall(candidate)) > MAX_CANDIDATE_SENTENCES or "{" in candidate):
+        return None, "complex_candidate"
+    if candidate[-1] not in ".!?":
+        candidate += "."
+
+    note = DATA_QUALITY_NOTES[quality] if concern != "data_gap" else ""  # a data_gap opening already says it
+    parts = (opening, candidate[0].upper() + candidate[1:], note, CLOSINGS[band])
+    return " ".join(part for part in parts if part), "template"
@@ -1,11 +1,11 @@
-from google.adk.agents import LoopAgent
-
+from ...observability import TracedLoopAgent
 from .subagents.glycemic_risk_forecast_agent.agent import GlycemicRiskForecasterAgent
 from .subagents.forecast_verifier.agent import ForecastVerifierAgent
 from .subagents.loop_exit_agent.agent import LoopExitAgent
 
 
-RefinementLoopAgent = LoopAgent(    
+# TracedLoopAgent: LoopAgent semantics plus one trace span per iteration
+RefinementLoopAgent = TracedLoopAgent(
     name="RefinementLoopAgent",
     sub_agents=[
         GlycemicRiskForecasterAgent,
@@ -2,11 +2,16 @@ import json
 import os
 
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import google_search
+from google.genai import types
 
 from dotenv import load_dotenv
 
-from .prompt import FORECAST_VERIFIER_PROMPT, VerificationOutput
+from .prompt import FORECAST_VERIFIER_PROMPT, FORECAST_VERIFIER_STATIC_PROMPT, VerificationOutput
+from .....context_cache import context_cache, StaticPrefixCache
+from .....execution import model_call_hedger, run_profile, HedgedLlm, HedgePolicy
+from .....schemas import parse_state_output
 
 load_dotenv()
 
@@ -21,11 +26,50 @@ instruction_for_agent = FORECAST_VERIFIER_PROMPT.format(
 schema_string=SCHEMA_JSON_STRING
 )
 
+# Static instruction prefix (plus the search tool) served from the context cache (when enabled)
+prefix_cache = StaticPrefixCache(
+    context_cache, FORECAST_VERIFIER_STATIC_PROMPT.format(schema_string=SCHEMA_JSON_STRING),
+    label="ForecastVerifierAgent",
+)
+
+# The search round is the slowest call in the loop: deadline per call, and a duplicate
+# (FORECAST_VERIFIER_HEDGE_MODEL, else the same model) once it runs past the rolling p90
+hedge_policy = model_call_hedger.register(HedgePolicy(
+    name="ForecastVerifierAgent",
+    timeout=float(os.getenv("FORECAST_VERIFIER_TIMEOUT_SECONDS", "90")),
+    alternate_model=os.getenv("FORECAST_VERIFIER_HEDGE_MODEL"),
+    validator=lambda text: parse_state_output("verification_output", text) is not None,
+))
+
+def skip_unverified_profiles(callback_context: CallbackContext):
+    """
+    Profiles without verification (fast) skip the search round; the loop
+    checker then ends the loop after the single forecast.
+    """
+    if run_profile(callback_context.state).verify:
+        return None
+    return types.Content(role="model", parts=[types.Part(text="Verification skipped by the execution profile.")])
+
+def store_parsed_verification(callback_context: CallbackContext):
+    """
+    The verifier can't use output_schema (it needs the search tool), so its output
+    lands in state as free text. Validate it once here and store the structured
+    dict, so the loop exit check and the forecaster never re-parse it.
+    """
+    parsed = parse_state_output("verification_output", callback_context.state.get("verification_output"))
+    if parsed is not None:
+        callback_context.state["verification_output"] = parsed
+    return None
+
 ForecastVerifierAgent = LlmAgent(
-    model=MODEL_NAME,
+    model=HedgedLlm(model=MODEL_NAME, hedger=model_call_hedger, policy_name=hedge_policy.name),
     name="ForecastVerifierAgent",
     description="Verifies verification risk forecasts based on grounding data.",
     instruction=instruction_for_agent,
     tools=[google_search],
     output_key="verification_output",
+    before_agent_callback=skip_unverified_profiles,
+    before_model_callback=prefix_cache.before_model,
+    after_model_callback=prefix_cache.after_model,
+    after_agent_callback=store_parsed_verification,
 )
\ No newline at end of file
@@ -1,26 +1,13 @@
-import json
-from pydantic import BaseModel
-from typing import List, Optional
+from .....schemas import VerificationOutput
 
-class VerificationOutput(BaseModel):
-    original_forecast_id: str
-    verification_confidence: float
-    verification_summary: str
-    feedback_for_forecaster: Optional[List[str]] = None
 
-
-
-
-
-
-FORECAST_VERIFIER_PROMPT = """You are an AI assistant tasked with critically verifying a glycemic risk forecast.
-You will be provided with:
+# Static part first (identical for every session and cacheable, see context_cache),
+# per-session inputs last.
+FORECAST_VERIFIER_STATIC_PROMPT = """You are an AI assistant tasked with critically verifying a glycemic risk forecast.
+You will be provided (under **Inputs** at the end of these instructions) with:
 1. The original CGM data: `state['cgm_data']`
-   {{cgm_data}}
 2. The original contextual event data: `state['context_event']`
-   {{context_event}}
 3. The glycemic risk forecast generated by another AI (the "Forecaster"): `state['risk_forecast']`
-   {{risk_forecast}}
 
 Your Task:
 1. Analyze the original `cgm_data` and `context_event`.
@@ -44,4 +31,16 @@ Produce a JSON object containing:
 ```
 
 Prioritize safety and accuracy.
-"""
\ No newline at end of file
+"""
+
+FORECAST_VERIFIER_INPUT_SECTION = """
+**Inputs:**
+1. The original CGM data: `state['cgm_data']`
+   {{cgm_data}}
+2. The original contextual event data: `state['context_event']`
+   {{context_event}}
+3. The Forecaster's risk forecast: `state['risk_forecast']`
+   {{risk_forecast}}
+"""
+
+FORECAST_VERIFIER_PROMPT = FORECAST_VERIFIER_STATIC_PROMPT + FORECAST_VERIFIER_INPUT_SECTION
@@ -1,25 +1,103 @@
 import os
 
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
 from dotenv import load_dotenv
 
-from .prompts import risk_forecaster_prompts, RiskForecastOutput
+from .prompts import risk_forecaster_prompts, RiskForecastOutput, RISK_FORECASTER_STATIC_INSTRUCTION
+from .refinement import send_refinement_delta, record_prompt_tokens
+from .....analytics import glucose_forecast
+from .....analytics.sensor_faults import cgm_data_reliable
+from .....context_cache import context_cache, StaticPrefixCache
+from .....execution import (
+    model_call_hedger, model_router, run_profile, speculative_policy, HedgedLlm, HedgePolicy, RoutingPolicy,
+    tiers_from_env,
+)
+from .....schemas import parse_state_output
+from ..loop_exit_agent.agent import LoopExitAgent
+from ..loop_exit_agent.logic import latest_confidence
 
 load_dotenv()
 
 
 
 MODEL_NAME = os.getenv("GLYCEMIC_FORECAST_MODEL")
+NUMERIC_FORECAST_HORIZON_HOURS = float(os.getenv("GLUCOSE_FORECAST_HORIZON_HOURS", "3"))
+
+
+def valid_forecast(text: str) -> bool:
+    return parse_state_output("risk_forecast", text) is not None
+
+
+def apply_numeric_forecast(callback_context: CallbackContext):
+    """
+    Publish the numeric trajectory (`state['glucose_forecast']`) the prompt
+    builds on: from the CGM window when the run has one, else from the latest
+    reading and its trend arrow, with meal / exercise inputs from the context event.
+    Skipped when the sensor data was flagged unreliable (stuck or erratic).
+    """
+    if not cgm_data_reliable(callback_context.state):
+        callback_context.state["glucose_forecast"] = None
+        return None
+    cgm_data = callback_context.state.get("cgm_data")
+    cgm_data = cgm_data if isinstance(cgm_data, dict) else {}
+    window = callback_context.state.get("cgm_window") or [cgm_data.get("glucose_value")]
+    if all(value is None for value in window):
+        return None
+    callback_context.state["glucose_forecast"] = glucose_forecast(
+        window, callback_context.state.get("context_event"), trend_arrow=cgm_data.get("trend_arrow"),
+        horizon_hours=NUMERIC_FORECAST_HORIZON_HOURS,
+    )
+    return None
+
+# Cheap model first (GLYCEMIC_FORECAST_FAST_MODEL); the configured model after a
+# low-confidence verification or an output that fails the forecast schema
+routing_policy = model_router.register(RoutingPolicy(
+    agent_name="GlycemicRiskForecasterAgent",
+    tiers=tiers_from_env(MODEL_NAME, os.getenv("GLYCEMIC_FORECAST_FAST_MODEL")),
+    escalate_below=float(os.getenv("GLYCEMIC_FORECAST_ESCALATE_BELOW", str(LoopExitAgent.threshold))),
+    confidence_source=latest_confidence,
+    validator=valid_forecast,
+))
+
+# Deadline per call; a duplicate (GLYCEMIC_FORECAST_HEDGE_MODEL, else the same model) past the rolling p90
+hedge_policy = model_call_hedger.register(HedgePolicy(
+    name="GlycemicRiskForecasterAgent",
+    timeout=float(os.getenv("GLYCEMIC_FORECAST_TIMEOUT_SECONDS", "60")),
+    alternate_model=os.getenv("GLYCEMIC_FORECAST_HEDGE_MODEL"),
+    validator=valid_forecast,
+))
+
+def request_speculative_candidates(callback_context: CallbackContext, llm_request: LlmRequest):
+    """
+    before_model_callback: in profiles with speculative forecasts (thorough)
+    the hedger sends the duplicate request at once instead of after the
+    rolling p90, and the first schema-valid forecast wins.
+    """
+    speculate = run_profile(callback_context.state).speculative_forecasts
+    speculative_policy.set(hedge_policy.name if speculate else None)
+    return None
+
+# Static instruction prefix served from the provider-side context cache (when enabled)
+prefix_cache = StaticPrefixCache(context_cache, RISK_FORECASTER_STATIC_INSTRUCTION, label="GlycemicRiskForecasterAgent")
 
 # --- Configure Llm Agent --- 
 
 GlycemicRiskForecasterAgent = LlmAgent(
-    model=MODEL_NAME,
+    model=HedgedLlm(model=MODEL_NAME, hedger=model_call_hedger, policy_name=hedge_policy.name),
     name="GlycemicRiskForecasterAgent",
     description="Generates glycemic risk forecasts based on CGM and context data.",
     instruction=risk_forecaster_prompts,
     output_schema=RiskForecastOutput,
     output_key="risk_forecast",
+    before_agent_callback=apply_numeric_forecast,
+    # delta on iteration 2+, pick the model tier, then the cache (keyed on the model)
+    before_model_callback=[
+        send_refinement_delta, model_router.before_model, prefix_cache.before_model, request_speculative_candidates,
+    ],
+    # release the cache entry that served the call, swap in a retried answer, then count its tokens
+    after_model_callback=[prefix_cache.after_model, model_router.after_model, record_prompt_tokens],
     disallow_transfer_to_parent=True,
     disallow_transfer_to_peers=True
 )
@@ -0,0 +1,173 @@
+"""
+Incremental Refinement Requests
+
+On refinement iterations the forecaster used to get RISK_FORECASTER_UPDATE_PROMPT:
+the whole base prompt, schema, CGM data and context again, plus the full
+verification_output JSON - on top of a conversation history that already
+carried every earlier forecast, the verifier's complete output (search
+grounding included) and the loop checker's chatter.
+
+In delta mode (default) iteration 2+ keeps the system instruction and the
+original turn contents byte-identical to iteration 1 (a stable, cacheable
+prefix) and replaces the rest of the conversation with two turns:
+
+    model: <previous forecast, compact JSON>        prior forecast reference
+    user:  <verifier confidence + feedback items>   feedback delta
+
+Prompt token counts reported by the model are recorded per iteration in
+session state (`forecaster_token_usage`) so the savings are measured on real
+runs; FORECASTER_REFINEMENT_MODE=full restores the previous requests for A/B
+comparison (see benchmarks/forecaster_refinement_tokens_benchmark.py). An
+execution profile may set the mode for its runs (thorough: full, so every
+refinement carries the verifier's grounding).
+
+Performance Characteristics:
+- Request rewrite: O(c) over c conversation contents, once per model call
+- Refinement request size: O(base prompt + forecast + feedback), independent
+  of the iteration number and of the verifier's search output
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from ..loop_exit_agent.logic import HISTORY_KEY
+from .....execution import run_profile
+from .....schemas import coerce_json
+
+logger = logging.getLogger(__name__)
+
+REFINEMENT_MODE_DELTA = "delta"
+REFINEMENT_MODE_FULL = "full"
+REFINEMENT_MODE = os.getenv("FORECASTER_REFINEMENT_MODE", REFINEMENT_MODE_DELTA).lower()
+
+TOKEN_USAGE_KEY = "forecaster_token_usage"
+
+# How ADK presents other agents' events to this agent (contents.py)
+FOREIGN_EVENT_MARKER = "For context:"
+
+REFINEMENT_DELTA_PROMPT = """Your forecast above was reviewed (verification confidence {confidence:.2f}).
+Address the following feedback and return the complete revised forecast as a single JSON object conforming to the RiskForecastOutput schema:
+{feedback}"""
+
+
+def refinement_iteration(context) -> int:
+    """
+    1-based loop iteration of the current run, from the confidence history the
+    loop checker keeps (one entry per completed verification round).
+
+    Time Complexity: O(h) for h history entries
+    """
+    history = context.state.get(HISTORY_KEY) or []
+    return 1 + sum(
+        1 for entry in history
+        if isinstance(entry, dict) and entry.get("invocation_id") == context.invocation_id
+    )
+
+
+def feedback_delta(verification_output: Any) -> Optional[str]:
+    """The verifier's actionable feedback as a short user turn, or None. Time Complexity: O(f)"""
+    verification = coerce_json(verification_output)
+    if not verification:
+        return None
+    items: List[str] = [str(item) for item in verification.get("feedback_for_forecaster") or [] if item]
+    if not items and verification.get("verification_summary"):
+        items = [str(verification["verification_summary"])]
+    if not items:
+        return None
+    try:
+        confidence = float(verification.get("verification_confidence", 0.0))
+    except (TypeError, ValueError):
+        confidence = 0.0
+    return REFINEMENT_DELTA_PROMPT.format(
+        confidence=confidence, feedback="\n".join(f"- {item}" for item in items)
+    )
+
+
+def _is_foreign(content: types.Content) -> bool:
+    parts = content.parts or []
+    return bool(parts) and parts[0].text == FOREIGN_EVENT_MARKER
+
+
+def turn_prefix(contents: List[types.Content]) -> Optional[List[types.Content]]:
+    """
+    Contents of the current turn up to this agent's first reply in it: the
+    user's message and the earlier agents' outputs, exactly as iteration 1 saw them.
+
+    Time Complexity: O(c)
+    """
+    turn_start = 0
+    for index, content in enumerate(contents):
+        if content.role == "user" and not _is_foreign(content):
+            turn_start = index
+    for index in range(turn_start, len(contents)):
+        if contents[index].role == "model":
+            return contents[:index]
+    return None
+
+
+def refinement_mode(context) -> str:
+    """The run's refinement mode: its execution profile's, else FORECASTER_REFINEMENT_MODE."""
+    return run_profile(context.state).refinement_mode or REFINEMENT_MODE
+
+
+def send_refinement_delta(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """
+    before_model_callback: on refinement iterations, send the original turn plus
+    the previous forecast and the verifier's feedback instead of the whole loop
+    history. Leaves the request untouched when any piece is missing.
+    """
+    if refinement_mode(callback_context) != REFINEMENT_MODE_DELTA or refinement_iteration(callback_context) == 1:
+        return None
+
+    prefix = turn_prefix(llm_request.contents)
+    forecast = coerce_json(callback_context.state.get("risk_forecast"))
+    delta = feedback_delta(callback_context.state.get("verification_output"))
+    if prefix is None or not forecast or delta is None:
+        logger.info("  - Refinement delta unavailable, sending full history")
+        return None
+
+    dropped = len(llm_request.contents) - len(prefix)
+    llm_request.contents = prefix + [
+        types.Content(role="model", parts=[types.Part(text=json.dumps(forecast, separators=(",", ":")))]),
+        types.Content(role="user", parts=[types.Part(text=delta)]),
+    ]
+    logger.info(f"✂️ Forecaster refinement request: {dropped} history contents replaced by forecast + feedback delta")
+    return None
+
+
+def record_prompt_tokens(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+    """
+    after_model_callback: append this iteration's prompt token counts to
+    `forecaster_token_usage` in session state (current run only).
+    """
+    usage = llm_response.usage_metadata
+    if llm_response.partial or usage is None or usage.prompt_token_count is None:
+        return None
+
+    iteration = refinement_iteration(callback_context)
+    mode = refinement_mode(callback_context)
+    entry: Dict[str, Any] = {
+        "invocation_id": callback_context.invocation_id,
+        "iteration": iteration,
+        "mode": mode,
+        "prompt_tokens": usage.prompt_token_count,
+        "cached_tokens": usage.cached_content_token_count or 0,
+    }
+    usage_log = [
+        e for e in callback_context.state.get(TOKEN_USAGE_KEY) or []
+        if isinstance(e, dict) and e.get("invocation_id") == callback_context.invocation_id
+    ]
+    first = usage_log[0]["prompt_tokens"] if usage_log else None
+    usage_log.append(entry)
+    callback_context.state[TOKEN_USAGE_KEY] = usage_log
+
+    growth = f", {entry['prompt_tokens'] - first:+d} vs iteration 1" if first is not None else ""
+    logger.info(f"🪙 Forecaster iteration {iteration} ({mode}): "
+                f"{entry['prompt_tokens']} prompt tokens, {entry['cached_tokens']} cached{growth}")
+    return None
@@ -1,8 +1,13 @@
+import os
+
 from .logic import ConfidenceCheckAgent
 
 
 
 LoopExitAgent = ConfidenceCheckAgent(
     name="ConfidenceChecker",
-    threshold=0.8
-)
\ No newline at end of file
+    threshold=0.8,
+    min_improvement=float(os.getenv("REFINEMENT_MIN_CONFIDENCE_GAIN", "0.05")),
+    feedback_similarity=float(os.getenv("REFINEMENT_FEEDBACK_SIMILARITY", "0.85")),
+    forecast_similarity=float(os.getenv("REFINEMENT_FORECAST_SIMILARITY", "0.9")),
+)
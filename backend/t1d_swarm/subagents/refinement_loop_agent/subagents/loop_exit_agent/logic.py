@@ -1,10 +1,86 @@
-from typing import AsyncGenerator
+import difflib
+import logging
+import re
+from typing import Any, AsyncGenerator, Dict, List, Optional
 from google.adk.agents import BaseAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
 from google.genai.types import Part
 
 from .tools import extract_json_from_llm_output
+from .....analytics.sensor_faults import cgm_data_reliable
+from .....execution import run_profile
+from .....observability import annotate_current_span, CONFIDENCE_ATTRIBUTE, EXIT_REASON_ATTRIBUTE
+from .....schemas import coerce_json
+
+logger = logging.getLogger(__name__)
+
+# Session state written by the checker
+HISTORY_KEY = "confidence_history"
+EXIT_REASON_KEY = "refinement_exit_reason"
+ITERATIONS_SAVED_KEY = "refinement_iterations_saved"
+
+# Exit reasons
+EXIT_THRESHOLD_MET = "confidence_threshold_met"
+EXIT_NOT_IMPROVING = "confidence_not_improving"
+EXIT_FEEDBACK_REPEATED = "feedback_repeated"
+EXIT_FORECAST_UNCHANGED = "forecast_unchanged"
+EXIT_MAX_ITERATIONS = "max_iterations"
+EXIT_UNRELIABLE_DATA = "unreliable_cgm_data"
+EXIT_NOT_VERIFIED = "verification_skipped"
+
+# Texts kept per iteration for the next round's comparison (bounds state size)
+MAX_COMPARED_CHARS = 2000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: Any) -> str:
+    """Lowercased, whitespace-collapsed, length-capped text for comparison. Time Complexity: O(n)"""
+    if isinstance(text, (list, tuple)):
+        text = "\n".join(str(item) for item in text)
+    return _WHITESPACE.sub(" ", str(text or "")).strip().lower()[:MAX_COMPARED_CHARS]
+
+
+def text_similarity(a: str, b: str) -> float:
+    """
+    Similarity ratio in [0, 1] between two normalized texts.
+
+    Time Complexity: O(n * m) worst case, n, m <= MAX_COMPARED_CHARS; the
+    cheap quick_ratio upper bound short-circuits clearly different texts
+    """
+    if not a or not b:
+        return 0.0
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    upper_bound = matcher.quick_ratio()
+    return matcher.ratio() if upper_bound >= 0.5 else upper_bound
+
+
+def forecast_snapshot(risk_forecast: Any) -> Optional[Dict[str, Any]]:
+    """The forecast fields that matter for a material-change check, or None."""
+    forecast = coerce_json(risk_forecast)
+    if not forecast:
+        return None
+    outlook = forecast.get("short_term_outlook") or {}
+    factors = " ".join(str(f.get("detail", "")) for f in forecast.get("contributing_factors") or [] if isinstance(f, dict))
+    return {
+        "risk_level": outlook.get("overall_risk_level"),
+        "primary_concern": outlook.get("primary_concern"),
+        "confidence_score": outlook.get("confidence_score"),
+        "text": normalize_text(" ".join([
+            str(outlook.get("narrative_summary", "")),
+            str(forecast.get("actionable_micro_insight_candidate", "")),
+            factors,
+        ])),
+    }
+
+
+def latest_confidence(context) -> Optional[float]:
+    """The current run's most recent verification confidence, or None before the first check."""
+    for entry in reversed(context.state.get(HISTORY_KEY) or []):
+        if isinstance(entry, dict) and entry.get("invocation_id") == context.invocation_id:
+            return entry.get("confidence")
+    return None
 
 
 class ConfidenceCheckAgent(BaseAgent):
@@ -12,15 +88,33 @@ class ConfidenceCheckAgent(BaseAgent):
     A custom agent that evaluates confidence scores in agent verification outputs
     and determines whether to exit the refinement loop.
     
-    This agent implements a threshold-based decision system for loop termination,
-    helping to prevent infinite refinement cycles while ensuring quality outputs.
+    Exits when the confidence threshold is met, or early when the trajectory
+    says another forecast/verify round (two LLM calls, one with search) would
+    be wasted:
+    - confidence_not_improving: gain over the previous round < min_improvement
+    - feedback_repeated: verifier feedback similar to last round's
+    - forecast_unchanged: same risk level / concern and near-identical text
+    - unreliable_cgm_data: the sensor data was flagged faulty, so refining the
+      forecast against it cannot raise confidence
+    
+    The run's execution profile can change this: without verification (fast)
+    the loop ends after the first forecast (verification_skipped, no history
+    entry as there is no confidence), and with early exits off (thorough) only
+    the threshold, unreliable data and max iterations end it.
+    
+    Each round is appended to `confidence_history` in session state and the
+    exit reason is stored under `refinement_exit_reason`.
     
     Design Pattern: Circuit Breaker for iterative agent workflows
-    Time Complexity: O(1) - Simple threshold comparison and JSON extraction
+    Time Complexity: O(t) for compared texts of length t <= MAX_COMPARED_CHARS
     """
     threshold: float
+    min_improvement: float = 0.05
+    feedback_similarity: float = 0.85
+    forecast_similarity: float = 0.9
     
-    def __init__(self, name: str, threshold: float = 0.8):
+    def __init__(self, name: str, threshold: float = 0.8, min_improvement: float = 0.05,
+                 feedback_similarity: float = 0.85, forecast_similarity: float = 0.9):
         """
         Initialize the confidence check agent.
         
@@ -28,8 +122,36 @@ class ConfidenceCheckAgent(BaseAgent):
             name (str): Agent identifier
             threshold (float): Confidence threshold for loop exit (0.0-1.0)
                               Default 0.8 provides good balance between quality and efficiency
+            min_improvement (float): Smallest confidence gain per round worth another round
+            feedback_similarity (float): Feedback similarity (0-1) treated as a repeat
+            forecast_similarity (float): Forecast text similarity (0-1) treated as unchanged
         """
-        super().__init__(name=name, sub_agents=[], threshold=threshold)
+        super().__init__(
+            name=name, sub_agents=[], threshold=threshold, min_improvement=min_improvement,
+            feedback_similarity=feedback_similarity, forecast_similarity=forecast_similarity,
+        )
+
+    def _early_exit_reason(self, entry: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Trajectory checks against the previous round of this run. Time Complexity: O(t)"""
+        if previous is None:
+            return None
+        gain = entry["confidence"] - previous["confidence"]
+        if gain < self.min_improvement:
+            logger.info(f"  - Confidence gain {gain:+.2f} < {self.min_improvement}")
+            return EXIT_NOT_IMPROVING
+        similarity = text_similarity(entry["feedback"], previous["feedback"])
+        if similarity >= self.feedback_similarity:
+            logger.info(f"  - Verifier feedback repeats last round (similarity {similarity:.2f})")
+            return EXIT_FEEDBACK_REPEATED
+        forecast, previous_forecast = entry["forecast"], previous["forecast"]
+        if forecast and previous_forecast and all(
+            forecast[key] == previous_forecast[key] for key in ("risk_level", "primary_concern")
+        ):
+            similarity = text_similarity(forecast["text"], previous_forecast["text"])
+            if similarity >= self.forecast_similarity:
+                logger.info(f"  - Forecast materially unchanged (similarity {similarity:.2f})")
+                return EXIT_FORECAST_UNCHANGED
+        return None
 
     async def _run_async_impl(
         self, ctx: InvocationContext
@@ -46,27 +168,44 @@ class ConfidenceCheckAgent(BaseAgent):
         Yields:
             Event: Agent execution event with escalation action if threshold met
             
-        Time Complexity: O(1) - Fixed operations regardless of input size
+        Time Complexity: O(t) - Bounded text comparisons against the previous round
         Error Handling: Graceful degradation with default values for missing data
         """
-        print(f"--- Running {self.name} ---")
+        logger.info(f"--- Running {self.name} ---")
+        profile = run_profile(ctx.session.state)
+        max_iterations = getattr(self.parent_agent, "max_iterations", None)
+
+        if not profile.verify:
+            # Single forecast: nothing was verified, so there is no confidence to record
+            saved = max(0, max_iterations - 1) if max_iterations else 0
+            logger.info(f"  - ⏭️ No verification ({profile.name} profile), skipping {saved} iteration(s).")
+            annotate_current_span(**{EXIT_REASON_ATTRIBUTE: EXIT_NOT_VERIFIED})
+            yield Event(
+                author=self.name,
+                content={"parts": [Part(text=f"Single forecast, verification skipped ({profile.name} profile).")]},
+                actions=EventActions(escalate=True, state_delta={
+                    EXIT_REASON_KEY: EXIT_NOT_VERIFIED, ITERATIONS_SAVED_KEY: saved,
+                }),
+                invocation_id=ctx.invocation_id
+            )
+            return
         
         # Extract verification output from session state
         # Default to empty dict if missing to prevent KeyError
         verification_output = ctx.session.state.get("verification_output", {})
-        print(f"  - Raw verification output: {verification_output}")
+        logger.info(f"  - Raw verification output: {verification_output}")
         
-        # Handle case where verification_output might be a string with embedded JSON
-        # This covers scenarios where LLM output hasn't been parsed yet
+        # The verifier's after_agent_callback normally stores a validated dict (parse-once);
+        # a string here means its output failed schema validation, so extract leniently
         if isinstance(verification_output, str):
             verification_output = extract_json_from_llm_output(verification_output)
         
         # Validate extraction was successful
         if verification_output and isinstance(verification_output, dict):
-            print(f"  - Parsed verification output: {verification_output}")
-            print(f"  - Output type: {type(verification_output)}")
+            logger.info(f"  - Parsed verification output: {verification_output}")
+            logger.debug(f"  - Output type: {type(verification_output)}")
         else:
-            print("  - Warning: Could not extract valid verification data")
+            logger.warning("  - Warning: Could not extract valid verification data")
             verification_output = {}
         
         # Extract confidence score with safe fallback
@@ -77,19 +216,57 @@ class ConfidenceCheckAgent(BaseAgent):
         try:
             confidence = float(confidence)
         except (ValueError, TypeError):
-            print(f"  - Warning: Invalid confidence value '{confidence}', defaulting to 0.0")
+            logger.warning(f"  - Warning: Invalid confidence value '{confidence}', defaulting to 0.0")
             confidence = 0.0
         
-        print(f"  - Checking confidence: {confidence} >= {self.threshold}?")
+        logger.info(f"  - Checking confidence: {confidence} >= {self.threshold}?")
+        annotate_current_span(**{CONFIDENCE_ATTRIBUTE: confidence})
+
+        # Per-round history for this run (earlier runs of the session are ignored)
+        history: List[Dict[str, Any]] = [
+            entry for entry in ctx.session.state.get(HISTORY_KEY) or []
+            if isinstance(entry, dict) and entry.get("invocation_id") == ctx.invocation_id
+        ]
+        previous = history[-1] if history else None
+        entry = {
+            "invocation_id": ctx.invocation_id,
+            "iteration": len(history) + 1,
+            "confidence": confidence,
+            "feedback": normalize_text(verification_output.get("feedback_for_forecaster")),
+            "forecast": forecast_snapshot(ctx.session.state.get("risk_forecast")),
+        }
+        history.append(entry)
 
-        # Core decision logic: threshold comparison determines loop continuation
+        # Core decision logic: threshold first, then trajectory-based early exit
         if confidence >= self.threshold:
-            print(f"  - ✅ Confidence threshold met ({confidence:.2f} >= {self.threshold}). Escalating to exit loop.")
-            actions = EventActions(escalate=True)  # Signal loop termination
+            exit_reason = EXIT_THRESHOLD_MET
+        elif not cgm_data_reliable(ctx.session.state):
+            exit_reason = EXIT_UNRELIABLE_DATA
+        elif profile.early_exit:
+            exit_reason = self._early_exit_reason(entry, previous)
+        else:
+            exit_reason = None
+        if exit_reason is None and max_iterations and entry["iteration"] >= max_iterations:
+            exit_reason = EXIT_MAX_ITERATIONS  # loop ends on its own, record why
+
+        state_delta: Dict[str, Any] = {HISTORY_KEY: history}
+        if exit_reason is not None:
+            saved = max(0, max_iterations - entry["iteration"]) if max_iterations else 0
+            state_delta.update({EXIT_REASON_KEY: exit_reason, ITERATIONS_SAVED_KEY: saved})
+            annotate_current_span(**{EXIT_REASON_ATTRIBUTE: exit_reason})
+
+        if exit_reason == EXIT_THRESHOLD_MET:
+            logger.info(f"  - ✅ Confidence threshold met ({confidence:.2f} >= {self.threshold}). Escalating to exit loop.")
+            actions = EventActions(escalate=True, state_delta=state_delta)  # Signal loop termination
             event_content = [Part(text=f"Confidence threshold met ({confidence:.2f}). Verification successful.")]
+        elif exit_reason in (EXIT_NOT_IMPROVING, EXIT_FEEDBACK_REPEATED, EXIT_FORECAST_UNCHANGED, EXIT_UNRELIABLE_DATA):
+            logger.info(f"  - ⏹️ Early exit ({exit_reason}) at {confidence:.2f}, "
+                        f"skipping {state_delta[ITERATIONS_SAVED_KEY]} iteration(s).")
+            actions = EventActions(escalate=True, state_delta=state_delta)
+            event_content = [Part(text=f"Refinement stopped early ({exit_reason}) at confidence {confidence:.2f}.")]
         else:
-            print(f"  - 🔄 Confidence below threshold ({confidence:.2f} < {self.threshold}). Continuing loop.")
-            actions = EventActions()  # Continue loop iteration
+            logger.info(f"  - 🔄 Confidence below threshold ({confidence:.2f} < {self.threshold}). Continuing loop.")
+            actions = EventActions(state_delta=state_delta)  # Continue loop iteration
             event_content = [Part(text=f"Confidence too low ({confidence:.2f}). Continuing refinement.")]
 
         # Yield execution event with appropriate action
@@ -1,7 +1,10 @@
+import logging
 import re
 import json
 from typing import Dict, Any, Optional
 
+logger = logging.getLogger(__name__)
+
 def extract_json_from_llm_output(raw_output: str) -> Optional[Dict[str, Any]]:
     """
     Robustly extracts a JSON object from a string that may contain surrounding text.
@@ -40,7 +43,7 @@ def extract_json_from_llm_output(raw_output: str) -> Optional[Dict[str, Any]]:
                 json_string = raw_output[start:end]
 
     if not json_string:
-        print("Warning: No JSON block found in the output.")
+        logger.warning("Warning: No JSON block found in the output.")
         return None
 
     try:
@@ -48,8 +51,6 @@ def extract_json_from_llm_output(raw_output: str) -> Optional[Dict[str, Any]]:
         parsed_json = json.loads(json_string)
         return parsed_json
     except json.JSONDecodeError as e:
-        print(f"Warning: Could not decode extracted JSON string. Error: {e}")
-        print(f"--- Faulty JSON String ---")
-        print(json_string)
-        print("--------------------------")
+        logger.warning(f"Warning: Could not decode extracted JSON string. Error: {e}\n"
+                       f"--- Faulty JSON String ---\n{json_string}\n--------------------------")
         return None
@@ -2,8 +2,13 @@ import json
 import os
 
 from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
 from dotenv import load_dotenv
 
+from ...analytics import window_features
+from ...analytics.sensor_faults import DATA_QUALITY_KEY, assess_data_quality, detect_window_faults, merge_issues
+from ...execution import run_profile
 from .prompts import SIMULATED_CGM_FEED_PROMPT, CGMDataOutput
 
 load_dotenv()
@@ -19,6 +24,50 @@ instruction_for_agent = SIMULATED_CGM_FEED_PROMPT.format(
 model_output=SCHEMA_JSON_STRING
 )
 
+def apply_cgm_window_features(callback_context: CallbackContext):
+    """
+    When the run carries a real CGM window (`state['cgm_window']`, 5-minute samples,
+    oldest first), replace the LLM's guessed trend arrow and data quality issues
+    with computed ones and publish the derived features for the forecaster.
+
+    Either way `state['cgm_data_quality']` records whether the data is reliable,
+    so downstream agents can skip analysis that is pointless on faulty data.
+    """
+    cgm_window = callback_context.state.get("cgm_window")
+    cgm_data = callback_context.state.get("cgm_data")
+    if not cgm_window:
+        reported = cgm_data.get("data_quality_issues") if isinstance(cgm_data, dict) else None
+        callback_context.state[DATA_QUALITY_KEY] = assess_data_quality(reported, "reported")
+        return None
+
+    features = window_features(cgm_window)
+    issues = detect_window_faults(cgm_window)
+    if isinstance(cgm_data, dict):
+        cgm_data = dict(cgm_data)
+        cgm_data["trend_arrow"] = features["trend_arrow"]
+        if features["latest_glucose"] is not None:
+            cgm_data["glucose_value"] = int(features["latest_glucose"])
+        cgm_data["data_quality_issues"] = merge_issues(issues)
+        callback_context.state["cgm_data"] = cgm_data
+    callback_context.state["cgm_features"] = features
+    callback_context.state[DATA_QUALITY_KEY] = assess_data_quality(issues, "detector")
+    return None
+
+def use_imported_cgm_data(callback_context: CallbackContext):
+    """
+    Imported scenarios (`state['cgm_source'] == 'import'`) already carry the
+    real reading in `state['cgm_data']`, and fast profile runs of built-in
+    scenarios a simulated one ('simulated'): publish its window features and
+    skip the simulation call.
+    """
+    cgm_data = callback_context.state.get("cgm_data")
+    source = callback_context.state.get("cgm_source")
+    provided = source == "import" or (source == "simulated" and run_profile(callback_context.state).simulate_inputs)
+    if not provided or not isinstance(cgm_data, dict):
+        return None
+    apply_cgm_window_features(callback_context)
+    return types.Content(role="model", parts=[types.Part(text=json.dumps(callback_context.state["cgm_data"]))])
+
 SimulatedCGMFeedAgent = LlmAgent(
     model=MODEL_NAME,
     name="SimulatedCGMFeedAgent",
@@ -27,5 +76,7 @@ SimulatedCGMFeedAgent = LlmAgent(
     output_schema=CGMDataOutput,
     output_key="cgm_data",
     disallow_transfer_to_parent=True,
-    disallow_transfer_to_peers=True
+    disallow_transfer_to_peers=True,
+    before_agent_callback=use_imported_cgm_data,
+    after_agent_callback=apply_cgm_window_features
 )
@@ -1,41 +1,4 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
-
-# --- Pydantic Schema for CGMDataOutput ---
-# This is what the Simulated_CGM_Feed_Agent will output.
-
-class CGMDataOutput(BaseModel):
-    """
-    Pydantic schema for the structured output of the Simulated_CGM_Feed_Agent.
-    """
-    glucose_value: Optional[int] = Field(
-        default=None,
-        description="The blood glucose reading in mg/dL. Can be null if there's a sensor error or missing data."
-    )
-    trend_arrow: str = Field(
-        description="An arrow showing how quickly the patients glucose is rising,"
-                    "return 'DoubleUp' to indicate patients glucose is rising rapidly,"
-                    "return 'SingleUp' to indicate patients glucose is rising,"
-                    "return 'FortyFiveUp' to indicate patients glucose is rising slowly,"
-                    "return 'Flat' to indicate patients glucose is constant,"
-                    "return 'FortyFiveDown' to indicate patients glucose is falling slowly,"
-                    "return 'SingleDown' to indicate patients glucose is falling,"
-                    "return 'DoubleDown' to indicate patients glucose is falling rapidly,"
-                    "return 'NOT_COMPUTABLE' to indicate the CGM has no reading of patients glucose,"
-                    "return 'Error' to indicate issues with CGM reading",)
-    unit: str = Field(
-        default="mg/dL",
-        description="Unit for the glucose value, typically 'mg/dL'."
-    )
-    data_quality_issues: Optional[str] = Field(
-        default=None,
-        description="Describes any sensor data quality issues (e.g., 'missing_data', 'erratic_readings', 'sensor_error_X01'). Omit or null if no issues."
-    )
-    timestamp_simulated: str = Field(
-        default_factory=lambda: datetime.utcnow().isoformat() + "Z",
-        description="ISO 8601 timestamp for when this CGM reading was simulated (UTC)."
-    )
+from ...schemas import CGMDataOutput
 
 # --- Prompt for SimulatedCGMFeedAgent ---
 # This prompt will be used by an LlmAgent.
@@ -1,3 +1,4 @@
+import logging
 import random
 import os
 from typing import Dict, Optional
@@ -10,50 +11,75 @@ from google.genai.types import HttpOptions
 from dotenv import load_dotenv
 
 from .prompt import *
+from .schemas import ScenarioDict, parse_state_output, validate_output
+from .execution import model_call_hedger, HedgePolicy
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 MODEL = os.getenv("GENERATE_SCENARIO_MODEL")
-print(f"Using model: {MODEL}")
+logger.info(f"Using model: {MODEL}")
 
 client = genai.Client(http_options=HttpOptions(api_version="v1"))
 
-class ScenarioDict(BaseModel):
-    scenarios: str
+# Scenario generation gates the whole pipeline: deadline per call, and a duplicate
+# (GENERATE_SCENARIO_HEDGE_MODEL, else the same model) once it runs past the rolling p90
+scenario_hedge_policy = model_call_hedger.register(HedgePolicy(
+    name="ScenarioGeneration",
+    timeout=float(os.getenv("GENERATE_SCENARIO_TIMEOUT_SECONDS", "30")),
+    alternate_model=os.getenv("GENERATE_SCENARIO_HEDGE_MODEL"),
+))
 
 
-def generate_scenario():
+async def _generate_scenario_json(config: types.GenerateContentConfig, contents) -> Dict[str, str]:
+    """
+    One hedged scenario request on the async client; the first response that
+    validates as a scenario wins and the slower duplicate is cancelled.
+
+    Raises:
+        ValueError: If scenario validation fails
+        ModelCallTimeout: If no response arrived within the policy's timeout
+    """
+    response = await model_call_hedger.call(
+        scenario_hedge_policy, MODEL,
+        lambda model: client.aio.models.generate_content(model=model, config=config, contents=contents),
+        valid=lambda response: parse_state_output("scenario", response.text) is not None,
+    )
+
+    # Parse once and hand back the validated result instead of the raw text
+    try:
+        return validate_output("scenario", response.text).model_dump()
+    except ValueError as e:  # includes pydantic ValidationError
+        raise ValueError("Scenario validation failed.") from e
+
+async def generate_scenario():
     """
     Generates a random but realistic scenario sentence inspired by the real world.
     
     Uses Google's Gemini API to create contextually appropriate T1D scenarios.
     
     Returns:
-        str: JSON string containing the generated scenario
+        Dict[str, str]: Validated scenario, e.g. {"scenarios": "..."}
         
     Raises:
         ValueError: If scenario validation fails
+        ModelCallTimeout: If the call (hedge included) timed out
         
-    Time Complexity: O(1) - Single API call with fixed parameters
+    Time Complexity: O(1) - Single API call with fixed parameters (two when hedged)
     """
-    response = client.models.generate_content(
-        model=MODEL,
-        config=types.GenerateContentConfig(
+    return await _generate_scenario_json(
+        types.GenerateContentConfig(
             system_instruction=CALLBACK_PROMPT,
             temperature=1.2,
             max_output_tokens=500,
             response_mime_type='application/json',
             response_schema=ScenarioDict
         ),
-        contents=['Generate a new, random but realistic scenario sentence inspired by the real world.']  
+        ['Generate a new, random but realistic scenario sentence inspired by the real world.']
     )
 
-    if ScenarioDict.model_validate_json(response.text):
-        return response.text
-    else:
-        raise ValueError("Scenario validation failed.")
-
-def rephrase_custom_scenario(custom_text: str):
+async def rephrase_custom_scenario(custom_text: str):
     """
     Rephrase the custom text into a properly formatted scenario sentence.
     
@@ -64,30 +90,25 @@ def rephrase_custom_scenario(custom_text: str):
         custom_text (str): Raw user input describing their scenario
         
     Returns:
-        str: JSON string containing the rephrased scenario
+        Dict[str, str]: Validated scenario, e.g. {"scenarios": "..."}
         
     Raises:
         ValueError: If scenario validation fails
+        ModelCallTimeout: If the call (hedge included) timed out
         
-    Time Complexity: O(1) - Single API call with fixed parameters
+    Time Complexity: O(1) - Single API call with fixed parameters (two when hedged)
     """
-    response = client.models.generate_content(
-        model=MODEL,
-        config=types.GenerateContentConfig(
+    return await _generate_scenario_json(
+        types.GenerateContentConfig(
             system_instruction=REPHRASE_PROMPT,
             temperature=0.5,
             max_output_tokens=500,
             response_mime_type='application/json',
             response_schema=ScenarioDict
         ),
-        contents=[custom_text]  
+        [custom_text]
     )
 
-    if ScenarioDict.model_validate_json(response.text):
-        return response.text
-    else:
-        raise ValueError("Scenario validation failed.")
-
 
 # --- Robust Scenario Definitions ---
 # This dictionary holds the detailed scenario descriptions that will be fed
@@ -145,13 +166,14 @@ class ScenarioRequest(BaseModel):
     scenario_id: str  # e.g., "high_carb_hyper", "random", "custom"
     session_id: str
     custom_text: Optional[str] = None
+    profile: Optional[str] = None  # execution profile: "fast", "balanced", "thorough" (None: EXECUTION_PROFILE)
 
 
 
 
 # --- Main Logic Function ---
 
-def get_scenario_details(scenario_id: str, custom_text: Optional[str] = None) -> Dict[str, str]:
+async def get_scenario_details(scenario_id: str, custom_text: Optional[str] = None) -> Dict[str, str]:
     """
     Retrieves the detailed scenario descriptions based on the selected ID.
     
@@ -186,7 +208,7 @@ def get_scenario_details(scenario_id: str, custom_text: Optional[str] = None) ->
         if not custom_text or not custom_text.strip():
             raise HTTPException(status_code=400, detail="Custom text must be provided for 'custom' scenario.")
         # Call AI rephrasing function - O(1) time complexity
-        details = rephrase_custom_scenario(custom_text)
+        details = await rephrase_custom_scenario(custom_text)
         return details
 
     elif scenario_id in SCENARIO_DETAILS_DB: